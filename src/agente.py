@@ -3,24 +3,24 @@ Agente Entrevistador con Arquitectura Desacoplada
 Utiliza DatabaseManager y DataLoader para manejo de datos
 """
 
-print("🎯 Agente Entrevistador - Arquitectura Desacoplada")
-print("=" * 60)
-
 import time
 import os
+import sys
 from typing import List, Dict
 
-# Importar módulos desacoplados
+# Importar módulos desacoplados (sin imprimir nada: importar el módulo no debe
+# tener efectos visibles; main() informa del resultado)
 try:
-    from database_manager import DatabaseManager
+    from fragmentacion import crear_gestor_bd
     from data_loader import DataLoader, inicializar_base_datos_completa
+    from normalizacion import normalizar_texto
+    from sesiones import GestorSesiones
 
-    print("✅ Módulos de datos importados correctamente")
     MODULOS_DISPONIBLES = True
+    ERROR_IMPORTACION = None
 except ImportError as e:
-    print(f"❌ Error importando módulos: {e}")
-    print("💡 Asegúrate de tener los archivos database_manager.py y data_loader.py")
     MODULOS_DISPONIBLES = False
+    ERROR_IMPORTACION = e
 
 
 class AgenteEntrevistador:
@@ -31,26 +31,28 @@ class AgenteEntrevistador:
             print("❌ No se pueden cargar los módulos necesarios")
             return
 
-        self.db_manager = DatabaseManager(db_path)
+        self.db_manager = crear_gestor_bd(db_path)
         self.data_loader = DataLoader()
         self.habilidades_seleccionadas = []
         self.preguntas_generadas = {}
 
+        # Sesión de entrevista: volver a obtener preguntas no repite las ya mostradas
+        try:
+            self.sesiones = GestorSesiones(self.db_manager)
+            self.sesion_id = self.sesiones.crear()
+        except Exception as e:
+            print(f"⚠️ Sesiones no disponibles, las preguntas pueden repetirse: {e}")
+            self.sesiones = None
+
         # Inicializar datos si es necesario
         self.inicializar_datos_si_necesario()
 
     def inicializar_datos_si_necesario(self):
-        """Inicializa la base de datos con datos si está vacía"""
-        total_preguntas = self.db_manager.contar_preguntas()
-
-        if total_preguntas == 0:
-            print("📝 Base de datos vacía. Cargando preguntas iniciales...")
-            if self.data_loader.cargar_datos_iniciales(self.db_manager):
-                print("✅ Preguntas iniciales cargadas correctamente")
-            else:
-                print("❌ Error cargando preguntas iniciales")
+        """Carga los datos iniciales si la BD está vacía o si cambiaron (según su hash)"""
+        if not self.data_loader.cargar_datos_iniciales(self.db_manager):
+            print("❌ Error cargando preguntas iniciales")
         else:
-            print(f"📚 Base de datos lista con {total_preguntas} preguntas")
+            print(f"📚 Base de datos lista con {self.db_manager.contar_preguntas()} preguntas")
 
     def mostrar_habilidades_disponibles(self) -> List[str]:
         """Muestra todas las habilidades disponibles en la base de datos"""
@@ -63,10 +65,13 @@ class AgenteEntrevistador:
         print("\n📚 HABILIDADES DISPONIBLES EN LA BASE DE DATOS:")
         print("=" * 55)
 
+        # Una consulta agrupada para todas, no dos por habilidad
+        estadisticas_por_habilidad = self.db_manager.obtener_estadisticas_habilidades()
+
         # Organizar en columnas para mejor visualización
         for i, habilidad in enumerate(habilidades, 1):
-            total_preguntas = self.db_manager.contar_preguntas_por_habilidad(habilidad)
-            estadisticas = self.db_manager.obtener_estadisticas_habilidad(habilidad)
+            estadisticas = estadisticas_por_habilidad.get(habilidad, {})
+            total_preguntas = estadisticas.get('total', 0)
 
             niveles_info = ", ".join(
                 [f"{nivel}: {count}" for nivel, count in estadisticas.get('por_nivel', {}).items()])
@@ -116,12 +121,8 @@ class AgenteEntrevistador:
 
                 elif seleccion.startswith('nivel:'):
                     nivel = seleccion.split(':')[1].lower()
-                    self.habilidades_seleccionadas = []
-                    for hab in habilidades_disponibles:
-                        # Verificar si la habilidad tiene preguntas del nivel solicitado
-                        stats = self.db_manager.obtener_estadisticas_habilidad(hab)
-                        if nivel in stats.get('por_nivel', {}):
-                            self.habilidades_seleccionadas.append(hab)
+                    # Habilidades con preguntas del nivel solicitado, en una sola consulta
+                    self.habilidades_seleccionadas = self.db_manager.obtener_habilidades_con_criterios(nivel=nivel)
 
                     if self.habilidades_seleccionadas:
                         break
@@ -170,8 +171,11 @@ class AgenteEntrevistador:
                     self.habilidades_seleccionadas = []
 
                     for nombre in nombres:
-                        coincidencias = [h for h in habilidades_disponibles
-                                         if nombre.lower() in h.lower()]
+                        nombre_norm = normalizar_texto(nombre)
+                        exactas = [h for h in habilidades_disponibles
+                                   if normalizar_texto(h) == nombre_norm]
+                        coincidencias = exactas or [h for h in habilidades_disponibles
+                                                    if nombre_norm in normalizar_texto(h)]
                         if coincidencias:
                             self.habilidades_seleccionadas.extend(coincidencias)
                         else:
@@ -212,14 +216,26 @@ class AgenteEntrevistador:
 
         preguntas_exitosas = 0
 
+        # En la sesión: una lectura para todas las habilidades y sin repetir preguntas
+        resultado = None
+        if self.sesiones is not None:
+            try:
+                resultado = self.sesiones.generar(self.sesion_id, self.habilidades_seleccionadas,
+                                                  cantidad_por_habilidad, nivel_filtro)
+            except Exception as e:
+                print(f"⚠️ Error en la sesión, se obtienen preguntas sin ella: {e}")
+
         for habilidad in self.habilidades_seleccionadas:
             print(f"🔄 Procesando {habilidad}...")
 
-            preguntas = self.db_manager.obtener_preguntas_por_habilidad(
-                habilidad,
-                cantidad=cantidad_por_habilidad,
-                nivel=nivel_filtro
-            )
+            if resultado is not None:
+                preguntas = resultado['preguntas'][habilidad]
+            else:
+                preguntas = self.db_manager.obtener_preguntas_por_habilidad(
+                    habilidad,
+                    cantidad=cantidad_por_habilidad,
+                    nivel=nivel_filtro
+                )
 
             if preguntas:
                 self.preguntas_generadas[habilidad] = preguntas
@@ -234,9 +250,10 @@ class AgenteEntrevistador:
                 ]
                 preguntas_exitosas += 2
 
-            time.sleep(0.3)  # Pausa visual
-
         print(f"\n✅ Proceso completado: {preguntas_exitosas} preguntas obtenidas")
+        if resultado is not None and resultado['repetidas']:
+            print(f"⚠️ {resultado['repetidas']} preguntas repetidas: ya no quedan nuevas para "
+                  f"{', '.join(resultado['agotadas'])}")
         return True
 
     def mostrar_resumen_preguntas(self):
@@ -526,10 +543,11 @@ class AgenteEntrevistador:
             print("2. Exportar BD completa a SQL")
             print("3. Limpiar base de datos")
             print("4. Buscar preguntas por término")
-            print("5. Volver al menú principal")
+            print("5. Reporte de preguntas casi duplicadas")
+            print("6. Volver al menú principal")
 
             try:
-                opcion = input("\nSelecciona (1-5): ").strip()
+                opcion = input("\nSelecciona (1-6): ").strip()
 
                 if opcion == "1":
                     confirmacion = input("¿Recargar datos iniciales? Esto puede duplicar datos (s/n): ")
@@ -559,9 +577,27 @@ class AgenteEntrevistador:
                             for hab, pregunta, tipo, nivel in resultados:
                                 print(f"• {hab} ({nivel}): {pregunta[:60]}...")
                         else:
-                            print("❌ No se encontraron resultados")
+                            # Sin coincidencias exactas: probar búsqueda tolerante a errores
+                            aproximados = self.db_manager.buscar_preguntas_difusa(termino)
+                            if aproximados:
+                                print(f"\n🔍 Sin coincidencias exactas. {len(aproximados)} resultados aproximados:")
+                                for hab, pregunta, tipo, nivel, similitud in aproximados:
+                                    print(f"• {hab} ({nivel}, {similitud:.0%}): {pregunta[:60]}...")
+                            else:
+                                print("❌ No se encontraron resultados")
 
                 elif opcion == "5":
+                    grupos = self.db_manager.reporte_duplicados()
+                    if grupos:
+                        print(f"\n🔁 {len(grupos)} grupos de preguntas casi duplicadas:")
+                        for grupo in grupos:
+                            print(f"\n• {grupo['habilidad']} (IDs: {', '.join(map(str, grupo['ids']))})")
+                            for pregunta in grupo['preguntas']:
+                                print(f"    - {pregunta[:70]}")
+                    else:
+                        print("✅ No se encontraron preguntas casi duplicadas")
+
+                elif opcion == "6":
                     break
 
             except KeyboardInterrupt:
@@ -570,6 +606,20 @@ class AgenteEntrevistador:
 
 def main():
     """Función principal del programa"""
+    # Con argumentos, modo por lotes sin interacción (ver lote.py)
+    if len(sys.argv) > 1:
+        from lote import main as main_lote
+        main_lote(sys.argv[1:])
+        return
+
+    print("🎯 Agente Entrevistador - Arquitectura Desacoplada")
+    print("=" * 60)
+    if MODULOS_DISPONIBLES:
+        print("✅ Módulos de datos importados correctamente")
+    else:
+        print(f"❌ Error importando módulos: {ERROR_IMPORTACION}")
+        print("💡 Asegúrate de tener los archivos database_manager.py y data_loader.py")
+
     print("\n🎯 AGENTE ENTREVISTADOR - ARQUITECTURA PROFESIONAL")
     print("=" * 65)
     print("Sistema de generación de preguntas técnicas con base de datos SQLite")
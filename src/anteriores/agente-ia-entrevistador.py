@@ -1,43 +1,37 @@
 print("🎯 Agente IA para Entrevistas Técnicas")
 print("=" * 50)
 
-try:
-    from langchain.llms import Ollama
-    from langchain.schema import HumanMessage, SystemMessage
-    import time
-    import json
+import time
 
-    print("✅ LangChain importado correctamente")
-    LANGCHAIN_OK = True
-except ImportError as e:
-    print(f"❌ Error importando LangChain: {e}")
-    LANGCHAIN_OK = False
+# Cliente HTTP de Ollama (solo biblioteca estándar) y motor de generación en paralelo
+from generacion_concurrente import TAMANO_GRUPO, ClienteOllamaHTTP, generar_agrupado, generar_concurrente
+from cache_llm import con_cache
 
 
 class AgenteEntrevistador:
-    def __init__(self, modelo="llama2"):
+    def __init__(self, modelo="llama2", tamano_grupo=TAMANO_GRUPO):
         print("🤖 Inicializando Agente Entrevistador...")
         self.modelo = modelo
+        # Habilidades por prompt al generar todas (1: una llamada por habilidad)
+        self.tamano_grupo = tamano_grupo
         self.habilidades = []
         self.preguntas_generadas = {}
         self.memoria_entrevistas = []
 
         # Conectar con Ollama
-        if LANGCHAIN_OK:
-            try:
-                print(f"🔄 Conectando con modelo {modelo}...")
-                self.llm = Ollama(model=modelo)
+        try:
+            print(f"🔄 Conectando con modelo {modelo}...")
+            cliente = ClienteOllamaHTTP(modelo=modelo)
 
-                # Prueba de conexión
-                test_response = self.llm("Responde solo: OK")
-                print("✅ Conexión con Ollama establecida")
-                self.ia_disponible = True
+            # Prueba de conexión sin inferencia: el servidor responde y tiene el modelo
+            cliente.verificar_conexion()
+            self.llm = con_cache(cliente, modelo)
+            print("✅ Conexión con Ollama establecida")
+            self.ia_disponible = True
 
-            except Exception as e:
-                print(f"⚠️ Error conectando con Ollama: {e}")
-                print("💡 Ejecuta 'ollama serve' en otra terminal")
-                self.ia_disponible = False
-        else:
+        except Exception as e:
+            print(f"⚠️ Error conectando con Ollama: {e}")
+            print("💡 Ejecuta 'ollama serve' en otra terminal")
             self.ia_disponible = False
 
     def capturar_habilidades(self):
@@ -98,9 +92,24 @@ class AgenteEntrevistador:
             return preguntas_simuladas
 
         try:
-            print(f"🔄 Generando preguntas para {habilidad}...")
-
-            prompt = f"""Eres un experto reclutador técnico. Genera exactamente 2 preguntas de entrevista para evaluar la habilidad técnica: {habilidad}
+            return self._generar_con_llm(habilidad)
+        except Exception as e:
+            print(f"❌ Error generando preguntas: {e}")
+            return self._preguntas_respaldo(habilidad)
+
+    def _preguntas_respaldo(self, habilidad):
+        """Preguntas genéricas cuando el LLM falla tras los reintentos"""
+        return [
+            f"¿Cuál es tu nivel de experiencia con {habilidad}?",
+            f"¿Puedes dar un ejemplo de uso de {habilidad}?"
+        ]
+
+    def _generar_con_llm(self, habilidad, refrescar=False):
+        """
+        Una llamada al LLM (o la respuesta en caché, salvo con refrescar);
+        lanza ErrorLLM para que el motor concurrente reintente
+        """
+        prompt = f"""Eres un experto reclutador técnico. Genera exactamente 2 preguntas de entrevista para evaluar la habilidad técnica: {habilidad}
 
 Requisitos:
 - Preguntas claras y específicas
@@ -116,25 +125,18 @@ PREGUNTA 2: [pregunta práctica]
 
 Habilidad a evaluar: {habilidad}"""
 
-            respuesta = self.llm(prompt)
+        respuesta = self.llm(prompt, refrescar=refrescar)
 
-            # Procesar la respuesta para extraer las preguntas
-            preguntas = self.extraer_preguntas(respuesta)
+        # Procesar la respuesta para extraer las preguntas
+        preguntas = self.extraer_preguntas(respuesta)
 
-            if len(preguntas) >= 2:
-                return preguntas[:2]  # Solo las primeras 2
-            else:
-                # Fallback si no se pudieron extraer
-                return [
-                    f"¿Cuáles son los conceptos fundamentales de {habilidad}?",
-                    f"Describe un proyecto donde hayas aplicado {habilidad}"
-                ]
-
-        except Exception as e:
-            print(f"❌ Error generando preguntas: {e}")
+        if len(preguntas) >= 2:
+            return preguntas[:2]  # Solo las primeras 2
+        else:
+            # Fallback si no se pudieron extraer
             return [
-                f"¿Cuál es tu nivel de experiencia con {habilidad}?",
-                f"¿Puedes dar un ejemplo de uso de {habilidad}?"
+                f"¿Cuáles son los conceptos fundamentales de {habilidad}?",
+                f"Describe un proyecto donde hayas aplicado {habilidad}"
             ]
 
     def extraer_preguntas(self, respuesta_ia):
@@ -157,21 +159,60 @@ Habilidad a evaluar: {habilidad}"""
 
         return preguntas
 
-    def generar_todas_las_preguntas(self):
-        """Genera preguntas para todas las habilidades"""
+    def _generar_agrupadas(self, refrescar=False):
+        """Varias habilidades por prompt con respuesta JSON; solo se repiten las que fallan"""
+        print(f"🔄 Generando preguntas para {len(self.habilidades)} habilidades "
+              f"en prompts de {self.tamano_grupo}...")
+
+        def al_completar(indice, preguntas, error):
+            if error:
+                print(f"❌ Error generando preguntas para {self.habilidades[indice]}: {error}")
+            else:
+                print(f"✅ {self.habilidades[indice]} lista")
+
+        resultados = generar_agrupado(
+            [{'habilidad': habilidad, 'nivel': 'intermedio', 'cantidad': 2} for habilidad in self.habilidades],
+            lambda prompt, formato: self.llm(prompt, refrescar=refrescar, formato=formato),
+            tamano_grupo=self.tamano_grupo, al_completar=al_completar
+        )
+        for habilidad, preguntas in zip(self.habilidades, resultados):
+            self.preguntas_generadas[habilidad] = preguntas or self._preguntas_respaldo(habilidad)
+
+    def generar_todas_las_preguntas(self, refrescar=False):
+        """Genera preguntas para todas las habilidades (refrescar: sin usar la caché del LLM)"""
         print("\n🧠 GENERANDO PREGUNTAS DE ENTREVISTA...")
         print("=" * 50)
 
-        for habilidad in self.habilidades:
-            preguntas = self.generar_preguntas_habilidad(habilidad)
-            self.preguntas_generadas[habilidad] = preguntas
+        if not self.ia_disponible:
+            for habilidad in self.habilidades:
+                self.preguntas_generadas[habilidad] = self.generar_preguntas_habilidad(habilidad)
+        else:
+            inicio = time.perf_counter()
+            if self.tamano_grupo > 1:
+                self._generar_agrupadas(refrescar)
+            else:
+                # Todas las habilidades en paralelo, con timeout y reintentos por llamada
+                print(f"🔄 Generando preguntas para {len(self.habilidades)} habilidades en paralelo...")
+
+                def al_completar(habilidad, preguntas, error):
+                    if error:
+                        print(f"❌ Error generando preguntas para {habilidad}: {error}")
+                    else:
+                        print(f"✅ {habilidad} lista")
+
+                self.preguntas_generadas.update(generar_concurrente(
+                    self.habilidades, lambda habilidad: self._generar_con_llm(habilidad, refrescar),
+                    self._preguntas_respaldo, al_completar=al_completar
+                ))
+            print(f"⏱️ Generación completada en {time.perf_counter() - inicio:.1f} s")
+            if self.llm.resumen():
+                print(self.llm.resumen())
 
+        for habilidad in self.habilidades:
             print(f"\n📌 {habilidad}:")
-            for i, pregunta in enumerate(preguntas, 1):
+            for i, pregunta in enumerate(self.preguntas_generadas[habilidad], 1):
                 print(f"   {i}. {pregunta}")
 
-            time.sleep(1)  # Pausa entre generaciones
-
         print(f"\n✅ Se generaron {len(self.preguntas_generadas)} conjuntos de preguntas")
 
     def mostrar_resumen_preguntas(self):
@@ -248,7 +289,7 @@ Habilidad a evaluar: {habilidad}"""
                 elif opcion == "4":
                     print("\n🔄 Regenerando todas las preguntas...")
                     self.preguntas_generadas = {}
-                    self.generar_todas_las_preguntas()
+                    self.generar_todas_las_preguntas(refrescar=True)
 
                 elif opcion == "5":
                     print("👋 ¡Gracias por usar el Agente Entrevistador!")
@@ -1,62 +1,79 @@
 print("🚀 Inicializando agente con IA real...")
 
-try:
-    from langchain.llms import Ollama
-    from langchain.schema import HumanMessage, SystemMessage
-    import time
+import time
 
-    print("✅ LangChain importado correctamente")
-    LANGCHAIN_OK = True
-except ImportError as e:
-    print(f"❌ Error importando LangChain: {e}")
-    LANGCHAIN_OK = False
+# Cliente HTTP de Ollama (solo biblioteca estándar) con caché persistente de respuestas
+from generacion_concurrente import ClienteOllamaHTTP
+from cache_llm import con_cache
+from memoria_conversacion import MemoriaConversacion
 
 
 class AgenteIAReal:
     def __init__(self, modelo="llama2"):
         print("🤖 Inicializando Agente IA Real...")
-        self.memoria = []
         self.modelo = modelo
 
         # Intentar conectar con Ollama
-        if LANGCHAIN_OK:
-            try:
-                print(f"🔄 Conectando con modelo {modelo}...")
-                self.llm = Ollama(model=modelo)
-
-                # Hacer una prueba rápida
-                test_response = self.llm("Di solo 'OK'")
-                print("✅ Conexión con Ollama establecida correctamente")
-                self.ia_disponible = True
-
-            except Exception as e:
-                print(f"⚠️ Error conectando con Ollama: {e}")
-                print("💡 Asegúrate de que:")
-                print("   1. 'ollama serve' esté corriendo en otra terminal")
-                print(f"   2. El modelo '{modelo}' esté descargado: ollama pull {modelo}")
-                self.ia_disponible = False
-        else:
+        try:
+            print(f"🔄 Conectando con modelo {modelo}...")
+            cliente = ClienteOllamaHTTP(modelo=modelo)
+
+            # Prueba rápida sin inferencia: el servidor responde y tiene el modelo
+            cliente.verificar_conexion()
+            self.llm = con_cache(cliente, modelo)
+            print("✅ Conexión con Ollama establecida correctamente")
+            self.ia_disponible = True
+
+        except Exception as e:
+            print(f"⚠️ Error conectando con Ollama: {e}")
+            print("💡 Asegúrate de que:")
+            print("   1. 'ollama serve' esté corriendo en otra terminal")
+            print(f"   2. El modelo '{modelo}' esté descargado: ollama pull {modelo}")
             self.ia_disponible = False
 
-    def respuesta_inteligente(self, consulta):
-        """Genera una respuesta usando IA o modo simulado"""
+        # Memoria con presupuesto de tokens: el contexto del prompt no crece con la sesión
+        self.memoria = MemoriaConversacion(resumir=self.llm if self.ia_disponible else None)
+
+    def respuesta_inteligente(self, consulta, al_fragmento=None):
+        """
+        Genera una respuesta usando IA o modo simulado.
+        Con al_fragmento(texto) la respuesta de la IA se entrega token a token mientras
+        se genera (y también se retorna completa al final)
+        """
         if self.ia_disponible:
+            partes = []
             try:
-                print("🔄 Procesando con IA...")
-
                 # Prompt mejorado para mejores respuestas
+                contexto = self.memoria.contexto()
+                contexto = f"{contexto}\n\n" if contexto else ""
                 prompt = f"""Eres un asistente IA útil y amigable. 
                 Responde de manera clara, concisa y en español.
 
-                Pregunta: {consulta}
+                {contexto}Pregunta: {consulta}
 
                 Respuesta:"""
 
-                respuesta = self.llm(prompt)
-                return respuesta.strip()
+                if al_fragmento is None:
+                    print("🔄 Procesando con IA...")
+                    return self.llm(prompt).strip()
+
+                for fragmento in self.llm.stream(prompt):
+                    # Los espacios iniciales del modelo no se muestran
+                    if not partes:
+                        fragmento = fragmento.lstrip()
+                        if not fragmento:
+                            continue
+                    partes.append(fragmento)
+                    al_fragmento(fragmento)
+                return ''.join(partes).strip()
 
             except Exception as e:
-                return f"❌ Error procesando con IA: {e}"
+                error = f"❌ Error procesando con IA: {e}"
+                if partes:
+                    # Parte de la respuesta ya se mostró: se conserva y se avisa del corte
+                    al_fragmento(f"\n{error}")
+                    return ''.join(partes).strip() + f"\n{error}"
+                return error
         else:
             # Modo simulado con respuestas más inteligentes
             respuestas_simuladas = {
@@ -76,21 +93,32 @@ class AgenteIAReal:
             return respuestas_simuladas["default"]
 
     def conversar(self, consulta):
-        """Procesa una consulta y la guarda en memoria"""
+        """Procesa una consulta, mostrando la respuesta mientras se genera, y la guarda en memoria"""
         print(f"\n❓ Usuario: {consulta}")
+        print("🤖 Agente: ", end='', flush=True)
 
         inicio = time.time()
-        respuesta = self.respuesta_inteligente(consulta)
+        primer_token = None
+
+        def mostrar(fragmento):
+            nonlocal primer_token
+            if primer_token is None:
+                primer_token = time.time() - inicio
+            print(fragmento, end='', flush=True)
+
+        respuesta = self.respuesta_inteligente(consulta, mostrar)
         tiempo = time.time() - inicio
 
-        # Guardar en memoria
-        self.memoria.append({
-            "consulta": consulta,
-            "respuesta": respuesta,
-            "tiempo": round(tiempo, 2)
-        })
+        if primer_token is None:
+            # Modo simulado o error antes del primer token: la respuesta llega entera
+            print(respuesta, end='')
+        detalle = f", primer token en {primer_token:.1f}s" if primer_token is not None else ""
+        print(f"\n   ⏱️ {tiempo:.1f}s{detalle}")
+
+        # Guardar en memoria (después de mostrar la respuesta: plegar turnos no retrasa al usuario)
+        self.memoria.agregar(consulta, respuesta, tiempo=round(tiempo, 2),
+                             primer_token=round(primer_token, 2) if primer_token is not None else None)
 
-        print(f"🤖 Agente ({tiempo:.1f}s): {respuesta}")
         return respuesta
 
     def mostrar_memoria(self):
@@ -99,15 +127,24 @@ class AgenteIAReal:
         print("📚 MEMORIA DEL AGENTE")
         print("=" * 60)
 
-        if not self.memoria:
+        if not len(self.memoria):
             print("No hay conversaciones guardadas.")
             return
 
-        for i, item in enumerate(self.memoria, 1):
+        if self.memoria.resumen:
+            print(f"\n📝 Resumen de {self.memoria.turnos_resumidos} interacciones anteriores:")
+            print(self.memoria.resumen)
+
+        primero = len(self.memoria) - len(self.memoria.recientes) + 1
+        for i, item in enumerate(self.memoria.recientes, primero):
             print(f"\n{i}. 👤 Usuario: {item['consulta']}")
             print(f"   🤖 Agente ({item['tiempo']}s): {item['respuesta']}")
 
-        print(f"\n📊 Total: {len(self.memoria)} interacciones")
+        stats = self.memoria.estadisticas()
+        print(f"\n📊 Total: {stats['turnos']} interacciones, contexto de "
+              f"{stats['tokens_contexto']}/{stats['presupuesto_tokens']} tokens")
+        if self.ia_disponible and self.llm.resumen():
+            print(self.llm.resumen())
 
     def conversacion_interactiva(self):
         """Modo conversación interactiva con el usuario"""
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Caché persistente de respuestas del LLM para los agentes de anteriores/
+
+Las llamadas a Ollama son lo más lento y caro del sistema y muchas se repiten (mismas
+habilidades, mismas preguntas de prueba). CacheLLM guarda cada respuesta en SQLite con
+clave sha256(modelo + prompt): sobrevive entre ejecuciones, caduca a los ttl_s segundos
+y, al pasar de max_entradas, desaloja las de uso menos reciente (LRU).
+
+LLMConCache envuelve cualquier LLM invocable (prompt -> texto) con la caché. Los errores
+no se guardan: una llamada fallida se repite la próxima vez.
+
+Variables de entorno: LLM_CACHE (false para desactivar), LLM_CACHE_PATH,
+LLM_CACHE_TTL_S, LLM_CACHE_MAX_ENTRADAS.
+
+Uso:
+    python cache_llm.py                   # entradas y aciertos acumulados
+    python cache_llm.py --purgar          # borra las entradas caducadas
+    python cache_llm.py --vaciar
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+CACHE_ACTIVA = os.getenv('LLM_CACHE', 'true').lower() in ('1', 'true', 'yes', 'si', 'sí')
+RUTA_CACHE = os.getenv('LLM_CACHE_PATH', 'cache_llm.db')
+TTL_DEFECTO_S = float(os.getenv('LLM_CACHE_TTL_S', str(7 * 24 * 3600)))
+MAX_ENTRADAS_DEFECTO = int(os.getenv('LLM_CACHE_MAX_ENTRADAS', '5000'))
+
+
+class CacheLLM:
+    """Respuestas del LLM en SQLite, con caducidad y desalojo LRU; segura entre hilos"""
+
+    def __init__(self, ruta: str = None, ttl_s: float = TTL_DEFECTO_S,
+                 max_entradas: int = MAX_ENTRADAS_DEFECTO):
+        self.ruta = ruta or RUTA_CACHE
+        self.ttl_s = ttl_s
+        self.max_entradas = max_entradas
+
+        # Contadores de este proceso; los aciertos por entrada quedan en la tabla
+        self.aciertos = 0
+        self.fallos = 0
+        self.caducadas = 0
+        self.desalojadas = 0
+
+        self._bloqueo = threading.Lock()
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute('''
+            CREATE TABLE IF NOT EXISTS respuestas (
+                clave TEXT PRIMARY KEY,
+                modelo TEXT NOT NULL,
+                respuesta TEXT NOT NULL,
+                creado REAL NOT NULL,
+                ultimo_uso REAL NOT NULL,
+                aciertos INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self._conexion.execute('CREATE INDEX IF NOT EXISTS idx_respuestas_uso ON respuestas (ultimo_uso)')
+        self._conexion.commit()
+
+    @staticmethod
+    def clave(modelo: str, prompt: str) -> str:
+        return hashlib.sha256(f"{modelo}\0{prompt}".encode('utf-8')).hexdigest()
+
+    def obtener(self, modelo: str, prompt: str) -> Optional[str]:
+        """Respuesta guardada y vigente, o None (cuenta como fallo)"""
+        clave = self.clave(modelo, prompt)
+        ahora = time.time()
+        with self._bloqueo:
+            fila = self._conexion.execute(
+                'SELECT respuesta, creado FROM respuestas WHERE clave = ?', (clave,)).fetchone()
+
+            if fila is not None and ahora - fila[1] > self.ttl_s:
+                self._conexion.execute('DELETE FROM respuestas WHERE clave = ?', (clave,))
+                self._conexion.commit()
+                self.caducadas += 1
+                fila = None
+
+            if fila is None:
+                self.fallos += 1
+                return None
+
+            self._conexion.execute(
+                'UPDATE respuestas SET ultimo_uso = ?, aciertos = aciertos + 1 WHERE clave = ?',
+                (ahora, clave))
+            self._conexion.commit()
+            self.aciertos += 1
+            return fila[0]
+
+    def guardar(self, modelo: str, prompt: str, respuesta: str):
+        ahora = time.time()
+        with self._bloqueo:
+            self._conexion.execute('''
+                INSERT OR REPLACE INTO respuestas (clave, modelo, respuesta, creado, ultimo_uso)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (self.clave(modelo, prompt), modelo, respuesta, ahora, ahora))
+            self._desalojar()
+            self._conexion.commit()
+
+    def _desalojar(self):
+        """Borra las entradas menos usadas recientemente por encima de max_entradas"""
+        total = self._conexion.execute('SELECT COUNT(*) FROM respuestas').fetchone()[0]
+        sobrantes = total - self.max_entradas
+        if sobrantes > 0:
+            self._conexion.execute('''
+                DELETE FROM respuestas WHERE clave IN (
+                    SELECT clave FROM respuestas ORDER BY ultimo_uso LIMIT ?
+                )
+            ''', (sobrantes,))
+            self.desalojadas += sobrantes
+
+    def purgar_caducadas(self) -> int:
+        with self._bloqueo:
+            cursor = self._conexion.execute('DELETE FROM respuestas WHERE creado < ?',
+                                            (time.time() - self.ttl_s,))
+            self._conexion.commit()
+            return cursor.rowcount
+
+    def vaciar(self):
+        with self._bloqueo:
+            self._conexion.execute('DELETE FROM respuestas')
+            self._conexion.commit()
+
+    def estadisticas(self) -> dict:
+        with self._bloqueo:
+            entradas, aciertos_historicos = self._conexion.execute(
+                'SELECT COUNT(*), COALESCE(SUM(aciertos), 0) FROM respuestas').fetchone()
+        consultas = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': round(self.aciertos / consultas, 3) if consultas else 0.0,
+            'caducadas': self.caducadas,
+            'desalojadas': self.desalojadas,
+            'entradas': entradas,
+            'max_entradas': self.max_entradas,
+            'aciertos_historicos': aciertos_historicos
+        }
+
+    def resumen(self) -> str:
+        stats = self.estadisticas()
+        return (f"💾 Caché LLM: {stats['aciertos']} aciertos / {stats['aciertos'] + stats['fallos']} consultas "
+                f"({stats['tasa_aciertos']:.0%}), {stats['entradas']} entradas guardadas")
+
+    def cerrar(self):
+        with self._bloqueo:
+            self._conexion.close()
+
+
+class LLMConCache:
+    """
+    LLM invocable (prompt -> texto) con CacheLLM delante. Con cache=None llama siempre
+    al LLM; refrescar=True salta la lectura y reemplaza la respuesta guardada.
+    formato (esquema JSON de la respuesta) se pasa al LLM y forma parte de la clave.
+    stream() entrega la respuesta por fragmentos si el LLM tiene generar_stream.
+    """
+
+    def __init__(self, llm: Callable[[str], str], modelo: str, cache: Optional[CacheLLM]):
+        self.llm = llm
+        self.modelo = modelo
+        self.cache = cache
+
+    def __call__(self, prompt: str, refrescar: bool = False, formato: dict = None) -> str:
+        def llamar():
+            return self.llm(prompt) if formato is None else self.llm(prompt, formato=formato)
+
+        if self.cache is None:
+            return llamar()
+
+        clave = prompt if formato is None else f"{prompt}\0{json.dumps(formato, sort_keys=True)}"
+        respuesta = None if refrescar else self.cache.obtener(self.modelo, clave)
+        if respuesta is None:
+            respuesta = llamar()
+            self.cache.guardar(self.modelo, clave, respuesta)
+        return respuesta
+
+    def stream(self, prompt: str, refrescar: bool = False) -> Iterator[str]:
+        """
+        Un acierto sale entero de una vez; un fallo se transmite del LLM a medida que
+        llega y se guarda solo si el stream termina (uno cortado no se cachea)
+        """
+        if not hasattr(self.llm, 'generar_stream'):
+            yield self(prompt, refrescar)
+            return
+
+        respuesta = None if refrescar or self.cache is None else self.cache.obtener(self.modelo, prompt)
+        if respuesta is not None:
+            yield respuesta
+            return
+
+        partes = []
+        for fragmento in self.llm.generar_stream(prompt):
+            partes.append(fragmento)
+            yield fragmento
+        if self.cache is not None:
+            self.cache.guardar(self.modelo, prompt, ''.join(partes))
+
+    def resumen(self) -> Optional[str]:
+        return self.cache.resumen() if self.cache else None
+
+
+def con_cache(llm: Callable[[str], str], modelo: str) -> LLMConCache:
+    """El LLM con la caché persistente; sin caché si LLM_CACHE=false o no se puede abrir"""
+    if not CACHE_ACTIVA:
+        return LLMConCache(llm, modelo, None)
+    try:
+        return LLMConCache(llm, modelo, CacheLLM())
+    except sqlite3.Error as e:
+        print(f"⚠️ Caché LLM no disponible ({RUTA_CACHE}): {e}")
+        return LLMConCache(llm, modelo, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Caché persistente de respuestas del LLM')
+    parser.add_argument('--ruta', default=RUTA_CACHE)
+    parser.add_argument('--purgar', action='store_true', help='Borra las entradas caducadas')
+    parser.add_argument('--vaciar', action='store_true', help='Borra todas las entradas')
+    args = parser.parse_args()
+
+    cache = CacheLLM(args.ruta)
+    if args.purgar:
+        print(f"🧹 {cache.purgar_caducadas()} entradas caducadas borradas")
+    if args.vaciar:
+        cache.vaciar()
+        print("🧹 Caché vaciada")
+
+    stats = cache.estadisticas()
+    print(f"💾 {cache.ruta}: {stats['entradas']}/{stats['max_entradas']} entradas, "
+          f"{stats['aciertos_historicos']} aciertos acumulados")
+    cache.cerrar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+Generación concurrente de preguntas con el LLM (Ollama) para el agente entrevistador
+
+Las habilidades se reparten en un pool de hilos con concurrencia acotada: cada llamada
+tiene su timeout y se reintenta con backoff exponencial (con jitter) ante errores de
+red, timeouts o respuestas inválidas. Generar 15 habilidades tarda lo que la llamada
+más lenta (por tandas de max_concurrencia), no la suma de todas.
+
+generar_agrupado pide las preguntas de muchas habilidades/niveles en un solo prompt
+con respuesta JSON restringida por esquema (el parámetro format de Ollama); la respuesta
+se valida solicitud por solicitud y solo las que faltan o no cumplen se vuelven a pedir,
+agrupadas de nuevo. Con grupos de 10 son 10 veces menos llamadas y las instrucciones
+del prompt se pagan una vez por grupo, no una por habilidad.
+
+ClienteOllamaHTTP habla con la API REST de Ollama usando solo la biblioteca estándar
+(generar_stream entrega los tokens a medida que llegan); ServidorLLMSimulado imita esa API (latencia y fallos configurables) para probar el
+motor sin un modelo real.
+
+Uso:
+    python generacion_concurrente.py --servidor-simulado --puerto 11435 --latencia 2
+    python generacion_concurrente.py --url http://localhost:11435 --habilidades Python,Java,SQL
+    python generacion_concurrente.py --url http://localhost:11435 --agrupar 10
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional
+
+OLLAMA_URL_DEFECTO = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+
+# Llamadas simultáneas al LLM. Acota conexiones e hilos; Ollama atiende
+# OLLAMA_NUM_PARALLEL a la vez y encola el resto sin rechazarlas
+MAX_CONCURRENCIA = int(os.getenv('LLM_MAX_CONCURRENCIA', '16'))
+TIMEOUT_LLAMADA_S = float(os.getenv('LLM_TIMEOUT_S', '60'))
+REINTENTOS = int(os.getenv('LLM_REINTENTOS', '2'))
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAXIMO_S = 8.0
+
+# Solicitudes (habilidad, nivel) por prompt en la generación agrupada. Grupos más
+# grandes ahorran llamadas, pero las respuestas largas se truncan o mezclan habilidades
+TAMANO_GRUPO = int(os.getenv('LLM_TAMANO_GRUPO', '10'))
+
+# Preguntas más cortas que esto son restos de formato, no preguntas
+LONGITUD_MINIMA_PREGUNTA = 10
+
+# Esquema de la respuesta agrupada: Ollama lo impone con el parámetro format
+ESQUEMA_RESPUESTA_AGRUPADA = {
+    'type': 'object',
+    'properties': {
+        'resultados': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'id': {'type': 'integer'},
+                    'preguntas': {'type': 'array', 'items': {'type': 'string'}}
+                },
+                'required': ['id', 'preguntas']
+            }
+        }
+    },
+    'required': ['resultados']
+}
+
+# Con con_tipo cada pregunta es {tipo, pregunta}; el tipo se guarda en el banco
+TIPOS_AGRUPADO = ('conceptual', 'practica')
+ESQUEMA_RESPUESTA_AGRUPADA_TIPADA = json.loads(json.dumps(ESQUEMA_RESPUESTA_AGRUPADA))
+ESQUEMA_RESPUESTA_AGRUPADA_TIPADA['properties']['resultados']['items']['properties']['preguntas']['items'] = {
+    'type': 'object',
+    'properties': {
+        'tipo': {'type': 'string', 'enum': list(TIPOS_AGRUPADO)},
+        'pregunta': {'type': 'string'}
+    },
+    'required': ['tipo', 'pregunta']
+}
+
+
+class ErrorLLM(Exception):
+    """Fallo de una llamada al LLM (red, timeout, HTTP o respuesta inválida): se reintenta"""
+
+
+class ClienteOllamaHTTP:
+    """
+    Cliente mínimo de la API de Ollama (POST /api/generate). Cada llamada abre su propia
+    conexión, así que puede usarse desde varios hilos a la vez.
+    Se invoca como el LLM de LangChain: cliente(prompt) -> texto.
+    """
+
+    def __init__(self, modelo: str = "llama2", url_base: str = None,
+                 timeout: float = TIMEOUT_LLAMADA_S):
+        self.modelo = modelo
+        self.url_base = (url_base or OLLAMA_URL_DEFECTO).rstrip('/')
+        self.timeout = timeout
+
+    def _peticion(self, ruta: str, cuerpo: dict) -> urllib.request.Request:
+        return urllib.request.Request(
+            f"{self.url_base}{ruta}",
+            data=json.dumps(cuerpo).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+
+    def _post(self, ruta: str, cuerpo: dict, timeout: float = None) -> dict:
+        try:
+            with urllib.request.urlopen(self._peticion(ruta, cuerpo), timeout=timeout or self.timeout) as respuesta:
+                return json.loads(respuesta.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            raise ErrorLLM(f"HTTP {e.code} en {ruta}") from e
+        except (urllib.error.URLError, TimeoutError, OSError) as e:
+            raise ErrorLLM(f"Sin respuesta de {self.url_base}: {e}") from e
+        except ValueError as e:
+            raise ErrorLLM(f"Respuesta no JSON de {ruta}") from e
+
+    def modelos_disponibles(self, timeout: float = 5.0) -> list:
+        """Modelos descargados en el servidor (GET /api/tags): no hace inferencia"""
+        try:
+            with urllib.request.urlopen(f"{self.url_base}/api/tags", timeout=timeout) as respuesta:
+                datos = json.loads(respuesta.read().decode('utf-8'))
+        except (OSError, ValueError) as e:
+            raise ErrorLLM(f"Sin respuesta de {self.url_base}: {e}") from e
+        return [modelo.get('name', '') for modelo in datos.get('models', [])]
+
+    def verificar_conexion(self):
+        """Lanza ErrorLLM si el servidor no responde o no tiene el modelo descargado"""
+        modelos = self.modelos_disponibles()
+        if not any(nombre == self.modelo or nombre.split(':')[0] == self.modelo for nombre in modelos):
+            raise ErrorLLM(f"Modelo '{self.modelo}' no descargado (disponibles: {', '.join(modelos) or 'ninguno'})")
+
+    def generar(self, prompt: str, timeout: float = None, formato: dict = None) -> str:
+        """formato: esquema JSON que debe cumplir la respuesta (salida estructurada de Ollama)"""
+        cuerpo = {'model': self.modelo, 'prompt': prompt, 'stream': False}
+        if formato is not None:
+            cuerpo['format'] = formato
+        datos = self._post('/api/generate', cuerpo, timeout)
+        if 'response' not in datos:
+            raise ErrorLLM(f"Respuesta sin texto: {datos.get('error', datos)}")
+        return datos['response']
+
+    def generar_stream(self, prompt: str, timeout: float = None, formato: dict = None) -> Iterator[str]:
+        """
+        Fragmentos de la respuesta a medida que el modelo los genera (NDJSON de Ollama).
+        El timeout cuenta entre fragmentos, no para la respuesta completa. Lanza ErrorLLM
+        si la conexión falla o se corta antes del fragmento final (done).
+        """
+        cuerpo = {'model': self.modelo, 'prompt': prompt, 'stream': True}
+        if formato is not None:
+            cuerpo['format'] = formato
+        try:
+            respuesta = urllib.request.urlopen(self._peticion('/api/generate', cuerpo),
+                                               timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as e:
+            raise ErrorLLM(f"HTTP {e.code} en /api/generate") from e
+        except (urllib.error.URLError, TimeoutError, OSError) as e:
+            raise ErrorLLM(f"Sin respuesta de {self.url_base}: {e}") from e
+
+        with respuesta:
+            try:
+                for linea in respuesta:
+                    if not linea.strip():
+                        continue
+                    datos = json.loads(linea.decode('utf-8'))
+                    if 'error' in datos:
+                        raise ErrorLLM(f"Error del modelo: {datos['error']}")
+                    if datos.get('response'):
+                        yield datos['response']
+                    if datos.get('done'):
+                        return
+            except (TimeoutError, OSError) as e:
+                raise ErrorLLM(f"Stream interrumpido: {e}") from e
+            except ValueError as e:
+                raise ErrorLLM("Fragmento no JSON en el stream") from e
+        raise ErrorLLM("Stream cortado antes de terminar")
+
+    def __call__(self, prompt: str, formato: dict = None) -> str:
+        return self.generar(prompt, formato=formato)
+
+
+def espera_backoff(intento: int, base: float = BACKOFF_BASE_S, maximo: float = BACKOFF_MAXIMO_S) -> float:
+    """Backoff exponencial con jitter completo: uniforme entre 0 y base * 2^intento"""
+    return random.uniform(0, min(maximo, base * (2 ** intento)))
+
+
+def con_reintentos(funcion: Callable, *args, reintentos: int = REINTENTOS,
+                   backoff_base: float = BACKOFF_BASE_S):
+    """funcion(*args), reintentando ante ErrorLLM; relanza el último error"""
+    for intento in range(reintentos + 1):
+        try:
+            return funcion(*args)
+        except ErrorLLM:
+            if intento == reintentos:
+                raise
+            time.sleep(espera_backoff(intento, backoff_base))
+
+
+def generar_concurrente(habilidades: List[str],
+                        generar: Callable[[str], List[str]],
+                        respaldo: Callable[[str], List[str]],
+                        max_concurrencia: int = MAX_CONCURRENCIA,
+                        reintentos: int = REINTENTOS,
+                        backoff_base: float = BACKOFF_BASE_S,
+                        al_completar: Optional[Callable[[str, List[str], Optional[Exception]], None]] = None
+                        ) -> Dict[str, List[str]]:
+    """
+    Preguntas de cada habilidad, generadas en paralelo y en el orden de `habilidades`.
+
+    generar(habilidad) debe lanzar ErrorLLM ante fallos reintentables; si se agotan los
+    reintentos (o lanza otra excepción) la habilidad recibe respaldo(habilidad).
+    al_completar(habilidad, preguntas, error) se llama desde el hilo principal a medida
+    que terminan, para mostrar el progreso.
+    """
+    resultados = {}
+    if not habilidades:
+        return resultados
+
+    with ThreadPoolExecutor(max_workers=min(max_concurrencia, len(habilidades)),
+                            thread_name_prefix='llm') as ejecutor:
+        futuros = {
+            ejecutor.submit(con_reintentos, generar, habilidad,
+                            reintentos=reintentos, backoff_base=backoff_base): habilidad
+            for habilidad in habilidades
+        }
+        for futuro in as_completed(futuros):
+            habilidad = futuros[futuro]
+            try:
+                preguntas, error = futuro.result(), None
+            except Exception as e:
+                preguntas, error = respaldo(habilidad), e
+            resultados[habilidad] = preguntas
+            if al_completar:
+                al_completar(habilidad, preguntas, error)
+
+    return {habilidad: resultados[habilidad] for habilidad in habilidades}
+
+
+# ---------------------------------------------------------------------- generación agrupada
+
+def prompt_agrupado(solicitudes: List[dict], intento: int = 0, con_tipo: bool = False) -> str:
+    """
+    Un prompt para varias solicitudes {habilidad, nivel, cantidad[, evitar]}, identificadas
+    por su posición en el grupo. La lista va al final como JSON de una línea.
+    con_tipo pide cada pregunta como {tipo, pregunta}.
+    """
+    items = []
+    for i, solicitud in enumerate(solicitudes):
+        item = {'id': i, 'habilidad': solicitud['habilidad'],
+                'nivel': solicitud.get('nivel') or 'intermedio', 'cantidad': solicitud.get('cantidad', 2)}
+        if solicitud.get('evitar'):
+            item['evitar'] = list(solicitud['evitar'])
+        items.append(item)
+
+    # En los reintentos el prompt cambia: insiste en el formato y no reutiliza la caché
+    aviso = (f"\nReintento {intento}: la respuesta anterior no era válida. "
+             f"Responde solo con el JSON pedido y la cantidad exacta de cada solicitud.\n"
+             if intento else '')
+    if con_tipo:
+        formato = ('{"resultados": [{"id": <id de la solicitud>, "preguntas": '
+                   '[{"tipo": "conceptual", "pregunta": "..."}, {"tipo": "practica", "pregunta": "..."}]}]}')
+    else:
+        formato = '{"resultados": [{"id": <id de la solicitud>, "preguntas": ["...", "..."]}]}'
+    return f"""Eres un experto reclutador técnico. Para cada solicitud genera exactamente `cantidad` preguntas de entrevista para evaluar la `habilidad` al `nivel` indicado.
+
+Requisitos:
+- Preguntas claras y específicas, en español, cada una terminada en '?'
+- Mezcla preguntas conceptuales y prácticas
+- Sin numeración ni texto adicional
+- No repitas ni reformules las preguntas de `evitar`
+{aviso}
+Responde solo con JSON: {formato}, un resultado por solicitud.
+
+Solicitudes:
+{json.dumps(items, ensure_ascii=False)}"""
+
+
+def _cargar_json(texto: str):
+    """JSON de la respuesta, tolerando bloques ``` y texto antes o después"""
+    texto = texto.strip()
+    if texto.startswith('```'):
+        texto = re.sub(r'^```\w*\s*|\s*```$', '', texto)
+    try:
+        return json.loads(texto)
+    except ValueError:
+        pass
+    for apertura, cierre in (('{', '}'), ('[', ']')):
+        inicio, fin = texto.find(apertura), texto.rfind(cierre)
+        if 0 <= inicio < fin:
+            try:
+                return json.loads(texto[inicio:fin + 1])
+            except ValueError:
+                continue
+    raise ErrorLLM("La respuesta agrupada no es JSON")
+
+
+def _limpiar_preguntas(preguntas, con_tipo: bool = False) -> list:
+    """
+    Preguntas válidas de un resultado, sin numeración ni repetidas. Con con_tipo,
+    (tipo, pregunta); un tipo ausente o fuera de TIPOS_AGRUPADO queda 'general'
+    """
+    if not isinstance(preguntas, list):
+        return []
+    limpias, vistas = [], set()
+    for pregunta in preguntas:
+        tipo = 'general'
+        if isinstance(pregunta, dict):
+            tipo = str(pregunta.get('tipo') or '').strip().lower().replace('á', 'a')
+            tipo = tipo if tipo in TIPOS_AGRUPADO else 'general'
+            pregunta = pregunta.get('pregunta') or pregunta.get('texto')
+        if not isinstance(pregunta, str):
+            continue
+        pregunta = re.sub(r'^\s*(?:[-*•]|\d+[.)])\s*', '', pregunta).strip()
+        if len(pregunta) < LONGITUD_MINIMA_PREGUNTA or not pregunta.endswith('?'):
+            continue
+        if pregunta.lower() not in vistas:
+            vistas.add(pregunta.lower())
+            limpias.append((tipo, pregunta) if con_tipo else pregunta)
+    return limpias
+
+
+def interpretar_respuesta_agrupada(texto: str, solicitudes: List[dict],
+                                   con_tipo: bool = False) -> Dict[int, list]:
+    """
+    {posición en el grupo: preguntas} de las solicitudes bien respondidas: con al menos
+    `cantidad` preguntas válidas (se recortan a `cantidad`). Los resultados se asocian
+    por id y, si el modelo no lo respetó, por nombre de habilidad (y nivel).
+    Con con_tipo las preguntas son (tipo, pregunta). Lanza ErrorLLM si la respuesta no es JSON.
+    """
+    datos = _cargar_json(texto)
+    if isinstance(datos, dict):
+        resultados = datos.get('resultados', datos.get('results'))
+        if resultados is None:
+            # {"Python": [...], "Docker": [...]}: el modelo indexó por habilidad
+            resultados = [{'habilidad': clave, 'preguntas': valor} for clave, valor in datos.items()]
+    else:
+        resultados = datos
+    if not isinstance(resultados, list):
+        raise ErrorLLM("La respuesta agrupada no tiene lista de resultados")
+
+    por_nombre = {}
+    for i, solicitud in enumerate(solicitudes):
+        por_nombre.setdefault(solicitud['habilidad'].strip().lower(), []).append(i)
+
+    validas = {}
+    for resultado in resultados:
+        if not isinstance(resultado, dict):
+            continue
+        indice = resultado.get('id')
+        if isinstance(indice, str) and indice.isdigit():
+            indice = int(indice)
+        if not isinstance(indice, int) or not 0 <= indice < len(solicitudes):
+            candidatos = por_nombre.get(str(resultado.get('habilidad', '')).strip().lower(), [])
+            nivel = resultado.get('nivel')
+            candidatos = [i for i in candidatos if i not in validas
+                          and (nivel is None or solicitudes[i].get('nivel') in (None, nivel))]
+            if not candidatos:
+                continue
+            indice = candidatos[0]
+
+        cantidad = solicitudes[indice].get('cantidad', 2)
+        preguntas = _limpiar_preguntas(resultado.get('preguntas'), con_tipo)
+        if indice not in validas and len(preguntas) >= cantidad:
+            validas[indice] = preguntas[:cantidad]
+    return validas
+
+
+def generar_agrupado(solicitudes: List[dict],
+                     llm: Callable[..., str],
+                     tamano_grupo: int = TAMANO_GRUPO,
+                     max_concurrencia: int = MAX_CONCURRENCIA,
+                     reintentos: int = REINTENTOS,
+                     backoff_base: float = BACKOFF_BASE_S,
+                     al_completar: Optional[Callable[[int, Optional[list], Optional[Exception]], None]] = None,
+                     con_tipo: bool = False
+                     ) -> List[Optional[list]]:
+    """
+    Preguntas de cada solicitud {habilidad, nivel, cantidad[, evitar]}, en el orden de
+    `solicitudes`; None en las que siguen fallando tras los reintentos. Con con_tipo el
+    esquema pide el tipo de cada pregunta y se devuelven pares (tipo, pregunta).
+
+    Las solicitudes se reparten en grupos de tamano_grupo, un prompt por grupo y los
+    grupos en paralelo. llm(prompt, formato=esquema) -> texto. Tras cada ronda solo las
+    solicitudes sin respuesta válida (ausentes, cortas, JSON roto, error de red) se
+    reagrupan y se vuelven a pedir, con backoff entre rondas.
+    al_completar(indice, preguntas, error) se llama desde el hilo principal al resolverse
+    cada solicitud, o al final con preguntas None si se agotaron los reintentos.
+    """
+    resultados: List[Optional[list]] = [None] * len(solicitudes)
+    errores: Dict[int, Exception] = {}
+    pendientes = list(range(len(solicitudes)))
+    tamano_grupo = max(1, tamano_grupo)
+
+    esquema = ESQUEMA_RESPUESTA_AGRUPADA_TIPADA if con_tipo else ESQUEMA_RESPUESTA_AGRUPADA
+
+    def pedir(grupo: List[int], intento: int) -> Dict[int, list]:
+        parte = [solicitudes[i] for i in grupo]
+        texto = llm(prompt_agrupado(parte, intento, con_tipo), formato=esquema)
+        return interpretar_respuesta_agrupada(texto, parte, con_tipo)
+
+    for intento in range(reintentos + 1):
+        if not pendientes:
+            break
+        if intento:
+            time.sleep(espera_backoff(intento - 1, backoff_base))
+
+        grupos = [pendientes[i:i + tamano_grupo] for i in range(0, len(pendientes), tamano_grupo)]
+        with ThreadPoolExecutor(max_workers=min(max_concurrencia, len(grupos)),
+                                thread_name_prefix='llm') as ejecutor:
+            futuros = {ejecutor.submit(pedir, grupo, intento): grupo for grupo in grupos}
+            for futuro in as_completed(futuros):
+                grupo = futuros[futuro]
+                try:
+                    validas = futuro.result()
+                except Exception as e:
+                    validas = {}
+                    for i in grupo:
+                        errores[i] = e
+
+                for posicion, i in enumerate(grupo):
+                    if posicion in validas:
+                        resultados[i] = validas[posicion]
+                        errores.pop(i, None)
+                        if al_completar:
+                            al_completar(i, resultados[i], None)
+                    elif i not in errores:
+                        errores[i] = ErrorLLM("Solicitud ausente o incompleta en la respuesta")
+
+        pendientes = [i for i in pendientes if resultados[i] is None]
+
+    if al_completar:
+        for i in pendientes:
+            al_completar(i, None, errores.get(i))
+    return resultados
+
+
+# ---------------------------------------------------------------------- servidor simulado
+
+class ServidorLLMSimulado:
+    """
+    Imita /api/generate y /api/tags de Ollama en un hilo. Responde con dos preguntas
+    sobre la habilidad del prompt tras `latencia` segundos (± jitter); una fracción
+    `tasa_fallos` de las peticiones recibe 503 para ejercitar los reintentos.
+    Con format (prompt agrupado) responde el JSON de todas las solicitudes, salvo una
+    fracción `tasa_incompletas` que omite para ejercitar los reintentos parciales.
+    Con stream reparte la `latencia` entre las palabras y envía cada una en su línea NDJSON.
+    """
+
+    def __init__(self, puerto: int = 0, latencia: float = 0.5, jitter: float = 0.0,
+                 tasa_fallos: float = 0.0, modelo: str = 'llama2', tasa_incompletas: float = 0.0):
+        self.latencia = latencia
+        self.jitter = jitter
+        self.tasa_fallos = tasa_fallos
+        self.tasa_incompletas = tasa_incompletas
+        self.modelo = modelo
+        self.peticiones = 0
+        self._bloqueo = threading.Lock()
+
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, formato, *args):
+                pass
+
+            def _responder(self, estado: int, datos: dict):
+                cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+                self.send_response(estado)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def do_GET(self):
+                if self.path == '/api/tags':
+                    self._responder(200, {'models': [{'name': f"{servidor.modelo}:latest"}]})
+                else:
+                    self._responder(404, {'error': 'not found'})
+
+            def do_POST(self):
+                longitud = int(self.headers.get('Content-Length', 0))
+                datos = json.loads(self.rfile.read(longitud) or b'{}')
+                with servidor._bloqueo:
+                    servidor.peticiones += 1
+                if self.path != '/api/generate':
+                    self._responder(404, {'error': 'not found'})
+                    return
+
+                latencia = max(0.0, servidor.latencia + random.uniform(-servidor.jitter, servidor.jitter))
+                if random.random() < servidor.tasa_fallos:
+                    self._responder(503, {'error': 'servidor ocupado'})
+                    return
+                prompt = datos.get('prompt', '')
+                texto = (servidor.responder_agrupado(prompt, datos['format'] == ESQUEMA_RESPUESTA_AGRUPADA_TIPADA)
+                         if datos.get('format') else servidor.responder(prompt))
+                if datos.get('stream'):
+                    self._responder_stream(datos.get('model'), texto, latencia)
+                    return
+                time.sleep(latencia)
+                self._responder(200, {'model': datos.get('model'), 'done': True, 'response': texto})
+
+            def _responder_stream(self, modelo: str, texto: str, latencia: float):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.end_headers()
+                fragmentos = re.findall(r'\S+\s*', texto) or ['']
+                for fragmento in fragmentos:
+                    time.sleep(latencia / len(fragmentos))
+                    linea = {'model': modelo, 'response': fragmento, 'done': False}
+                    self.wfile.write(json.dumps(linea, ensure_ascii=False).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+                self.wfile.write(json.dumps({'model': modelo, 'response': '', 'done': True}).encode('utf-8') + b'\n')
+
+        self._http = ThreadingHTTPServer(('127.0.0.1', puerto), Manejador)
+        self._http.daemon_threads = True
+        self.puerto = self._http.server_address[1]
+        self.url = f"http://127.0.0.1:{self.puerto}"
+        self._hilo = None
+
+    @staticmethod
+    def responder(prompt: str) -> str:
+        coincidencia = re.search(r'Habilidad a evaluar:\s*(.+)', prompt)
+        habilidad = coincidencia.group(1).strip() if coincidencia else 'el tema'
+        return (f"PREGUNTA 1: ¿Qué conceptos fundamentales de {habilidad} consideras imprescindibles?\n"
+                f"PREGUNTA 2: ¿Cómo resolviste un problema real usando {habilidad}?")
+
+    def responder_agrupado(self, prompt: str, con_tipo: bool = False) -> str:
+        coincidencia = re.search(r'Solicitudes:\s*(\[.*\])\s*$', prompt, re.DOTALL)
+        resultados = []
+        for item in json.loads(coincidencia.group(1)) if coincidencia else []:
+            if random.random() < self.tasa_incompletas:
+                continue
+            habilidad, nivel = item['habilidad'], item.get('nivel', 'intermedio')
+            preguntas = [f"¿Qué aspecto {i + 1} de {habilidad} evaluarías en un perfil {nivel}?"
+                         for i in range(item.get('cantidad', 2))]
+            if con_tipo:
+                preguntas = [{'tipo': TIPOS_AGRUPADO[i % len(TIPOS_AGRUPADO)], 'pregunta': pregunta}
+                             for i, pregunta in enumerate(preguntas)]
+            resultados.append({'id': item['id'], 'preguntas': preguntas})
+        return json.dumps({'resultados': resultados}, ensure_ascii=False)
+
+    def iniciar(self) -> 'ServidorLLMSimulado':
+        self._hilo = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generación concurrente de preguntas con Ollama')
+    parser.add_argument('--servidor-simulado', action='store_true', help='Levanta un LLM simulado y espera')
+    parser.add_argument('--puerto', type=int, default=11435)
+    parser.add_argument('--latencia', type=float, default=1.0, help='Segundos por respuesta del simulado')
+    parser.add_argument('--tasa-fallos', type=float, default=0.0, help='Fracción de 503 del simulado')
+    parser.add_argument('--tasa-incompletas', type=float, default=0.0,
+                        help='Fracción de solicitudes que el simulado omite en las respuestas agrupadas')
+    parser.add_argument('--url', default=OLLAMA_URL_DEFECTO, help='URL de Ollama (o del simulado)')
+    parser.add_argument('--modelo', default='llama2')
+    parser.add_argument('--habilidades', default='Python,JavaScript,SQL,Docker,React')
+    parser.add_argument('--concurrencia', type=int, default=MAX_CONCURRENCIA)
+    parser.add_argument('--agrupar', type=int, default=0, help='Solicitudes por prompt (0: una llamada por habilidad)')
+    args = parser.parse_args()
+
+    if args.servidor_simulado:
+        servidor = ServidorLLMSimulado(args.puerto, args.latencia, tasa_fallos=args.tasa_fallos,
+                                       tasa_incompletas=args.tasa_incompletas).iniciar()
+        print(f"🧪 LLM simulado en {servidor.url} (latencia {args.latencia} s). Ctrl+C para salir")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            servidor.detener()
+        return
+
+    cliente = ClienteOllamaHTTP(args.modelo, args.url)
+    habilidades = [h.strip() for h in args.habilidades.split(',') if h.strip()]
+
+    def generar(habilidad: str) -> List[str]:
+        texto = cliente(f"Genera 2 preguntas de entrevista.\n\nHabilidad a evaluar: {habilidad}")
+        preguntas = [linea.split(':', 1)[1].strip() for linea in texto.splitlines() if ':' in linea]
+        if not preguntas:
+            raise ErrorLLM("Respuesta sin preguntas")
+        return preguntas
+
+    def al_completar(habilidad, preguntas, error):
+        print(f"{'⚠️' if error else '✅'} {habilidad}: {len(preguntas)} preguntas"
+              + (f" (respaldo: {error})" if error else ''))
+
+    inicio = time.perf_counter()
+    if args.agrupar:
+        resultados = generar_agrupado(
+            [{'habilidad': habilidad, 'cantidad': 2} for habilidad in habilidades], cliente,
+            tamano_grupo=args.agrupar, max_concurrencia=args.concurrencia,
+            al_completar=lambda i, preguntas, error: al_completar(habilidades[i], preguntas or [], error))
+        print(f"📦 {-(-len(habilidades) // args.agrupar)} prompts agrupados, "
+              f"{sum(r is None for r in resultados)} solicitudes sin respuesta")
+    else:
+        generar_concurrente(habilidades, generar, lambda h: [f"¿Cuál es tu experiencia con {h}?"],
+                            max_concurrencia=args.concurrencia, al_completar=al_completar)
+    print(f"⏱️ {len(habilidades)} habilidades en {time.perf_counter() - inicio:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
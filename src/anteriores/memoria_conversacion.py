@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Memoria de conversación acotada para el agente de preguntas y respuestas
+
+La memoria que va al prompt tiene un presupuesto fijo de tokens, dure lo que dure la
+sesión: los últimos turnos se guardan completos en un buffer circular y los que salen
+de él se pliegan en un resumen. Cada turno plegado suma una línea extractiva al resumen
+(sin llamar al LLM); cuando el resumen pasa de su parte del presupuesto se condensa con
+el LLM (una llamada cada varios turnos) o, sin LLM, se descartan sus líneas más antiguas.
+Así el tamaño del prompt, y con él la latencia del LLM, no crece con la sesión.
+
+Con ruta, todos los turnos y el resumen se guardan en SQLite: el historial completo
+queda en disco y una sesión larga se retoma con su resumen y sus últimos turnos.
+
+Los tokens se estiman por caracteres (CARACTERES_POR_TOKEN), sin tokenizador.
+
+Variables de entorno: MEMORIA_TOKENS, MEMORIA_TURNOS, MEMORIA_PATH (sin definir: solo
+en memoria), MEMORIA_SESION.
+
+Uso:
+    python memoria_conversacion.py --ruta memoria.db                    # sesiones guardadas
+    python memoria_conversacion.py --ruta memoria.db --sesion entrevista-42
+    python memoria_conversacion.py --ruta memoria.db --sesion entrevista-42 --borrar
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+PRESUPUESTO_TOKENS = int(os.getenv('MEMORIA_TOKENS', '1500'))
+MAX_TURNOS_RECIENTES = int(os.getenv('MEMORIA_TURNOS', '6'))
+RUTA_MEMORIA = os.getenv('MEMORIA_PATH')
+SESION_DEFECTO = os.getenv('MEMORIA_SESION', 'default')
+
+# Aproximación para español con los tokenizadores habituales
+CARACTERES_POR_TOKEN = 4
+
+# Parte del presupuesto reservada al resumen de los turnos antiguos
+FRACCION_RESUMEN = 1 / 3
+
+ENCABEZADO_RESUMEN = "Resumen de la conversación anterior:\n"
+ENCABEZADO_RECIENTES = "Últimos turnos:\n"
+
+# Longitud de consulta y respuesta en las líneas extractivas del resumen
+CARACTERES_CONSULTA_RESUMEN = 80
+CARACTERES_RESPUESTA_RESUMEN = 160
+
+
+def estimar_tokens(texto: str) -> int:
+    return (len(texto) + CARACTERES_POR_TOKEN - 1) // CARACTERES_POR_TOKEN
+
+
+def recortar(texto: str, max_tokens: int) -> str:
+    """El texto dentro de max_tokens, cortado en un espacio y con '…' si no cabía"""
+    max_caracteres = max_tokens * CARACTERES_POR_TOKEN
+    if len(texto) <= max_caracteres:
+        return texto
+    corte = texto.rfind(' ', 0, max_caracteres - 1)
+    return texto[:corte if corte > 0 else max_caracteres - 1].rstrip() + '…'
+
+
+def _primera_frase(texto: str) -> str:
+    texto = ' '.join(texto.split())
+    for separador in ('. ', '? ', '! ', '\n'):
+        posicion = texto.find(separador)
+        if 0 < posicion < CARACTERES_RESPUESTA_RESUMEN:
+            return texto[:posicion + 1]
+    return texto
+
+
+class MemoriaConversacion:
+    """
+    Turnos recientes completos + resumen de los anteriores, dentro de presupuesto_tokens.
+    resumir(prompt) -> texto es el LLM con el que se condensa el resumen (None: solo
+    resumen extractivo). Segura entre hilos.
+    """
+
+    def __init__(self, presupuesto_tokens: int = PRESUPUESTO_TOKENS,
+                 max_turnos: int = MAX_TURNOS_RECIENTES,
+                 resumir: Optional[Callable[[str], str]] = None,
+                 ruta: Optional[str] = RUTA_MEMORIA, sesion: str = SESION_DEFECTO):
+        self.presupuesto_tokens = presupuesto_tokens
+        self.presupuesto_resumen = int(presupuesto_tokens * FRACCION_RESUMEN)
+        # Un turno largo se recorta para que siempre quepan al menos dos
+        self.max_tokens_turno = (presupuesto_tokens - self.presupuesto_resumen) // 2
+        self.max_turnos = max_turnos
+        self.resumir = resumir
+        self.ruta = ruta
+        self.sesion = sesion
+
+        self.recientes = deque()
+        self.resumen = ''
+        self.total_turnos = 0
+        self.turnos_resumidos = 0
+        self.condensaciones = 0
+
+        self._bloqueo = threading.Lock()
+        self._conexion = None
+        if ruta:
+            self._abrir()
+
+    # ------------------------------------------------------------------ persistencia
+
+    def _abrir(self):
+        self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        self._conexion.execute('PRAGMA journal_mode=WAL')
+        self._conexion.execute('''
+            CREATE TABLE IF NOT EXISTS turnos (
+                sesion TEXT NOT NULL,
+                numero INTEGER NOT NULL,
+                consulta TEXT NOT NULL,
+                respuesta TEXT NOT NULL,
+                tiempo REAL,
+                primer_token REAL,
+                creado REAL NOT NULL,
+                PRIMARY KEY (sesion, numero)
+            )
+        ''')
+        self._conexion.execute('''
+            CREATE TABLE IF NOT EXISTS resumenes (
+                sesion TEXT PRIMARY KEY,
+                resumen TEXT NOT NULL,
+                turnos_resumidos INTEGER NOT NULL,
+                actualizado REAL NOT NULL
+            )
+        ''')
+        self._conexion.commit()
+
+        # Retomar la sesión: su resumen y los turnos que no entraron en él
+        fila = self._conexion.execute(
+            'SELECT resumen, turnos_resumidos FROM resumenes WHERE sesion = ?', (self.sesion,)).fetchone()
+        if fila:
+            self.resumen, self.turnos_resumidos = fila
+        self.total_turnos = self._conexion.execute(
+            'SELECT COUNT(*) FROM turnos WHERE sesion = ?', (self.sesion,)).fetchone()[0]
+        filas = self._conexion.execute('''
+            SELECT consulta, respuesta, tiempo, primer_token FROM turnos
+            WHERE sesion = ? AND numero > ? ORDER BY numero
+        ''', (self.sesion, self.turnos_resumidos)).fetchall()
+        for consulta, respuesta, tiempo, primer_token in filas:
+            self.recientes.append({'consulta': consulta, 'respuesta': respuesta,
+                                   'tiempo': tiempo, 'primer_token': primer_token})
+        self._ajustar()
+
+    def _guardar(self, turno: dict):
+        self._conexion.execute('''
+            INSERT INTO turnos (sesion, numero, consulta, respuesta, tiempo, primer_token, creado)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (self.sesion, self.total_turnos, turno['consulta'], turno['respuesta'],
+              turno.get('tiempo'), turno.get('primer_token'), time.time()))
+        self._conexion.execute('''
+            INSERT OR REPLACE INTO resumenes (sesion, resumen, turnos_resumidos, actualizado)
+            VALUES (?, ?, ?, ?)
+        ''', (self.sesion, self.resumen, self.turnos_resumidos, time.time()))
+        self._conexion.commit()
+
+    def historial(self, limite: int = 50, desde: int = 0) -> List[dict]:
+        """
+        Turnos completos guardados en disco posteriores al número `desde` (numerados
+        desde 1); sin ruta solo se conservan los del buffer
+        """
+        if self._conexion is None:
+            return list(self.recientes)[:limite]
+        with self._bloqueo:
+            filas = self._conexion.execute('''
+                SELECT numero, consulta, respuesta, tiempo, primer_token FROM turnos
+                WHERE sesion = ? AND numero > ? ORDER BY numero LIMIT ?
+            ''', (self.sesion, desde, limite)).fetchall()
+        return [{'numero': numero, 'consulta': consulta, 'respuesta': respuesta,
+                 'tiempo': tiempo, 'primer_token': primer_token}
+                for numero, consulta, respuesta, tiempo, primer_token in filas]
+
+    def borrar(self):
+        """Vacía la memoria y borra la sesión del disco"""
+        with self._bloqueo:
+            self.recientes.clear()
+            self.resumen = ''
+            self.total_turnos = self.turnos_resumidos = 0
+            if self._conexion is not None:
+                self._conexion.execute('DELETE FROM turnos WHERE sesion = ?', (self.sesion,))
+                self._conexion.execute('DELETE FROM resumenes WHERE sesion = ?', (self.sesion,))
+                self._conexion.commit()
+
+    def cerrar(self):
+        if self._conexion is not None:
+            with self._bloqueo:
+                self._conexion.close()
+                self._conexion = None
+
+    # ------------------------------------------------------------------ memoria
+
+    def agregar(self, consulta: str, respuesta: str, **datos) -> dict:
+        """Guarda un turno y pliega en el resumen los que ya no caben en el presupuesto"""
+        turno = {'consulta': consulta, 'respuesta': respuesta, **datos}
+        with self._bloqueo:
+            self.recientes.append(turno)
+            self.total_turnos += 1
+            self._ajustar()
+            if self._conexion is not None:
+                self._guardar(turno)
+        return turno
+
+    def _formatear_turno(self, turno: dict) -> str:
+        return recortar(f"Usuario: {turno['consulta']}\nAgente: {turno['respuesta']}", self.max_tokens_turno)
+
+    def _texto_recientes(self) -> str:
+        return ENCABEZADO_RECIENTES + '\n'.join(self._formatear_turno(turno) for turno in self.recientes)
+
+    def _ajustar(self):
+        """Saca del buffer los turnos de más (por cantidad o por tokens) y los pliega en el resumen"""
+        # Los encabezados y el separador entre resumen y turnos también cuentan
+        presupuesto_recientes = (self.presupuesto_tokens - self.presupuesto_resumen
+                                 - estimar_tokens(ENCABEZADO_RESUMEN + '\n\n'))
+        plegados = []
+        while len(self.recientes) > self.max_turnos or (
+                len(self.recientes) > 1 and estimar_tokens(self._texto_recientes()) > presupuesto_recientes):
+            plegados.append(self.recientes.popleft())
+        if not plegados:
+            return
+
+        lineas = [self.resumen] if self.resumen else []
+        for turno in plegados:
+            consulta = recortar(' '.join(turno['consulta'].split()), CARACTERES_CONSULTA_RESUMEN // CARACTERES_POR_TOKEN)
+            respuesta = recortar(_primera_frase(turno['respuesta']), CARACTERES_RESPUESTA_RESUMEN // CARACTERES_POR_TOKEN)
+            lineas.append(f"- {consulta} → {respuesta}")
+        self.resumen = '\n'.join(lineas)
+        self.turnos_resumidos += len(plegados)
+
+        if estimar_tokens(self.resumen) > self.presupuesto_resumen:
+            self._condensar()
+
+    def _condensar(self):
+        """
+        Deja el resumen en la mitad de su presupuesto, para que quepan varios turnos
+        más antes de volver a condensar: con el LLM si hay, si no quitando líneas antiguas
+        """
+        objetivo = self.presupuesto_resumen // 2
+        if self.resumir is not None:
+            prompt = (f"Resume en español, en como máximo {objetivo * 3 // 4} palabras, esta conversación "
+                      f"entre un usuario y un asistente. Conserva nombres, datos concretos y "
+                      f"decisiones; omite saludos.\n\n{self.resumen}\n\nResumen:")
+            try:
+                condensado = self.resumir(prompt).strip()
+                if condensado:
+                    self.resumen = recortar(condensado, objetivo)
+                    self.condensaciones += 1
+                    return
+            except Exception as e:
+                print(f"⚠️ No se pudo resumir la memoria con el LLM: {e}")
+
+        lineas = self.resumen.split('\n')
+        while len(lineas) > 1 and estimar_tokens('\n'.join(lineas)) > objetivo:
+            lineas.pop(0)
+        self.resumen = recortar('\n'.join(lineas), objetivo)
+
+    def contexto(self) -> str:
+        """Texto para el prompt, dentro de presupuesto_tokens ('' si no hay turnos)"""
+        with self._bloqueo:
+            partes = []
+            if self.resumen:
+                partes.append(ENCABEZADO_RESUMEN + self.resumen)
+            if self.recientes:
+                partes.append(self._texto_recientes())
+            return '\n\n'.join(partes)
+
+    def estadisticas(self) -> dict:
+        contexto = self.contexto()
+        return {
+            'turnos': self.total_turnos,
+            'en_buffer': len(self.recientes),
+            'resumidos': self.turnos_resumidos,
+            'condensaciones': self.condensaciones,
+            'tokens_contexto': estimar_tokens(contexto),
+            'tokens_resumen': estimar_tokens(self.resumen),
+            'presupuesto_tokens': self.presupuesto_tokens,
+            'persistente': self._conexion is not None
+        }
+
+    def __len__(self) -> int:
+        return self.total_turnos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sesiones guardadas de la memoria de conversación')
+    parser.add_argument('--ruta', default=RUTA_MEMORIA or 'memoria_conversacion.db')
+    parser.add_argument('--sesion', help='Muestra el resumen y los últimos turnos de la sesión')
+    parser.add_argument('--borrar', action='store_true', help='Borra la sesión indicada')
+    args = parser.parse_args()
+
+    if not args.sesion:
+        conexion = sqlite3.connect(args.ruta)
+        try:
+            filas = conexion.execute('''
+                SELECT sesion, COUNT(*), MAX(creado) FROM turnos GROUP BY sesion ORDER BY MAX(creado) DESC
+            ''').fetchall()
+        except sqlite3.OperationalError:
+            filas = []
+        conexion.close()
+        print(f"💾 {args.ruta}: {len(filas)} sesiones")
+        for sesion, turnos, ultimo in filas:
+            print(f"   • {sesion}: {turnos} turnos, último {time.strftime('%Y-%m-%d %H:%M', time.localtime(ultimo))}")
+        return
+
+    memoria = MemoriaConversacion(ruta=args.ruta, sesion=args.sesion)
+    if args.borrar:
+        memoria.borrar()
+        print(f"🧹 Sesión {args.sesion} borrada")
+    else:
+        stats = memoria.estadisticas()
+        print(f"🧠 {args.sesion}: {stats['turnos']} turnos ({stats['resumidos']} resumidos), "
+              f"contexto de {stats['tokens_contexto']}/{stats['presupuesto_tokens']} tokens\n")
+        print(memoria.contexto() or '(vacía)')
+    memoria.cerrar()
+
+
+if __name__ == '__main__':
+    main()
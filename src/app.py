@@ -3,26 +3,28 @@ Servidor Flask para Interfaz Web del Agente Entrevistador
 Proporciona API REST y sirve la interfaz HTML
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, g, Response, stream_with_context
 from flask_cors import CORS
 import os
 import sys
 import json
+import time
 from datetime import datetime
 import io
 
 # Agregar el directorio actual al path para importar nuestros módulos
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+# El resto de módulos (fragmentación, sesiones, compositor, métricas...) se importan en
+# las funciones que los usan: solo los paga el proceso que llega a necesitarlos
 try:
-    from database_manager import DatabaseManager
     from data_loader import DataLoader, inicializar_base_datos_completa
 
-    print("✅ Módulos importados correctamente")
     MODULOS_DISPONIBLES = True
+    ERROR_IMPORTACION = None
 except ImportError as e:
-    print(f"❌ Error importando módulos: {e}")
     MODULOS_DISPONIBLES = False
+    ERROR_IMPORTACION = e
 
 # Inicializar Flask
 import os
@@ -34,24 +36,82 @@ CORS(app)  # Permitir CORS para desarrollo
 # Variables globales
 db_manager = None
 data_loader = None
+gestor_sesiones = None
+compositor = None
+
+# Cliente del LLM para la generación bajo demanda (se crea en la primera petición)
+cliente_llm = None
+MODELO_LLM = os.getenv('OLLAMA_MODELO', 'llama2')
+
+
+@app.before_request
+def iniciar_medicion():
+    """Marca el inicio de la petición para las métricas y la ventana de escritura del cliente"""
+    if MODULOS_DISPONIBLES:
+        from metricas import metricas
+        from replicas import COOKIE_ESCRITURA, iniciar_peticion
+        g.inicio_peticion = time.perf_counter()
+        metricas.sumar_gauge('preguntas_http_en_curso', 1)
+        # Ventana de lectura de las propias escrituras del cliente, válida en cualquier worker
+        g.token_replicas = iniciar_peticion(request.cookies.get(COOKIE_ESCRITURA))
+
+
+@app.after_request
+def registrar_medicion(response):
+    """Cuenta la petición y su duración por ruta (la plantilla, no la URL concreta)"""
+    if MODULOS_DISPONIBLES and 'inicio_peticion' in g:
+        from metricas import metricas
+        from replicas import COOKIE_ESCRITURA, ventana_escritura_peticion
+        hasta = ventana_escritura_peticion()
+        if hasta is not None:
+            response.set_cookie(COOKIE_ESCRITURA, f"{hasta:.3f}", max_age=max(int(hasta - time.time()) + 1, 1),
+                                httponly=True, samesite='Lax')
+        ruta = request.url_rule.rule if request.url_rule else 'sin_ruta'
+        duracion = time.perf_counter() - g.inicio_peticion
+        metricas.incrementar('preguntas_http_peticiones_total', ruta=ruta,
+                             metodo=request.method, estado=response.status_code)
+        metricas.observar('preguntas_http_duracion_segundos', duracion, ruta=ruta, metodo=request.method)
+    return response
+
+
+@app.teardown_request
+def finalizar_medicion(exc):
+    """Se ejecuta siempre, incluso si la vista lanzó una excepción"""
+    if MODULOS_DISPONIBLES and g.pop('inicio_peticion', None) is not None:
+        from metricas import metricas
+        from replicas import terminar_peticion
+        terminar_peticion(g.pop('token_replicas'))
+        metricas.sumar_gauge('preguntas_http_en_curso', -1)
+        metricas.volcar()
 
 
 def inicializar_sistema():
     """Inicializa el sistema de base de datos"""
-    global db_manager, data_loader
+    global db_manager, data_loader, gestor_sesiones, compositor
 
     if not MODULOS_DISPONIBLES:
         return False
 
+    from fragmentacion import crear_gestor_bd
+    from sesiones import GestorSesiones
+    from compositor import CompositorEntrevistas
+
     try:
         # Inicializar componentes
-        db_manager = DatabaseManager()
+        db_manager = crear_gestor_bd()
         data_loader = DataLoader()
 
-        # Cargar datos si es necesario
-        if db_manager.contar_preguntas() == 0:
-            print("📝 Cargando preguntas iniciales...")
-            data_loader.cargar_datos_iniciales(db_manager)
+        # Cargar datos si la BD está vacía o cambiaron los datos iniciales (compara su hash)
+        data_loader.cargar_datos_iniciales(db_manager)
+
+        compositor = CompositorEntrevistas(db_manager)
+
+        # Sin almacén de sesiones la generación sigue funcionando, solo sin sesión
+        try:
+            gestor_sesiones = GestorSesiones(db_manager)
+        except Exception as e:
+            print(f"⚠️ Sesiones de entrevista no disponibles: {e}")
+            gestor_sesiones = None
 
         return True
 
@@ -97,13 +157,21 @@ def api_status():
 
 @app.route('/api/habilidades')
 def api_habilidades():
-    """Obtiene todas las habilidades disponibles"""
+    """
+    Obtiene las habilidades disponibles con sus estadísticas (una consulta agrupada).
+    ?nivel=, ?tipo= y ?categoria= dejan solo las que tienen preguntas que cumplan todos.
+    """
     try:
-        habilidades = db_manager.obtener_todas_habilidades()
+        estadisticas = db_manager.obtener_estadisticas_habilidades()
+        criterios = {clave: request.args.get(clave) for clave in ('nivel', 'tipo', 'categoria')}
+        if any(criterios.values()):
+            habilidades = db_manager.obtener_habilidades_con_criterios(**criterios)
+        else:
+            habilidades = list(estadisticas)
         habilidades_con_stats = []
 
         for habilidad in habilidades:
-            stats = db_manager.obtener_estadisticas_habilidad(habilidad)
+            stats = estadisticas.get(habilidad, {})
             habilidades_con_stats.append({
                 'nombre': habilidad,
                 'total': stats.get('total', 0),
@@ -124,13 +192,17 @@ def api_habilidades():
 
 @app.route('/api/generar-preguntas', methods=['POST'])
 def api_generar_preguntas():
-    """Genera preguntas basadas en la selección del usuario"""
+    """
+    Genera preguntas basadas en la selección del usuario. Con sesion_id no se repiten
+    las preguntas ya servidas en esa sesión (ver /api/sesiones).
+    """
     try:
         data = request.get_json()
 
         habilidades_seleccionadas = data.get('habilidades', [])
         nivel_filtro = data.get('nivel_filtro')
         cantidad_por_habilidad = data.get('cantidad_por_habilidad', 2)
+        sesion_id = data.get('sesion_id')
 
         if not habilidades_seleccionadas:
             return jsonify({
@@ -138,6 +210,10 @@ def api_generar_preguntas():
                 'message': 'No se seleccionaron habilidades'
             })
 
+        if sesion_id:
+            return _generar_en_sesion(sesion_id, habilidades_seleccionadas,
+                                      cantidad_por_habilidad, nivel_filtro)
+
         preguntas_resultado = {}
 
         for habilidad in habilidades_seleccionadas:
@@ -179,10 +255,231 @@ def api_generar_preguntas():
         })
 
 
+def _generar_en_sesion(sesion_id, habilidades, cantidad, nivel):
+    """Respuesta de /api/generar-preguntas para una sesión"""
+    if gestor_sesiones is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Sesiones de entrevista no disponibles'
+        })
+
+    resultado = gestor_sesiones.generar(sesion_id, habilidades, cantidad, nivel)
+    if resultado is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Sesión no encontrada o caducada'
+        })
+
+    preguntas_resultado = resultado['preguntas']
+    for habilidad, preguntas in preguntas_resultado.items():
+        if not preguntas:
+            # Mismo fallback que sin sesión
+            preguntas_resultado[habilidad] = [
+                f"¿Cuál es tu experiencia trabajando con {habilidad}?",
+                f"Describe un proyecto donde hayas aplicado {habilidad} de manera efectiva"
+            ]
+
+    total_preguntas = sum(len(p) for p in preguntas_resultado.values())
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'preguntas': preguntas_resultado,
+            'estadisticas': {
+                'total_habilidades': len(preguntas_resultado),
+                'total_preguntas': total_preguntas,
+                'promedio_por_habilidad': round(total_preguntas / len(preguntas_resultado),
+                                                1) if preguntas_resultado else 0,
+                'repetidas': resultado['repetidas'],
+                'agotadas': resultado['agotadas']
+            },
+            'sesion': gestor_sesiones.obtener(sesion_id)
+        }
+    })
+
+
+@app.route('/api/componer-entrevista', methods=['POST'])
+def api_componer_entrevista():
+    """
+    Compone una entrevista con cuotas por nivel y mínimos por tipo para cada habilidad,
+    p. ej. {"habilidades": [...], "niveles": {"basico": 1, "intermedio": 2, "avanzado": 1},
+    "tipos_minimos": {"practica": 1}}. Con sesion_id no repite lo ya servido en la sesión.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        sesion_id = data.get('sesion_id')
+
+        if sesion_id:
+            if gestor_sesiones is None:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Sesiones de entrevista no disponibles'
+                })
+            resultado = compositor.componer_en_sesion(gestor_sesiones, sesion_id, data)
+            if resultado is None:
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Sesión no encontrada o caducada'
+                })
+            resultado['sesion'] = gestor_sesiones.obtener(sesion_id)
+        else:
+            resultado = compositor.componer(data, semilla=data.get('semilla'))
+
+        return jsonify({
+            'status': 'success',
+            'data': resultado
+        })
+
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Especificación no válida: {e}'
+        })
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+
+@app.route('/api/sesiones', methods=['POST'])
+def api_crear_sesion():
+    """Crea una sesión de entrevista (opcionalmente con el nombre del candidato)"""
+    if gestor_sesiones is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Sesiones de entrevista no disponibles'
+        })
+
+    try:
+        data = request.get_json(silent=True) or {}
+        candidato = (data.get('candidato') or '').strip() or None
+        sesion_id = gestor_sesiones.crear(candidato)
+        return jsonify({
+            'status': 'success',
+            'data': gestor_sesiones.obtener(sesion_id)
+        })
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+
+@app.route('/api/sesiones/<sesion_id>', methods=['GET', 'DELETE'])
+def api_sesion(sesion_id):
+    """Consulta o borra una sesión de entrevista"""
+    if gestor_sesiones is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Sesiones de entrevista no disponibles'
+        })
+
+    if request.method == 'DELETE':
+        if gestor_sesiones.eliminar(sesion_id):
+            return jsonify({
+                'status': 'success',
+                'message': 'Sesión eliminada'
+            })
+    else:
+        sesion = gestor_sesiones.obtener(sesion_id)
+        if sesion is not None:
+            return jsonify({
+                'status': 'success',
+                'data': sesion
+            })
+
+    return jsonify({
+        'status': 'error',
+        'message': 'Sesión no encontrada o caducada'
+    })
+
+
+def obtener_cliente_llm():
+    """Cliente de Ollama compartido; solo biblioteca estándar, se importa al usarlo"""
+    global cliente_llm
+    if cliente_llm is None:
+        from anteriores.generacion_concurrente import ClienteOllamaHTTP
+        cliente_llm = ClienteOllamaHTTP(MODELO_LLM)
+    return cliente_llm
+
+
+def _evento_sse(evento: str, datos: dict) -> str:
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+@app.route('/api/generar-llm/stream')
+def api_generar_llm_stream():
+    """
+    Genera preguntas con el LLM bajo demanda y transmite los tokens a medida que llegan
+    como server-sent events: inicio, token (muchos), y fin con las preguntas extraídas
+    o error. Es de solo lectura (GET): para guardar las preguntas el cliente las envía
+    después a /api/agregar-pregunta con fuente llm:<modelo>.
+    """
+    from metricas import metricas
+
+    habilidad = (request.args.get('habilidad') or '').strip()
+    if not habilidad:
+        return jsonify({
+            'status': 'error',
+            'message': 'Se requiere una habilidad'
+        }), 400
+
+    nivel = request.args.get('nivel') or 'intermedio'
+    cantidad = max(1, min(request.args.get('cantidad', 3, type=int), 10))
+
+    try:
+        from banco_llm import EJEMPLOS_EN_PROMPT, construir_prompt, extraer_preguntas
+
+        existentes = db_manager.obtener_preguntas_por_habilidad(habilidad, EJEMPLOS_EN_PROMPT, nivel)
+        prompt = construir_prompt(habilidad, nivel, cantidad, existentes)
+        cliente = obtener_cliente_llm()
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+    def eventos():
+        inicio = time.perf_counter()
+        primer_token = None
+        partes = []
+        yield _evento_sse('inicio', {'habilidad': habilidad, 'nivel': nivel, 'modelo': cliente.modelo})
+
+        try:
+            for fragmento in cliente.generar_stream(prompt):
+                if primer_token is None:
+                    primer_token = time.perf_counter() - inicio
+                    metricas.observar('preguntas_llm_primer_token_segundos', primer_token)
+                partes.append(fragmento)
+                yield _evento_sse('token', {'texto': fragmento})
+        except Exception as e:
+            # La respuesta ya empezó (200): el error viaja como evento, no como código HTTP
+            yield _evento_sse('error', {'message': str(e)})
+            return
+
+        preguntas = extraer_preguntas(''.join(partes))[:cantidad]
+        yield _evento_sse('fin', {
+            'preguntas': [pregunta for _, pregunta in preguntas],
+            'tipos': [tipo for tipo, _ in preguntas],
+            'fuente': f"llm:{cliente.modelo}",
+            'primer_token_s': round(primer_token, 3) if primer_token is not None else None,
+            'total_s': round(time.perf_counter() - inicio, 3)
+        })
+
+    # X-Accel-Buffering: que nginx no acumule los eventos antes de enviarlos
+    return Response(stream_with_context(eventos()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/api/exportar', methods=['POST'])
 def api_exportar():
     """Exporta preguntas en formato especificado"""
+    from metricas import metricas
+
     try:
+        inicio = time.perf_counter()
         data = request.get_json()
 
         preguntas = data.get('preguntas', {})
@@ -240,6 +537,14 @@ def api_exportar():
         archivo_memoria.write(content.encode('utf-8'))
         archivo_memoria.seek(0)
 
+        # Etiqueta acotada: cualquier formato desconocido se exporta como txt
+        etiqueta = formato if formato in ('json', 'csv') else 'txt'
+        metricas.incrementar('preguntas_exportadas_total', sum(len(p) for p in preguntas.values()),
+                             formato=etiqueta)
+        metricas.incrementar('preguntas_exportacion_bytes_total', archivo_memoria.getbuffer().nbytes,
+                             formato=etiqueta)
+        metricas.observar('preguntas_exportacion_segundos', time.perf_counter() - inicio, formato=etiqueta)
+
         return send_file(
             archivo_memoria,
             as_attachment=True,
@@ -279,9 +584,12 @@ def api_estadisticas():
 @app.route('/api/buscar', methods=['POST'])
 def api_buscar():
     """Busca preguntas por término"""
+    from busqueda_difusa import UMBRAL_SIMILITUD_DEFECTO
+
     try:
         data = request.get_json()
         termino = data.get('termino', '').strip()
+        modo = data.get('modo', 'exacto')
 
         if not termino:
             return jsonify({
@@ -289,21 +597,42 @@ def api_buscar():
                 'message': 'Término de búsqueda vacío'
             })
 
-        resultados = db_manager.buscar_preguntas(termino, limit=20)
+        if modo not in ('exacto', 'difuso'):
+            return jsonify({
+                'status': 'error',
+                'message': "Modo de búsqueda inválido. Use: exacto, difuso"
+            })
 
         resultados_formateados = []
-        for habilidad, pregunta, tipo, nivel in resultados:
-            resultados_formateados.append({
-                'habilidad': habilidad,
-                'pregunta': pregunta,
-                'tipo': tipo,
-                'nivel': nivel
-            })
+
+        if modo == 'difuso':
+            umbral = float(data.get('umbral', UMBRAL_SIMILITUD_DEFECTO))
+            resultados = db_manager.buscar_preguntas_difusa(termino, limit=20, umbral=umbral)
+
+            for habilidad, pregunta, tipo, nivel, similitud in resultados:
+                resultados_formateados.append({
+                    'habilidad': habilidad,
+                    'pregunta': pregunta,
+                    'tipo': tipo,
+                    'nivel': nivel,
+                    'similitud': similitud
+                })
+        else:
+            resultados = db_manager.buscar_preguntas(termino, limit=20)
+
+            for habilidad, pregunta, tipo, nivel in resultados:
+                resultados_formateados.append({
+                    'habilidad': habilidad,
+                    'pregunta': pregunta,
+                    'tipo': tipo,
+                    'nivel': nivel
+                })
 
         return jsonify({
             'status': 'success',
             'data': {
                 'termino': termino,
+                'modo': modo,
                 'total_encontrados': len(resultados_formateados),
                 'resultados': resultados_formateados
             }
@@ -319,6 +648,8 @@ def api_buscar():
 @app.route('/api/agregar-pregunta', methods=['POST'])
 def api_agregar_pregunta():
     """Agrega una nueva pregunta a la base de datos"""
+    from database_manager import FUENTE_BANCO
+
     try:
         data = request.get_json()
 
@@ -326,6 +657,8 @@ def api_agregar_pregunta():
         pregunta = data.get('pregunta', '').strip()
         tipo = data.get('tipo', 'general').strip()
         nivel = data.get('nivel', 'intermedio').strip()
+        # De dónde viene la pregunta: el banco, o 'llm:<modelo>' si la generó el LLM
+        fuente = (data.get('fuente') or FUENTE_BANCO).strip()
 
         if not habilidad or not pregunta:
             return jsonify({
@@ -333,7 +666,13 @@ def api_agregar_pregunta():
                 'message': 'Habilidad y pregunta son requeridos'
             })
 
-        if db_manager.agregar_pregunta(habilidad, pregunta, tipo, nivel):
+        if fuente != FUENTE_BANCO and not (fuente.startswith('llm:') and len(fuente) <= 100):
+            return jsonify({
+                'status': 'error',
+                'message': f"Fuente no válida: {fuente}"
+            })
+
+        if db_manager.agregar_pregunta(habilidad, pregunta, tipo, nivel, fuente=fuente):
             return jsonify({
                 'status': 'success',
                 'message': f'Pregunta agregada para {habilidad}'
@@ -354,7 +693,10 @@ def api_agregar_pregunta():
 @app.route('/api/backup')
 def api_backup():
     """Genera un backup de la base de datos"""
+    from metricas import metricas
+
     try:
+        inicio = time.perf_counter()
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"backup_bd_{timestamp}.sql"
 
@@ -370,6 +712,10 @@ def api_backup():
             archivo_memoria.write(content.encode('utf-8'))
             archivo_memoria.seek(0)
 
+            metricas.incrementar('preguntas_exportacion_bytes_total', archivo_memoria.getbuffer().nbytes,
+                                 formato='sql')
+            metricas.observar('preguntas_exportacion_segundos', time.perf_counter() - inicio, formato='sql')
+
             return send_file(
                 archivo_memoria,
                 as_attachment=True,
@@ -511,6 +857,8 @@ def api_actualizar_pregunta():
 @app.route('/api/importar-datos', methods=['POST'])
 def api_importar_datos():
     """Importa datos desde un archivo JSON"""
+    from metricas import metricas
+
     try:
         if 'file' not in request.files:
             return jsonify({
@@ -537,17 +885,88 @@ def api_importar_datos():
                 'message': 'Formato de archivo inválido'
             })
 
-        # Importar preguntas
+        # Importar preguntas (agregar_pregunta descarta las casi duplicadas)
+        inicio = time.perf_counter()
         total_importadas = 0
+        total_omitidas = 0
         for habilidad, niveles in data['preguntas'].items():
             for nivel, preguntas in niveles.items():
                 for pregunta in preguntas:
                     if db_manager.agregar_pregunta(habilidad, pregunta, 'general', nivel):
                         total_importadas += 1
+                    else:
+                        total_omitidas += 1
+
+        metricas.incrementar('preguntas_importadas_total', total_importadas, resultado='importada')
+        metricas.incrementar('preguntas_importadas_total', total_omitidas, resultado='omitida')
+        metricas.observar('preguntas_importacion_segundos', time.perf_counter() - inicio)
+
+        return jsonify({
+            'status': 'success',
+            'message': f'Importadas {total_importadas} preguntas correctamente',
+            'omitidas': total_omitidas
+        })
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+
+@app.route('/api/similares', methods=['POST'])
+def api_similares():
+    """Preguntas más parecidas a una pregunta del banco (id) o a un texto libre"""
+    try:
+        data = request.get_json()
+
+        pregunta_id = data.get('id')
+        texto = (data.get('texto') or '').strip()
+        k = max(1, min(int(data.get('k', 5)), 50))
+
+        if pregunta_id is None and not texto:
+            return jsonify({
+                'status': 'error',
+                'message': 'Se requiere id o texto'
+            })
+
+        similares = db_manager.obtener_preguntas_similares(
+            pregunta_id=int(pregunta_id) if pregunta_id is not None else None,
+            texto=texto,
+            k=k
+        )
+
+        return jsonify({
+            'status': 'success',
+            'data': {
+                'total_encontrados': len(similares),
+                'resultados': similares
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+
+
+@app.route('/api/duplicados')
+def api_duplicados():
+    """Reporte de grupos de preguntas casi duplicadas en todo el banco"""
+    from duplicados import UMBRAL_DUPLICADO
+
+    try:
+        umbral = float(request.args.get('umbral', UMBRAL_DUPLICADO))
+        grupos = db_manager.reporte_duplicados(umbral=umbral)
 
         return jsonify({
             'status': 'success',
-            'message': f'Importadas {total_importadas} preguntas correctamente'
+            'data': {
+                'umbral': umbral,
+                'total_grupos': len(grupos),
+                'grupos': grupos
+            }
         })
 
     except Exception as e:
@@ -564,10 +983,25 @@ def api_health():
         'status': 'success',
         'message': 'API funcionando correctamente',
         'timestamp': datetime.now().isoformat(),
-        'modulos_disponibles': MODULOS_DISPONIBLES
+        'modulos_disponibles': MODULOS_DISPONIBLES,
+        'replicas': db_manager.estado_replicas() if db_manager else []
     })
 
 
+@app.route('/api/metrics')
+def api_metrics():
+    """Métricas en formato de texto de Prometheus (agregadas entre procesos worker)"""
+    if not MODULOS_DISPONIBLES:
+        return jsonify({
+            'status': 'error',
+            'message': 'Módulos no disponibles'
+        }), 503
+
+    from metricas import metricas
+    return Response(metricas.exportar_prometheus(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.errorhandler(404)
 def not_found_error(error):
     return jsonify({
@@ -595,6 +1029,8 @@ def bad_request_error(error):
 if __name__ == '__main__':
     print("🚀 Inicializando Servidor Web del Agente Entrevistador...")
     print("=" * 60)
+    if ERROR_IMPORTACION:
+        print(f"❌ Error importando módulos: {ERROR_IMPORTACION}")
 
     if inicializar_sistema():
         print("✅ Sistema inicializado correctamente")
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Reposición del banco con preguntas generadas por el LLM, fuera del camino de la entrevista
+
+Detecta los pares (habilidad, nivel) con menos de `minimo` preguntas a partir de los
+conteos agrupados del banco, pide al LLM las que faltan (en paralelo, con reintentos),
+descarta las repetidas y las casi duplicadas (contra el banco y entre sí) y las inserta
+de una vez con agregar_preguntas_lote, con fuente 'llm:<modelo>'. Las entrevistas leen
+luego esas preguntas de la base como cualquier otra, sin esperar al LLM.
+
+Se ejecuta como proceso aparte (cron o --intervalo), no dentro de los workers web:
+con varios workers cada uno repetiría las mismas llamadas al LLM.
+
+Uso:
+    python banco_llm.py --solo-detectar              # huecos de cobertura, sin generar
+    python banco_llm.py --minimo 8 --modelo llama3
+    python banco_llm.py --intervalo 3600             # repone cada hora hasta Ctrl+C
+    python banco_llm.py --url http://localhost:11435 # LLM simulado de generacion_concurrente.py
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from duplicados import UMBRAL_DUPLICADO, firma_minhash, similitud_estimada
+from metricas import metricas
+from normalizacion import NIVELES, normalizar_texto
+from anteriores.generacion_concurrente import (MAX_CONCURRENCIA, OLLAMA_URL_DEFECTO, TAMANO_GRUPO,
+                                               ClienteOllamaHTTP, ErrorLLM, generar_agrupado,
+                                               generar_concurrente)
+
+# Preguntas por (habilidad, nivel) por debajo de las cuales se pide al LLM
+MINIMO_POR_NIVEL = int(os.getenv('BANCO_LLM_MINIMO', '5'))
+
+# Tope de preguntas por llamada: respuestas más largas se degradan y tardan más
+PREGUNTAS_POR_LLAMADA = 8
+
+# Preguntas existentes que se muestran al LLM para que no las repita
+EJEMPLOS_EN_PROMPT = 5
+
+# Huecos que se atienden por ronda: acota la duración y la carga sobre el LLM
+MAX_HUECOS_POR_RONDA = int(os.getenv('BANCO_LLM_MAX_HUECOS', '200'))
+
+_LINEA_PREGUNTA = re.compile(
+    r'^\s*(?:[-*•]|\d+[.)])?\s*(?:pregunta\s*\d*\s*)?(?:\(?(conceptual|practica|práctica)\)?\s*[|:-]\s*)?(.+)$',
+    re.IGNORECASE
+)
+
+Hueco = Tuple[str, str]
+
+
+def detectar_huecos(db, minimo: int = MINIMO_POR_NIVEL, niveles: Iterable[str] = NIVELES,
+                    habilidades: Optional[List[str]] = None) -> List[Tuple[str, str, int]]:
+    """
+    (habilidad, nivel, faltan) con menos de `minimo` preguntas, de más a menos faltantes.
+    Usa los conteos agrupados (dos consultas cubiertas por índices), no uno por habilidad.
+    """
+    estadisticas = db.obtener_estadisticas_habilidades()
+    if habilidades:
+        buscadas = {normalizar_texto(h) for h in habilidades}
+        estadisticas = {h: s for h, s in estadisticas.items() if normalizar_texto(h) in buscadas}
+
+    huecos = []
+    for habilidad, stats in estadisticas.items():
+        for nivel in niveles:
+            faltan = minimo - stats['por_nivel'].get(nivel, 0)
+            if faltan > 0:
+                huecos.append((habilidad, nivel, faltan))
+    huecos.sort(key=lambda hueco: (-hueco[2], hueco[0], hueco[1]))
+    return huecos
+
+
+def construir_prompt(habilidad: str, nivel: str, cantidad: int, existentes: List[str]) -> str:
+    ejemplos = '\n'.join(f"- {pregunta}" for pregunta in existentes) or '- (ninguna)'
+    return f"""Eres un experto reclutador técnico. Genera exactamente {cantidad} preguntas de entrevista nuevas.
+
+Requisitos:
+- Nivel de dificultad: {nivel}
+- En español, claras y específicas, cada una terminada en '?'
+- Mezcla preguntas conceptuales y prácticas
+- No repitas ni reformules estas preguntas que ya tenemos:
+{ejemplos}
+
+Formato de respuesta, una por línea:
+conceptual | [pregunta]
+practica | [pregunta]
+
+Nivel a evaluar: {nivel}
+Habilidad a evaluar: {habilidad}"""
+
+
+def extraer_preguntas(respuesta: str) -> List[Tuple[str, str]]:
+    """(tipo, pregunta) de cada línea que termina en '?'; sin tipo reconocible queda 'general'"""
+    preguntas = []
+    for linea in respuesta.splitlines():
+        coincidencia = _LINEA_PREGUNTA.match(linea.strip())
+        if not coincidencia:
+            continue
+        tipo, pregunta = coincidencia.groups()
+        pregunta = pregunta.strip().strip('"').strip()
+        if ':' in pregunta and not pregunta.startswith('¿'):
+            # "PREGUNTA 1: ¿...?" del formato del agente entrevistador
+            pregunta = pregunta.split(':', 1)[1].strip()
+        if len(pregunta) < 10 or not pregunta.endswith('?'):
+            continue
+        tipo = normalizar_texto(tipo) if tipo else 'general'
+        preguntas.append((tipo, pregunta))
+    return preguntas
+
+
+def filtrar_nuevas(db, generadas: Dict[Hueco, List[Tuple[str, str]]],
+                   umbral: float = UMBRAL_DUPLICADO) -> Tuple[List[Tuple[str, ...]], Dict[str, int]]:
+    """
+    Filas (habilidad, pregunta, tipo, nivel, categoria) que no están ya en el banco.
+    Descarta repetidas exactas (texto normalizado, una sola consulta), casi duplicadas
+    de preguntas del banco (LSH de la misma habilidad) y casi duplicadas entre las propias
+    generadas (MinHash en memoria). Retorna también los descartes por motivo.
+    """
+    habilidades = sorted({habilidad for habilidad, _ in generadas})
+    existentes = db.obtener_claves_preguntas(habilidades)
+    descartes = {'repetida': 0, 'casi_duplicada': 0}
+    aceptadas_por_habilidad: Dict[str, list] = {}
+    filas = []
+
+    for (habilidad, nivel), preguntas in generadas.items():
+        habilidad_norm = normalizar_texto(habilidad)
+        aceptadas = aceptadas_por_habilidad.setdefault(habilidad_norm, [])
+
+        for tipo, pregunta in preguntas:
+            pregunta_norm = normalizar_texto(pregunta)
+            if (habilidad_norm, pregunta_norm) in existentes:
+                descartes['repetida'] += 1
+                continue
+
+            firma = firma_minhash(pregunta_norm)
+            if any(similitud_estimada(firma, otra) >= umbral for otra in aceptadas) \
+                    or db.buscar_casi_duplicados(pregunta, habilidad, umbral):
+                descartes['casi_duplicada'] += 1
+                continue
+
+            existentes.add((habilidad_norm, pregunta_norm))
+            aceptadas.append(firma)
+            filas.append((habilidad, pregunta, tipo, nivel, 'tecnica'))
+
+    return filas, descartes
+
+
+def reponer(db, llm: Callable[..., str], modelo: str, minimo: int = MINIMO_POR_NIVEL,
+            niveles: Iterable[str] = NIVELES, habilidades: Optional[List[str]] = None,
+            max_huecos: int = MAX_HUECOS_POR_RONDA, max_concurrencia: int = MAX_CONCURRENCIA,
+            tamano_grupo: int = TAMANO_GRUPO, verbose: bool = True) -> dict:
+    """
+    Una ronda completa: detectar huecos, generar en paralelo, filtrar e insertar.
+    Con tamano_grupo > 1 se piden varios huecos por prompt (respuesta JSON con el tipo
+    de cada pregunta); con 1, un prompt de texto por hueco.
+    Los huecos que no se llenan (LLM caído, todo duplicado) se reintentan en la siguiente.
+    """
+    inicio = time.perf_counter()
+    huecos = detectar_huecos(db, minimo, niveles, habilidades)[:max_huecos]
+    faltan = {(habilidad, nivel): cantidad for habilidad, nivel, cantidad in huecos}
+    resultado = {'huecos': len(huecos), 'generadas': 0, 'insertadas': 0,
+                 'repetida': 0, 'casi_duplicada': 0, 'fallidas': 0}
+    if not huecos:
+        return resultado
+
+    pares = [(habilidad, nivel) for habilidad, nivel, _ in huecos]
+    # Se pide algo más de lo que falta: parte se pierde en la deduplicación
+    pedidas = {hueco: min(PREGUNTAS_POR_LLAMADA, faltan[hueco] + 2) for hueco in pares}
+
+    def generar(hueco: Hueco) -> List[Tuple[str, str]]:
+        habilidad, nivel = hueco
+        existentes = db.obtener_preguntas_por_habilidad(habilidad, EJEMPLOS_EN_PROMPT, nivel)
+        preguntas = extraer_preguntas(llm(construir_prompt(habilidad, nivel, pedidas[hueco], existentes)))
+        if not preguntas:
+            raise ErrorLLM("Respuesta sin preguntas reconocibles")
+        return preguntas
+
+    def al_completar(hueco, preguntas, error):
+        if error:
+            resultado['fallidas'] += 1
+            if verbose:
+                print(f"⚠️ {hueco[0]} ({hueco[1]}): sin preguntas ({error})")
+
+    if tamano_grupo > 1:
+        solicitudes = [{'habilidad': habilidad, 'nivel': nivel, 'cantidad': pedidas[(habilidad, nivel)],
+                        'evitar': db.obtener_preguntas_por_habilidad(habilidad, EJEMPLOS_EN_PROMPT, nivel)}
+                       for habilidad, nivel in pares]
+        # El esquema agrupado pide el tipo de cada pregunta, como el formato por líneas
+        respuestas = generar_agrupado(
+            solicitudes, llm, tamano_grupo, max_concurrencia,
+            al_completar=lambda i, preguntas, error: al_completar(pares[i], preguntas, error),
+            con_tipo=True)
+        generadas = {hueco: preguntas or [] for hueco, preguntas in zip(pares, respuestas)}
+    else:
+        generadas = generar_concurrente(pares, generar, lambda hueco: [],
+                                        max_concurrencia=max_concurrencia, al_completar=al_completar)
+    generadas = {hueco: preguntas[:pedidas[hueco]] for hueco, preguntas in generadas.items()}
+    resultado['generadas'] = sum(len(preguntas) for preguntas in generadas.values())
+
+    filas, descartes = filtrar_nuevas(db, generadas)
+    resultado.update(descartes)
+
+    # Cada hueco recibe como mucho lo que le faltaba
+    recibidas: Dict[Hueco, int] = {}
+    fuente = f"llm:{modelo}"
+    seleccion = []
+    for habilidad, pregunta, tipo, nivel, categoria in filas:
+        hueco = (habilidad, nivel)
+        if recibidas.get(hueco, 0) < faltan[hueco]:
+            recibidas[hueco] = recibidas.get(hueco, 0) + 1
+            seleccion.append((habilidad, pregunta, tipo, nivel, categoria, fuente))
+
+    if seleccion:
+        resultado['insertadas'] = db.agregar_preguntas_lote(seleccion)
+
+    metricas.incrementar('preguntas_llm_total', resultado['insertadas'], resultado='insertada')
+    metricas.incrementar('preguntas_llm_total', resultado['repetida'], resultado='repetida')
+    metricas.incrementar('preguntas_llm_total', resultado['casi_duplicada'], resultado='casi_duplicada')
+    metricas.observar('preguntas_llm_reposicion_segundos', time.perf_counter() - inicio)
+    resultado['segundos'] = round(time.perf_counter() - inicio, 2)
+    return resultado
+
+
+def _imprimir_huecos(huecos: List[Tuple[str, str, int]], limite: int = 30):
+    print(f"🔍 {len(huecos)} pares (habilidad, nivel) con cobertura insuficiente")
+    for habilidad, nivel, faltan in huecos[:limite]:
+        print(f"   • {habilidad} ({nivel}): faltan {faltan}")
+    if len(huecos) > limite:
+        print(f"   ... y {len(huecos) - limite} más")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Repone el banco con preguntas generadas por el LLM')
+    parser.add_argument('--minimo', type=int, default=MINIMO_POR_NIVEL, help='Preguntas por habilidad y nivel')
+    parser.add_argument('--niveles', default=','.join(NIVELES))
+    parser.add_argument('--habilidades', help='Solo estas habilidades (separadas por comas)')
+    parser.add_argument('--max-huecos', type=int, default=MAX_HUECOS_POR_RONDA, help='Huecos por ronda')
+    parser.add_argument('--modelo', default='llama2')
+    parser.add_argument('--url', default=OLLAMA_URL_DEFECTO, help='URL de Ollama (o del simulado)')
+    parser.add_argument('--concurrencia', type=int, default=MAX_CONCURRENCIA)
+    parser.add_argument('--agrupar', type=int, default=TAMANO_GRUPO,
+                        help='Huecos por prompt (1: un prompt de texto por hueco)')
+    parser.add_argument('--intervalo', type=float, help='Segundos entre rondas (sin él, una sola ronda)')
+    parser.add_argument('--solo-detectar', action='store_true', help='Lista los huecos y termina')
+    args = parser.parse_args(argv)
+
+    from fragmentacion import crear_gestor_bd
+
+    db = crear_gestor_bd()
+    if db.db_type == 'snapshot':
+        print("❌ El catálogo de solo lectura no admite escrituras: usa la base de origen")
+        return 1
+
+    niveles = [n.strip() for n in args.niveles.split(',') if n.strip()]
+    habilidades = [h.strip() for h in args.habilidades.split(',')] if args.habilidades else None
+
+    if args.solo_detectar:
+        _imprimir_huecos(detectar_huecos(db, args.minimo, niveles, habilidades))
+        return 0
+
+    cliente = ClienteOllamaHTTP(args.modelo, args.url)
+    try:
+        cliente.verificar_conexion()
+    except ErrorLLM as e:
+        print(f"❌ LLM no disponible: {e}")
+        return 1
+
+    try:
+        while True:
+            resultado = reponer(db, cliente, args.modelo, args.minimo, niveles, habilidades,
+                                args.max_huecos, args.concurrencia, args.agrupar)
+            if resultado['huecos']:
+                print(f"✅ {resultado['insertadas']} preguntas insertadas en {resultado['huecos']} huecos "
+                      f"({resultado['generadas']} generadas, {resultado['repetida']} repetidas, "
+                      f"{resultado['casi_duplicada']} casi duplicadas, {resultado['fallidas']} huecos fallidos) "
+                      f"en {resultado['segundos']} s")
+            else:
+                print(f"✅ Todas las habilidades tienen al menos {args.minimo} preguntas por nivel")
+            if args.intervalo is None:
+                return 0
+            time.sleep(args.intervalo)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        db.cerrar_conexion()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
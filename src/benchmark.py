@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del DatabaseManager sobre bancos sintéticos
+Mide carga masiva, selección por habilidad, búsqueda, estadísticas, exportación
+y migración en SQLite y PostgreSQL, y emite JSON comparable entre commits.
+
+Uso:
+    python benchmark.py --tamanos 10000,100000 --habilidades 200 --salida bench.json
+    python benchmark.py --backend postgresql --tamanos 10000
+    python benchmark.py --backend ambos --tamanos 10000
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, List
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from generador_banco import VOCABULARIO, generar_banco, quitar_acentos
+from normalizacion import NIVELES
+
+# Base PostgreSQL que se vacía y recarga en cada corrida (nunca la de trabajo)
+BASE_POSTGRES_BENCH = os.getenv('BENCH_POSTGRES_DB', 'preguntas_bench')
+
+# Términos de búsqueda tomados del vocabulario del generador (sin tildes, como se suele teclear)
+TERMINOS_BUSQUEDA = [quitar_acentos(palabra) for palabra in VOCABULARIO[:30]]
+
+
+def _percentil(ordenados: List[float], p: float) -> float:
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+def medir(nombre: str, funcion: Callable, repeticiones: int, elementos: int = 1) -> dict:
+    """Ejecuta la función varias veces y resume sus latencias en ms"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    tiempos.sort()
+    total_s = sum(tiempos) / 1000
+    return {
+        'operacion': nombre,
+        'repeticiones': repeticiones,
+        'media_ms': round(sum(tiempos) / len(tiempos), 3),
+        'p50_ms': round(_percentil(tiempos, 0.50), 3),
+        'p95_ms': round(_percentil(tiempos, 0.95), 3),
+        'p99_ms': round(_percentil(tiempos, 0.99), 3),
+        'min_ms': round(tiempos[0], 3),
+        'max_ms': round(tiempos[-1], 3),
+        'elementos_por_s': round(repeticiones * elementos / total_s, 1) if total_s else None
+    }
+
+
+def commit_actual() -> str:
+    """Hash del commit de trabajo (o 'desconocido' fuera de git)"""
+    try:
+        salida = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return salida.stdout.strip() or 'desconocido'
+    except (OSError, subprocess.SubprocessError):
+        return 'desconocido'
+
+
+def ejecutar_backend(args) -> List[dict]:
+    """Corre todos los benchmarks en el backend configurado en este proceso"""
+    from database_manager import DatabaseManager
+
+    resultados = []
+    rng = random.Random(args.semilla)
+
+    for tamano in args.tamanos:
+        directorio = tempfile.mkdtemp(prefix='bench_preguntas_')
+        db = DatabaseManager(os.path.join(directorio, 'bench.db'))
+        db.limpiar_base_datos()
+
+        def anotar(resultado):
+            resultado.update({'backend': db.db_type, 'tamano': tamano, 'habilidades': args.habilidades})
+            resultados.append(resultado)
+            print(f"  {resultado['operacion']:<40} p50 {resultado['p50_ms']:>10.3f} ms"
+                  f"  p95 {resultado['p95_ms']:>10.3f} ms")
+
+        print(f"\n📦 {db.db_type} - {tamano} preguntas en {args.habilidades} habilidades")
+
+        anotar(medir('carga_masiva',
+                     lambda: db.agregar_preguntas_lote(generar_banco(tamano, args.habilidades, args.semilla)),
+                     1, tamano))
+
+        habilidades = db.obtener_todas_habilidades()
+        anotar(medir('obtener_preguntas_por_habilidad',
+                     lambda: db.obtener_preguntas_por_habilidad(rng.choice(habilidades), cantidad=5),
+                     args.repeticiones))
+        anotar(medir('obtener_preguntas_por_habilidad_nivel',
+                     lambda: db.obtener_preguntas_por_habilidad(rng.choice(habilidades), cantidad=5,
+                                                                nivel=rng.choice(NIVELES)),
+                     args.repeticiones))
+        anotar(medir('buscar_preguntas',
+                     lambda: db.buscar_preguntas(rng.choice(TERMINOS_BUSQUEDA), limit=20),
+                     args.repeticiones))
+        anotar(medir('buscar_preguntas_difusa',
+                     lambda: db.buscar_preguntas_difusa(rng.choice(TERMINOS_BUSQUEDA)[:-1] + 'x', limit=20),
+                     args.repeticiones))
+        anotar(medir('contar_preguntas', db.contar_preguntas, args.repeticiones))
+        anotar(medir('obtener_estadisticas_habilidad',
+                     lambda: db.obtener_estadisticas_habilidad(rng.choice(habilidades)),
+                     args.repeticiones))
+        anotar(medir('obtener_estadisticas_generales', db.obtener_estadisticas_generales,
+                     max(1, args.repeticiones // 10)))
+        anotar(medir('obtener_resumen_completo', db.obtener_resumen_completo,
+                     max(1, args.repeticiones // 10)))
+
+        archivo_sql = os.path.join(directorio, 'export.sql')
+        anotar(medir('exportar_bd_a_sql', lambda: db.exportar_bd_a_sql(archivo_sql), 1, tamano))
+
+        if db.db_type == 'sqlite':
+            from generate_migration import generar_sql_migracion
+            archivo_migracion = os.path.join(directorio, 'migracion.sql')
+            anotar(medir('generar_sql_migracion',
+                         lambda: generar_sql_migracion(db.db_name, archivo_migracion), 1, tamano))
+
+        db.cerrar_conexion()
+
+    return resultados
+
+
+def ejecutar_en_subproceso(backend: str, args) -> List[dict]:
+    """Cada backend corre en su propio proceso: DatabaseConfig se lee al importar"""
+    entorno = dict(os.environ, DATABASE_TYPE=backend)
+    if backend == 'postgresql':
+        entorno['POSTGRES_DB'] = BASE_POSTGRES_BENCH
+
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as tmp:
+        salida = tmp.name
+    comando = [sys.executable, os.path.abspath(__file__), '--backend', backend,
+               '--tamanos', ','.join(map(str, args.tamanos)), '--habilidades', str(args.habilidades),
+               '--repeticiones', str(args.repeticiones), '--semilla', str(args.semilla), '--salida', salida]
+
+    try:
+        if subprocess.run(comando, env=entorno).returncode != 0:
+            print(f"❌ Benchmark de {backend} falló")
+            return []
+        with open(salida, encoding='utf-8') as f:
+            return json.load(f)['resultados']
+    finally:
+        os.remove(salida)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks del DatabaseManager')
+    parser.add_argument('--backend', choices=['sqlite', 'postgresql', 'ambos'], default='sqlite')
+    parser.add_argument('--tamanos', default='10000',
+                        type=lambda valor: [int(v) for v in valor.split(',')],
+                        help='Tamaños del banco separados por coma (ej: 10000,100000,1000000)')
+    parser.add_argument('--habilidades', type=int, default=200)
+    parser.add_argument('--repeticiones', type=int, default=200)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto stdout)')
+    args = parser.parse_args()
+
+    if args.backend == 'ambos':
+        resultados = ejecutar_en_subproceso('sqlite', args) + ejecutar_en_subproceso('postgresql', args)
+    elif os.getenv('DATABASE_TYPE', '').lower() != args.backend:
+        resultados = ejecutar_en_subproceso(args.backend, args)
+    else:
+        resultados = ejecutar_backend(args)
+
+    informe = {
+        'commit': commit_actual(),
+        'fecha': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'parametros': {
+            'tamanos': args.tamanos,
+            'habilidades': args.habilidades,
+            'repeticiones': args.repeticiones,
+            'semilla': args.semilla
+        },
+        'resultados': resultados
+    }
+
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        print(f"\n✅ Resultados guardados en: {args.salida}")
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Búsqueda difusa por trigramas (tolerante a errores de escritura)
+Índice invertido en memoria para SQLite, equivalente a pg_trgm en PostgreSQL
+"""
+
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Set, Tuple
+
+from normalizacion import normalizar_texto
+
+_PALABRA = re.compile(r'\w+')
+
+# Palabras de menos letras aportan trigramas poco selectivos ("es", "un", "y")
+LONGITUD_MINIMA_PALABRA = 3
+
+# Algo menor que el 0.3 de pg_trgm para tolerar transposiciones ("Pyhton" ~ 0.27)
+UMBRAL_SIMILITUD_DEFECTO = 0.25
+
+
+def trigramas(palabra: str) -> Set[str]:
+    """Trigramas de una palabra con el mismo relleno que pg_trgm ('  pa', ' pal', ..., 'ra ')"""
+    relleno = f"  {palabra} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+def extraer_palabras(texto_norm: str) -> Set[str]:
+    """Palabras indexables de un texto ya normalizado"""
+    return {p for p in _PALABRA.findall(texto_norm) if len(p) >= LONGITUD_MINIMA_PALABRA}
+
+
+class IndiceTrigramas:
+    """
+    Índice invertido de dos niveles:
+    trigrama -> palabras del vocabulario y palabra -> ids de preguntas.
+    Las búsquedas solo comparan contra palabras que comparten algún trigrama
+    con el término, nunca contra todas las preguntas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._palabras_por_trigrama: Dict[str, Set[str]] = defaultdict(set)
+        self._ids_por_palabra: Dict[str, Set[int]] = defaultdict(set)
+        self._palabras_por_id: Dict[int, Set[str]] = {}
+        self._trigramas_por_palabra: Dict[str, Set[str]] = {}
+
+    def __len__(self):
+        return len(self._palabras_por_id)
+
+    def agregar(self, pregunta_id: int, *textos_norm: str):
+        """Indexa (o reindexa) una pregunta a partir de sus textos normalizados"""
+        palabras = set()
+        for texto in textos_norm:
+            palabras |= extraer_palabras(texto or '')
+
+        with self._lock:
+            self._eliminar_sin_lock(pregunta_id)
+            self._palabras_por_id[pregunta_id] = palabras
+
+            for palabra in palabras:
+                if palabra not in self._trigramas_por_palabra:
+                    tris = trigramas(palabra)
+                    self._trigramas_por_palabra[palabra] = tris
+                    for tri in tris:
+                        self._palabras_por_trigrama[tri].add(palabra)
+                self._ids_por_palabra[palabra].add(pregunta_id)
+
+    def eliminar(self, pregunta_id: int):
+        """Quita una pregunta del índice"""
+        with self._lock:
+            self._eliminar_sin_lock(pregunta_id)
+
+    def _eliminar_sin_lock(self, pregunta_id: int):
+        for palabra in self._palabras_por_id.pop(pregunta_id, ()):
+            ids = self._ids_por_palabra.get(palabra)
+            if ids is None:
+                continue
+            ids.discard(pregunta_id)
+            if not ids:
+                # Palabra sin preguntas: sacarla también del vocabulario
+                del self._ids_por_palabra[palabra]
+                for tri in self._trigramas_por_palabra.pop(palabra, ()):
+                    self._palabras_por_trigrama[tri].discard(palabra)
+
+    def palabras_similares(self, palabra: str, umbral: float) -> Dict[str, float]:
+        """Palabras del vocabulario con similitud de trigramas >= umbral"""
+        tris = trigramas(palabra)
+        compartidos = Counter()
+
+        with self._lock:
+            for tri in tris:
+                for candidata in self._palabras_por_trigrama.get(tri, ()):
+                    compartidos[candidata] += 1
+
+            resultado = {}
+            for candidata, comunes in compartidos.items():
+                total = len(tris) + len(self._trigramas_por_palabra[candidata]) - comunes
+                similitud = comunes / total
+                if similitud >= umbral:
+                    resultado[candidata] = similitud
+        return resultado
+
+    def ids_con_subcadena(self, palabra: str) -> Set[int]:
+        """
+        Ids de preguntas con alguna palabra que contiene `palabra` (de 3 letras o más).
+        Solo se revisan las palabras que tienen todos sus trigramas, como LIKE '%...%' con pg_trgm.
+        """
+        tris = {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+        ids = set()
+
+        with self._lock:
+            conjuntos = sorted((self._palabras_por_trigrama.get(tri, set()) for tri in tris), key=len)
+            if not conjuntos or not conjuntos[0]:
+                return ids
+            for candidata in conjuntos[0].intersection(*conjuntos[1:]):
+                if palabra in candidata:
+                    ids |= self._ids_por_palabra.get(candidata, set())
+        return ids
+
+    def buscar(self, termino: str, umbral: float = UMBRAL_SIMILITUD_DEFECTO,
+               limite: int = 10) -> List[Tuple[int, float]]:
+        """
+        Devuelve [(pregunta_id, similitud)] ordenado de mayor a menor.
+        La similitud de una pregunta es el promedio, sobre las palabras del término,
+        de la mejor coincidencia encontrada en la pregunta.
+        """
+        palabras_termino = extraer_palabras(normalizar_texto(termino))
+        if not palabras_termino:
+            return []
+
+        puntajes = defaultdict(float)
+        for palabra in palabras_termino:
+            mejor_por_id = {}
+            for similar, similitud in self.palabras_similares(palabra, umbral).items():
+                with self._lock:
+                    ids = tuple(self._ids_por_palabra.get(similar, ()))
+                for pregunta_id in ids:
+                    if similitud > mejor_por_id.get(pregunta_id, 0.0):
+                        mejor_por_id[pregunta_id] = similitud
+            for pregunta_id, similitud in mejor_por_id.items():
+                puntajes[pregunta_id] += similitud
+
+        n = len(palabras_termino)
+        resultados = [(pid, round(total / n, 3)) for pid, total in puntajes.items() if total / n >= umbral]
+        resultados.sort(key=lambda item: (-item[1], item[0]))
+        return resultados[:limite]
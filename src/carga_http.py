@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Generador de carga HTTP para la API Flask
+Reproduce sesiones de reclutador (status -> habilidades -> generar-preguntas -> exportar,
+más búsquedas y ediciones) en lazo cerrado (N usuarios concurrentes) o en lazo abierto
+(llegadas de Poisson a una tasa fija), y reporta percentiles de latencia por endpoint.
+
+Uso:
+    python app.py                                  # en otra terminal
+    python carga_http.py --modo cerrado --usuarios 16 --duracion 30
+    python carga_http.py --modo abierto --tasas 5,10,20,40 --duracion 20 --slo-p99 500
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+TERMINOS_BUSQUEDA = ['python', 'listas', 'sql', 'javascript', 'docker', 'pyhton', 'indices', 'api']
+FORMATOS_EXPORTACION = ['txt', 'json', 'csv']
+
+# Vocabulario para redactar altas distintas entre sí (el banco rechaza casi duplicados)
+_VOCABULARIO = [
+    'latencia', 'caché', 'réplica', 'índice', 'cola', 'lote', 'hilo', 'proceso', 'memoria', 'disco',
+    'red', 'contrato', 'esquema', 'migración', 'bloqueo', 'transacción', 'evento', 'métrica', 'traza',
+    'despliegue', 'contenedor', 'servicio', 'consulta', 'partición', 'compresión', 'firma', 'sesión',
+    'token', 'modelo', 'prueba', 'cobertura', 'error', 'reintento', 'timeout', 'presupuesto', 'límite',
+]
+
+
+class Estadisticas:
+    """Latencias por endpoint, seguras entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias: Dict[str, List[float]] = defaultdict(list)
+        self.errores: Dict[str, int] = defaultdict(int)
+        self.sesiones = 0
+        self.sesiones_fallidas = 0
+
+    def registrar(self, endpoint: str, latencia_ms: float, ok: bool):
+        with self._lock:
+            self.latencias[endpoint].append(latencia_ms)
+            if not ok:
+                self.errores[endpoint] += 1
+
+    def registrar_sesion(self, latencia_ms: float, ok: bool):
+        self.registrar('sesion', latencia_ms, ok)
+        with self._lock:
+            self.sesiones += 1
+            if not ok:
+                self.sesiones_fallidas += 1
+
+    def resumen(self, duracion_s: float) -> dict:
+        with self._lock:
+            por_endpoint = {}
+            for endpoint, valores in sorted(self.latencias.items()):
+                ordenados = sorted(valores)
+                por_endpoint[endpoint] = {
+                    'peticiones': len(ordenados),
+                    'errores': self.errores.get(endpoint, 0),
+                    'por_segundo': round(len(ordenados) / duracion_s, 2) if duracion_s else 0,
+                    'p50_ms': round(percentil(ordenados, 0.50), 2),
+                    'p90_ms': round(percentil(ordenados, 0.90), 2),
+                    'p99_ms': round(percentil(ordenados, 0.99), 2),
+                    'max_ms': round(ordenados[-1], 2) if ordenados else 0.0
+                }
+            return {
+                'duracion_s': round(duracion_s, 2),
+                'sesiones': self.sesiones,
+                'sesiones_fallidas': self.sesiones_fallidas,
+                'endpoints': por_endpoint
+            }
+
+
+def percentil(ordenados: List[float], p: float) -> float:
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+class ClienteAPI:
+    """Cliente mínimo sobre urllib (sin dependencias externas)"""
+
+    def __init__(self, url_base: str, estadisticas: Estadisticas, timeout: float = 30.0):
+        self.url_base = url_base.rstrip('/')
+        self.estadisticas = estadisticas
+        self.timeout = timeout
+
+    def pedir(self, metodo: str, ruta: str, datos: dict = None, nombre: str = None) -> Optional[dict]:
+        """Hace la petición, registra su latencia y retorna el JSON (o None si no es JSON)"""
+        cuerpo = json.dumps(datos).encode('utf-8') if datos is not None else None
+        peticion = urllib.request.Request(f"{self.url_base}{ruta}", data=cuerpo, method=metodo,
+                                          headers={'Content-Type': 'application/json'})
+        inicio = time.perf_counter()
+        ok, respuesta = True, None
+        try:
+            with urllib.request.urlopen(peticion, timeout=self.timeout) as r:
+                contenido = r.read()
+                if r.headers.get_content_type() == 'application/json':
+                    respuesta = json.loads(contenido)
+                    # La API responde 200 con status 'error' en los fallos de negocio
+                    ok = respuesta.get('status') != 'error'
+        except (urllib.error.URLError, OSError, ValueError):
+            ok = False
+
+        self.estadisticas.registrar(nombre or ruta, (time.perf_counter() - inicio) * 1000, ok)
+        if not ok:
+            raise RuntimeError(f"{metodo} {ruta} falló")
+        return respuesta
+
+
+def sesion_reclutador(cliente: ClienteAPI, rng: random.Random, proporcion_ediciones: float):
+    """Una sesión típica de la interfaz web"""
+    estado = cliente.pedir('GET', '/api/status')
+    habilidades = estado['data']['habilidades'] or ['Python']
+
+    cliente.pedir('GET', '/api/habilidades')
+
+    if rng.random() < 0.5:
+        cliente.pedir('POST', '/api/buscar', {
+            'termino': rng.choice(TERMINOS_BUSQUEDA),
+            'modo': rng.choice(['exacto', 'difuso'])
+        })
+
+    seleccion = rng.sample(habilidades, min(len(habilidades), rng.randint(2, 5)))
+    generadas = cliente.pedir('POST', '/api/generar-preguntas', {
+        'habilidades': seleccion,
+        'cantidad_por_habilidad': rng.randint(2, 5),
+        'nivel_filtro': rng.choice([None, 'basico', 'intermedio', 'avanzado'])
+    })
+
+    cliente.pedir('POST', '/api/exportar', {
+        'preguntas': generadas['data']['preguntas'],
+        'formato': rng.choice(FORMATOS_EXPORTACION)
+    })
+
+    if rng.random() < proporcion_ediciones:
+        # Alta única por sesión (evita el filtro de duplicados) y edición de una existente
+        cliente.pedir('POST', '/api/agregar-pregunta', {
+            'habilidad': rng.choice(seleccion),
+            'pregunta': f"¿Cómo relacionarías {', '.join(rng.sample(_VOCABULARIO, 6))} "
+                        f"en un sistema real? ({rng.getrandbits(32):x})",
+            'nivel': 'intermedio'
+        })
+        pregunta_id = rng.randint(1, 100)
+        existente = cliente.pedir('GET', f'/api/obtener-pregunta/{pregunta_id}', nombre='/api/obtener-pregunta/<id>')
+        cliente.pedir('POST', '/api/actualizar-pregunta', {
+            'id': pregunta_id,
+            'nivel': existente['data'].get('nivel', 'intermedio')
+        })
+
+
+def _ejecutar_sesion(cliente: ClienteAPI, rng: random.Random, proporcion_ediciones: float,
+                     inicio_programado: float):
+    """La latencia de la sesión se cuenta desde su llegada programada (evita omisión coordinada)"""
+    ok = True
+    try:
+        sesion_reclutador(cliente, rng, proporcion_ediciones)
+    except Exception:
+        ok = False
+    cliente.estadisticas.registrar_sesion((time.perf_counter() - inicio_programado) * 1000, ok)
+
+
+def lazo_cerrado(url: str, usuarios: int, duracion: float, pausa: float,
+                 proporcion_ediciones: float, semilla: int) -> dict:
+    """N usuarios que encadenan sesiones (con una pausa de 'pensar' entre ellas)"""
+    estadisticas = Estadisticas()
+    fin = time.perf_counter() + duracion
+
+    def usuario(indice: int):
+        rng = random.Random(semilla + indice)
+        cliente = ClienteAPI(url, estadisticas)
+        while time.perf_counter() < fin:
+            _ejecutar_sesion(cliente, rng, proporcion_ediciones, time.perf_counter())
+            if pausa:
+                time.sleep(rng.expovariate(1.0 / pausa))
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=usuario, args=(i,), daemon=True) for i in range(usuarios)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    resumen = estadisticas.resumen(time.perf_counter() - inicio)
+    resumen.update({'modo': 'cerrado', 'usuarios': usuarios})
+    return resumen
+
+
+def lazo_abierto(url: str, tasa: float, duracion: float, max_concurrencia: int,
+                 proporcion_ediciones: float, semilla: int) -> dict:
+    """Sesiones que llegan como proceso de Poisson a 'tasa' sesiones/s, se atienda o no a tiempo"""
+    estadisticas = Estadisticas()
+    rng = random.Random(semilla)
+    cliente = ClienteAPI(url, estadisticas)
+
+    inicio = time.perf_counter()
+    llegada = inicio
+    with ThreadPoolExecutor(max_workers=max_concurrencia) as pool:
+        while True:
+            llegada += rng.expovariate(tasa)
+            if llegada - inicio >= duracion:
+                break
+            espera = llegada - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+            pool.submit(_ejecutar_sesion, cliente, random.Random(rng.getrandbits(32)),
+                        proporcion_ediciones, llegada)
+
+    resumen = estadisticas.resumen(time.perf_counter() - inicio)
+    resumen.update({'modo': 'abierto', 'tasa_objetivo': tasa})
+    return resumen
+
+
+def imprimir_resumen(resumen: dict):
+    etiqueta = (f"{resumen['usuarios']} usuarios" if resumen['modo'] == 'cerrado'
+                else f"{resumen['tasa_objetivo']} sesiones/s")
+    print(f"\n📈 Lazo {resumen['modo']} - {etiqueta} - {resumen['sesiones']} sesiones "
+          f"({resumen['sesiones_fallidas']} fallidas) en {resumen['duracion_s']} s")
+    print(f"  {'endpoint':<34}{'peticiones':>10}{'errores':>9}{'req/s':>9}"
+          f"{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for endpoint, datos in resumen['endpoints'].items():
+        print(f"  {endpoint:<34}{datos['peticiones']:>10}{datos['errores']:>9}{datos['por_segundo']:>9}"
+              f"{datos['p50_ms']:>10}{datos['p90_ms']:>10}{datos['p99_ms']:>10}{datos['max_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generador de carga HTTP para la API')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--modo', choices=['cerrado', 'abierto'], default='cerrado')
+    parser.add_argument('--usuarios', default='8',
+                        help='Lazo cerrado: usuarios concurrentes (lista separada por coma para un barrido)')
+    parser.add_argument('--tasas', default='5',
+                        help='Lazo abierto: sesiones/s (lista separada por coma para un barrido)')
+    parser.add_argument('--duracion', type=float, default=30.0, help='Segundos por escalón')
+    parser.add_argument('--pausa', type=float, default=0.0, help='Pausa media entre sesiones (lazo cerrado)')
+    parser.add_argument('--max-concurrencia', type=int, default=256, help='Sesiones simultáneas (lazo abierto)')
+    parser.add_argument('--ediciones', type=float, default=0.1, help='Proporción de sesiones con ediciones')
+    parser.add_argument('--slo-p99', type=float, default=1000.0,
+                        help='p99 de sesión (ms) a partir del cual se considera saturado')
+    parser.add_argument('--max-fallos', type=float, default=0.01,
+                        help='Proporción de sesiones fallidas a partir de la cual se considera saturado')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help='Archivo JSON con los resultados')
+    args = parser.parse_args()
+
+    niveles = [float(v) for v in (args.tasas if args.modo == 'abierto' else args.usuarios).split(',')]
+    escalones = []
+    saturacion = None
+
+    for nivel in niveles:
+        if args.modo == 'abierto':
+            resumen = lazo_abierto(args.url, nivel, args.duracion, args.max_concurrencia,
+                                   args.ediciones, args.semilla)
+        else:
+            resumen = lazo_cerrado(args.url, int(nivel), args.duracion, args.pausa,
+                                   args.ediciones, args.semilla)
+        imprimir_resumen(resumen)
+        escalones.append(resumen)
+
+        p99_sesion = resumen['endpoints'].get('sesion', {}).get('p99_ms', 0.0)
+        tasa_fallos = resumen['sesiones_fallidas'] / resumen['sesiones'] if resumen['sesiones'] else 1.0
+        if saturacion is None and (p99_sesion > args.slo_p99 or tasa_fallos > args.max_fallos):
+            saturacion = nivel
+            print(f"⚠️ Saturación: p99 de sesión {p99_sesion} ms (SLO {args.slo_p99} ms), "
+                  f"{tasa_fallos:.1%} de sesiones fallidas")
+
+    if saturacion is None:
+        print("\n✅ Ningún escalón superó el SLO")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fecha': datetime.now().isoformat(),
+                'url': args.url,
+                'modo': args.modo,
+                'slo_p99_ms': args.slo_p99,
+                'saturacion': saturacion,
+                'escalones': escalones
+            }, f, indent=2, ensure_ascii=False)
+        print(f"✅ Resultados guardados en: {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Compositor de entrevistas con cuotas por nivel y mínimos por tipo
+
+Arma una entrevista completa a partir de una especificación como "por habilidad: 1
+básico, 2 intermedio, 1 avanzado, al menos una práctica" en una sola pasada: lee los
+pools por estrato (habilidad, nivel, tipo) de todas las habilidades con una consulta
+(obtener_pool_estratos), los cachea mientras no cambie la revisión del banco (como
+mucho SESIONES_TTL_POOL_S segundos) y resuelve las cuotas en memoria, en lugar de una
+consulta por estrato y el cosido en el cliente.
+
+Las cuotas por nivel son exactas; los mínimos por tipo se reparten entre los niveles
+como un flujo máximo (tipo -> nivel, con capacidad = preguntas del estrato), así que
+si existe un reparto que los cumple se encuentra. Lo que el banco no alcanza a cubrir
+se informa en 'faltantes' en vez de rellenarse con otros niveles.
+
+Especificación (JSON; las habilidades pueden redefinir niveles y tipos_minimos):
+    {
+      "niveles": {"basico": 1, "intermedio": 2, "avanzado": 1},
+      "tipos_minimos": {"practica": 1},
+      "habilidades": ["Python", "Docker"]
+    }
+    {"niveles": {"intermedio": 3}, "habilidades": {"Python": {}, "SQL": {"niveles": {"avanzado": 2}}}}
+
+Uso:
+    python compositor.py --habilidades Python,Docker --niveles basico:1,intermedio:2,avanzado:1 --tipos practica:1
+    python compositor.py --especificacion entrevista.json --json
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import DatabaseConfig
+from normalizacion import NIVELES
+from sesiones import BitmapVistas, muestrear_sin_repetir
+
+# Máximo de preguntas por habilidad que admite una especificación
+MAX_PREGUNTAS_POR_HABILIDAD = 50
+
+Estratos = Dict[Tuple[str, str], List[Tuple[int, str]]]
+
+
+def parsear_cuotas(texto: str) -> Dict[str, int]:
+    """'basico:1,intermedio:2' -> {'basico': 1, 'intermedio': 2}"""
+    cuotas = {}
+    for parte in texto.split(','):
+        if not parte.strip():
+            continue
+        nombre, _, cantidad = parte.partition(':')
+        cuotas[nombre.strip()] = int(cantidad or 1)
+    return cuotas
+
+
+def _validar_cuotas(cuotas, campo: str) -> Dict[str, int]:
+    if not isinstance(cuotas, dict):
+        raise ValueError(f"'{campo}' debe ser un objeto {{nombre: cantidad}}")
+    validadas = {}
+    for nombre, cantidad in cuotas.items():
+        if not isinstance(cantidad, int) or isinstance(cantidad, bool) or cantidad < 0:
+            raise ValueError(f"Cantidad no válida en '{campo}' para '{nombre}': {cantidad!r}")
+        if cantidad:
+            validadas[nombre] = cantidad
+    return validadas
+
+
+def preparar_especificacion(especificacion: dict) -> Dict[str, dict]:
+    """
+    {habilidad: {'niveles': {...}, 'tipos_minimos': {...}}} con los valores de la raíz
+    heredados y validados. ValueError si la especificación no se puede cumplir ni en teoría.
+    """
+    habilidades = especificacion.get('habilidades')
+    if isinstance(habilidades, str):
+        habilidades = [h.strip() for h in habilidades.split(',') if h.strip()]
+    if isinstance(habilidades, list):
+        habilidades = {habilidad: {} for habilidad in habilidades}
+    if not habilidades or not isinstance(habilidades, dict):
+        raise ValueError("La especificación no tiene habilidades")
+
+    preparadas = {}
+    for habilidad, propia in habilidades.items():
+        propia = propia or {}
+        niveles = _validar_cuotas(propia.get('niveles', especificacion.get('niveles', {})), 'niveles')
+        tipos = _validar_cuotas(propia.get('tipos_minimos', especificacion.get('tipos_minimos', {})),
+                                'tipos_minimos')
+        total = sum(niveles.values())
+        if not total:
+            raise ValueError(f"Sin cuotas por nivel para {habilidad}")
+        if total > MAX_PREGUNTAS_POR_HABILIDAD:
+            raise ValueError(f"Demasiadas preguntas para {habilidad}: {total} (máximo {MAX_PREGUNTAS_POR_HABILIDAD})")
+        if sum(tipos.values()) > total:
+            raise ValueError(f"Los mínimos por tipo de {habilidad} suman más que sus cuotas por nivel")
+        # Las preguntas salen de básico a avanzado sea cual sea el orden de la especificación
+        orden = sorted(niveles, key=lambda n: NIVELES.index(n) if n in NIVELES else len(NIVELES))
+        preparadas[habilidad] = {'niveles': {nivel: niveles[nivel] for nivel in orden}, 'tipos_minimos': tipos}
+    return preparadas
+
+
+def asignar_tipos(cuotas: Dict[str, int], minimos: Dict[str, int],
+                  disponibles: Dict[Tuple[str, str], int]) -> Tuple[Dict[Tuple[str, str], int], Dict[str, int]]:
+    """
+    Reparte los mínimos por tipo entre los niveles sin pasar las cuotas de cada nivel ni
+    las preguntas de cada estrato: flujo máximo origen -> tipo -> nivel -> destino, por
+    caminos de aumento de una unidad (los mínimos son pocos). Devuelve
+    ({(nivel, tipo): preguntas}, {tipo: las que no se pudieron cubrir}).
+    """
+    capacidad = {}
+    vecinos = {}
+
+    def arista(origen, destino, valor):
+        capacidad[(origen, destino)] = capacidad.get((origen, destino), 0) + valor
+        capacidad.setdefault((destino, origen), 0)
+        vecinos.setdefault(origen, []).append(destino)
+        vecinos.setdefault(destino, []).append(origen)
+
+    for tipo, minimo in minimos.items():
+        arista('origen', ('tipo', tipo), minimo)
+    for (nivel, tipo), cantidad in disponibles.items():
+        if tipo in minimos and nivel in cuotas and cantidad:
+            arista(('tipo', tipo), ('nivel', nivel), cantidad)
+    for nivel, cuota in cuotas.items():
+        arista(('nivel', nivel), 'destino', cuota)
+
+    def aumentar(nodo, visitados) -> bool:
+        if nodo == 'destino':
+            return True
+        visitados.add(nodo)
+        for siguiente in vecinos.get(nodo, []):
+            if siguiente not in visitados and capacidad[(nodo, siguiente)] > 0 and aumentar(siguiente, visitados):
+                capacidad[(nodo, siguiente)] -= 1
+                capacidad[(siguiente, nodo)] += 1
+                return True
+        return False
+
+    while aumentar('origen', set()):
+        pass
+
+    # El flujo por tipo -> nivel queda como capacidad de la arista inversa
+    asignacion = {(nivel, tipo): capacidad.get((('nivel', nivel), ('tipo', tipo)), 0)
+                  for (nivel, tipo) in disponibles if tipo in minimos and nivel in cuotas}
+    asignacion = {estrato: cantidad for estrato, cantidad in asignacion.items() if cantidad}
+    faltantes = {tipo: minimo - capacidad[(('tipo', tipo), 'origen')] for tipo, minimo in minimos.items()}
+    return asignacion, {tipo: falta for tipo, falta in faltantes.items() if falta}
+
+
+def componer_habilidad(estratos: Estratos, niveles: Dict[str, int], tipos_minimos: Dict[str, int],
+                       aleatorio: random.Random, vistas: BitmapVistas = None) -> dict:
+    """
+    Preguntas de una habilidad que cumplen las cuotas. Con `vistas` (sesión) se prefieren
+    las no servidas; si un estrato no tiene nuevas, se repiten y se cuentan en 'repetidas'.
+    """
+    vistas = vistas if vistas is not None else BitmapVistas()
+    disponibles = {estrato: len(pool) for estrato, pool in estratos.items()}
+    asignacion, faltan_tipos = asignar_tipos(niveles, tipos_minimos, disponibles)
+
+    preguntas, repetidas, faltan_niveles = [], 0, {}
+    for nivel, cuota in niveles.items():
+        elegidas = []
+        # Primero los estratos que cubren los mínimos por tipo...
+        for (nivel_estrato, tipo), cantidad in asignacion.items():
+            if nivel_estrato == nivel:
+                muestra, repetidas_estrato = muestrear_sin_repetir(estratos[(nivel, tipo)], cantidad,
+                                                                   vistas, aleatorio)
+                elegidas.extend((pregunta_id, pregunta, tipo) for pregunta_id, pregunta in muestra)
+                repetidas += repetidas_estrato
+
+        # ...y el resto de la cuota de cualquier tipo del nivel
+        resto = cuota - len(elegidas)
+        if resto > 0:
+            ya_elegidas = {pregunta_id for pregunta_id, _, _ in elegidas}
+            candidatas = [(pregunta_id, pregunta, tipo) for (nivel_estrato, tipo), pool in estratos.items()
+                          if nivel_estrato == nivel for pregunta_id, pregunta in pool
+                          if pregunta_id not in ya_elegidas]
+            muestra, repetidas_resto = muestrear_sin_repetir(candidatas, resto, vistas, aleatorio)
+            elegidas.extend(muestra)
+            repetidas += repetidas_resto
+
+        if len(elegidas) < cuota:
+            faltan_niveles[nivel] = cuota - len(elegidas)
+        aleatorio.shuffle(elegidas)
+        preguntas.extend({'id': pregunta_id, 'pregunta': pregunta, 'nivel': nivel, 'tipo': tipo}
+                         for pregunta_id, pregunta, tipo in elegidas)
+
+    return {
+        'preguntas': preguntas,
+        'repetidas': repetidas,
+        'faltantes': {'niveles': faltan_niveles, 'tipos': faltan_tipos}
+    }
+
+
+def componer(pools: Dict[str, Estratos], preparada: Dict[str, dict],
+             aleatorio: random.Random = None, vistas: BitmapVistas = None) -> dict:
+    """Entrevista completa a partir de los pools por estrato y la especificación preparada"""
+    aleatorio = aleatorio or random.Random()
+    habilidades = {}
+    for habilidad, cuotas in preparada.items():
+        habilidades[habilidad] = componer_habilidad(pools.get(habilidad) or {}, cuotas['niveles'],
+                                                    cuotas['tipos_minimos'], aleatorio, vistas)
+
+    total = sum(len(resultado['preguntas']) for resultado in habilidades.values())
+    return {
+        'habilidades': habilidades,
+        'total_preguntas': total,
+        'repetidas': sum(resultado['repetidas'] for resultado in habilidades.values()),
+        'completa': not any(resultado['faltantes']['niveles'] or resultado['faltantes']['tipos']
+                            for resultado in habilidades.values())
+    }
+
+
+class CompositorEntrevistas:
+    """Compositor con los pools por estrato de cada habilidad cacheados en memoria; seguro entre hilos"""
+
+    def __init__(self, db, ttl_pool_s: float = None):
+        self.db = db
+        self.ttl_pool_s = ttl_pool_s if ttl_pool_s is not None else DatabaseConfig.SESIONES_TTL_POOL_S
+        self._aleatorio = random.Random()
+        # {habilidad: (instante, estratos)}, válidos para la revisión del banco en _revision_pools
+        self._pools = {}
+        self._revision_pools = None
+        self._bloqueo = threading.Lock()
+
+    def _obtener_pools(self, habilidades: List[str]) -> Dict[str, Estratos]:
+        """Estratos de las habilidades; las que faltan o caducaron, en una sola lectura"""
+        ahora = time.monotonic()
+        revision = self.db.obtener_revision()
+        with self._bloqueo:
+            if revision != self._revision_pools:
+                self._pools.clear()
+                self._revision_pools = revision
+            vigentes = {}
+            for habilidad in habilidades:
+                entrada = self._pools.get(habilidad)
+                if entrada is not None and ahora - entrada[0] <= self.ttl_pool_s:
+                    vigentes[habilidad] = entrada[1]
+        faltantes = [habilidad for habilidad in habilidades if habilidad not in vigentes]
+        if faltantes:
+            leidos = self.db.obtener_pool_estratos(faltantes)
+            with self._bloqueo:
+                for habilidad in faltantes:
+                    vigentes[habilidad] = leidos.get(habilidad, {})
+                    self._pools[habilidad] = (ahora, vigentes[habilidad])
+        return vigentes
+
+    def componer(self, especificacion: dict, vistas: BitmapVistas = None, semilla=None) -> dict:
+        """Entrevista según la especificación (ValueError si no es válida)"""
+        preparada = preparar_especificacion(especificacion)
+        pools = self._obtener_pools(list(preparada))
+        aleatorio = random.Random(semilla) if semilla is not None else self._aleatorio
+        return componer(pools, preparada, aleatorio, vistas)
+
+    def componer_en_sesion(self, gestor_sesiones, sesion_id: str, especificacion: dict) -> Optional[dict]:
+        """Como componer, sin repetir lo ya servido en la sesión (None si no existe o caducó)"""
+        preparada = preparar_especificacion(especificacion)
+        pools = self._obtener_pools(list(preparada))
+
+        def elegir(vistas: BitmapVistas):
+            resultado = componer(pools, preparada, self._aleatorio, vistas)
+            servidas = [pregunta['id'] for habilidad in resultado['habilidades'].values()
+                        for pregunta in habilidad['preguntas']]
+            return resultado, servidas, resultado['repetidas']
+
+        return gestor_sesiones.servir(sesion_id, elegir)
+
+
+def _imprimir(resultado: dict):
+    for habilidad, datos in resultado['habilidades'].items():
+        print(f"\n🎯 {habilidad}")
+        for i, pregunta in enumerate(datos['preguntas'], 1):
+            print(f"   {i}. [{pregunta['nivel']}/{pregunta['tipo']}] {pregunta['pregunta']}")
+        faltantes = datos['faltantes']
+        if faltantes['niveles'] or faltantes['tipos']:
+            print(f"   ⚠️ Faltan: {json.dumps(faltantes, ensure_ascii=False)}")
+    estado = "✅ Entrevista completa" if resultado['completa'] else "⚠️ Entrevista incompleta"
+    print(f"\n{estado}: {resultado['total_preguntas']} preguntas")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Compone una entrevista con cuotas por nivel y tipo')
+    parser.add_argument('--especificacion', help='Archivo JSON con la especificación')
+    parser.add_argument('--habilidades', help='Habilidades separadas por comas')
+    parser.add_argument('--niveles', help='Cuotas por nivel, p. ej. basico:1,intermedio:2,avanzado:1')
+    parser.add_argument('--tipos', help='Mínimos por tipo, p. ej. practica:1')
+    parser.add_argument('--semilla', type=int)
+    parser.add_argument('--json', action='store_true', help='Imprime el resultado en JSON')
+    args = parser.parse_args(argv)
+
+    especificacion = {}
+    if args.especificacion:
+        with open(args.especificacion, 'r', encoding='utf-8') as f:
+            especificacion = json.load(f)
+    if args.habilidades:
+        especificacion['habilidades'] = args.habilidades
+    if args.niveles:
+        especificacion['niveles'] = parsear_cuotas(args.niveles)
+    if args.tipos:
+        especificacion['tipos_minimos'] = parsear_cuotas(args.tipos)
+
+    from fragmentacion import crear_gestor_bd
+
+    db = crear_gestor_bd()
+    try:
+        resultado = CompositorEntrevistas(db).componer(especificacion, semilla=args.semilla)
+    except ValueError as e:
+        print(f"❌ Especificación no válida: {e}")
+        return 1
+    finally:
+        db.cerrar_conexion()
+
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    else:
+        _imprimir(resultado)
+    return 0 if resultado['completa'] else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,32 +1,165 @@
 """
 Configuración de base de datos para el Agente Entrevistador
 Maneja tanto SQLite como PostgreSQL
+
+Las variables se leen la primera vez que se consultan: importar este módulo no toca
+el disco ni carga python-dotenv, así que no encarece el arranque de la CLI ni de los
+workers. Después quedan en caché (algunas se consultan en cada consulta a la base);
+DatabaseConfig.recargar() las vuelve a leer, p. ej. en tests que cambian el entorno.
 """
 
 import os
-from dotenv import load_dotenv
 
-# Cargar variables de entorno
-load_dotenv()
+_ENTORNO_CARGADO = False
+
+# Descriptores con valor en caché, para recargar()
+_CACHEADAS = []
+_SIN_LEER = object()
+
+
+def cargar_entorno():
+    """Carga el archivo .env una sola vez, la primera vez que se consulta la configuración"""
+    global _ENTORNO_CARGADO
+    if _ENTORNO_CARGADO:
+        return
+    _ENTORNO_CARGADO = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+class _Cacheada:
+    """Descriptor que calcula su valor en el primer acceso y lo guarda hasta recargar()"""
+
+    def __init__(self):
+        self._valor = _SIN_LEER
+        _CACHEADAS.append(self)
+
+    def __get__(self, instancia, propietario):
+        if self._valor is _SIN_LEER:
+            cargar_entorno()
+            self._valor = self.leer(propietario)
+        return self._valor
+
+    def leer(self, propietario):
+        raise NotImplementedError
+
+    def olvidar(self):
+        self._valor = _SIN_LEER
+
+
+class _Variable(_Cacheada):
+    """Variable de entorno con valor por defecto y conversión"""
+
+    def __init__(self, nombre: str, defecto: str = None, convertir=None):
+        super().__init__()
+        self.nombre = nombre
+        self.defecto = defecto
+        self.convertir = convertir
+
+    def leer(self, propietario):
+        valor = os.getenv(self.nombre, self.defecto)
+        if valor is None or self.convertir is None:
+            return valor
+        return self.convertir(valor)
+
+
+class _ConfigPostgres(_Cacheada):
+    """Parámetros de conexión de PostgreSQL"""
+
+    def leer(self, propietario):
+        return {
+            'host': os.getenv('POSTGRES_HOST', 'localhost'),
+            'port': os.getenv('POSTGRES_PORT', '5432'),
+            'database': os.getenv('POSTGRES_DB', 'preguntas_entrevista'),
+            'user': os.getenv('POSTGRES_USER', 'postgres'),
+            'password': os.getenv('POSTGRES_PASSWORD', 'password'),
+        }
+
+
+class _ReplicasPostgres(_Cacheada):
+    """
+    Réplicas de lectura: POSTGRES_REPLICAS=host[:puerto],host[:puerto],...
+    Comparten base, usuario y contraseña con la primaria.
+    """
+
+    def leer(self, propietario):
+        base = propietario.POSTGRES_CONFIG
+        replicas = []
+        for entrada in os.getenv('POSTGRES_REPLICAS', '').split(','):
+            entrada = entrada.strip()
+            if not entrada:
+                continue
+            host, _, puerto = entrada.partition(':')
+            replicas.append(dict(base, host=host, port=puerto or base['port']))
+        return replicas
+
+
+def _booleano(valor: str) -> bool:
+    return valor.lower() == 'true'
 
 
 class DatabaseConfig:
     """Configuración de base de datos"""
 
     # Tipo de base de datos: 'sqlite' o 'postgresql'
-    DATABASE_TYPE = os.getenv('DATABASE_TYPE', 'sqlite')
+    DATABASE_TYPE = _Variable('DATABASE_TYPE', 'sqlite')
 
     # Configuración SQLite (modo legacy)
-    SQLITE_PATH = os.getenv('SQLITE_PATH', 'preguntas_entrevista.db')
+    SQLITE_PATH = _Variable('SQLITE_PATH', 'preguntas_entrevista.db')
+
+    # Archivo de preguntas iniciales (NDJSON, opcionalmente .gz); por defecto src/datos/
+    DATOS_INICIALES_PATH = _Variable('DATOS_INICIALES_PATH')
+
+    # Caché en disco del índice de preguntas similares (por defecto junto a la BD)
+    SIMILITUD_CACHE_PATH = _Variable('SIMILITUD_CACHE_PATH')
+
+    # Instrumentación de consultas: umbral del log de consultas lentas (ms),
+    # captura de EXPLAIN y archivo opcional del log (por defecto va a stderr)
+    INSTRUMENTACION_ACTIVA = _Variable('INSTRUMENTACION_ACTIVA', 'true', _booleano)
+    SLOW_QUERY_MS = _Variable('SLOW_QUERY_MS', '200', float)
+    SLOW_QUERY_EXPLAIN = _Variable('SLOW_QUERY_EXPLAIN', 'true', _booleano)
+    SLOW_QUERY_LOG_PATH = _Variable('SLOW_QUERY_LOG_PATH')
+
+    # Directorio compartido donde cada proceso worker vuelca sus métricas
+    # para que /api/metrics las agregue (sin definir: solo el proceso actual)
+    METRICAS_DIR = _Variable('METRICAS_DIR')
+
+    # Sesiones de entrevista (ver sesiones.py): archivo SQLite del almacén, caducidad
+    # por inactividad (s) y vigencia de los pools de preguntas cacheados (s)
+    SESIONES_PATH = _Variable('SESIONES_PATH', 'sesiones.db')
+    SESIONES_TTL_S = _Variable('SESIONES_TTL_S', str(30 * 24 * 3600), float)
+    SESIONES_TTL_POOL_S = _Variable('SESIONES_TTL_POOL_S', '60', float)
+
+    # Banco SQLite repartido por habilidad en N archivos (ver fragmentacion.py)
+    FRAGMENTOS_SQLITE = _Variable('FRAGMENTOS_SQLITE', '1', int)
+
+    # Snapshot del catálogo (ver snapshot_catalogo.py): con CATALOGO_SOLO_LECTURA=true
+    # la app y la CLI leen del archivo con mmap y no abren la base
+    SNAPSHOT_CATALOGO_PATH = _Variable('SNAPSHOT_CATALOGO_PATH')
+    CATALOGO_SOLO_LECTURA = _Variable('CATALOGO_SOLO_LECTURA', 'false', _booleano)
 
     # Configuración PostgreSQL
-    POSTGRES_CONFIG = {
-        'host': os.getenv('POSTGRES_HOST', 'localhost'),
-        'port': os.getenv('POSTGRES_PORT', '5432'),
-        'database': os.getenv('POSTGRES_DB', 'preguntas_entrevista'),
-        'user': os.getenv('POSTGRES_USER', 'postgres'),
-        'password': os.getenv('POSTGRES_PASSWORD', 'password'),
-    }
+    POSTGRES_CONFIG = _ConfigPostgres()
+
+    # Réplicas de lectura (solo PostgreSQL): selección 'latencia' o 'round_robin',
+    # segundos que las lecturas de un cliente siguen yendo a la primaria tras una
+    # escritura suya, segundos que se descarta una réplica caída, retraso de
+    # replicación máximo admitido (s) y timeout de conexión (s, entero)
+    POSTGRES_REPLICAS = _ReplicasPostgres()
+    REPLICA_ESTRATEGIA = _Variable('REPLICA_ESTRATEGIA', 'latencia')
+    REPLICA_VENTANA_ESCRITURA_S = _Variable('REPLICA_VENTANA_ESCRITURA_S', '5', float)
+    REPLICA_ENFRIAMIENTO_S = _Variable('REPLICA_ENFRIAMIENTO_S', '30', float)
+    REPLICA_RETRASO_MAXIMO_S = _Variable('REPLICA_RETRASO_MAXIMO_S', '10', float)
+    REPLICA_TIMEOUT_CONEXION_S = _Variable('REPLICA_TIMEOUT_CONEXION_S', '2', int)
+
+    @classmethod
+    def recargar(cls):
+        """Olvida los valores leídos: el próximo acceso vuelve a leer el entorno"""
+        for variable in _CACHEADAS:
+            variable.olvidar()
 
     @classmethod
     def get_postgres_connection_string(cls):
@@ -47,4 +180,4 @@ class DatabaseConfig:
     @classmethod
     def is_sqlite(cls):
         """Verifica si se usa SQLite"""
-        return cls.DATABASE_TYPE.lower() == 'sqlite'
\ No newline at end of file
+        return cls.DATABASE_TYPE.lower() == 'sqlite'
@@ -1,316 +1,145 @@
 """
 Cargador de Datos Iniciales para Preguntas de Entrevista
-Contiene todas las preguntas predefinidas y métodos para cargarlas
+Lee las preguntas predefinidas de src/datos/preguntas_iniciales.ndjson y las carga
 Compatible con SQLite y PostgreSQL
 """
 
 from database_manager import DatabaseManager
+from fragmentacion import crear_gestor_bd
+from config import DatabaseConfig
+from normalizacion import normalizar_texto
+import gzip
+import hashlib
+import json
 import os
 from datetime import datetime
+from typing import Iterator, Tuple
+
+# Datos iniciales versionados: una línea de cabecera {"version": N} y luego una pregunta por línea
+RUTA_DATOS_INICIALES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    'datos', 'preguntas_iniciales.ndjson')
+
+# Claves de la tabla metadatos con el contenido cargado por última vez
+CLAVE_HASH_DATOS = 'hash_datos_iniciales'
+CLAVE_VERSION_DATOS = 'version_datos_iniciales'
+
+# Preguntas por bloque al cargar los datos iniciales
+TAMANO_LOTE_CARGA = 1000
 
 
 class DataLoader:
-    def __init__(self):
-        self.preguntas_iniciales = self.get_preguntas_iniciales()
+    def __init__(self, ruta_datos: str = None):
+        """
+        ruta_datos: archivo NDJSON (o .ndjson.gz) con las preguntas iniciales.
+        No lee nada al instanciarse: el archivo se recorre solo cuando hace falta.
+        """
+        self.ruta_datos = ruta_datos or DatabaseConfig.DATOS_INICIALES_PATH or RUTA_DATOS_INICIALES
+        self._preguntas_iniciales = None
+
+    def _abrir_datos(self):
+        abrir = gzip.open if self.ruta_datos.endswith('.gz') else open
+        return abrir(self.ruta_datos, 'rt', encoding='utf-8')
+
+    def _leer_registros(self) -> Iterator[dict]:
+        """Recorre el archivo de datos línea a línea, sin cargarlo entero en memoria"""
+        with self._abrir_datos() as f:
+            for linea in f:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                registro = json.loads(linea)
+                if 'pregunta' in registro:
+                    yield registro
+
+    def version_datos(self) -> int:
+        """Versión declarada en la cabecera del archivo de datos"""
+        with self._abrir_datos() as f:
+            return json.loads(f.readline()).get('version', 0)
+
+    def hash_contenido(self) -> str:
+        """
+        sha256 de los datos iniciales en forma canónica (habilidad -> nivel -> preguntas,
+        claves ordenadas): da lo mismo con el dict materializado que leyendo el archivo,
+        que se recorre sin guardarlo. Cambiar el formato del archivo no fuerza una recarga
+        """
+        preguntas = self._preguntas_iniciales
+        if preguntas is None:
+            preguntas = self.get_preguntas_iniciales()
+        canonico = json.dumps(preguntas, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+    def iterar_preguntas(self) -> Iterator[Tuple[str, str, str, str, str]]:
+        """(habilidad, pregunta, tipo, nivel, categoria) de cada pregunta inicial, en streaming"""
+        if self._preguntas_iniciales is not None:
+            # Datos ya materializados (y quizá ampliados con agregar/importar)
+            for habilidad, niveles in self._preguntas_iniciales.items():
+                for nivel, preguntas in niveles.items():
+                    for pregunta in preguntas:
+                        tipo = "conceptual" if "concepto" in pregunta.lower() else "practica"
+                        yield habilidad, pregunta, tipo, nivel, "tecnica"
+            return
+
+        for registro in self._leer_registros():
+            yield (registro['habilidad'], registro['pregunta'], registro.get('tipo', 'practica'),
+                   registro['nivel'], registro.get('categoria', 'tecnica'))
+
+    @property
+    def preguntas_iniciales(self) -> dict:
+        """Diccionario habilidad -> nivel -> preguntas, construido la primera vez que se usa"""
+        if self._preguntas_iniciales is None:
+            self._preguntas_iniciales = self.get_preguntas_iniciales()
+        return self._preguntas_iniciales
 
     def get_preguntas_iniciales(self) -> dict:
         """Retorna diccionario con todas las preguntas iniciales organizadas por habilidad"""
-        return {
-            "Python": {
-                "basico": [
-                    "¿Cuáles son los tipos de datos básicos en Python?",
-                    "¿Qué es una lista en Python y cómo se diferencia de una tupla?",
-                    "¿Cómo se manejan las cadenas de texto en Python?",
-                    "¿Qué son las funciones lambda en Python?"
-                ],
-                "intermedio": [
-                    "¿Cuáles son las diferencias entre listas y tuplas en Python?",
-                    "Explica el concepto de decoradores en Python y da un ejemplo",
-                    "¿Cómo manejas las excepciones en Python?",
-                    "¿Qué son los generadores y cuándo los usarías?",
-                    "Describe la diferencia entre métodos de clase y métodos estáticos"
-                ],
-                "avanzado": [
-                    "¿Cómo funciona el GIL (Global Interpreter Lock) en Python?",
-                    "Explica el concepto de metaclases en Python",
-                    "¿Qué son los context managers y cómo implementarías uno?",
-                    "¿Cómo optimizarías el rendimiento de una aplicación Python?"
-                ]
-            },
-
-            "JavaScript": {
-                "basico": [
-                    "¿Cuáles son los tipos de datos primitivos en JavaScript?",
-                    "¿Qué es una función en JavaScript?",
-                    "¿Cómo funcionan los arrays en JavaScript?",
-                    "¿Qué es el DOM y cómo interactúas con él?"
-                ],
-                "intermedio": [
-                    "¿Cuál es la diferencia entre var, let y const?",
-                    "Explica el concepto de closures en JavaScript",
-                    "¿Cómo funciona el hoisting en JavaScript?",
-                    "¿Qué es el Event Loop y cómo funciona?",
-                    "Describe las diferencias entre == y === en JavaScript"
-                ],
-                "avanzado": [
-                    "¿Cómo implementarías el patrón Observer en JavaScript?",
-                    "Explica el concepto de currying y sus ventajas",
-                    "¿Qué son los Web Workers y cuándo los usarías?",
-                    "¿Cómo manejas la programación asíncrona con async/await?"
-                ]
-            },
-
-            "React": {
-                "basico": [
-                    "¿Qué es React y cuáles son sus características principales?",
-                    "¿Qué es JSX y por qué se usa en React?",
-                    "¿Cómo creas un componente simple en React?",
-                    "¿Qué son las props en React?"
-                ],
-                "intermedio": [
-                    "¿Cuál es la diferencia entre componentes funcionales y de clase?",
-                    "Explica cómo funciona el Virtual DOM",
-                    "¿Qué son los Hooks y cuáles son los más comunes?",
-                    "¿Cómo manejas el estado en una aplicación React compleja?",
-                    "Explica el ciclo de vida de un componente React"
-                ],
-                "avanzado": [
-                    "¿Cómo implementarías un Hook personalizado?",
-                    "¿Qué es React Suspense y cómo se usa?",
-                    "¿Cómo optimizarías el rendimiento de una aplicación React?",
-                    "Explica el patrón de render props en React"
-                ]
-            },
-
-            "SQL": {
-                "basico": [
-                    "¿Qué es SQL y para qué se utiliza?",
-                    "¿Cuáles son los comandos básicos de SQL?",
-                    "¿Qué es una tabla en una base de datos relacional?",
-                    "¿Cómo realizas consultas básicas con SELECT?"
-                ],
-                "intermedio": [
-                    "¿Cuál es la diferencia entre INNER JOIN y LEFT JOIN?",
-                    "¿Qué son las transacciones y cuáles son sus propiedades ACID?",
-                    "Explica la diferencia entre índices clustered y non-clustered",
-                    "¿Cómo optimizarías una consulta SQL lenta?",
-                    "¿Qué es la normalización de bases de datos?"
-                ],
-                "avanzado": [
-                    "¿Cómo implementarías procedimientos almacenados complejos?",
-                    "¿Qué son las funciones de ventana (window functions) en SQL?",
-                    "¿Cómo manejas la concurrencia en bases de datos?",
-                    "Explica las estrategias de particionamiento de tablas"
-                ]
-            },
-
-            "Java": {
-                "basico": [
-                    "¿Qué es Java y cuáles son sus características principales?",
-                    "¿Cuál es la diferencia entre JDK, JRE y JVM?",
-                    "¿Qué son las clases y objetos en Java?",
-                    "¿Cómo funciona la herencia en Java?"
-                ],
-                "intermedio": [
-                    "¿Cuál es la diferencia entre abstract class e interface?",
-                    "Explica el concepto de polimorfismo en Java",
-                    "¿Qué son las Collections y cuáles son las más importantes?",
-                    "¿Cómo funciona el Garbage Collector en Java?",
-                    "Explica la diferencia entre String, StringBuilder y StringBuffer"
-                ],
-                "avanzado": [
-                    "¿Cómo implementarías un patrón Singleton thread-safe?",
-                    "¿Qué son las anotaciones en Java y cómo crearías una personalizada?",
-                    "¿Cómo funciona la programación concurrente con ExecutorService?",
-                    "Explica el concepto de generics y wildcards en Java"
-                ]
-            },
-
-            "Docker": {
-                "basico": [
-                    "¿Qué es Docker y qué problema resuelve?",
-                    "¿Cuál es la diferencia entre virtualización y containerización?",
-                    "¿Qué son los contenedores Docker?",
-                    "¿Cómo ejecutas tu primer contenedor Docker?"
-                ],
-                "intermedio": [
-                    "¿Cuál es la diferencia entre una imagen y un contenedor?",
-                    "¿Qué es un Dockerfile y cuáles son sus principales instrucciones?",
-                    "Explica qué son los volumes en Docker",
-                    "¿Cómo manejas las variables de entorno en Docker?",
-                    "¿Qué es Docker Compose y cuándo lo usarías?"
-                ],
-                "avanzado": [
-                    "¿Cómo implementarías una estrategia de multi-stage builds?",
-                    "¿Cómo optimizarías el tamaño de las imágenes Docker?",
-                    "¿Qué son los health checks y cómo los implementas?",
-                    "¿Cómo manejas secretos en Docker de forma segura?"
-                ]
-            },
-
-            "Git": {
-                "basico": [
-                    "¿Qué es Git y para qué se utiliza?",
-                    "¿Cuáles son los comandos básicos de Git?",
-                    "¿Qué es un repositorio Git?",
-                    "¿Cómo haces tu primer commit?"
-                ],
-                "intermedio": [
-                    "¿Cuál es la diferencia entre merge y rebase?",
-                    "¿Cómo resuelves conflictos en Git?",
-                    "Explica qué son las ramas (branches) y cómo las usas",
-                    "¿Qué comandos usas para deshacer cambios en Git?",
-                    "¿Cómo manejas un repositorio con múltiples colaboradores?"
-                ],
-                "avanzado": [
-                    "¿Cuándo y cómo usarías git cherry-pick?",
-                    "¿Qué es git bisect y cómo lo usarías para debugging?",
-                    "¿Cómo implementarías una estrategia de branching como GitFlow?",
-                    "¿Cómo manejas releases y tags en proyectos grandes?"
-                ]
-            },
-
-            "Node.js": {
-                "basico": [
-                    "¿Qué es Node.js y cuáles son sus características?",
-                    "¿Cuál es la diferencia entre Node.js y JavaScript del navegador?",
-                    "¿Qué es npm y cómo lo usas?",
-                    "¿Cómo creas un servidor HTTP básico en Node.js?"
-                ],
-                "intermedio": [
-                    "¿Qué es el Event Loop en Node.js?",
-                    "¿Cuál es la diferencia entre require() e import?",
-                    "Explica qué son los middlewares en Express",
-                    "¿Cómo manejas operaciones asíncronas en Node.js?",
-                    "¿Cómo gestionas las dependencias con package.json?"
-                ],
-                "avanzado": [
-                    "¿Cómo implementarías clustering en Node.js?",
-                    "¿Qué son los streams en Node.js y cómo los usas?",
-                    "¿Cómo manejas el debugging y profiling en aplicaciones Node.js?",
-                    "¿Qué estrategias usas para el manejo de errores en aplicaciones Node.js?"
-                ]
-            },
-
-            "Angular": {
-                "basico": [
-                    "¿Qué es Angular y cuáles son sus características principales?",
-                    "¿Qué es TypeScript y por qué Angular lo usa?",
-                    "¿Cómo creas un componente en Angular?",
-                    "¿Qué son los servicios en Angular?"
-                ],
-                "intermedio": [
-                    "¿Cómo funciona la inyección de dependencias en Angular?",
-                    "¿Qué son los observables y cómo se usan en Angular?",
-                    "¿Cómo implementas routing en una aplicación Angular?",
-                    "¿Qué son las directivas y cómo creas una personalizada?",
-                    "¿Cómo manejas formularios reactivos en Angular?"
-                ],
-                "avanzado": [
-                    "¿Cómo implementas lazy loading en Angular?",
-                    "¿Qué son los guards y cuándo los usarías?",
-                    "¿Cómo optimizas el rendimiento de una aplicación Angular?",
-                    "¿Cómo implementas testing unitario e integración en Angular?"
-                ]
-            },
-
-            "AWS": {
-                "basico": [
-                    "¿Qué es AWS y cuáles son sus servicios principales?",
-                    "¿Qué es EC2 y para qué se utiliza?",
-                    "¿Qué es S3 y cuáles son sus casos de uso?",
-                    "¿Qué son las regiones y zonas de disponibilidad en AWS?"
-                ],
-                "intermedio": [
-                    "¿Cuál es la diferencia entre ELB y Auto Scaling?",
-                    "¿Qué es Lambda y cuándo usarías funciones serverless?",
-                    "¿Cómo implementas una VPC en AWS?",
-                    "¿Qué es RDS y cómo configurarías una base de datos?",
-                    "¿Cómo manejas la seguridad con IAM en AWS?"
-                ],
-                "avanzado": [
-                    "¿Cómo diseñarías una arquitectura de microservicios en AWS?",
-                    "¿Cómo implementas CI/CD con AWS CodePipeline?",
-                    "¿Qué estrategias usas para optimizar costos en AWS?",
-                    "¿Cómo implementas monitoring y logging con CloudWatch?"
-                ]
-            },
-
-            "CSS": {
-                "basico": [
-                    "¿Qué es CSS y para qué se utiliza?",
-                    "¿Cuáles son los selectores básicos de CSS?",
-                    "¿Qué es el modelo de caja (box model) en CSS?",
-                    "¿Cómo aplicas estilos en línea, internos y externos?"
-                ],
-                "intermedio": [
-                    "¿Cuál es la diferencia entre margin y padding?",
-                    "¿Qué son los pseudo-elementos y pseudo-clases?",
-                    "¿Cómo funciona el sistema de layout con Flexbox?",
-                    "¿Qué es CSS Grid y cuándo lo usarías?",
-                    "¿Cómo manejas la responsividad con media queries?"
-                ],
-                "avanzado": [
-                    "¿Cómo implementas animaciones complejas con CSS?",
-                    "¿Qué son las variables CSS y cómo las usas?",
-                    "¿Cómo optimizas el rendimiento de CSS en aplicaciones grandes?",
-                    "¿Qué metodologías usas para organizar CSS (BEM, SMACSS)?"
-                ]
-            },
-
-            "MongoDB": {
-                "basico": [
-                    "¿Qué es MongoDB y cuáles son sus características?",
-                    "¿Cuál es la diferencia entre bases de datos relacionales y NoSQL?",
-                    "¿Qué son los documentos y colecciones en MongoDB?",
-                    "¿Cómo insertas y consultas documentos básicos?"
-                ],
-                "intermedio": [
-                    "¿Cómo realizas consultas complejas con agregaciones?",
-                    "¿Qué son los índices en MongoDB y cómo los creas?",
-                    "¿Cómo manejas las relaciones entre documentos?",
-                    "¿Qué es el sharding y cuándo lo implementarías?",
-                    "¿Cómo realizas operaciones de actualización complejas?"
-                ],
-                "avanzado": [
-                    "¿Cómo implementas replicación en MongoDB?",
-                    "¿Qué estrategias usas para optimizar consultas?",
-                    "¿Cómo manejas transacciones en MongoDB?",
-                    "¿Cómo implementas seguridad y autenticación en MongoDB?"
-                ]
-            }
-        }
+        preguntas = {}
+        for registro in self._leer_registros():
+            niveles = preguntas.setdefault(registro['habilidad'], {})
+            niveles.setdefault(registro['nivel'], []).append(registro['pregunta'])
+        return preguntas
 
     def cargar_datos_iniciales(self, db_manager: DatabaseManager, forzar_recarga: bool = False) -> bool:
-        """Carga las preguntas iniciales en la base de datos"""
+        """
+        Carga las preguntas iniciales en la base de datos.
+        Si la base ya tiene preguntas y el hash de los datos coincide con el guardado,
+        no hace nada; si los datos cambiaron, solo inserta las preguntas nuevas.
+        """
+        if db_manager.db_type == 'snapshot':
+            # El catálogo de solo lectura se publica ya cargado desde la base
+            return True
+
         try:
-            # Verificar si ya hay datos
-            if db_manager.contar_preguntas() > 0 and not forzar_recarga:
-                print("Base de datos ya contiene preguntas")
-                return True
+            hash_actual = self.hash_contenido()
+            hay_preguntas = db_manager.contar_preguntas() > 0
+
+            if hay_preguntas and not forzar_recarga:
+                if db_manager.obtener_metadato(CLAVE_HASH_DATOS) == hash_actual:
+                    print("Base de datos ya contiene preguntas (datos iniciales sin cambios)")
+                    return True
+                print("Datos iniciales modificados: cargando solo preguntas nuevas...")
 
             if forzar_recarga:
                 print("Forzando recarga de datos...")
                 db_manager.limpiar_base_datos()
+                hay_preguntas = False
 
             print("Cargando preguntas iniciales en la base de datos...")
-            total_cargadas = 0
-
-            for habilidad, niveles in self.preguntas_iniciales.items():
-                print(f"  Cargando {habilidad}...")
-
-                for nivel, preguntas in niveles.items():
-                    for pregunta in preguntas:
-                        if db_manager.agregar_pregunta(
-                                habilidad=habilidad,
-                                pregunta=pregunta,
-                                tipo="conceptual" if "concepto" in pregunta.lower() else "practica",
-                                nivel=nivel,
-                                categoria="tecnica"
-                        ):
-                            total_cargadas += 1
+            filas = self.iterar_preguntas()
+            if hay_preguntas:
+                filas = self._solo_nuevas(db_manager, filas)
 
-                print(f"  {habilidad}: {sum(len(p) for p in niveles.values())} preguntas")
+            total_cargadas = 0
+            bloque = []
+            for fila in filas:
+                bloque.append(fila)
+                if len(bloque) >= TAMANO_LOTE_CARGA:
+                    total_cargadas += db_manager.agregar_preguntas_lote(bloque)
+                    bloque = []
+            if bloque:
+                total_cargadas += db_manager.agregar_preguntas_lote(bloque)
+
+            db_manager.guardar_metadato(CLAVE_HASH_DATOS, hash_actual)
+            db_manager.guardar_metadato(CLAVE_VERSION_DATOS, str(self.version_datos()))
 
             print(f"Carga completada: {total_cargadas} preguntas cargadas")
             return True
@@ -319,6 +148,14 @@ class DataLoader:
             print(f"Error cargando datos iniciales: {e}")
             return False
 
+    def _solo_nuevas(self, db_manager: DatabaseManager, filas) -> Iterator[Tuple[str, str, str, str, str]]:
+        """Descarta las preguntas que ya están en la base (comparando texto normalizado)"""
+        filas = list(filas)
+        existentes = db_manager.obtener_claves_preguntas(sorted({fila[0] for fila in filas}))
+        for fila in filas:
+            if (normalizar_texto(fila[0]), normalizar_texto(fila[1])) not in existentes:
+                yield fila
+
     def generar_archivo_sql(self, archivo_salida: str = "preguntas_iniciales.sql") -> bool:
         """Genera un archivo SQL con todas las preguntas iniciales"""
         try:
@@ -418,8 +255,6 @@ CREATE INDEX IF NOT EXISTS idx_tipo_nivel ON preguntas(tipo, nivel);
     def exportar_preguntas_json(self, archivo_salida: str = "preguntas_backup.json") -> bool:
         """Exporta todas las preguntas a formato JSON"""
         try:
-            import json
-
             data = {
                 "metadata": {
                     "generado": datetime.now().isoformat(),
@@ -444,8 +279,6 @@ CREATE INDEX IF NOT EXISTS idx_tipo_nivel ON preguntas(tipo, nivel);
     def importar_preguntas_json(self, archivo_entrada: str) -> bool:
         """Importa preguntas desde un archivo JSON"""
         try:
-            import json
-
             if not os.path.exists(archivo_entrada):
                 print(f"Archivo no encontrado: {archivo_entrada}")
                 return False
@@ -533,7 +366,7 @@ def inicializar_base_datos_completa(db_path: str = "preguntas_entrevista.db", fo
         print("Inicializando base de datos completa...")
 
         # Crear gestor de BD
-        db_manager = DatabaseManager(db_path)
+        db_manager = crear_gestor_bd(db_path)
 
         # Crear cargador de datos
         data_loader = DataLoader()
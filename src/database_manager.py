@@ -3,178 +3,773 @@ Gestor de Base de Datos para Preguntas de Entrevista
 Maneja operaciones tanto en SQLite como PostgreSQL de forma desacoplada
 """
 
+import heapq
+import io
 import sqlite3
 import os
-from typing import List, Optional, Tuple
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 from config import DatabaseConfig
+from normalizacion import normalizar_texto
+from busqueda_difusa import IndiceTrigramas, UMBRAL_SIMILITUD_DEFECTO, extraer_palabras
+from duplicados import (NUMPY_DISPONIBLE, UMBRAL_DUPLICADO, UnionFind, cubetas_lsh,
+                        deserializar_firma, firma_minhash, serializar_firma, similitud_estimada)
+import instrumentacion
+from instrumentacion import ConexionInstrumentada, registro_consultas
+import metricas as modulo_metricas
+from metricas import metricas
+from migraciones import EjecutorMigraciones, ultima_version
+from replicas import SQL_RETRASO_REPLICA, SelectorReplicas
+
+if TYPE_CHECKING:
+    from similitud import IndiceSimilitud
+
+# psycopg2 y el índice TF-IDF (numpy) se importan la primera vez que se usan,
+# para que la CLI y los workers arranquen sin pagar drivers que no necesitan
+psycopg2 = None
+
+
+def _cargar_psycopg2() -> bool:
+    """Importa psycopg2 al crear el primer gestor PostgreSQL del proceso"""
+    global psycopg2
+    if psycopg2 is None:
+        try:
+            import psycopg2 as modulo
+        except ImportError:
+            print("❌ psycopg2 no instalado. Instala con: pip install psycopg2-binary")
+            return False
+        psycopg2 = modulo
+    return True
+
+
+# Escrituras acumuladas antes de volver a guardar el índice de similitud en disco
+CAMBIOS_ANTES_DE_GUARDAR = 50
+
+# Filas por executemany en las cargas masivas
+TAMANO_LOTE = 5000
+
+# Parámetros por consulta en SQLite (el límite histórico de la biblioteca es 999)
+MAX_PARAMETROS_SQLITE = 900
+
+# Por encima de esta fracción del banco, buscar_preguntas recorre la tabla en vez de
+# confirmar candidatos del índice de trigramas (el recorrido ordenado para en `limit`)
+FRACCION_MAXIMA_CANDIDATOS = 0.1
+
+# Valor de la columna fuente para las preguntas del banco estático
+FUENTE_BANCO = 'banco'
+
+# Clave de metadatos con la revisión del banco: sube con cada escritura de preguntas
+CLAVE_REVISION = 'revision_preguntas'
+
+
 
-# Importar psycopg2 solo si se usa PostgreSQL
-if DatabaseConfig.is_postgresql():
-    try:
-        import psycopg2
-        from psycopg2.extras import DictCursor
-        from psycopg2 import sql
-        POSTGRES_AVAILABLE = True
-    except ImportError:
-        print("❌ psycopg2 no instalado. Instala con: pip install psycopg2-binary")
-        POSTGRES_AVAILABLE = False
-else:
-    POSTGRES_AVAILABLE = False
+def _escapar_copy(valor) -> str:
+    """Valor en formato de texto de COPY (barras, tabuladores y saltos escapados)"""
+    if valor is None:
+        return '\\N'
+    return (str(valor).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
 
 
 class DatabaseManager:
+    # Bases cuyo esquema ya se verificó en este proceso (ver _clave_esquema)
+    _esquemas_verificados = set()
+
     def __init__(self, db_name: str = None):
         """
         Inicializa el gestor de base de datos
         db_name: nombre del archivo SQLite (ignorado si se usa PostgreSQL)
         """
         self.db_type = DatabaseConfig.DATABASE_TYPE.lower()
+        instrumentacion.configurar_desde_entorno()
+        modulo_metricas.configurar_desde_entorno()
 
         if self.db_type == 'postgresql':
-            if not POSTGRES_AVAILABLE:
+            if not _cargar_psycopg2():
                 raise Exception("PostgreSQL configurado pero psycopg2 no disponible")
             self.connection_params = DatabaseConfig.get_postgres_connection_params()
             print(f"🗄️ Configurado para PostgreSQL: {self.connection_params['host']}:{self.connection_params['port']}")
+
+            # Réplicas de lectura: los métodos de solo lectura piden get_connection(lectura=True)
+            self.selector_replicas = SelectorReplicas(
+                DatabaseConfig.POSTGRES_REPLICAS,
+                estrategia=DatabaseConfig.REPLICA_ESTRATEGIA,
+                ventana_escritura_s=DatabaseConfig.REPLICA_VENTANA_ESCRITURA_S,
+                enfriamiento_s=DatabaseConfig.REPLICA_ENFRIAMIENTO_S,
+                retraso_maximo_s=DatabaseConfig.REPLICA_RETRASO_MAXIMO_S
+            )
+            if self.selector_replicas.replicas:
+                nombres = ', '.join(SelectorReplicas.nombre(r) for r in self.selector_replicas.replicas)
+                print(f"📚 Réplicas de lectura: {nombres}")
         else:
             # Modo SQLite (legacy)
             self.db_name = db_name or DatabaseConfig.SQLITE_PATH
+            self.selector_replicas = None
             print(f"🗄️ Configurado para SQLite: {self.db_name}")
 
+        # Índice de trigramas en memoria (solo SQLite; PostgreSQL usa pg_trgm)
+        self._indice_trigramas = None
+        self._firma_indice_trigramas = None
+
+        # Índice TF-IDF de preguntas similares (cacheado en disco)
+        self._indice_similitud = None
+
         self.init_database()
 
-    def get_connection(self):
-        """Obtiene conexión según el tipo de base de datos"""
+    def get_connection(self, lectura: bool = False):
+        """
+        Obtiene conexión según el tipo de base de datos (instrumentada si está activo).
+        lectura=True permite servir la consulta desde una réplica de PostgreSQL.
+        """
+        inicio = time.perf_counter()
+        replica = None
         if self.db_type == 'postgresql':
-            return psycopg2.connect(**self.connection_params)
+            conn, replica = self._conectar_postgresql(lectura)
         else:
-            return sqlite3.connect(self.db_name)
-
-    def init_database(self):
-        """Inicializa la base de datos y crea las tablas necesarias"""
+            conn = sqlite3.connect(self.db_name)
+
+        if not DatabaseConfig.INSTRUMENTACION_ACTIVA:
+            return conn
+        registro_consultas.registrar_adquisicion(time.perf_counter() - inicio)
+        # La latencia de una réplica es la de las consultas que sirve, medida por el cursor
+        al_medir = None
+        if replica is not None:
+            selector = self.selector_replicas
+            al_medir = lambda duracion: selector.registrar_latencia(replica, duracion)
+        return ConexionInstrumentada(conn, registro_consultas, self.db_type, al_medir=al_medir)
+
+    def _conectar_postgresql(self, lectura: bool):
+        """
+        (conexión, índice de la réplica o None): la réplica elegida por el selector si la
+        hay; ante un fallo o un retraso de replicación excesivo, la primaria
+        """
+        indice = self.selector_replicas.elegir() if lectura and self.selector_replicas else None
+
+        if indice is not None:
+            params = self.selector_replicas.replicas[indice]
+            nombre = SelectorReplicas.nombre(params)
+            inicio = time.perf_counter()
+            try:
+                conn = psycopg2.connect(**params, connect_timeout=DatabaseConfig.REPLICA_TIMEOUT_CONEXION_S)
+                if not DatabaseConfig.INSTRUMENTACION_ACTIVA:
+                    # Sin cursor instrumentado, el tiempo de conexión es la única medida
+                    self.selector_replicas.registrar_latencia(indice, time.perf_counter() - inicio)
+                if self._replica_al_dia(conn, indice, nombre):
+                    metricas.incrementar('preguntas_db_lecturas_total', destino=nombre)
+                    return conn, indice
+                conn.close()
+            except psycopg2.OperationalError as e:
+                self.selector_replicas.marcar_caida(indice)
+                metricas.incrementar('preguntas_db_replica_fallos_total', replica=nombre)
+                print(f"⚠️ Réplica {nombre} no disponible, se lee de la primaria: {e}")
+
+        if lectura:
+            metricas.incrementar('preguntas_db_lecturas_total', destino='primaria')
+        return psycopg2.connect(**self.connection_params), None
+
+    def _replica_al_dia(self, conn, indice: int, nombre: str) -> bool:
+        """Mide el retraso de replicación cada INTERVALO_RETRASO_S; False si supera el máximo"""
+        if not self.selector_replicas.toca_medir_retraso(indice):
+            return True
+        cursor = conn.cursor()
+        cursor.execute(SQL_RETRASO_REPLICA)
+        retraso = float(cursor.fetchone()[0])
+        cursor.close()
+        conn.rollback()
+        if self.selector_replicas.registrar_retraso(indice, retraso):
+            return True
+        metricas.incrementar('preguntas_db_replica_retrasada_total', replica=nombre)
+        print(f"⚠️ Réplica {nombre} con {retraso:.1f}s de retraso, se lee de la primaria")
+        return False
+
+    def _registrar_escritura(self):
+        """Durante la ventana configurada las lecturas van a la primaria (leer lo propio escrito)"""
+        if self.selector_replicas is not None:
+            self.selector_replicas.registrar_escritura()
+
+    def estado_replicas(self) -> List[dict]:
+        """Disponibilidad y latencia suavizada de cada réplica de lectura"""
+        return self.selector_replicas.estado() if self.selector_replicas else []
+
+    def obtener_metricas_consultas(self) -> dict:
+        """Latencias por consulta, adquisición de conexiones y últimas consultas lentas"""
+        metricas = registro_consultas.snapshot()
+        metricas['lentas'] = registro_consultas.consultas_lentas()
+        return metricas
+
+    def _clave_esquema(self) -> Optional[tuple]:
+        """
+        Identifica la base para no repetir init_database en el mismo proceso.
+        En SQLite incluye el inodo: un archivo borrado y recreado vuelve a inicializarse.
+        """
+        if self.db_type == 'postgresql':
+            params = self.connection_params
+            return ('postgresql', params['host'], params['port'], params['database'])
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            estado = os.stat(self.db_name)
+        except OSError:
+            return None
+        return ('sqlite', os.path.abspath(self.db_name), estado.st_dev, estado.st_ino)
 
-            if self.db_type == 'postgresql':
-                # PostgreSQL con SERIAL para auto-increment
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS preguntas (
-                        id SERIAL PRIMARY KEY,
-                        habilidad VARCHAR(100) NOT NULL,
-                        pregunta TEXT NOT NULL,
-                        tipo VARCHAR(50) DEFAULT 'general',
-                        nivel VARCHAR(50) DEFAULT 'intermedio',
-                        categoria VARCHAR(50) DEFAULT 'tecnica',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        CONSTRAINT unique_pregunta UNIQUE(habilidad, pregunta)
-                    )
-                ''')
+    def _hay_filas_sin_firma(self, cursor) -> bool:
+        """
+        Filas escritas por fuera del gestor (SQL externo, restauración de backups) no
+        tienen firma ni columnas normalizadas y quedan con un id mayor que la última
+        firma: comparar los MAX(id) usa solo las claves primarias, sin recorrer tablas.
+        """
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM preguntas')
+        max_pregunta = cursor.fetchone()[0]
+        cursor.execute('SELECT COALESCE(MAX(pregunta_id), 0) FROM preguntas_minhash')
+        return max_pregunta != cursor.fetchone()[0]
 
-                # Crear índices optimizados para PostgreSQL
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_habilidad ON preguntas(habilidad)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tipo_nivel ON preguntas(tipo, nivel)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_nivel ON preguntas(nivel)')
+    def init_database(self):
+        """
+        Inicializa la base de datos y aplica las migraciones pendientes (ver migraciones.py).
+        Cada base se verifica una sola vez por proceso; después basta con leer schema_version.
+        """
+        clave = self._clave_esquema()
+        if clave is not None and clave in DatabaseManager._esquemas_verificados:
+            return True
 
-                # Índice de texto completo para PostgreSQL
-                cursor.execute('''
-                    CREATE INDEX IF NOT EXISTS idx_full_search 
-                    ON preguntas USING gin(to_tsvector('spanish', pregunta))
-                ''')
+        try:
+            conn = self.get_connection()
 
-            else:
-                # SQLite (código original)
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS preguntas (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        habilidad TEXT NOT NULL,
-                        pregunta TEXT NOT NULL,
-                        tipo TEXT DEFAULT 'general',
-                        nivel TEXT DEFAULT 'intermedio',
-                        categoria TEXT DEFAULT 'tecnica',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
+            ejecutor = EjecutorMigraciones(conn, self.db_type)
+            if ejecutor.version_actual() < ultima_version():
+                ejecutor.aplicar()
 
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_habilidad ON preguntas(habilidad)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_tipo_nivel ON preguntas(tipo, nivel)')
+            cursor = conn.cursor()
+            if self._hay_filas_sin_firma(cursor):
+                self._rellenar_columnas_normalizadas(cursor)
+                self._rellenar_firmas_minhash(cursor)
 
             conn.commit()
             conn.close()
+
+            # En SQLite el archivo puede haberse creado recién ahora
+            clave = self._clave_esquema()
+            if clave is not None:
+                DatabaseManager._esquemas_verificados.add(clave)
             return True
 
         except Exception as e:
             print(f"❌ Error inicializando base de datos: {e}")
             return False
 
+    def _rellenar_columnas_normalizadas(self, cursor):
+        """Calcula habilidad_norm/pregunta_norm de filas insertadas sin ellas (SQL externo, backups)"""
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+
+        cursor.execute('''
+            SELECT id, habilidad, pregunta
+            FROM preguntas
+            WHERE habilidad_norm IS NULL OR pregunta_norm IS NULL
+        ''')
+        pendientes = cursor.fetchall()
+
+        if pendientes:
+            cursor.executemany(
+                f"UPDATE preguntas SET habilidad_norm = {placeholder}, pregunta_norm = {placeholder} "
+                f"WHERE id = {placeholder}",
+                [(normalizar_texto(hab), normalizar_texto(preg), pid) for pid, hab, preg in pendientes]
+            )
+
+    def _registrar_firma(self, cursor, pregunta_id: int, firma):
+        """Guarda (o reemplaza) la firma MinHash de una pregunta y sus cubetas LSH"""
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+
+        cursor.execute(f"DELETE FROM preguntas_minhash WHERE pregunta_id = {placeholder}", (pregunta_id,))
+        cursor.execute(f"DELETE FROM preguntas_lsh WHERE pregunta_id = {placeholder}", (pregunta_id,))
+        cursor.execute(
+            f"INSERT INTO preguntas_minhash (pregunta_id, firma) VALUES ({placeholder}, {placeholder})",
+            (pregunta_id, serializar_firma(firma))
+        )
+        cursor.executemany(
+            f"INSERT INTO preguntas_lsh (banda, cubeta, pregunta_id) "
+            f"VALUES ({placeholder}, {placeholder}, {placeholder})",
+            [(banda, cubeta, pregunta_id) for banda, cubeta in cubetas_lsh(firma)]
+        )
+
+    def _rellenar_firmas_minhash(self, cursor):
+        """Calcula firmas de preguntas que aún no la tienen (datos previos o SQL externo)"""
+        cursor.execute('''
+            SELECT p.id, p.pregunta_norm
+            FROM preguntas p
+            LEFT JOIN preguntas_minhash m ON m.pregunta_id = p.id
+            WHERE m.pregunta_id IS NULL
+        ''')
+        for pregunta_id, pregunta_norm in cursor.fetchall():
+            self._registrar_firma(cursor, pregunta_id, firma_minhash(pregunta_norm or ''))
+
+    def _buscar_candidatos_lsh(self, cursor, firma, habilidad_norm: str = None,
+                               umbral: float = UMBRAL_DUPLICADO, excluir_id: int = None) -> List[Tuple[int, float]]:
+        """
+        Preguntas que comparten alguna cubeta LSH con la firma y cuya similitud
+        estimada supera el umbral. Retorna [(pregunta_id, similitud)] de mayor a menor.
+        """
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+        cubetas = cubetas_lsh(firma)
+
+        condiciones = ' OR '.join([f"(l.banda = {placeholder} AND l.cubeta = {placeholder})"] * len(cubetas))
+        params = [valor for cubeta in cubetas for valor in cubeta]
+
+        query = f'''
+            SELECT DISTINCT m.pregunta_id, m.firma
+            FROM preguntas_lsh l
+            JOIN preguntas_minhash m ON m.pregunta_id = l.pregunta_id
+            JOIN preguntas p ON p.id = l.pregunta_id
+            WHERE ({condiciones})
+        '''
+        if habilidad_norm is not None:
+            query += f" AND p.habilidad_norm = {placeholder}"
+            params.append(habilidad_norm)
+
+        cursor.execute(query, params)
+
+        candidatos = []
+        for pregunta_id, firma_guardada in cursor.fetchall():
+            if pregunta_id == excluir_id:
+                continue
+            similitud = similitud_estimada(firma, deserializar_firma(firma_guardada))
+            if similitud >= umbral:
+                candidatos.append((pregunta_id, similitud))
+
+        candidatos.sort(key=lambda item: -item[1])
+        return candidatos
+
+    def _resolver_habilidad(self, cursor, habilidad: str) -> List[str]:
+        """
+        Resuelve el nombre de habilidad escrito por el usuario a sus valores normalizados.
+        Primero busca coincidencia exacta (la sirve idx_habilidad_norm_nivel, cuyo prefijo es
+        habilidad_norm) y solo si no existe recurre a coincidencia parcial: en PostgreSQL la
+        sirve idx_habilidad_trgm; en SQLite recorre ese índice compuesto, no la tabla.
+        """
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+        habilidad_norm = normalizar_texto(habilidad)
+
+        cursor.execute(f'''
+            SELECT 1 FROM preguntas WHERE habilidad_norm = {placeholder} LIMIT 1
+        ''', (habilidad_norm,))
+        if cursor.fetchone():
+            return [habilidad_norm]
+
+        cursor.execute(f'''
+            SELECT DISTINCT habilidad_norm
+            FROM preguntas
+            WHERE habilidad_norm LIKE {placeholder}
+        ''', (f'%{habilidad_norm}%',))
+        return [row[0] for row in cursor.fetchall()]
+
+    def existe_habilidad(self, habilidad: str) -> bool:
+        """Si hay preguntas de exactamente esa habilidad (sin distinguir acentos ni mayúsculas)"""
+        try:
+            conn = self.get_connection(lectura=True)
+            cursor = conn.cursor()
+
+            placeholder = '%s' if self.db_type == 'postgresql' else '?'
+            cursor.execute(f'''
+                SELECT 1 FROM preguntas WHERE habilidad_norm = {placeholder} LIMIT 1
+            ''', (normalizar_texto(habilidad),))
+            existe = cursor.fetchone() is not None
+            conn.close()
+            return existe
+
+        except Exception as e:
+            print(f"❌ Error verificando habilidad: {e}")
+            return False
+
+    def _obtener_indice_trigramas(self, cursor) -> IndiceTrigramas:
+        """
+        Devuelve el índice de trigramas de SQLite, construyéndolo si no existe o si
+        otro proceso insertó preguntas (cambia MAX(id)). Las escrituras hechas por este
+        gestor lo mantienen al día de forma incremental.
+        """
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM preguntas')
+        firma = cursor.fetchone()[0]
+
+        if self._indice_trigramas is None or firma != self._firma_indice_trigramas:
+            metricas.incrementar('preguntas_cache_consultas_total', cache='trigramas', resultado='fallo')
+            indice = IndiceTrigramas()
+            cursor.execute('SELECT id, habilidad_norm, pregunta_norm FROM preguntas')
+            for pregunta_id, habilidad_norm, pregunta_norm in cursor.fetchall():
+                indice.agregar(pregunta_id, habilidad_norm, pregunta_norm)
+
+            self._indice_trigramas = indice
+            self._firma_indice_trigramas = firma
+        else:
+            metricas.incrementar('preguntas_cache_consultas_total', cache='trigramas', resultado='acierto')
+
+        return self._indice_trigramas
+
+    def _candidatos_subcadena(self, cursor, termino_norm: str) -> Optional[set]:
+        """
+        Ids que pueden contener termino_norm según el índice de trigramas (SQLite): cada
+        palabra del término tiene que ser parte de alguna palabra de la pregunta o de la
+        habilidad. None si el término no tiene palabras indexables ("c#", "go") o si es tan
+        común que sale más barato recorrer la tabla en orden y parar en las primeras.
+        """
+        palabras = extraer_palabras(termino_norm)
+        if not palabras:
+            return None
+
+        indice = self._obtener_indice_trigramas(cursor)
+        candidatos = None
+        for palabra in sorted(palabras, key=len, reverse=True):
+            ids = indice.ids_con_subcadena(palabra)
+            candidatos = ids if candidatos is None else candidatos & ids
+            if not candidatos:
+                break
+
+        if len(candidatos) > len(indice) * FRACCION_MAXIMA_CANDIDATOS:
+            return None
+        return candidatos
+
+    def _ruta_cache_similitud(self) -> str:
+        """Archivo .npz donde se cachea el índice TF-IDF"""
+        if DatabaseConfig.SIMILITUD_CACHE_PATH:
+            return DatabaseConfig.SIMILITUD_CACHE_PATH
+        if self.db_type == 'postgresql':
+            return f"similitud_{self.connection_params['database']}.npz"
+        return f"{self.db_name}.similitud.npz"
+
+    def _obtener_indice_similitud(self, cursor) -> 'IndiceSimilitud':
+        """
+        Devuelve el índice TF-IDF. La primera vez lo carga del disco si corresponde al
+        banco actual (mismo COUNT y MAX(id)) o lo reconstruye; después solo incorpora
+        las preguntas que otros procesos hayan insertado.
+        """
+        from similitud import IndiceSimilitud
+
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+
+        if self._indice_similitud is None:
+            ruta = self._ruta_cache_similitud()
+            cursor.execute('SELECT COUNT(*), COALESCE(MAX(id), 0) FROM preguntas')
+            firma = tuple(cursor.fetchone())
+
+            try:
+                indice, firma_guardada = IndiceSimilitud.cargar(ruta)
+            except Exception as e:
+                print(f"⚠️ Caché de similitud inválida, se reconstruye: {e}")
+                indice, firma_guardada = None, None
+
+            if indice is None or firma_guardada != firma:
+                metricas.incrementar('preguntas_cache_consultas_total', cache='similitud', resultado='fallo')
+                cursor.execute('SELECT id, habilidad_norm, pregunta_norm FROM preguntas ORDER BY id')
+                indice = IndiceSimilitud.construir(
+                    (pregunta_id, f"{habilidad_norm} {pregunta_norm}")
+                    for pregunta_id, habilidad_norm, pregunta_norm in cursor.fetchall()
+                )
+                indice.guardar(ruta, firma)
+            else:
+                metricas.incrementar('preguntas_cache_consultas_total', cache='similitud', resultado='disco')
+
+            self._indice_similitud = indice
+        else:
+            metricas.incrementar('preguntas_cache_consultas_total', cache='similitud', resultado='acierto')
+            cursor.execute(f'''
+                SELECT id, habilidad_norm, pregunta_norm FROM preguntas WHERE id > {placeholder}
+            ''', (self._indice_similitud.max_id,))
+            for pregunta_id, habilidad_norm, pregunta_norm in cursor.fetchall():
+                self._indice_similitud.agregar(pregunta_id, f"{habilidad_norm} {pregunta_norm}")
+
+        return self._indice_similitud
+
+    def _guardar_indice_similitud(self):
+        """Persiste el índice TF-IDF si tiene cambios sin guardar"""
+        indice = self._indice_similitud
+        if indice is not None and indice.cambios_sin_guardar:
+            firma = (int(indice.activos.sum()) + len(indice._pendientes), indice.max_id)
+            indice.guardar(self._ruta_cache_similitud(), firma)
+
+    def _actualizar_indices_locales(self, pregunta_id: int, habilidad_norm: str, pregunta_norm: str):
+        """Refleja una inserción o edición en los índices en memoria ya construidos"""
+        if not pregunta_id:
+            return
+
+        if self._indice_trigramas is not None:
+            self._indice_trigramas.agregar(pregunta_id, habilidad_norm, pregunta_norm)
+            # Solo avanzar la firma si no hubo inserciones ajenas entre medio
+            if pregunta_id == (self._firma_indice_trigramas or 0) + 1:
+                self._firma_indice_trigramas = pregunta_id
+
+        if self._indice_similitud is not None:
+            self._indice_similitud.agregar(pregunta_id, f"{habilidad_norm} {pregunta_norm}")
+            if self._indice_similitud.cambios_sin_guardar >= CAMBIOS_ANTES_DE_GUARDAR:
+                self._guardar_indice_similitud()
+
+    def _descartar_de_indices_locales(self, pregunta_id: int):
+        """Refleja un borrado en los índices en memoria ya construidos"""
+        if self._indice_trigramas is not None:
+            self._indice_trigramas.eliminar(pregunta_id)
+
+        if self._indice_similitud is not None:
+            self._indice_similitud.eliminar(pregunta_id)
+            if self._indice_similitud.cambios_sin_guardar >= CAMBIOS_ANTES_DE_GUARDAR:
+                self._guardar_indice_similitud()
+
     def agregar_pregunta(self, habilidad: str, pregunta: str,
                          tipo: str = "general", nivel: str = "intermedio",
-                         categoria: str = "tecnica") -> bool:
-        """Agrega una nueva pregunta a la base de datos"""
+                         categoria: str = "tecnica", verificar_duplicados: bool = True,
+                         fuente: str = FUENTE_BANCO) -> bool:
+        """
+        Agrega una nueva pregunta a la base de datos.
+        Con verificar_duplicados se descartan reformulaciones de preguntas ya
+        existentes en la misma habilidad (MinHash + LSH).
+        """
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
 
+            habilidad_norm = normalizar_texto(habilidad)
+            pregunta_norm = normalizar_texto(pregunta)
+            firma = firma_minhash(pregunta_norm)
+
+            if verificar_duplicados:
+                duplicados = self._buscar_candidatos_lsh(cursor, firma, habilidad_norm)
+                if duplicados:
+                    conn.close()
+                    duplicado_id, similitud = duplicados[0]
+                    print(f"⚠️ Pregunta casi duplicada de ID {duplicado_id} ({similitud:.0%}), no se agrega")
+                    return False
+
             if self.db_type == 'postgresql':
-                # PostgreSQL con ON CONFLICT para evitar duplicados
+                # PostgreSQL con ON CONFLICT para evitar duplicados. Sin columnas: la restricción
+                # única cambia si la tabla está particionada (incluye habilidad_norm)
                 cursor.execute('''
-                    INSERT INTO preguntas (habilidad, pregunta, tipo, nivel, categoria)
-                    VALUES (%s, %s, %s, %s, %s)
-                    ON CONFLICT (habilidad, pregunta) DO NOTHING
-                ''', (habilidad, pregunta, tipo, nivel, categoria))
+                    INSERT INTO preguntas (habilidad, pregunta, tipo, nivel, categoria,
+                                           habilidad_norm, pregunta_norm, fuente)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT DO NOTHING
+                    RETURNING id
+                ''', (habilidad, pregunta, tipo, nivel, categoria, habilidad_norm, pregunta_norm, fuente))
+                fila = cursor.fetchone()
+                pregunta_id = fila[0] if fila else None
             else:
-                # SQLite (código original)
+                # SQLite: OR IGNORE respeta el índice único, como ON CONFLICT en PostgreSQL
                 cursor.execute('''
-                    INSERT INTO preguntas (habilidad, pregunta, tipo, nivel, categoria)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (habilidad, pregunta, tipo, nivel, categoria))
+                    INSERT OR IGNORE INTO preguntas (habilidad, pregunta, tipo, nivel, categoria,
+                                                     habilidad_norm, pregunta_norm, fuente)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (habilidad, pregunta, tipo, nivel, categoria, habilidad_norm, pregunta_norm, fuente))
+                pregunta_id = cursor.lastrowid if cursor.rowcount > 0 else None
+
+            if pregunta_id:
+                self._registrar_firma(cursor, pregunta_id, firma)
+                self._incrementar_revision(cursor)
 
             conn.commit()
+            self._registrar_escritura()
             conn.close()
+
+            self._actualizar_indices_locales(pregunta_id, habilidad_norm, pregunta_norm)
             return True
 
         except Exception as e:
             print(f"❌ Error agregando pregunta: {e}")
             return False
 
+    def agregar_preguntas_lote(self, preguntas: Iterable[Tuple[str, ...]]) -> int:
+        """
+        Inserta muchas preguntas (habilidad, pregunta, tipo, nivel, categoria[, fuente]) en una
+        sola transacción, por bloques de TAMANO_LOTE filas (executemany en SQLite, COPY en PostgreSQL).
+        Sin sexto elemento la fuente es FUENTE_BANCO.
+        No descarta casi duplicados: está pensado para cargas iniciales, bancos sintéticos
+        y lotes ya filtrados (banco_llm).
+        Retorna cuántas preguntas se insertaron.
+        """
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+        insertadas = 0
+
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            bloque = []
+            for fila in preguntas:
+                bloque.append(fila)
+                if len(bloque) >= TAMANO_LOTE:
+                    insertadas += self._insertar_bloque(cursor, bloque, placeholder)
+                    bloque = []
+            if bloque:
+                insertadas += self._insertar_bloque(cursor, bloque, placeholder)
+            if insertadas:
+                self._incrementar_revision(cursor)
+
+            conn.commit()
+            self._registrar_escritura()
+            conn.close()
+            return insertadas
+
+        except Exception as e:
+            print(f"❌ Error en carga masiva: {e}")
+            return 0
+
+    def _insertar_bloque(self, cursor, bloque: list, placeholder: str) -> int:
+        """Inserta un bloque de preguntas con sus columnas normalizadas y firmas MinHash"""
+        valores = [
+            (fila[0], fila[1], fila[2], fila[3], fila[4],
+             normalizar_texto(fila[0]), normalizar_texto(fila[1]), fila[5] if len(fila) > 5 else FUENTE_BANCO)
+            for fila in bloque
+        ]
+
+        if self.db_type == 'postgresql':
+            # COPY a una tabla temporal (la vía más rápida) y de ahí a preguntas,
+            # respetando la restricción única y obteniendo los ids creados
+            cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS preguntas_carga (
+                    habilidad TEXT, pregunta TEXT, tipo TEXT, nivel TEXT, categoria TEXT,
+                    habilidad_norm TEXT, pregunta_norm TEXT, fuente TEXT
+                ) ON COMMIT DROP
+            ''')
+            cursor.execute('TRUNCATE preguntas_carga')
+            cursor.copy_expert(
+                'COPY preguntas_carga FROM STDIN',
+                io.StringIO(''.join('\t'.join(_escapar_copy(v) for v in fila) + '\n' for fila in valores))
+            )
+            cursor.execute('''
+                INSERT INTO preguntas (habilidad, pregunta, tipo, nivel, categoria,
+                                       habilidad_norm, pregunta_norm, fuente)
+                SELECT habilidad, pregunta, tipo, nivel, categoria, habilidad_norm, pregunta_norm, fuente
+                FROM preguntas_carga
+                ON CONFLICT DO NOTHING
+                RETURNING id, pregunta_norm
+            ''')
+            filas = cursor.fetchall()
+        else:
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM preguntas')
+            ultimo_id = cursor.fetchone()[0]
+            cursor.executemany('''
+                INSERT OR IGNORE INTO preguntas (habilidad, pregunta, tipo, nivel, categoria,
+                                                 habilidad_norm, pregunta_norm, fuente)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', valores)
+            # La transacción está abierta: los ids nuevos son exactamente los > ultimo_id
+            cursor.execute('SELECT id, pregunta_norm FROM preguntas WHERE id > ?', (ultimo_id,))
+            filas = cursor.fetchall()
+
+        firmas, cubetas = [], []
+        for pregunta_id, pregunta_norm in filas:
+            firma = firma_minhash(pregunta_norm)
+            firmas.append((pregunta_id, serializar_firma(firma)))
+            cubetas.extend((banda, cubeta, pregunta_id) for banda, cubeta in cubetas_lsh(firma))
+
+        cursor.executemany(
+            f"INSERT INTO preguntas_minhash (pregunta_id, firma) VALUES ({placeholder}, {placeholder})",
+            firmas
+        )
+        cursor.executemany(
+            f"INSERT INTO preguntas_lsh (banda, cubeta, pregunta_id) "
+            f"VALUES ({placeholder}, {placeholder}, {placeholder})",
+            cubetas
+        )
+
+        # Los índices en memoria detectan las filas nuevas por MAX(id) en su próximo uso
+        return len(filas)
+
+    def obtener_metadato(self, clave: str) -> Optional[str]:
+        """Valor guardado en la tabla metadatos (None si no existe)"""
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT valor FROM metadatos WHERE clave = {placeholder}", (clave,))
+            fila = cursor.fetchone()
+            conn.close()
+            return fila[0] if fila else None
+
+        except Exception as e:
+            print(f"❌ Error leyendo metadato {clave}: {e}")
+            return None
+
+    def guardar_metadato(self, clave: str, valor: str) -> bool:
+        """Crea o reemplaza un valor de la tabla metadatos"""
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                INSERT INTO metadatos (clave, valor) VALUES ({placeholder}, {placeholder})
+                ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor, actualizado = CURRENT_TIMESTAMP
+            ''', (clave, valor))
+            conn.commit()
+            self._registrar_escritura()
+            conn.close()
+            return True
+
+        except Exception as e:
+            print(f"❌ Error guardando metadato {clave}: {e}")
+            return False
+
+    def _incrementar_revision(self, cursor):
+        """Sube la revisión del banco dentro de la transacción de la escritura"""
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+        cursor.execute(f'''
+            INSERT INTO metadatos (clave, valor) VALUES ({placeholder}, '1')
+            ON CONFLICT (clave) DO UPDATE
+            SET valor = CAST(CAST(metadatos.valor AS INTEGER) + 1 AS TEXT), actualizado = CURRENT_TIMESTAMP
+        ''', (CLAVE_REVISION,))
+
+    def obtener_revision(self) -> int:
+        """
+        Revisión del banco: cambia con cada alta, edición, borrado o limpieza, también las
+        hechas por otros procesos. Sirve para saber si una copia cacheada sigue vigente.
+        """
+        valor = self.obtener_metadato(CLAVE_REVISION)
+        return int(valor) if valor else 0
+
+    def obtener_claves_preguntas(self, habilidades: List[str]) -> set:
+        """Pares (habilidad_norm, pregunta_norm) ya guardados para las habilidades dadas"""
+        placeholder = '%s' if self.db_type == 'postgresql' else '?'
+        normalizadas = sorted({normalizar_texto(h) for h in habilidades})
+        if not normalizadas:
+            return set()
+
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT habilidad_norm, pregunta_norm FROM preguntas
+                WHERE habilidad_norm IN ({', '.join([placeholder] * len(normalizadas))})
+            ''', normalizadas)
+            claves = set(cursor.fetchall())
+            conn.close()
+            return claves
+
+        except Exception as e:
+            print(f"❌ Error obteniendo preguntas existentes: {e}")
+            return set()
+
     def obtener_preguntas_por_habilidad(self, habilidad: str,
                                         cantidad: int = 2,
                                         nivel: Optional[str] = None) -> List[str]:
         """Obtiene preguntas de una habilidad específica"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
             cursor = conn.cursor()
 
-            if self.db_type == 'postgresql':
-                if nivel:
-                    cursor.execute('''
-                        SELECT pregunta
-                        FROM preguntas
-                        WHERE habilidad ILIKE %s AND nivel = %s
-                        ORDER BY RANDOM() LIMIT %s
-                    ''', (f'%{habilidad}%', nivel, cantidad))
-                else:
-                    cursor.execute('''
-                        SELECT pregunta
-                        FROM preguntas
-                        WHERE habilidad ILIKE %s
-                        ORDER BY RANDOM() LIMIT %s
-                    ''', (f'%{habilidad}%', cantidad))
-            else:
-                # SQLite (código original)
-                if nivel:
-                    cursor.execute('''
-                        SELECT pregunta
-                        FROM preguntas
-                        WHERE habilidad LIKE ? AND nivel = ?
-                        ORDER BY RANDOM() LIMIT ?
-                    ''', (f'%{habilidad}%', nivel, cantidad))
-                else:
-                    cursor.execute('''
-                        SELECT pregunta
-                        FROM preguntas
-                        WHERE habilidad LIKE ?
-                        ORDER BY RANDOM() LIMIT ?
-                    ''', (f'%{habilidad}%', cantidad))
+            placeholder = '%s' if self.db_type == 'postgresql' else '?'
+
+            # Resolver sin acentos ni mayúsculas ("metodos" == "Métodos")
+            habilidades_norm = self._resolver_habilidad(cursor, habilidad)
+            if not habilidades_norm:
+                conn.close()
+                return []
+
+            marcadores = ', '.join([placeholder] * len(habilidades_norm))
+            query = f"SELECT pregunta FROM preguntas WHERE habilidad_norm IN ({marcadores})"
+            params = list(habilidades_norm)
+
+            if nivel:
+                query += f" AND nivel = {placeholder}"
+                params.append(nivel)
+
+            query += f" ORDER BY RANDOM() LIMIT {placeholder}"
+            params.append(cantidad)
+
+            cursor.execute(query, params)
 
             preguntas = [row[0] for row in cursor.fetchall()]
             conn.close()
@@ -187,7 +782,7 @@ class DatabaseManager:
     def obtener_todas_habilidades(self) -> List[str]:
         """Obtiene lista de todas las habilidades disponibles"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -205,38 +800,30 @@ class DatabaseManager:
             return []
 
     def obtener_estadisticas_habilidad(self, habilidad: str) -> dict:
-        """Obtiene estadísticas detalladas de una habilidad"""
+        """
+        Obtiene estadísticas detalladas de una habilidad (coincidencia exacta normalizada,
+        como el resto de lecturas). Una sola consulta agrupada por nivel y tipo sobre
+        idx_habilidad_norm_nivel; el total y los dos desgloses se suman aquí
+        """
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
             cursor = conn.cursor()
 
             placeholder = '%s' if self.db_type == 'postgresql' else '?'
 
-            # Contar total
-            cursor.execute(f'''
-                SELECT COUNT(*)
-                FROM preguntas
-                WHERE habilidad = {placeholder}
-            ''', (habilidad,))
-            total = cursor.fetchone()[0]
-
-            # Contar por nivel
-            cursor.execute(f'''
-                SELECT nivel, COUNT(*)
-                FROM preguntas
-                WHERE habilidad = {placeholder}
-                GROUP BY nivel
-            ''', (habilidad,))
-            niveles = dict(cursor.fetchall())
-
-            # Contar por tipo
             cursor.execute(f'''
-                SELECT tipo, COUNT(*)
+                SELECT nivel, tipo, COUNT(*)
                 FROM preguntas
-                WHERE habilidad = {placeholder}
-                GROUP BY tipo
-            ''', (habilidad,))
-            tipos = dict(cursor.fetchall())
+                WHERE habilidad_norm = {placeholder}
+                GROUP BY nivel, tipo
+            ''', (normalizar_texto(habilidad),))
+            total = 0
+            niveles = {}
+            tipos = {}
+            for nivel, tipo, cantidad in cursor.fetchall():
+                total += cantidad
+                niveles[nivel] = niveles.get(nivel, 0) + cantidad
+                tipos[tipo] = tipos.get(tipo, 0) + cantidad
 
             conn.close()
 
@@ -251,10 +838,83 @@ class DatabaseManager:
             print(f"❌ Error obteniendo estadísticas: {e}")
             return {}
 
+    def obtener_estadisticas_habilidades(self) -> dict:
+        """
+        Estadísticas de todas las habilidades con dos consultas agrupadas en lugar de tres
+        por habilidad ({habilidad: mismo formato que obtener_estadisticas_habilidad}, en
+        orden alfabético). Cada GROUP BY recorre en orden un índice que lo cubre
+        (idx_habilidad_nivel, idx_habilidad_tipo), sin ordenar ni leer la tabla.
+        """
+        try:
+            conn = self.get_connection(lectura=True)
+            cursor = conn.cursor()
+
+            estadisticas = {}
+            cursor.execute('''
+                SELECT habilidad, nivel, COUNT(*)
+                FROM preguntas
+                GROUP BY habilidad, nivel
+                ORDER BY habilidad
+            ''')
+            for habilidad, nivel, cantidad in cursor.fetchall():
+                stats = estadisticas.setdefault(habilidad, {
+                    'habilidad': habilidad, 'total': 0, 'por_nivel': {}, 'por_tipo': {}
+                })
+                stats['total'] += cantidad
+                stats['por_nivel'][nivel] = cantidad
+
+            cursor.execute('''
+                SELECT habilidad, tipo, COUNT(*)
+                FROM preguntas
+                GROUP BY habilidad, tipo
+            ''')
+            for habilidad, tipo, cantidad in cursor.fetchall():
+                estadisticas[habilidad]['por_tipo'][tipo] = cantidad
+
+            conn.close()
+            return estadisticas
+
+        except Exception as e:
+            print(f"❌ Error obteniendo estadísticas por habilidad: {e}")
+            return {}
+
+    def obtener_habilidades_con_criterios(self, nivel: str = None, tipo: str = None,
+                                          categoria: str = None) -> List[str]:
+        """
+        Habilidades con al menos una pregunta que cumpla todos los criterios indicados,
+        en una sola consulta (por nivel la cubre idx_habilidad_nivel); sin criterios, todas
+        """
+        try:
+            conn = self.get_connection(lectura=True)
+            cursor = conn.cursor()
+
+            placeholder = '%s' if self.db_type == 'postgresql' else '?'
+            condiciones, params = [], []
+            for columna, valor in (('nivel', nivel), ('tipo', tipo), ('categoria', categoria)):
+                if valor:
+                    condiciones.append(f"{columna} = {placeholder}")
+                    params.append(valor)
+            where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+
+            cursor.execute(f'''
+                SELECT DISTINCT habilidad
+                FROM preguntas
+                {where}
+                ORDER BY habilidad
+            ''', params)
+
+            habilidades = [row[0] for row in cursor.fetchall()]
+            conn.close()
+            return habilidades
+
+        except Exception as e:
+            print(f"❌ Error obteniendo habilidades por criterios: {e}")
+            return []
+
     def contar_preguntas(self) -> int:
         """Cuenta el total de preguntas en la base de datos"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
             cursor = conn.cursor()
 
             cursor.execute('SELECT COUNT(*) FROM preguntas')
@@ -269,17 +929,22 @@ class DatabaseManager:
     def contar_preguntas_por_habilidad(self, habilidad: str) -> int:
         """Cuenta preguntas de una habilidad específica"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
             cursor = conn.cursor()
 
             placeholder = '%s' if self.db_type == 'postgresql' else '?'
-            like_operator = 'ILIKE' if self.db_type == 'postgresql' else 'LIKE'
 
+            habilidades_norm = self._resolver_habilidad(cursor, habilidad)
+            if not habilidades_norm:
+                conn.close()
+                return 0
+
+            marcadores = ', '.join([placeholder] * len(habilidades_norm))
             cursor.execute(f'''
                 SELECT COUNT(*)
                 FROM preguntas
-                WHERE habilidad {like_operator} {placeholder}
-            ''', (f'%{habilidad}%',))
+                WHERE habilidad_norm IN ({marcadores})
+            ''', habilidades_norm)
 
             total = cursor.fetchone()[0]
             conn.close()
@@ -290,49 +955,288 @@ class DatabaseManager:
             return 0
 
     def buscar_preguntas(self, termino: str, limit: int = 10) -> List[Tuple]:
-        """Busca preguntas que contengan un término específico"""
+        """Busca preguntas que contengan un término específico (sin distinguir acentos ni mayúsculas)"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
             cursor = conn.cursor()
 
             placeholder = '%s' if self.db_type == 'postgresql' else '?'
-            like_operator = 'ILIKE' if self.db_type == 'postgresql' else 'LIKE'
-
-            if self.db_type == 'postgresql':
-                # Usar búsqueda de texto completo en PostgreSQL si está disponible
+            termino_norm = normalizar_texto(termino)
+
+            # Las columnas *_norm ya están en minúsculas y sin acentos: basta LIKE en ambos
+            # motores, escapando % y _ para que el término se busque tal cual
+            patron = '%' + termino_norm.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            filtro = f'''(pregunta_norm LIKE {placeholder} ESCAPE '\\'
+                       OR habilidad_norm LIKE {placeholder} ESCAPE '\\')'''
+
+            # En PostgreSQL los índices GIN idx_*_trgm (gin_trgm_ops) sirven LIKE '%...%'.
+            # En SQLite el índice de trigramas en memoria da los candidatos y LIKE solo
+            # los confirma; sin palabras indexables no queda otra que recorrer la tabla.
+            candidatos = None
+            if self.db_type != 'postgresql':
+                candidatos = self._candidatos_subcadena(cursor, termino_norm)
+
+            if candidatos is None:
                 cursor.execute(f'''
                     SELECT habilidad, pregunta, tipo, nivel
                     FROM preguntas
-                    WHERE pregunta {like_operator} {placeholder}
-                       OR habilidad {like_operator} {placeholder}
+                    WHERE {filtro}
                     ORDER BY habilidad, pregunta LIMIT {placeholder}
-                ''', (f'%{termino}%', f'%{termino}%', limit))
+                ''', (patron, patron, limit))
+                resultados = cursor.fetchall()
+            else:
+                # Por bloques para no pasar el límite de parámetros de SQLite; cada bloque
+                # trae sus `limit` primeras en orden y basta quedarse con las mejores
+                ids = sorted(candidatos)
+                resultados = []
+                for inicio in range(0, len(ids), MAX_PARAMETROS_SQLITE):
+                    bloque = ids[inicio:inicio + MAX_PARAMETROS_SQLITE]
+                    cursor.execute(f'''
+                        SELECT habilidad, pregunta, tipo, nivel
+                        FROM preguntas
+                        WHERE id IN ({', '.join(['?'] * len(bloque))}) AND {filtro}
+                        ORDER BY habilidad, pregunta LIMIT ?
+                    ''', bloque + [patron, patron, limit])
+                    resultados.extend(cursor.fetchall())
+                resultados = heapq.nsmallest(limit, resultados, key=lambda fila: (fila[0], fila[1]))
+
+            conn.close()
+            return resultados
+
+        except Exception as e:
+            print(f"❌ Error buscando preguntas: {e}")
+            return []
+
+    def buscar_preguntas_difusa(self, termino: str, limit: int = 10,
+                                umbral: float = UMBRAL_SIMILITUD_DEFECTO) -> List[Tuple]:
+        """
+        Busca preguntas tolerando errores de escritura ("Pyhton", "Kubernets").
+        Retorna (habilidad, pregunta, tipo, nivel, similitud) ordenado por similitud.
+        """
+        try:
+            conn = self.get_connection(lectura=True)
+            cursor = conn.cursor()
+
+            termino_norm = normalizar_texto(termino)
+
+            if self.db_type == 'postgresql':
+                # Los operadores <% y % de pg_trgm usan los índices GIN idx_*_trgm
+                cursor.execute('''
+                    SELECT set_config('pg_trgm.word_similarity_threshold', %s, false),
+                           set_config('pg_trgm.similarity_threshold', %s, false)
+                ''', (str(umbral), str(umbral)))
+                cursor.execute('''
+                    SELECT habilidad, pregunta, tipo, nivel,
+                           GREATEST(word_similarity(%s, pregunta_norm),
+                                    similarity(%s, habilidad_norm)) AS similitud
+                    FROM preguntas
+                    WHERE %s <%% pregunta_norm
+                       OR habilidad_norm %% %s
+                    ORDER BY similitud DESC, habilidad, pregunta LIMIT %s
+                ''', (termino_norm, termino_norm, termino_norm, termino_norm, limit))
+                resultados = [(hab, preg, tipo, nivel, round(float(sim), 3))
+                              for hab, preg, tipo, nivel, sim in cursor.fetchall()]
+            else:
+                coincidencias = self._obtener_indice_trigramas(cursor).buscar(termino_norm, umbral, limit)
+                resultados = []
+
+                if coincidencias:
+                    ids = [pregunta_id for pregunta_id, _ in coincidencias]
+                    cursor.execute(f'''
+                        SELECT id, habilidad, pregunta, tipo, nivel
+                        FROM preguntas
+                        WHERE id IN ({', '.join(['?'] * len(ids))})
+                    ''', ids)
+                    filas = {row[0]: row[1:] for row in cursor.fetchall()}
+                    resultados = [filas[pregunta_id] + (similitud,)
+                                  for pregunta_id, similitud in coincidencias if pregunta_id in filas]
+
+            conn.close()
+            return resultados
+
+        except Exception as e:
+            print(f"❌ Error en búsqueda difusa: {e}")
+            return []
+
+    def buscar_casi_duplicados(self, pregunta: str, habilidad: str = None,
+                               umbral: float = UMBRAL_DUPLICADO) -> List[dict]:
+        """Preguntas existentes que son reformulaciones de la dada (opcionalmente en una habilidad)"""
+        try:
+            conn = self.get_connection(lectura=True)
+            cursor = conn.cursor()
+
+            habilidad_norm = normalizar_texto(habilidad) if habilidad else None
+            candidatos = self._buscar_candidatos_lsh(cursor, firma_minhash(normalizar_texto(pregunta)),
+                                                     habilidad_norm, umbral)
+            resultados = []
+
+            if candidatos:
+                placeholder = '%s' if self.db_type == 'postgresql' else '?'
+                ids = [pregunta_id for pregunta_id, _ in candidatos]
+                cursor.execute(f'''
+                    SELECT id, habilidad, pregunta, nivel
+                    FROM preguntas
+                    WHERE id IN ({', '.join([placeholder] * len(ids))})
+                ''', ids)
+                filas = {row[0]: row for row in cursor.fetchall()}
+
+                for pregunta_id, similitud in candidatos:
+                    if pregunta_id in filas:
+                        _, hab, preg, nivel = filas[pregunta_id]
+                        resultados.append({
+                            'id': pregunta_id,
+                            'habilidad': hab,
+                            'pregunta': preg,
+                            'nivel': nivel,
+                            'similitud': round(similitud, 3)
+                        })
+
+            conn.close()
+            return resultados
+
+        except Exception as e:
+            print(f"❌ Error buscando duplicados: {e}")
+            return []
+
+    def reporte_duplicados(self, umbral: float = UMBRAL_DUPLICADO) -> List[dict]:
+        """
+        Agrupa las preguntas casi duplicadas de todo el banco.
+        Solo se comparan pares que comparten cubeta LSH dentro de la misma habilidad,
+        nunca todos contra todos.
+        """
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+
+            self._rellenar_firmas_minhash(cursor)
+            conn.commit()
+
+            # Cubetas con más de una pregunta de la misma habilidad
+            cursor.execute('''
+                SELECT l.banda, l.cubeta, p.habilidad_norm, l.pregunta_id
+                FROM preguntas_lsh l
+                JOIN preguntas p ON p.id = l.pregunta_id
+                WHERE (l.banda, l.cubeta) IN (
+                    SELECT banda, cubeta FROM preguntas_lsh
+                    GROUP BY banda, cubeta HAVING COUNT(*) > 1
+                )
+                ORDER BY l.banda, l.cubeta, p.habilidad_norm
+            ''')
+
+            pares = set()
+            cubeta_actual, miembros = None, []
+            for banda, cubeta, habilidad_norm, pregunta_id in cursor.fetchall() + [(None, None, None, None)]:
+                clave = (banda, cubeta, habilidad_norm)
+                if clave != cubeta_actual:
+                    for i in range(len(miembros)):
+                        for j in range(i + 1, len(miembros)):
+                            pares.add((min(miembros[i], miembros[j]), max(miembros[i], miembros[j])))
+                    cubeta_actual, miembros = clave, []
+                miembros.append(pregunta_id)
+
+            # Verificar cada par candidato con la similitud estimada de sus firmas
+            ids_candidatos = sorted({pregunta_id for par in pares for pregunta_id in par})
+            firmas = {}
+            placeholder = '%s' if self.db_type == 'postgresql' else '?'
+            for inicio in range(0, len(ids_candidatos), 500):
+                lote = ids_candidatos[inicio:inicio + 500]
+                cursor.execute(f'''
+                    SELECT pregunta_id, firma FROM preguntas_minhash
+                    WHERE pregunta_id IN ({', '.join([placeholder] * len(lote))})
+                ''', lote)
+                firmas.update({pregunta_id: deserializar_firma(firma) for pregunta_id, firma in cursor.fetchall()})
+
+            grupos = UnionFind()
+            for id_a, id_b in pares:
+                if similitud_estimada(firmas[id_a], firmas[id_b]) >= umbral:
+                    grupos.unir(id_a, id_b)
+
+            reporte = []
+            for ids in grupos.grupos():
+                cursor.execute(f'''
+                    SELECT id, habilidad, pregunta FROM preguntas
+                    WHERE id IN ({', '.join([placeholder] * len(ids))})
+                    ORDER BY id
+                ''', ids)
+                filas = cursor.fetchall()
+                reporte.append({
+                    'habilidad': filas[0][1] if filas else None,
+                    'ids': ids,
+                    'preguntas': [pregunta for _, _, pregunta in filas]
+                })
+
+            conn.close()
+            return reporte
+
+        except Exception as e:
+            print(f"❌ Error generando reporte de duplicados: {e}")
+            return []
+
+    def obtener_preguntas_similares(self, pregunta_id: int = None, texto: str = None,
+                                    k: int = 5) -> List[dict]:
+        """
+        Top-k preguntas más parecidas (coseno TF-IDF) a una pregunta del banco o a un texto libre.
+        Útil para encontrar preguntas de seguimiento o alternativas.
+        """
+        if not NUMPY_DISPONIBLE:
+            print("❌ numpy no instalado. Instala con: pip install numpy")
+            return []
+
+        try:
+            conn = self.get_connection(lectura=True)
+            cursor = conn.cursor()
+            placeholder = '%s' if self.db_type == 'postgresql' else '?'
+
+            if pregunta_id is not None:
+                cursor.execute(f'''
+                    SELECT habilidad_norm, pregunta_norm FROM preguntas WHERE id = {placeholder}
+                ''', (pregunta_id,))
+                fila = cursor.fetchone()
+                if not fila:
+                    conn.close()
+                    return []
+                texto_norm = f"{fila[0]} {fila[1]}"
             else:
+                texto_norm = normalizar_texto(texto or '')
+
+            indice = self._obtener_indice_similitud(cursor)
+            coincidencias = indice.similares_a_texto(texto_norm, k, excluir_id=pregunta_id)
+            resultados = []
+
+            if coincidencias:
+                ids = [pid for pid, _ in coincidencias]
                 cursor.execute(f'''
-                    SELECT habilidad, pregunta, tipo, nivel
+                    SELECT id, habilidad, pregunta, tipo, nivel
                     FROM preguntas
-                    WHERE pregunta {like_operator} {placeholder}
-                       OR habilidad {like_operator} {placeholder}
-                    ORDER BY habilidad, pregunta LIMIT {placeholder}
-                ''', (f'%{termino}%', f'%{termino}%', limit))
+                    WHERE id IN ({', '.join([placeholder] * len(ids))})
+                ''', ids)
+                filas = {row[0]: row for row in cursor.fetchall()}
+
+                for pid, puntaje in coincidencias:
+                    if pid in filas:
+                        _, hab, preg, tipo, nivel = filas[pid]
+                        resultados.append({
+                            'id': pid,
+                            'habilidad': hab,
+                            'pregunta': preg,
+                            'tipo': tipo,
+                            'nivel': nivel,
+                            'similitud': puntaje
+                        })
 
-            resultados = cursor.fetchall()
             conn.close()
             return resultados
 
         except Exception as e:
-            print(f"❌ Error buscando preguntas: {e}")
+            print(f"❌ Error obteniendo preguntas similares: {e}")
             return []
 
     def obtener_resumen_completo(self) -> dict:
         """Obtiene un resumen completo de la base de datos"""
         try:
             total_preguntas = self.contar_preguntas()
-            habilidades = self.obtener_todas_habilidades()
-
-            estadisticas_por_habilidad = {}
-            for habilidad in habilidades:
-                estadisticas_por_habilidad[habilidad] = self.obtener_estadisticas_habilidad(habilidad)
+            estadisticas_por_habilidad = self.obtener_estadisticas_habilidades()
+            habilidades = list(estadisticas_por_habilidad)
 
             db_info = f"{self.db_type.upper()}"
             if self.db_type == 'postgresql':
@@ -355,7 +1259,7 @@ class DatabaseManager:
     def exportar_bd_a_sql(self, archivo_salida: str = "backup_preguntas.sql") -> bool:
         """Exporta toda la base de datos a un archivo SQL"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
 
             if self.db_type == 'postgresql':
                 # Para PostgreSQL, hacer export manual
@@ -396,12 +1300,21 @@ class DatabaseManager:
             cursor = conn.cursor()
 
             if self.db_type == 'postgresql':
-                cursor.execute('TRUNCATE TABLE preguntas RESTART IDENTITY CASCADE')
+                cursor.execute('TRUNCATE TABLE preguntas, preguntas_minhash, preguntas_lsh RESTART IDENTITY CASCADE')
             else:
                 cursor.execute('DELETE FROM preguntas')
+                cursor.execute('DELETE FROM preguntas_minhash')
+                cursor.execute('DELETE FROM preguntas_lsh')
+            self._incrementar_revision(cursor)
 
             conn.commit()
+            self._registrar_escritura()
             conn.close()
+
+            self._indice_trigramas = None
+            self._indice_similitud = None
+            if os.path.exists(self._ruta_cache_similitud()):
+                os.remove(self._ruta_cache_similitud())
             print("✅ Base de datos limpiada")
             return True
 
@@ -416,7 +1329,7 @@ class DatabaseManager:
                                         cantidad_por_habilidad: int = 2) -> dict:
         """Obtiene preguntas basado en múltiples criterios"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
             cursor = conn.cursor()
             preguntas_resultado = {}
 
@@ -454,6 +1367,83 @@ class DatabaseManager:
             print(f"❌ Error obteniendo preguntas por criterios: {e}")
             return {}
 
+    def obtener_pool_preguntas(self, habilidades: List[str],
+                               nivel: str = None) -> Dict[str, List[Tuple[int, str]]]:
+        """
+        Todas las preguntas (id, pregunta) de cada habilidad pedida, en una sola consulta
+        para las coincidencias exactas. Pensado para muestrear muchos sets en memoria
+        (lote.py) en lugar de hacer un ORDER BY RANDOM() por set y habilidad.
+        """
+        try:
+            filas = self._leer_pools(habilidades, nivel)
+            return {habilidad: [(pregunta_id, pregunta) for pregunta_id, pregunta, _, _ in pool]
+                    for habilidad, pool in filas.items()}
+
+        except Exception as e:
+            print(f"❌ Error obteniendo pool de preguntas: {e}")
+            return {}
+
+    def obtener_pool_estratos(self, habilidades: List[str]) -> Dict[str, Dict[Tuple[str, str], List[Tuple[int, str]]]]:
+        """
+        Pools por estrato: {habilidad: {(nivel, tipo): [(id, pregunta), ...]}}, con la misma
+        única consulta que obtener_pool_preguntas. Para componer entrevistas con cuotas
+        por nivel y tipo (compositor.py) sin una consulta por estrato.
+        """
+        try:
+            estratos = {}
+            for habilidad, pool in self._leer_pools(habilidades).items():
+                por_estrato = estratos.setdefault(habilidad, {})
+                for pregunta_id, pregunta, nivel, tipo in pool:
+                    por_estrato.setdefault((nivel, tipo), []).append((pregunta_id, pregunta))
+            return estratos
+
+        except Exception as e:
+            print(f"❌ Error obteniendo pools por estrato: {e}")
+            return {}
+
+    def _leer_pools(self, habilidades: List[str], nivel: str = None) -> Dict[str, List[tuple]]:
+        """(id, pregunta, nivel, tipo) de cada habilidad, ordenadas por id; exactas en una consulta"""
+        conn = self.get_connection(lectura=True)
+        try:
+            cursor = conn.cursor()
+            placeholder = '%s' if self.db_type == 'postgresql' else '?'
+
+            normalizadas = {habilidad: normalizar_texto(habilidad) for habilidad in habilidades}
+            nivel_sql = f" AND nivel = {placeholder}" if nivel else ''
+
+            por_norm = {}
+            valores = sorted(set(normalizadas.values()))
+            if valores:
+                cursor.execute(f'''
+                    SELECT habilidad_norm, id, pregunta, nivel, tipo FROM preguntas
+                    WHERE habilidad_norm IN ({', '.join([placeholder] * len(valores))}){nivel_sql}
+                    ORDER BY id
+                ''', valores + ([nivel] if nivel else []))
+                for habilidad_norm, *fila in cursor.fetchall():
+                    por_norm.setdefault(habilidad_norm, []).append(tuple(fila))
+
+            pools = {}
+            for habilidad, habilidad_norm in normalizadas.items():
+                if habilidad_norm in por_norm:
+                    pools[habilidad] = por_norm[habilidad_norm]
+                    continue
+
+                # Sin coincidencia exacta (o sin preguntas de ese nivel): parcial, como LIKE
+                resueltas = [h for h in self._resolver_habilidad(cursor, habilidad) if h != habilidad_norm]
+                if not resueltas:
+                    pools[habilidad] = []
+                    continue
+                cursor.execute(f'''
+                    SELECT id, pregunta, nivel, tipo FROM preguntas
+                    WHERE habilidad_norm IN ({', '.join([placeholder] * len(resueltas))}){nivel_sql}
+                    ORDER BY id
+                ''', resueltas + ([nivel] if nivel else []))
+                pools[habilidad] = [tuple(fila) for fila in cursor.fetchall()]
+
+            return pools
+        finally:
+            conn.close()
+
     def actualizar_pregunta(self, pregunta_id: int, nueva_pregunta: str = None,
                             nuevo_nivel: str = None, nuevo_tipo: str = None) -> bool:
         """Actualiza una pregunta existente"""
@@ -468,6 +1458,8 @@ class DatabaseManager:
             if nueva_pregunta:
                 updates.append(f"pregunta = {placeholder}")
                 params.append(nueva_pregunta)
+                updates.append(f"pregunta_norm = {placeholder}")
+                params.append(normalizar_texto(nueva_pregunta))
 
             if nuevo_nivel:
                 updates.append(f"nivel = {placeholder}")
@@ -487,7 +1479,20 @@ class DatabaseManager:
             cursor.execute(query, params)
 
             if cursor.rowcount > 0:
+                if nueva_pregunta:
+                    self._registrar_firma(cursor, pregunta_id, firma_minhash(normalizar_texto(nueva_pregunta)))
+                self._incrementar_revision(cursor)
+
                 conn.commit()
+                self._registrar_escritura()
+
+                if nueva_pregunta:
+                    cursor.execute(f'SELECT habilidad_norm, pregunta_norm FROM preguntas WHERE id = {placeholder}',
+                                   (pregunta_id,))
+                    fila = cursor.fetchone()
+                    if fila:
+                        self._actualizar_indices_locales(pregunta_id, *fila)
+
                 conn.close()
                 print(f"✅ Pregunta actualizada (ID: {pregunta_id})")
                 return True
@@ -510,8 +1515,15 @@ class DatabaseManager:
             cursor.execute(f"DELETE FROM preguntas WHERE id = {placeholder}", (pregunta_id,))
 
             if cursor.rowcount > 0:
+                # Explícito también en PostgreSQL: con preguntas particionada
+                # (fragmentacion.py) las firmas ya no tienen ON DELETE CASCADE
+                cursor.execute(f"DELETE FROM preguntas_minhash WHERE pregunta_id = {placeholder}", (pregunta_id,))
+                cursor.execute(f"DELETE FROM preguntas_lsh WHERE pregunta_id = {placeholder}", (pregunta_id,))
+                self._incrementar_revision(cursor)
                 conn.commit()
+                self._registrar_escritura()
                 conn.close()
+                self._descartar_de_indices_locales(pregunta_id)
                 print(f"✅ Pregunta eliminada (ID: {pregunta_id})")
                 return True
             else:
@@ -526,7 +1538,7 @@ class DatabaseManager:
     def obtener_pregunta_por_id(self, pregunta_id: int) -> dict:
         """Obtiene una pregunta específica por ID"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
             cursor = conn.cursor()
 
             placeholder = '%s' if self.db_type == 'postgresql' else '?'
@@ -559,7 +1571,7 @@ class DatabaseManager:
     def obtener_estadisticas_generales(self) -> dict:
         """Obtiene estadísticas generales de toda la base de datos"""
         try:
-            conn = self.get_connection()
+            conn = self.get_connection(lectura=True)
             cursor = conn.cursor()
 
             # Total de preguntas
@@ -632,7 +1644,7 @@ class DatabaseManager:
 
     def cerrar_conexion(self):
         """Método para limpiar recursos si es necesario"""
-        pass
+        self._guardar_indice_similitud()
 
 
 # Función utilitaria para pruebas independientes
@@ -662,6 +1674,12 @@ def test_database_manager():
     for hab, pregunta, tipo, nivel in resultados[:3]:
         print(f"• {hab} ({nivel}): {pregunta[:50]}...")
 
+    # Latencias medidas por la instrumentación durante las pruebas
+    print("\n⏱️ Consultas más lentas (p95):")
+    consultas = db.obtener_metricas_consultas()['consultas']
+    for nombre, datos in sorted(consultas.items(), key=lambda item: -item[1]['p95_ms'])[:5]:
+        print(f"• {nombre}: {datos['total']} llamadas, p95 {datos['p95_ms']} ms, {datos['filas']} filas")
+
     print("\n✅ Pruebas completadas")
 
 
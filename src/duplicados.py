@@ -0,0 +1,131 @@
+"""
+Detección de preguntas casi duplicadas con MinHash + LSH
+Permite encontrar reformulaciones de una misma pregunta sin comparar todos los pares
+"""
+
+import hashlib
+import importlib.util
+import random
+import re
+import struct
+import zlib
+from typing import List, Set, Tuple
+
+# numpy es opcional: acelera el cálculo de firmas en recargas masivas. Se importa
+# con la primera firma, no al importar el módulo (es la mayor parte del arranque)
+NUMPY_DISPONIBLE = importlib.util.find_spec('numpy') is not None
+
+# 64 permutaciones en 16 bandas de 4 filas: pares con Jaccard >= ~0.5
+# caen en alguna cubeta común con alta probabilidad
+NUM_PERMUTACIONES = 64
+NUM_BANDAS = 16
+FILAS_POR_BANDA = NUM_PERMUTACIONES // NUM_BANDAS
+
+# Similitud (Jaccard estimada) a partir de la cual dos preguntas se consideran duplicadas
+UMBRAL_DUPLICADO = 0.6
+
+# Shingles de 5 caracteres sobre el texto normalizado sin signos de puntuación
+TAMANO_SHINGLE = 5
+
+# Hash universal h(x) = (a*x + b) mod p con p = 2^31 - 1: a, x, b < p
+# garantizan que a*x + b cabe en 64 bits (vectorizable con numpy)
+_PRIMO_MERSENNE = (1 << 31) - 1
+_MAX_HASH = _PRIMO_MERSENNE
+_NO_ALFANUMERICO = re.compile(r'[^\w ]+')
+
+# Coeficientes fijos: las firmas guardadas deben seguir siendo comparables entre ejecuciones
+_rng = random.Random(20240829)
+_COEF_A = [_rng.randrange(1, _PRIMO_MERSENNE) for _ in range(NUM_PERMUTACIONES)]
+_COEF_B = [_rng.randrange(0, _PRIMO_MERSENNE) for _ in range(NUM_PERMUTACIONES)]
+
+_numpy = None
+
+_FORMATO_FIRMA = f'<{NUM_PERMUTACIONES}Q'
+
+
+def _cargar_numpy():
+    """Importa numpy y prepara los coeficientes vectorizados la primera vez"""
+    global _numpy, _A_NP, _B_NP
+    if _numpy is None:
+        import numpy
+        _A_NP = numpy.array(_COEF_A, dtype=numpy.uint64)[:, None]
+        _B_NP = numpy.array(_COEF_B, dtype=numpy.uint64)[:, None]
+        _numpy = numpy
+    return _numpy
+
+
+def shingles(texto_norm: str) -> Set[int]:
+    """Conjunto de shingles (como hashes menores que p) de un texto ya normalizado"""
+    limpio = ' '.join(_NO_ALFANUMERICO.sub(' ', texto_norm).split())
+    if len(limpio) <= TAMANO_SHINGLE:
+        return {zlib.crc32(limpio.encode('utf-8')) % _PRIMO_MERSENNE} if limpio else set()
+
+    return {zlib.crc32(limpio[i:i + TAMANO_SHINGLE].encode('utf-8')) % _PRIMO_MERSENNE
+            for i in range(len(limpio) - TAMANO_SHINGLE + 1)}
+
+
+def firma_minhash(texto_norm: str) -> Tuple[int, ...]:
+    """Firma MinHash de NUM_PERMUTACIONES valores para un texto normalizado"""
+    hashes = shingles(texto_norm)
+    if not hashes:
+        return tuple([_MAX_HASH] * NUM_PERMUTACIONES)
+
+    if NUMPY_DISPONIBLE:
+        np = _cargar_numpy()
+        x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        valores = (_A_NP * x + _B_NP) % np.uint64(_PRIMO_MERSENNE)
+        return tuple(int(v) for v in valores.min(axis=1))
+
+    return tuple(min((a * x + b) % _PRIMO_MERSENNE for x in hashes)
+                 for a, b in zip(_COEF_A, _COEF_B))
+
+
+def similitud_estimada(firma_a, firma_b) -> float:
+    """Estimación de la similitud de Jaccard entre dos firmas"""
+    iguales = sum(1 for a, b in zip(firma_a, firma_b) if a == b)
+    return iguales / NUM_PERMUTACIONES
+
+
+def cubetas_lsh(firma) -> List[Tuple[int, int]]:
+    """(banda, cubeta) de cada banda de la firma; la cubeta es un entero de 63 bits"""
+    cubetas = []
+    for banda in range(NUM_BANDAS):
+        valores = firma[banda * FILAS_POR_BANDA:(banda + 1) * FILAS_POR_BANDA]
+        digest = hashlib.blake2b(struct.pack(f'<{FILAS_POR_BANDA}Q', *valores), digest_size=8).digest()
+        cubetas.append((banda, int.from_bytes(digest, 'little') >> 1))
+    return cubetas
+
+
+def serializar_firma(firma) -> bytes:
+    """Firma a bytes para guardarla en BLOB/BYTEA"""
+    return struct.pack(_FORMATO_FIRMA, *firma)
+
+
+def deserializar_firma(datos) -> Tuple[int, ...]:
+    """Bytes (BLOB/BYTEA/memoryview) a firma"""
+    return struct.unpack(_FORMATO_FIRMA, bytes(datos))
+
+
+class UnionFind:
+    """Agrupa pares de duplicados en grupos transitivos para el reporte"""
+
+    def __init__(self):
+        self.padre = {}
+
+    def encontrar(self, x):
+        self.padre.setdefault(x, x)
+        while self.padre[x] != x:
+            self.padre[x] = self.padre[self.padre[x]]
+            x = self.padre[x]
+        return x
+
+    def unir(self, a, b):
+        raiz_a, raiz_b = self.encontrar(a), self.encontrar(b)
+        if raiz_a != raiz_b:
+            self.padre[max(raiz_a, raiz_b)] = min(raiz_a, raiz_b)
+
+    def grupos(self) -> List[List[int]]:
+        por_raiz = {}
+        for x in self.padre:
+            por_raiz.setdefault(self.encontrar(x), []).append(x)
+        return [sorted(ids) for ids in por_raiz.values() if len(ids) > 1]
@@ -0,0 +1,874 @@
+#!/usr/bin/env python3
+"""
+Fragmentación del banco de preguntas por habilidad
+
+SQLite: el banco se reparte en FRAGMENTOS_SQLITE archivos ({raiz}.frag{i}.db). Cada
+habilidad vive entera en un fragmento (crc32 de su nombre normalizado, o el que fije
+el mapa guardado en el fragmento 0), así que las inserciones, el VACUUM y la detección
+de duplicados trabajan sobre archivos pequeños. GestorFragmentado ofrece la misma
+interfaz que DatabaseManager: las operaciones de una habilidad van a su fragmento y
+las globales (conteos, estadísticas, búsquedas) se lanzan en paralelo y se combinan.
+
+PostgreSQL: particionar_postgresql convierte la tabla preguntas en una tabla con
+particiones declarativas HASH(habilidad_norm); el planificador se encarga del resto.
+
+Uso:
+    python fragmentacion.py --repartir preguntas_entrevista.db   # con FRAGMENTOS_SQLITE=4
+    python fragmentacion.py --particionar-postgresql 8
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+import zlib
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from busqueda_difusa import UMBRAL_SIMILITUD_DEFECTO
+from config import DatabaseConfig
+from database_manager import FUENTE_BANCO, TAMANO_LOTE, DatabaseManager
+from duplicados import UMBRAL_DUPLICADO
+from metricas import metricas
+from migraciones import LOCK_TIMEOUT, TAMANO_LOTE_MIGRACION
+from normalizacion import normalizar_texto
+
+# Claves de la tabla metadatos del fragmento 0
+CLAVE_TOTAL_FRAGMENTOS = 'fragmentos_total'
+CLAVE_MAPA_FRAGMENTOS = 'mapa_fragmentos'
+CLAVE_VERSION_MAPA = 'mapa_fragmentos_version'
+CLAVE_PARTICIONES_POSTGRESQL = 'particiones_postgresql'
+
+# Cada cuánto las lecturas comprueban si otro proceso cambió el mapa de habilidades
+INTERVALO_MAPA_S = 1.0
+
+
+def ruta_fragmento(ruta_base: str, indice: int) -> str:
+    """Archivo del fragmento `indice`: preguntas.db -> preguntas.frag0.db"""
+    raiz, extension = os.path.splitext(ruta_base)
+    return f"{raiz}.frag{indice}{extension or '.db'}"
+
+
+def crear_gestor_bd(db_name: str = None, solo_lectura: bool = None):
+    """
+    Gestor del banco configurado: GestorSoloLectura sobre el snapshot del catálogo con
+    CATALOGO_SOLO_LECTURA, GestorFragmentado con FRAGMENTOS_SQLITE > 1 en SQLite y
+    DatabaseManager en cualquier otro caso (PostgreSQL particiona dentro de la base)
+    """
+    if DatabaseConfig.CATALOGO_SOLO_LECTURA if solo_lectura is None else solo_lectura:
+        from snapshot_catalogo import GestorSoloLectura
+        return GestorSoloLectura()
+
+    fragmentos = DatabaseConfig.FRAGMENTOS_SQLITE
+    if DatabaseConfig.is_sqlite() and fragmentos > 1:
+        return GestorFragmentado(db_name, fragmentos)
+    return DatabaseManager(db_name)
+
+
+class GestorFragmentado:
+    """
+    Banco SQLite repartido por habilidad en varios archivos, con la interfaz de DatabaseManager.
+    Los ids que expone son globales: id_local * fragmentos + indice_fragmento.
+    """
+
+    def __init__(self, db_name: str = None, fragmentos: int = None):
+        # Importado aquí: solo lo pagan los procesos con el banco fragmentado
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.db_type = 'sqlite'
+        self.db_name = db_name or DatabaseConfig.SQLITE_PATH
+        self.total_fragmentos = fragmentos or DatabaseConfig.FRAGMENTOS_SQLITE
+        self.selector_replicas = None
+
+        print(f"🧩 Banco fragmentado en {self.total_fragmentos} archivos SQLite: {self.db_name}")
+        self.fragmentos = [DatabaseManager(ruta_fragmento(self.db_name, i))
+                           for i in range(self.total_fragmentos)]
+        self._ejecutor = ThreadPoolExecutor(max_workers=self.total_fragmentos,
+                                            thread_name_prefix='fragmento')
+
+        # Cambiar el número de fragmentos reubicaría habilidades: hay que repartir de nuevo
+        guardado = self.fragmentos[0].obtener_metadato(CLAVE_TOTAL_FRAGMENTOS)
+        if guardado is None:
+            self.fragmentos[0].guardar_metadato(CLAVE_TOTAL_FRAGMENTOS, str(self.total_fragmentos))
+        elif int(guardado) != self.total_fragmentos:
+            raise Exception(f"El banco tiene {guardado} fragmentos y FRAGMENTOS_SQLITE={self.total_fragmentos}; "
+                            f"usa fragmentacion.py --repartir para cambiarlo")
+
+        # Mapa {habilidad_norm: fragmento} de asignar_habilidad. Otro proceso puede cambiarlo:
+        # se relee cuando cambia su versión, comprobada en cada escritura y, en las lecturas,
+        # como mucho cada INTERVALO_MAPA_S
+        self._mapa = {}
+        self._version_mapa = ''
+        self._mapa_comprobado = 0.0
+        self._refrescar_mapa(forzar=True)
+
+        # {habilidad_norm: fragmento} de las habilidades con preguntas, para enrutar los pools.
+        # None = hay que releerlo. Si otro proceso lo deja viejo solo cuesta eficiencia: una
+        # habilidad desconocida se busca en todos los fragmentos como coincidencia parcial
+        self._habilidades_por_fragmento = None
+
+    # ------------------------------------------------------------------ enrutamiento
+
+    def _refrescar_mapa(self, forzar: bool = False):
+        """Relee el mapa de habilidades si cambió su versión en el fragmento 0"""
+        ahora = time.monotonic()
+        if not forzar and ahora - self._mapa_comprobado < INTERVALO_MAPA_S:
+            return
+        version = self.fragmentos[0].obtener_metadato(CLAVE_VERSION_MAPA)
+        if version != self._version_mapa:
+            self._mapa = json.loads(self.fragmentos[0].obtener_metadato(CLAVE_MAPA_FRAGMENTOS) or '{}')
+            self._version_mapa = version
+        self._mapa_comprobado = ahora
+
+    def indice_fragmento(self, habilidad: str, escritura: bool = False) -> int:
+        """Fragmento de una habilidad: el del mapa si está fijada, si no crc32 del nombre normalizado"""
+        self._refrescar_mapa(forzar=escritura)
+        habilidad_norm = normalizar_texto(habilidad)
+        if habilidad_norm in self._mapa:
+            return self._mapa[habilidad_norm]
+        return zlib.crc32(habilidad_norm.encode('utf-8')) % self.total_fragmentos
+
+    def _fragmento(self, habilidad: str) -> DatabaseManager:
+        metricas.incrementar('preguntas_fragmentos_consultas_total', modo='dirigida')
+        return self.fragmentos[self.indice_fragmento(habilidad)]
+
+    def _en_paralelo(self, funcion) -> list:
+        """Resultado de funcion(fragmento) para cada fragmento, en orden de índice"""
+        metricas.incrementar('preguntas_fragmentos_consultas_total', modo='difundida')
+        return list(self._ejecutor.map(funcion, self.fragmentos))
+
+    def id_global(self, indice: int, id_local: int) -> int:
+        return id_local * self.total_fragmentos + indice
+
+    def _id_local(self, pregunta_id: int) -> Tuple[DatabaseManager, int]:
+        return self.fragmentos[pregunta_id % self.total_fragmentos], pregunta_id // self.total_fragmentos
+
+    def asignar_habilidad(self, habilidad: str, indice: int) -> bool:
+        """
+        Fija el fragmento de una habilidad (p. ej. para aislar una muy grande).
+        Solo para habilidades sin preguntas: mover filas existentes requiere --repartir.
+        """
+        if not 0 <= indice < self.total_fragmentos:
+            print(f"❌ Fragmento fuera de rango: {indice}")
+            return False
+        if self._fragmento(habilidad).existe_habilidad(habilidad):
+            print(f"❌ La habilidad {habilidad} ya tiene preguntas en su fragmento actual")
+            return False
+
+        # Se parte del mapa guardado para no pisar asignaciones de otros procesos; la versión
+        # se escribe después del mapa, así quien la vea cambiada lee ya el mapa nuevo
+        self._refrescar_mapa(forzar=True)
+        self._mapa[normalizar_texto(habilidad)] = indice
+        if not self.fragmentos[0].guardar_metadato(CLAVE_MAPA_FRAGMENTOS,
+                                                   json.dumps(self._mapa, ensure_ascii=False, sort_keys=True)):
+            return False
+        self._version_mapa = str(int(self._version_mapa or 0) + 1)
+        return self.fragmentos[0].guardar_metadato(CLAVE_VERSION_MAPA, self._version_mapa)
+
+    def _fragmento_o_todos(self, habilidad: str) -> Optional[DatabaseManager]:
+        """
+        Fragmento de la habilidad si tiene coincidencia exacta (toda la habilidad está ahí);
+        None si solo puede haber coincidencias parciales, repartidas entre fragmentos
+        """
+        fragmento = self._fragmento(habilidad)
+        return fragmento if fragmento.existe_habilidad(habilidad) else None
+
+    # ------------------------------------------------------------------ escrituras
+
+    def agregar_pregunta(self, habilidad: str, pregunta: str,
+                         tipo: str = "general", nivel: str = "intermedio",
+                         categoria: str = "tecnica", verificar_duplicados: bool = True,
+                         fuente: str = FUENTE_BANCO) -> bool:
+        """Agrega una pregunta en el fragmento de su habilidad (los duplicados son de la misma habilidad)"""
+        indice = self.indice_fragmento(habilidad, escritura=True)
+        metricas.incrementar('preguntas_fragmentos_consultas_total', modo='dirigida')
+        agregada = self.fragmentos[indice].agregar_pregunta(habilidad, pregunta, tipo, nivel,
+                                                            categoria, verificar_duplicados, fuente)
+        habilidades = self._habilidades_por_fragmento
+        if agregada and habilidades is not None:
+            habilidades[normalizar_texto(habilidad)] = indice
+        return agregada
+
+    def agregar_preguntas_lote(self, preguntas: Iterable[Tuple[str, ...]]) -> int:
+        """
+        Reparte las filas por fragmento y carga los fragmentos en paralelo, cada uno
+        en su propia transacción, de a TAMANO_LOTE filas por fragmento como máximo
+        """
+        pendientes = [[] for _ in self.fragmentos]
+        insertadas = 0
+
+        def volcar():
+            lotes = [(fragmento, filas) for fragmento, filas in zip(self.fragmentos, pendientes) if filas]
+            resultado = sum(self._ejecutor.map(lambda par: par[0].agregar_preguntas_lote(par[1]), lotes))
+            for filas in pendientes:
+                filas.clear()
+            return resultado
+
+        self._refrescar_mapa(forzar=True)
+        acumuladas = 0
+        for fila in preguntas:
+            pendientes[self.indice_fragmento(fila[0])].append(fila)
+            acumuladas += 1
+            if acumuladas >= TAMANO_LOTE * self.total_fragmentos:
+                insertadas += volcar()
+                acumuladas = 0
+        if acumuladas:
+            insertadas += volcar()
+        if insertadas:
+            self._habilidades_por_fragmento = None
+        return insertadas
+
+    def obtener_metadato(self, clave: str) -> Optional[str]:
+        return self.fragmentos[0].obtener_metadato(clave)
+
+    def guardar_metadato(self, clave: str, valor: str) -> bool:
+        return self.fragmentos[0].guardar_metadato(clave, valor)
+
+    def obtener_revision(self) -> int:
+        # Cada fragmento sube la suya al escribir: la suma también sube con cualquier escritura
+        return sum(self._en_paralelo(lambda f: f.obtener_revision()))
+
+    def actualizar_pregunta(self, pregunta_id: int, nueva_pregunta: str = None,
+                            nuevo_nivel: str = None, nuevo_tipo: str = None) -> bool:
+        fragmento, id_local = self._id_local(pregunta_id)
+        return fragmento.actualizar_pregunta(id_local, nueva_pregunta, nuevo_nivel, nuevo_tipo)
+
+    def eliminar_pregunta(self, pregunta_id: int) -> bool:
+        fragmento, id_local = self._id_local(pregunta_id)
+        eliminada = fragmento.eliminar_pregunta(id_local)
+        if eliminada:
+            # Pudo ser la última de su habilidad
+            self._habilidades_por_fragmento = None
+        return eliminada
+
+    def limpiar_base_datos(self) -> bool:
+        """Limpia todos los fragmentos (el mapa de habilidades se conserva)"""
+        self._habilidades_por_fragmento = None
+        return all(self._en_paralelo(lambda fragmento: fragmento.limpiar_base_datos()))
+
+    # ------------------------------------------------------------------ lecturas por habilidad
+
+    def existe_habilidad(self, habilidad: str) -> bool:
+        return self._fragmento(habilidad).existe_habilidad(habilidad)
+
+    def obtener_claves_preguntas(self, habilidades: List[str]) -> set:
+        por_fragmento = {}
+        for habilidad in habilidades:
+            por_fragmento.setdefault(self.indice_fragmento(habilidad), []).append(habilidad)
+
+        claves = set()
+        for resultado in self._ejecutor.map(
+                lambda par: self.fragmentos[par[0]].obtener_claves_preguntas(par[1]), por_fragmento.items()):
+            claves |= resultado
+        return claves
+
+    def obtener_preguntas_por_habilidad(self, habilidad: str,
+                                        cantidad: int = 2,
+                                        nivel: Optional[str] = None) -> List[str]:
+        fragmento = self._fragmento_o_todos(habilidad)
+        if fragmento is not None:
+            return fragmento.obtener_preguntas_por_habilidad(habilidad, cantidad, nivel)
+
+        # Coincidencia parcial: cada fragmento aporta su muestra y se vuelve a muestrear
+        preguntas = [pregunta for parcial in self._en_paralelo(
+            lambda f: f.obtener_preguntas_por_habilidad(habilidad, cantidad, nivel)) for pregunta in parcial]
+        return random.sample(preguntas, min(cantidad, len(preguntas)))
+
+    def contar_preguntas_por_habilidad(self, habilidad: str) -> int:
+        fragmento = self._fragmento_o_todos(habilidad)
+        if fragmento is not None:
+            return fragmento.contar_preguntas_por_habilidad(habilidad)
+        return sum(self._en_paralelo(lambda f: f.contar_preguntas_por_habilidad(habilidad)))
+
+    def obtener_estadisticas_habilidad(self, habilidad: str) -> dict:
+        return self._fragmento(habilidad).obtener_estadisticas_habilidad(habilidad)
+
+    def obtener_preguntas_por_criterios(self,
+                                        habilidades: List[str] = None,
+                                        nivel: str = None,
+                                        tipo: str = None,
+                                        cantidad_por_habilidad: int = 2) -> dict:
+        if not habilidades:
+            habilidades = self.obtener_todas_habilidades()
+
+        por_fragmento = {}
+        for habilidad in habilidades:
+            por_fragmento.setdefault(self.indice_fragmento(habilidad), []).append(habilidad)
+
+        combinadas = {}
+        for resultado in self._ejecutor.map(
+                lambda par: self.fragmentos[par[0]].obtener_preguntas_por_criterios(
+                    par[1], nivel, tipo, cantidad_por_habilidad),
+                por_fragmento.items()):
+            combinadas.update(resultado)
+        # Mismo orden que las habilidades pedidas
+        return {habilidad: combinadas[habilidad] for habilidad in habilidades if habilidad in combinadas}
+
+    def obtener_pool_preguntas(self, habilidades: List[str],
+                               nivel: str = None) -> Dict[str, List[Tuple[int, str]]]:
+        """Pool de cada habilidad desde su fragmento, con ids globales"""
+        por_fragmento, parciales = self._repartir_pedidas(habilidades)
+
+        def pool_fragmento(par):
+            indice, pedidas = par
+            pools = self.fragmentos[indice].obtener_pool_preguntas(pedidas, nivel)
+            return {habilidad: [(self.id_global(indice, pregunta_id), pregunta) for pregunta_id, pregunta in pool]
+                    for habilidad, pool in pools.items()}
+
+        combinados = {}
+        for resultado in self._ejecutor.map(pool_fragmento, por_fragmento.items()):
+            combinados.update(resultado)
+        parciales += self._vacias(por_fragmento, combinados)
+
+        if parciales:
+            for indice, pools in enumerate(self._en_paralelo(
+                    lambda fragmento: fragmento.obtener_pool_preguntas(parciales, nivel))):
+                for habilidad, pool in pools.items():
+                    combinados.setdefault(habilidad, []).extend(
+                        (self.id_global(indice, pregunta_id), pregunta) for pregunta_id, pregunta in pool)
+            for habilidad in parciales:
+                combinados[habilidad] = sorted(combinados.get(habilidad, []))
+        return {habilidad: combinados.get(habilidad, []) for habilidad in habilidades}
+
+    def obtener_pool_estratos(self, habilidades: List[str]) -> Dict[str, Dict[Tuple[str, str], List[Tuple[int, str]]]]:
+        """Pools por (nivel, tipo) de cada habilidad desde su fragmento, con ids globales"""
+        por_fragmento, parciales = self._repartir_pedidas(habilidades)
+
+        def a_global(indice, estratos):
+            return {estrato: [(self.id_global(indice, pregunta_id), pregunta) for pregunta_id, pregunta in pool]
+                    for estrato, pool in estratos.items()}
+
+        def estratos_fragmento(par):
+            indice, pedidas = par
+            return {habilidad: a_global(indice, estratos)
+                    for habilidad, estratos in self.fragmentos[indice].obtener_pool_estratos(pedidas).items()}
+
+        combinados = {}
+        for resultado in self._ejecutor.map(estratos_fragmento, por_fragmento.items()):
+            combinados.update(resultado)
+        parciales += self._vacias(por_fragmento, combinados)
+
+        if parciales:
+            for indice, resultado in enumerate(self._en_paralelo(
+                    lambda fragmento: fragmento.obtener_pool_estratos(parciales))):
+                for habilidad, estratos in resultado.items():
+                    destino = combinados.setdefault(habilidad, {})
+                    for estrato, pool in a_global(indice, estratos).items():
+                        destino.setdefault(estrato, []).extend(pool)
+            for habilidad in parciales:
+                for pool in combinados.get(habilidad, {}).values():
+                    pool.sort()
+        return {habilidad: combinados.get(habilidad, {}) for habilidad in habilidades}
+
+    def _repartir_pedidas(self, habilidades: List[str]) -> Tuple[Dict[int, List[str]], List[str]]:
+        """Habilidades exactas agrupadas por fragmento, y las parciales (pueden estar en cualquiera)"""
+        exactas = self._obtener_habilidades_por_fragmento()
+        por_fragmento, parciales = {}, []
+        for habilidad in habilidades:
+            indice = exactas.get(normalizar_texto(habilidad))
+            if indice is None:
+                parciales.append(habilidad)
+            else:
+                por_fragmento.setdefault(indice, []).append(habilidad)
+        return por_fragmento, parciales
+
+    @staticmethod
+    def _vacias(por_fragmento: Dict[int, List[str]], combinados: dict) -> List[str]:
+        """
+        Habilidades que su fragmento devolvió vacías (sin preguntas de ese nivel, o el mapa
+        quedó viejo): pasan a parciales en todos los fragmentos, como en DatabaseManager
+        """
+        return [habilidad for pedidas in por_fragmento.values() for habilidad in pedidas
+                if not combinados.get(habilidad)]
+
+    def _obtener_habilidades_por_fragmento(self) -> Dict[str, int]:
+        """Mapa habilidad_norm -> fragmento, leído de todos los fragmentos solo si se invalidó"""
+        habilidades = self._habilidades_por_fragmento
+        if habilidades is not None:
+            metricas.incrementar('preguntas_cache_consultas_total', cache='habilidades_fragmentos',
+                                 resultado='acierto')
+            return habilidades
+
+        metricas.incrementar('preguntas_cache_consultas_total', cache='habilidades_fragmentos',
+                             resultado='fallo')
+        habilidades = {}
+        for indice, nombres in enumerate(self._en_paralelo(lambda f: f.obtener_todas_habilidades())):
+            for nombre in nombres:
+                habilidades[normalizar_texto(nombre)] = indice
+        self._habilidades_por_fragmento = habilidades
+        return habilidades
+
+    # ------------------------------------------------------------------ lecturas globales
+
+    def obtener_todas_habilidades(self) -> List[str]:
+        return sorted(set().union(*self._en_paralelo(lambda f: f.obtener_todas_habilidades())))
+
+    def obtener_habilidades_con_criterios(self, nivel: str = None, tipo: str = None,
+                                          categoria: str = None) -> List[str]:
+        return sorted(set().union(*self._en_paralelo(
+            lambda f: f.obtener_habilidades_con_criterios(nivel, tipo, categoria))))
+
+    def obtener_estadisticas_habilidades(self) -> dict:
+        # Cada habilidad está entera en un fragmento: basta unir los diccionarios
+        combinadas = {}
+        for parcial in self._en_paralelo(lambda f: f.obtener_estadisticas_habilidades()):
+            combinadas.update(parcial)
+        return {habilidad: combinadas[habilidad] for habilidad in sorted(combinadas)}
+
+    def contar_preguntas(self) -> int:
+        return sum(self._en_paralelo(lambda f: f.contar_preguntas()))
+
+    def buscar_preguntas(self, termino: str, limit: int = 10) -> List[Tuple]:
+        # Cada fragmento devuelve sus `limit` primeras en orden (habilidad, pregunta): basta mezclarlas
+        parciales = self._en_paralelo(lambda f: f.buscar_preguntas(termino, limit))
+        return list(islice(heapq.merge(*parciales, key=lambda fila: (fila[0], fila[1])), limit))
+
+    def buscar_preguntas_difusa(self, termino: str, limit: int = 10,
+                                umbral: float = UMBRAL_SIMILITUD_DEFECTO) -> List[Tuple]:
+        parciales = self._en_paralelo(lambda f: f.buscar_preguntas_difusa(termino, limit, umbral))
+        return heapq.nsmallest(limit, (fila for parcial in parciales for fila in parcial),
+                               key=lambda fila: (-fila[4], fila[0], fila[1]))
+
+    def buscar_casi_duplicados(self, pregunta: str, habilidad: str = None,
+                               umbral: float = UMBRAL_DUPLICADO) -> List[dict]:
+        if habilidad:
+            indices = [self.indice_fragmento(habilidad)]
+        else:
+            indices = list(range(self.total_fragmentos))
+
+        resultados = []
+        for indice, parcial in zip(indices, self._ejecutor.map(
+                lambda i: self.fragmentos[i].buscar_casi_duplicados(pregunta, habilidad, umbral), indices)):
+            for fila in parcial:
+                resultados.append(dict(fila, id=self.id_global(indice, fila['id'])))
+        resultados.sort(key=lambda fila: -fila['similitud'])
+        return resultados
+
+    def reporte_duplicados(self, umbral: float = UMBRAL_DUPLICADO) -> List[dict]:
+        """Los casi duplicados son siempre de la misma habilidad: cada fragmento informa los suyos"""
+        reporte = []
+        for indice, parcial in enumerate(self._en_paralelo(lambda f: f.reporte_duplicados(umbral))):
+            for grupo in parcial:
+                reporte.append(dict(grupo, ids=[self.id_global(indice, i) for i in grupo['ids']]))
+        return reporte
+
+    def obtener_preguntas_similares(self, pregunta_id: int = None, texto: str = None,
+                                    k: int = 5) -> List[dict]:
+        """
+        Top-k combinado de todos los fragmentos. Cada fragmento pondera con su propio
+        IDF, por lo que los puntajes entre fragmentos son comparables solo aproximadamente.
+        """
+        excluir = None
+        if pregunta_id is not None:
+            fragmento, id_local = self._id_local(pregunta_id)
+            origen = fragmento.obtener_pregunta_por_id(id_local)
+            if not origen:
+                return []
+            texto = f"{origen['habilidad']} {origen['pregunta']}"
+            excluir = pregunta_id
+
+        resultados = []
+        for indice, parcial in enumerate(self._en_paralelo(
+                lambda f: f.obtener_preguntas_similares(texto=texto, k=k + 1))):
+            for fila in parcial:
+                fila = dict(fila, id=self.id_global(indice, fila['id']))
+                if fila['id'] != excluir:
+                    resultados.append(fila)
+        return heapq.nlargest(k, resultados, key=lambda fila: fila['similitud'])
+
+    def obtener_pregunta_por_id(self, pregunta_id: int) -> dict:
+        fragmento, id_local = self._id_local(pregunta_id)
+        pregunta = fragmento.obtener_pregunta_por_id(id_local)
+        if pregunta:
+            pregunta['id'] = pregunta_id
+        return pregunta
+
+    def _descripcion(self) -> str:
+        return f"SQLITE ({self.db_name}, {self.total_fragmentos} fragmentos)"
+
+    def obtener_resumen_completo(self) -> dict:
+        try:
+            estadisticas = self.obtener_estadisticas_habilidades()
+            habilidades = list(estadisticas)
+            return {
+                'total_preguntas': self.contar_preguntas(),
+                'total_habilidades': len(habilidades),
+                'habilidades': habilidades,
+                'estadisticas': estadisticas,
+                'archivo_bd': self._descripcion()
+            }
+
+        except Exception as e:
+            print(f"❌ Error obteniendo resumen: {e}")
+            return {}
+
+    def obtener_estadisticas_generales(self) -> dict:
+        parciales = [p for p in self._en_paralelo(lambda f: f.obtener_estadisticas_generales()) if p]
+        if not parciales:
+            return {}
+
+        def sumar(clave):
+            total = {}
+            for parcial in parciales:
+                for valor, cantidad in parcial[clave].items():
+                    total[valor] = total.get(valor, 0) + cantidad
+            return total
+
+        # Cada habilidad está en un solo fragmento: su total es el de ese fragmento
+        top = heapq.nsmallest(5, (fila for p in parciales for fila in p['top_habilidades']),
+                              key=lambda fila: (-fila[1], fila[0]))
+        return {
+            'total_preguntas': sum(p['total_preguntas'] for p in parciales),
+            'por_nivel': sumar('por_nivel'),
+            'por_tipo': sumar('por_tipo'),
+            'por_categoria': sumar('por_categoria'),
+            'top_habilidades': top,
+            'archivo_bd': self._descripcion()
+        }
+
+    def exportar_bd_a_sql(self, archivo_salida: str = "backup_preguntas.sql") -> bool:
+        """
+        Exporta las preguntas de todos los fragmentos como INSERT portables (sin ids:
+        los ids locales de cada fragmento chocarían al restaurar en una sola base)
+        """
+        from generate_migration import escapar_sql
+
+        try:
+            total = 0
+            with open(archivo_salida, 'w', encoding='utf-8') as f:
+                f.write("-- Backup de banco fragmentado generado por GestorFragmentado\n")
+                f.write(f"-- Base de datos: {self.db_name} ({self.total_fragmentos} fragmentos)\n\n")
+
+                for indice, fragmento in enumerate(self.fragmentos):
+                    conn = fragmento.get_connection(lectura=True)
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT habilidad, pregunta, tipo, nivel, categoria, created_at
+                        FROM preguntas ORDER BY id
+                    ''')
+                    f.write(f"-- Fragmento {indice}\n")
+                    for registro in cursor:
+                        f.write("INSERT INTO preguntas (habilidad, pregunta, tipo, nivel, categoria, created_at) "
+                                f"VALUES ({', '.join(escapar_sql(valor) for valor in registro)});\n")
+                        total += 1
+                    conn.close()
+
+                f.write(f"\n-- Total registros: {total}\n")
+
+            print(f"✅ Base de datos exportada a: {archivo_salida}")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error exportando BD: {e}")
+            return False
+
+    # ------------------------------------------------------------------ mantenimiento
+
+    def test_connection(self) -> bool:
+        return all(self._en_paralelo(lambda f: f.test_connection()))
+
+    def obtener_metricas_consultas(self) -> dict:
+        # El registro de consultas es único por proceso
+        return self.fragmentos[0].obtener_metricas_consultas()
+
+    def estado_replicas(self) -> List[dict]:
+        return []
+
+    def cerrar_conexion(self):
+        for fragmento in self.fragmentos:
+            fragmento.cerrar_conexion()
+
+
+def repartir_sqlite(origen: str, destino: GestorFragmentado) -> int:
+    """
+    Copia un banco SQLite sin fragmentar (o un fragmento) en los fragmentos de `destino`,
+    con sus metadatos (hash de los datos iniciales, etc.) para que no se recarguen
+    """
+    conn = sqlite3.connect(origen)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'metadatos'")
+    if cursor.fetchone():
+        cursor.execute('SELECT clave, valor FROM metadatos WHERE clave NOT IN (?, ?, ?)',
+                       (CLAVE_TOTAL_FRAGMENTOS, CLAVE_MAPA_FRAGMENTOS, CLAVE_VERSION_MAPA))
+        for clave, valor in cursor.fetchall():
+            destino.guardar_metadato(clave, valor)
+
+    # El origen no se migra: sin categoria (preguntas_entrevista.db) se usa la del esquema
+    # inicial y sin fuente (anterior a la migración 4) las filas quedan como FUENTE_BANCO
+    cursor.execute('PRAGMA table_info(preguntas)')
+    existentes = {fila[1] for fila in cursor.fetchall()}
+    columnas = 'habilidad, pregunta, tipo, nivel, ' + ('categoria' if 'categoria' in existentes else "'tecnica'")
+    if 'fuente' in existentes:
+        columnas += ', fuente'
+    cursor.execute(f'SELECT {columnas} FROM preguntas ORDER BY id')
+
+    def filas():
+        while True:
+            bloque = cursor.fetchmany(TAMANO_LOTE)
+            if not bloque:
+                return
+            yield from bloque
+
+    total = destino.agregar_preguntas_lote(filas())
+    conn.close()
+    return total
+
+
+def particionar_postgresql(db: DatabaseManager, particiones: int,
+                           tamano_lote: int = TAMANO_LOTE_MIGRACION) -> bool:
+    """
+    Convierte preguntas en una tabla con particiones HASH(habilidad_norm), la columna por
+    la que filtran todas las lecturas, así el planificador descarta las demás particiones.
+
+    Cambio de esquema: toda restricción única de una tabla particionada debe incluir la
+    clave de partición, así que la clave primaria pasa de (id) a (id, habilidad_norm) y
+    unique_pregunta a (habilidad_norm, habilidad, pregunta); las inserciones usan ON
+    CONFLICT DO NOTHING sin columnas. Las tablas que referencian preguntas(id) (firmas
+    MinHash/LSH) reciben una columna habilidad_norm, rellenada por un trigger al insertar,
+    y su clave foránea se recrea sobre (pregunta_id, habilidad_norm) con ON DELETE CASCADE.
+
+    Sin bloquear las escrituras: un trigger anota en preguntas_cambios los ids que se
+    escriben, la copia va por lotes de ids con un COMMIT cada uno y después se reaplican
+    los cambios anotados hasta que quedan pocos. Solo el último tramo (reaplicar el resto,
+    DROP, RENAME y recrear las claves foráneas) corre bajo bloqueo y solo dura eso.
+    """
+    if db.db_type != 'postgresql':
+        print("❌ El particionado declarativo requiere PostgreSQL")
+        return False
+
+    conn = db.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'preguntas'::regclass")
+        if cursor.fetchone()[0] == 'p':
+            print("⚠️ La tabla preguntas ya está particionada")
+            conn.close()
+            return True
+
+        # habilidad_norm pasa a la clave primaria: no puede quedar ninguna sin rellenar
+        cursor.execute('SELECT COUNT(*) FROM preguntas WHERE habilidad_norm IS NULL')
+        if cursor.fetchone()[0]:
+            print("❌ Hay preguntas sin habilidad_norm; inicializa el banco para rellenarlas antes de particionar")
+            conn.close()
+            return False
+
+        cursor.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+
+        # Claves foráneas hacia preguntas(id): se recrean explícitamente tras el cambio
+        cursor.execute('''
+            SELECT c.conname, c.conrelid::regclass::text, a.attname, c.confdeltype = 'c'
+            FROM pg_constraint c
+            JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+            WHERE c.contype = 'f' AND c.confrelid = 'preguntas'::regclass
+        ''')
+        dependientes = cursor.fetchall()
+
+        # 1. Las tablas dependientes guardan habilidad_norm para la clave foránea compuesta
+        cursor.execute('''
+            CREATE OR REPLACE FUNCTION completar_habilidad_norm() RETURNS trigger AS $$
+            BEGIN
+                IF NEW.habilidad_norm IS NULL THEN
+                    SELECT habilidad_norm INTO NEW.habilidad_norm FROM preguntas
+                    WHERE id = NEW.pregunta_id;
+                END IF;
+                RETURN NEW;
+            END $$ LANGUAGE plpgsql
+        ''')
+        for _, tabla, columna, _ in dependientes:
+            if columna != 'pregunta_id':
+                raise Exception(f"Clave foránea de {tabla} sobre {columna}: solo se admite pregunta_id")
+            cursor.execute(f'ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS habilidad_norm VARCHAR(100)')
+            cursor.execute(f'DROP TRIGGER IF EXISTS {tabla}_habilidad_norm ON {tabla}')
+            cursor.execute(f'''
+                CREATE TRIGGER {tabla}_habilidad_norm BEFORE INSERT ON {tabla}
+                FOR EACH ROW EXECUTE FUNCTION completar_habilidad_norm()
+            ''')
+        conn.commit()
+        for _, tabla, _, _ in dependientes:
+            cursor.execute(f'''
+                UPDATE {tabla} d SET habilidad_norm = p.habilidad_norm
+                FROM preguntas p WHERE p.id = d.pregunta_id AND d.habilidad_norm IS NULL
+            ''')
+            conn.commit()
+
+        # 2. Registro de cambios: desde aquí toda escritura en preguntas anota su id
+        cursor.execute('CREATE TABLE preguntas_cambios (orden BIGSERIAL PRIMARY KEY, id INTEGER NOT NULL)')
+        cursor.execute('''
+            CREATE OR REPLACE FUNCTION anotar_cambio_pregunta() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    INSERT INTO preguntas_cambios (id) VALUES (OLD.id);
+                ELSE
+                    INSERT INTO preguntas_cambios (id) VALUES (NEW.id);
+                END IF;
+                RETURN NULL;
+            END $$ LANGUAGE plpgsql
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER preguntas_anotar_cambios AFTER INSERT OR UPDATE OR DELETE ON preguntas
+            FOR EACH ROW EXECUTE FUNCTION anotar_cambio_pregunta()
+        ''')
+        conn.commit()
+
+        # 3. Tabla nueva y copia por lotes. Lo escrito después del trigger se reaplica luego
+        cursor.execute('''
+            SELECT c.relname, pg_get_indexdef(i.indexrelid)
+            FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'preguntas'::regclass AND NOT i.indisunique
+        ''')
+        indices = cursor.fetchall()
+        cursor.execute("SELECT pg_get_serial_sequence('preguntas', 'id')")
+        secuencia = cursor.fetchone()[0]
+
+        cursor.execute('''
+            CREATE TABLE preguntas_particionada (LIKE preguntas INCLUDING DEFAULTS)
+            PARTITION BY HASH (habilidad_norm)
+        ''')
+        for resto in range(particiones):
+            cursor.execute(f'''
+                CREATE TABLE preguntas_p{resto} PARTITION OF preguntas_particionada
+                FOR VALUES WITH (MODULUS {particiones}, REMAINDER {resto})
+            ''')
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM preguntas')
+        maximo = cursor.fetchone()[0]
+        conn.commit()
+
+        desde = 0
+        while desde < maximo:
+            cursor.execute('INSERT INTO preguntas_particionada SELECT * FROM preguntas WHERE id > %s AND id <= %s',
+                           (desde, desde + tamano_lote))
+            conn.commit()
+            desde += tamano_lote
+
+        # Restricciones e índices con nombres provisionales (los definitivos siguen en uso
+        # por la tabla vieja); se renombran en el cambio
+        renombrar = [('preguntas_particionada_pkey', 'preguntas_pkey'),
+                     ('unique_pregunta_particionada', 'unique_pregunta')]
+        cursor.execute('''
+            ALTER TABLE preguntas_particionada
+            ADD CONSTRAINT preguntas_particionada_pkey PRIMARY KEY (id, habilidad_norm)
+        ''')
+        cursor.execute('''
+            ALTER TABLE preguntas_particionada
+            ADD CONSTRAINT unique_pregunta_particionada UNIQUE (habilidad_norm, habilidad, pregunta)
+        ''')
+        for nombre, definicion in indices:
+            provisional = f"{nombre}_particionada"
+            cursor.execute(re.sub(r'^(CREATE INDEX) \S+ ON (?:ONLY )?\S+',
+                                  rf'\1 {provisional} ON preguntas_particionada', definicion))
+            renombrar.append((provisional, nombre))
+        conn.commit()
+
+        def reaplicar_cambios() -> int:
+            """Copia de nuevo las filas anotadas (o las borra si ya no existen) y vacía la anotación"""
+            cursor.execute('SELECT COALESCE(MAX(orden), 0) FROM preguntas_cambios')
+            hasta = cursor.fetchone()[0]
+            cursor.execute('''
+                DELETE FROM preguntas_particionada
+                WHERE id IN (SELECT id FROM preguntas_cambios WHERE orden <= %s)
+            ''', (hasta,))
+            cursor.execute('''
+                INSERT INTO preguntas_particionada SELECT * FROM preguntas
+                WHERE id IN (SELECT id FROM preguntas_cambios WHERE orden <= %s)
+            ''', (hasta,))
+            cursor.execute('DELETE FROM preguntas_cambios WHERE orden <= %s', (hasta,))
+            reaplicados = cursor.rowcount
+            conn.commit()
+            return reaplicados
+
+        # 4. Alcanzar a las escrituras concurrentes hasta que el resto quepa en un lote
+        while reaplicar_cambios() > tamano_lote:
+            pass
+
+        # 5. Cambio: bloqueo solo para lo que quede anotado y las operaciones de catálogo.
+        # La secuencia de ids sobrevive al DROP y pasa a la tabla nueva
+        cursor.execute('LOCK TABLE preguntas IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute('DELETE FROM preguntas_particionada WHERE id IN (SELECT id FROM preguntas_cambios)')
+        cursor.execute('''
+            INSERT INTO preguntas_particionada SELECT * FROM preguntas
+            WHERE id IN (SELECT id FROM preguntas_cambios)
+        ''')
+        cursor.execute('DROP TRIGGER preguntas_anotar_cambios ON preguntas')
+        cursor.execute('DROP TABLE preguntas_cambios')
+        cursor.execute('DROP FUNCTION anotar_cambio_pregunta()')
+
+        for restriccion, tabla, _, _ in dependientes:
+            cursor.execute(f'ALTER TABLE {tabla} DROP CONSTRAINT {restriccion}')
+        cursor.execute(f'ALTER SEQUENCE {secuencia} OWNED BY NONE')
+        # Sin CASCADE: si algo más depende de la tabla, mejor fallar que borrarlo en silencio
+        cursor.execute('DROP TABLE preguntas')
+        cursor.execute('ALTER TABLE preguntas_particionada RENAME TO preguntas')
+        cursor.execute(f'ALTER SEQUENCE {secuencia} OWNED BY preguntas.id')
+        for provisional, nombre in renombrar:
+            cursor.execute(f'ALTER INDEX {provisional} RENAME TO {nombre}')
+        # NOT VALID: se crean sin recorrer las tablas; la validación va después, sin bloqueo
+        for restriccion, tabla, _, cascada in dependientes:
+            cursor.execute(f'''
+                ALTER TABLE {tabla} ADD CONSTRAINT {restriccion}
+                FOREIGN KEY (pregunta_id, habilidad_norm) REFERENCES preguntas (id, habilidad_norm)
+                {'ON DELETE CASCADE' if cascada else ''} NOT VALID
+            ''')
+        conn.commit()
+
+        for restriccion, tabla, _, _ in dependientes:
+            cursor.execute(f'ALTER TABLE {tabla} VALIDATE CONSTRAINT {restriccion}')
+            conn.commit()
+
+        cursor.execute('SELECT COUNT(*) FROM preguntas')
+        copiadas = cursor.fetchone()[0]
+        conn.close()
+
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        print(f"❌ Error particionando preguntas: {e}")
+        print("   Revisa y elimina preguntas_particionada, preguntas_cambios y sus triggers antes de reintentar")
+        return False
+
+    db.guardar_metadato(CLAVE_PARTICIONES_POSTGRESQL, str(particiones))
+    print(f"✅ preguntas particionada en {particiones} particiones HASH(habilidad_norm) ({copiadas} filas); "
+          f"clave primaria (id, habilidad_norm)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fragmentación del banco de preguntas por habilidad')
+    parser.add_argument('--repartir', metavar='ORIGEN',
+                        help='Reparte un banco SQLite sin fragmentar en FRAGMENTOS_SQLITE archivos')
+    parser.add_argument('--destino', help='Ruta base de los fragmentos (por defecto SQLITE_PATH)')
+    parser.add_argument('--particionar-postgresql', type=int, metavar='N',
+                        help='Convierte la tabla preguntas en N particiones HASH(habilidad_norm)')
+    parser.add_argument('--estado', action='store_true', help='Preguntas y habilidades por fragmento')
+    args = parser.parse_args()
+
+    if args.particionar_postgresql:
+        if not particionar_postgresql(DatabaseManager(), args.particionar_postgresql):
+            raise SystemExit(1)
+        return
+
+    if DatabaseConfig.FRAGMENTOS_SQLITE < 2:
+        parser.error('Define FRAGMENTOS_SQLITE (2 o más) para fragmentar el banco SQLite')
+
+    gestor = GestorFragmentado(args.destino)
+
+    if args.repartir:
+        if gestor.contar_preguntas() > 0:
+            parser.error('Los fragmentos de destino ya tienen preguntas')
+        total = repartir_sqlite(args.repartir, gestor)
+        print(f"✅ {total} preguntas repartidas en {gestor.total_fragmentos} fragmentos")
+
+    if args.estado or args.repartir:
+        for indice, fragmento in enumerate(gestor.fragmentos):
+            print(f"   {indice}: {fragmento.contar_preguntas():>8} preguntas, "
+                  f"{len(fragmento.obtener_todas_habilidades()):>5} habilidades  ({fragmento.db_name})")
+
+    gestor.cerrar_conexion()
+
+
+if __name__ == '__main__':
+    main()
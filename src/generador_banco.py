@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Generador de bancos de preguntas sintéticos para pruebas de escala
+Produce bancos grandes y realistas de forma determinista a partir de una semilla:
+cantidad de habilidades, distribución de niveles y de longitudes, proporción de
+casi duplicados y densidad de acentos configurables.
+
+Uso:
+    python generador_banco.py --total 100000 --habilidades 300 --cargar
+    python generador_banco.py --total 1000000 --salida banco.ndjson.gz
+"""
+
+import argparse
+import gzip
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+import unicodedata
+from typing import Dict, Iterator, Sequence, Tuple
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from normalizacion import NIVELES, TIPOS
+
+CATEGORIAS = ('tecnica', 'conductual', 'diseño')
+
+HABILIDADES_BASE = [
+    'Python', 'JavaScript', 'TypeScript', 'Java', 'Go', 'Rust', 'C#', 'Kotlin', 'SQL', 'PostgreSQL',
+    'MongoDB', 'Redis', 'Docker', 'Kubernetes', 'AWS', 'Azure', 'GCP', 'React', 'Vue', 'Angular',
+    'Django', 'Flask', 'FastAPI', 'Spring', 'Node.js', 'GraphQL', 'Kafka', 'Spark', 'Pandas',
+    'Machine Learning', 'Estadística', 'Diseño de APIs', 'Programación funcional', 'Seguridad',
+    'Gestión de proyectos', 'Comunicación', 'Liderazgo técnico', 'Arquitectura de software',
+    'Pruebas automatizadas', 'Integración continua', 'Observabilidad', 'Linux', 'Redes',
+    'Análisis de datos', 'Visualización', 'Optimización', 'Concurrencia', 'Microservicios',
+]
+
+CALIFICADORES = ['', 'Avanzado', 'en producción', 'para datos', 'Cloud', 'embebido', 'móvil', 'distribuido']
+
+VOCABULARIO = [
+    'índices', 'caché', 'concurrencia', 'transacciones', 'pruebas', 'despliegue', 'serialización',
+    'memoria', 'rendimiento', 'seguridad', 'patrones', 'colas', 'particionamiento', 'réplicas',
+    'validación', 'autenticación', 'migraciones', 'métricas', 'latencia', 'consistencia', 'bloqueos',
+    'algoritmo', 'estructura', 'función', 'módulo', 'paquete', 'excepción', 'depuración', 'código',
+    'diseño', 'interfaz', 'servicio', 'contenedor', 'orquestación', 'configuración', 'aplicación',
+    'compilación', 'ejecución', 'paralelismo', 'sincronización', 'optimización', 'compresión',
+    'búsqueda', 'ordenación', 'recursión', 'iteración', 'herencia', 'composición', 'abstracción',
+    'encapsulación', 'polimorfismo', 'dependencias', 'versionado', 'integración', 'revisión',
+    'documentación', 'monitoreo', 'alertas', 'trazas', 'errores', 'reintentos', 'límites', 'cuotas',
+    'sesiones', 'tokens', 'permisos', 'auditoría', 'respaldo', 'recuperación', 'escalabilidad',
+    'disponibilidad', 'tolerancia', 'fallos', 'red', 'protocolo', 'petición', 'respuesta', 'esquema',
+    'consulta', 'tabla', 'vista', 'procedimiento', 'evento', 'mensaje', 'lote', 'flujo', 'tubería',
+]
+
+CONECTORES = ['de', 'en', 'con', 'para', 'y', 'sobre', 'entre', 'sin', 'mediante', 'durante']
+
+INICIOS = [
+    '¿Qué es', '¿Cómo implementarías', '¿Cuándo usarías', 'Explica', 'Describe',
+    '¿Qué diferencias hay entre', '¿Cómo optimizarías', '¿Qué problemas has resuelto con',
+    '¿Cómo probarías', '¿Qué riesgos tiene', 'Compara', '¿Cómo depurarías',
+]
+
+# Reformulaciones para producir casi duplicados de una pregunta ya generada
+_REFORMULACIONES = (
+    lambda texto: texto.rstrip('?') + ' en detalle?',
+    lambda texto: 'Pregunta: ' + texto,
+    lambda texto: texto + ' Da un ejemplo.',
+    lambda texto: texto.lower(),
+)
+
+
+def quitar_acentos(palabra: str) -> str:
+    descompuesto = unicodedata.normalize('NFD', palabra)
+    return unicodedata.normalize('NFC', ''.join(c for c in descompuesto if not unicodedata.combining(c)))
+
+
+def nombres_habilidades(cantidad: int) -> list:
+    """Nombres realistas; a partir de la base se combinan con calificadores y, si faltan, un sufijo"""
+    nombres = []
+    for calificador in CALIFICADORES:
+        for base in HABILIDADES_BASE:
+            nombres.append(f"{base} {calificador}".strip())
+            if len(nombres) == cantidad:
+                return nombres
+
+    sufijo = 2
+    while len(nombres) < cantidad:
+        nombres.append(f"{HABILIDADES_BASE[len(nombres) % len(HABILIDADES_BASE)]} {sufijo}")
+        sufijo += 1
+    return nombres
+
+
+def generar_banco(total: int, habilidades: int = 200, semilla: int = 42,
+                  distribucion_niveles: Sequence[float] = (0.3, 0.5, 0.2),
+                  longitud_media: int = 14, proporcion_duplicados: float = 0.02,
+                  densidad_acentos: float = 0.8) -> Iterator[Tuple[str, str, str, str, str]]:
+    """
+    Genera (habilidad, pregunta, tipo, nivel, categoria) de forma determinista.
+
+    distribucion_niveles: pesos de basico/intermedio/avanzado
+    longitud_media: palabras por pregunta (distribución log-normal, de 5 a 80)
+    proporcion_duplicados: fracción de preguntas que reformulan una anterior de su habilidad
+    densidad_acentos: probabilidad de que una palabra acentuada conserve sus tildes
+    """
+    rng = random.Random(semilla)
+    nombres = nombres_habilidades(habilidades)
+    sigma = 0.45
+    mu = math.log(longitud_media) - sigma ** 2 / 2
+    ultima_por_habilidad: Dict[str, str] = {}
+    # Popularidad desigual (tipo Zipf), como en un banco real
+    acumulados = list(itertools.accumulate(1 / (k + 1) ** 0.8 for k in range(habilidades)))
+
+    def acentuar(palabra: str) -> str:
+        return palabra if rng.random() < densidad_acentos else quitar_acentos(palabra)
+
+    for i in range(total):
+        # La primera vuelta cubre todas las habilidades; luego se reparte según popularidad
+        habilidad = nombres[i] if i < habilidades else rng.choices(nombres, cum_weights=acumulados)[0]
+        nivel = rng.choices(NIVELES, weights=distribucion_niveles)[0]
+
+        anterior = ultima_por_habilidad.get(habilidad)
+        if anterior and rng.random() < proporcion_duplicados:
+            pregunta = rng.choice(_REFORMULACIONES)(anterior)
+        else:
+            largo = max(5, min(80, int(rng.lognormvariate(mu, sigma))))
+            palabras = [rng.choice(INICIOS), acentuar(rng.choice(VOCABULARIO))]
+            while len(palabras) < largo:
+                palabras.append(rng.choice(CONECTORES))
+                palabras.append(acentuar(rng.choice(VOCABULARIO)))
+            pregunta = ' '.join(palabras) + f' en {habilidad}'
+            pregunta += '?' if pregunta.startswith('¿') else '.'
+            ultima_por_habilidad[habilidad] = pregunta
+
+        yield habilidad, pregunta, rng.choice(TIPOS), nivel, rng.choices(CATEGORIAS, weights=(8, 1, 1))[0]
+
+
+def escribir_ndjson(filas, ruta: str) -> int:
+    """Vuelca el banco a NDJSON (comprimido con gzip si la ruta termina en .gz)"""
+    abrir = gzip.open if ruta.endswith('.gz') else open
+    total = 0
+    with abrir(ruta, 'wt', encoding='utf-8') as f:
+        for habilidad, pregunta, tipo, nivel, categoria in filas:
+            f.write(json.dumps({'habilidad': habilidad, 'pregunta': pregunta, 'tipo': tipo,
+                                'nivel': nivel, 'categoria': categoria}, ensure_ascii=False))
+            f.write('\n')
+            total += 1
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generador de bancos de preguntas sintéticos')
+    parser.add_argument('--total', type=int, default=10000)
+    parser.add_argument('--habilidades', type=int, default=200)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--niveles', default='0.3,0.5,0.2', help='Pesos de basico,intermedio,avanzado')
+    parser.add_argument('--longitud-media', type=int, default=14, help='Palabras por pregunta')
+    parser.add_argument('--duplicados', type=float, default=0.02, help='Proporción de casi duplicados')
+    parser.add_argument('--acentos', type=float, default=0.8, help='Probabilidad de conservar tildes')
+    parser.add_argument('--cargar', action='store_true', help='Cargar en la base de datos configurada')
+    parser.add_argument('--salida', help='Archivo NDJSON (.gz para comprimir)')
+    args = parser.parse_args()
+
+    if not args.cargar and not args.salida:
+        parser.error('Indica --cargar y/o --salida')
+
+    def filas():
+        return generar_banco(args.total, args.habilidades, args.semilla,
+                             [float(p) for p in args.niveles.split(',')],
+                             args.longitud_media, args.duplicados, args.acentos)
+
+    if args.salida:
+        inicio = time.perf_counter()
+        total = escribir_ndjson(filas(), args.salida)
+        print(f"✅ {total} preguntas escritas en {args.salida} ({time.perf_counter() - inicio:.1f} s)")
+
+    if args.cargar:
+        from fragmentacion import crear_gestor_bd
+
+        db = crear_gestor_bd()
+        inicio = time.perf_counter()
+        total = db.agregar_preguntas_lote(filas())
+        duracion = time.perf_counter() - inicio
+        print(f"✅ {total} preguntas cargadas en {duracion:.1f} s ({total / duracion:.0f} preguntas/s)")
+        db.cerrar_conexion()
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,8 @@ import sqlite3
 import os
 from datetime import datetime
 
+from migraciones import EjecutorMigraciones
+
 
 def escapar_sql(texto):
     """Escapar comillas simples para SQL"""
@@ -37,17 +39,18 @@ def generar_sql_migracion(sqlite_path, sql_output):
             print("❌ Tabla 'preguntas' no encontrada en SQLite")
             return False
 
-        # Obtener estructura de la tabla y determinar columnas disponibles
-        cursor.execute("PRAGMA table_info(preguntas)")
-        columnas = cursor.fetchall()
-        columnas_nombres = [col[1] for col in columnas]
-
-        print(f"📋 Estructura de tabla encontrada: {len(columnas)} columnas")
-        print(f"📋 Columnas disponibles: {', '.join(columnas_nombres)}")
-
-        # Verificar qué columnas existen
-        tiene_categoria = 'categoria' in columnas_nombres
-        tiene_tipo = 'tipo' in columnas_nombres
+        # Con schema_version las columnas son las del esquema versionado (tipo y
+        # categoria existen desde la versión 1); solo las bases previas se inspeccionan
+        version_esquema = EjecutorMigraciones(conn, 'sqlite').version_actual()
+        if version_esquema >= 1:
+            print(f"📋 Esquema versionado: versión {version_esquema}")
+            tiene_categoria = tiene_tipo = True
+        else:
+            cursor.execute("PRAGMA table_info(preguntas)")
+            columnas_nombres = [col[1] for col in cursor.fetchall()]
+            print(f"📋 Base sin schema_version, columnas disponibles: {', '.join(columnas_nombres)}")
+            tiene_categoria = 'categoria' in columnas_nombres
+            tiene_tipo = 'tipo' in columnas_nombres
 
         # Obtener todos los datos con las columnas disponibles
         if tiene_categoria and tiene_tipo:
@@ -75,6 +78,7 @@ def generar_sql_migracion(sqlite_path, sql_output):
             f.write("-- =====================================================\n")
             f.write(f"-- Generado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write(f"-- Origen: {sqlite_path}\n")
+            f.write(f"-- Versión de esquema de origen: {version_esquema or 'sin versionar'}\n")
             f.write(f"-- Total registros: {total_registros}\n")
             f.write("-- =====================================================\n\n")
 
@@ -97,7 +101,9 @@ def generar_sql_migracion(sqlite_path, sql_output):
             f.write("CREATE INDEX IF NOT EXISTS idx_nivel ON preguntas(nivel);\n")
             f.write("CREATE INDEX IF NOT EXISTS idx_tipo ON preguntas(tipo);\n")
             f.write(
-                "CREATE INDEX IF NOT EXISTS idx_full_search ON preguntas USING gin(to_tsvector('spanish', pregunta));\n\n")
+                "CREATE INDEX IF NOT EXISTS idx_full_search ON preguntas USING gin(to_tsvector('spanish', pregunta));\n")
+            f.write("-- El resto del esquema (firmas MinHash, índices compuestos) lo aplica\n")
+            f.write("-- migraciones.py en línea al arrancar la aplicación contra esta base\n\n")
 
             # Limpiar datos existentes (opcional)
             f.write("-- Opcional: Limpiar datos existentes\n")
@@ -118,14 +124,6 @@ def generar_sql_migracion(sqlite_path, sql_output):
                 f.write(f"-- HABILIDAD: {habilidad.upper()}\n")
                 f.write(f"-- ===============================\n\n")
 
-                # Obtener estructura real de la tabla primero
-                cursor.execute("PRAGMA table_info(preguntas)")
-                columnas_info = {col[1]: col[2] for col in cursor.fetchall()}
-
-                # Determinar qué columnas existen
-                tiene_categoria = 'categoria' in columnas_info
-                tiene_tipo = 'tipo' in columnas_info
-
                 # Construir query según columnas disponibles
                 if tiene_categoria and tiene_tipo:
                     query = "SELECT habilidad, pregunta, tipo, nivel, categoria FROM preguntas WHERE habilidad = ? ORDER BY nivel, pregunta"
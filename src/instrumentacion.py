@@ -0,0 +1,407 @@
+"""
+Instrumentación de consultas del DatabaseManager
+Mide latencia, filas y tiempo de adquisición de conexión por consulta,
+y registra las consultas lentas (con parámetros ocultos y su plan EXPLAIN)
+"""
+
+import functools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+logger_lentas = logging.getLogger('preguntas.consultas_lentas')
+
+# Límites superiores (ms) de los buckets del histograma, como en Prometheus
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+_ESPACIOS = re.compile(r'\s+')
+_COMENTARIOS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_TABLA = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?"?(\w+)', re.I)
+
+# Sentencias cuyo verbo solo se entiende con la palabra siguiente (create_index, drop_table)
+_VERBOS_COMPUESTOS = {'create', 'drop', 'alter'}
+
+
+def _sql_compacto(sql: str, limite: int = 500) -> str:
+    """SQL en una línea, recortado para el log"""
+    compacto = _ESPACIOS.sub(' ', sql).strip()
+    return compacto if len(compacto) <= limite else compacto[:limite] + '...'
+
+
+@functools.lru_cache(maxsize=1024)
+def huella_sql(sql: str) -> str:
+    """
+    Huella estable de una sentencia, sin literales ni parámetros: verbo y primera tabla
+    ('select_preguntas', 'create_index_preguntas', 'pragma')
+    """
+    limpio = _COMENTARIOS.sub(' ', sql)
+    palabras = limpio.split()
+    if not palabras:
+        return 'vacia'
+
+    verbo = palabras[0].lower()
+    if verbo in _VERBOS_COMPUESTOS and len(palabras) > 1:
+        siguiente = palabras[1].lower()
+        # CREATE UNIQUE INDEX / CREATE TEMP TABLE: cuenta el objeto, no el modificador
+        if siguiente in ('unique', 'temp', 'temporary') and len(palabras) > 2:
+            siguiente = palabras[2].lower()
+        verbo = f"{verbo}_{siguiente}"
+    verbo = re.sub(r'\W', '', verbo)
+
+    tabla = _TABLA.search(limpio)
+    return f"{verbo}_{tabla.group(1).lower()}" if tabla else verbo
+
+
+def redactar_parametros(params) -> List[str]:
+    """Sustituye cada parámetro por su tipo (y longitud si es texto o bytes)"""
+    if params is None:
+        return []
+    if isinstance(params, dict):
+        params = list(params.values())
+
+    redactados = []
+    for valor in params:
+        if isinstance(valor, (str, bytes, bytearray, memoryview)):
+            redactados.append(f"<{type(valor).__name__}:{len(valor)}>")
+        elif valor is None:
+            redactados.append("<null>")
+        else:
+            redactados.append(f"<{type(valor).__name__}>")
+    return redactados
+
+
+class HistogramaLatencia:
+    """Histograma acumulativo de latencias (no thread-safe: lo protege RegistroConsultas)"""
+
+    def __init__(self):
+        self.conteos = [0] * len(BUCKETS_MS)
+        self.total = 0
+        self.suma_ms = 0.0
+        self.maximo_ms = 0.0
+
+    def observar(self, duracion_ms: float):
+        for i, limite in enumerate(BUCKETS_MS):
+            if duracion_ms <= limite:
+                self.conteos[i] += 1
+                break
+        self.total += 1
+        self.suma_ms += duracion_ms
+        self.maximo_ms = max(self.maximo_ms, duracion_ms)
+
+    def percentil(self, p: float) -> float:
+        """Percentil aproximado: límite superior del bucket que lo contiene"""
+        if not self.total:
+            return 0.0
+        objetivo = p * self.total
+        acumulado = 0
+        for limite, conteo in zip(BUCKETS_MS, self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return self.maximo_ms if limite == float('inf') else limite
+        return self.maximo_ms
+
+    def a_dict(self) -> dict:
+        acumulado = 0
+        buckets = {}
+        for limite, conteo in zip(BUCKETS_MS, self.conteos):
+            acumulado += conteo
+            buckets['+Inf' if limite == float('inf') else str(limite)] = acumulado
+        return {
+            'total': self.total,
+            'suma_ms': round(self.suma_ms, 3),
+            'max_ms': round(self.maximo_ms, 3),
+            'p50_ms': self.percentil(0.50),
+            'p95_ms': self.percentil(0.95),
+            'p99_ms': self.percentil(0.99),
+            'buckets': buckets
+        }
+
+
+class RegistroConsultas:
+    """Agregados por nombre de consulta, seguro entre hilos"""
+
+    def __init__(self, umbral_lento_ms: float = 200.0, capturar_explain: bool = True,
+                 max_lentas: int = 100):
+        self.umbral_lento_ms = umbral_lento_ms
+        self.capturar_explain = capturar_explain
+        self._lock = threading.Lock()
+        self._por_consulta: Dict[str, dict] = {}
+        self._adquisicion = HistogramaLatencia()
+        self._lentas = deque(maxlen=max_lentas)
+
+    def registrar_adquisicion(self, duracion_s: float):
+        with self._lock:
+            self._adquisicion.observar(duracion_s * 1000)
+
+    def registrar_consulta(self, nombre: str, sql: str, params, duracion_s: float,
+                           filas: int, error: Optional[str] = None, explain=None):
+        """Acumula una ejecución; si es lenta la registra con parámetros redactados"""
+        duracion_ms = duracion_s * 1000
+
+        with self._lock:
+            datos = self._por_consulta.get(nombre)
+            if datos is None:
+                datos = {'histograma': HistogramaLatencia(), 'filas': 0, 'errores': 0}
+                self._por_consulta[nombre] = datos
+            datos['histograma'].observar(duracion_ms)
+            datos['filas'] += max(filas, 0)
+            if error:
+                datos['errores'] += 1
+
+        if duracion_ms < self.umbral_lento_ms:
+            return
+
+        plan = None
+        if explain is not None and self.capturar_explain and not error:
+            try:
+                plan = explain()
+            except Exception as e:
+                plan = f"EXPLAIN no disponible: {e}"
+
+        registro = {
+            'nombre': nombre,
+            'duracion_ms': round(duracion_ms, 3),
+            'filas': filas,
+            'sql': _sql_compacto(sql),
+            'parametros': redactar_parametros(params),
+            'plan': plan,
+            'error': error,
+            'timestamp': time.time()
+        }
+        with self._lock:
+            self._lentas.append(registro)
+
+        logger_lentas.warning(
+            "Consulta lenta %s: %.1f ms, %s filas | %s | params=%s%s",
+            nombre, duracion_ms, filas, registro['sql'], registro['parametros'],
+            f"\n{plan}" if plan else ''
+        )
+
+    def snapshot(self) -> dict:
+        """Copia de las métricas actuales"""
+        with self._lock:
+            consultas = {}
+            for nombre, datos in self._por_consulta.items():
+                resumen = datos['histograma'].a_dict()
+                resumen['filas'] = datos['filas']
+                resumen['errores'] = datos['errores']
+                consultas[nombre] = resumen
+            return {
+                'consultas': consultas,
+                'adquisicion_conexion': self._adquisicion.a_dict(),
+                'umbral_lento_ms': self.umbral_lento_ms
+            }
+
+    def consultas_lentas(self) -> List[dict]:
+        with self._lock:
+            return list(self._lentas)
+
+    def reiniciar(self):
+        with self._lock:
+            self._por_consulta.clear()
+            self._adquisicion = HistogramaLatencia()
+            self._lentas.clear()
+
+    def _tras_fork(self):
+        """En el hijo de un fork: empieza de cero, lo heredado ya lo cuenta el padre"""
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+
+class CursorInstrumentado:
+    """
+    Envuelve un cursor DB-API. El tiempo de una sentencia incluye sus fetch*,
+    porque SQLite ejecuta de forma perezosa al ir leyendo filas.
+    """
+
+    def __init__(self, cursor, conexion: 'ConexionInstrumentada'):
+        self._cursor = cursor
+        self._conexion = conexion
+        self._pendiente = None
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def _iniciar(self, nombre: str, sql, params):
+        self._finalizar()
+        # execute_values de psycopg2 envía bytes ya compuestos; el registro trabaja con texto
+        if isinstance(sql, (bytes, bytearray)):
+            sql = bytes(sql).decode('utf-8', 'replace')
+        elif not isinstance(sql, str):
+            sql = str(sql)
+        self._pendiente = {'nombre': nombre, 'sql': sql, 'params': params, 'duracion': 0.0, 'filas': 0}
+
+    def _finalizar(self, error: Optional[str] = None):
+        pendiente, self._pendiente = self._pendiente, None
+        if pendiente is None:
+            return
+
+        if pendiente['filas'] == 0 and self._cursor.rowcount and self._cursor.rowcount > 0:
+            pendiente['filas'] = self._cursor.rowcount
+
+        self._conexion.registro.registrar_consulta(
+            pendiente['nombre'], pendiente['sql'], pendiente['params'],
+            pendiente['duracion'], pendiente['filas'], error,
+            explain=lambda: self._conexion.explicar(pendiente['sql'], pendiente['params'])
+        )
+        if self._conexion.al_medir is not None and not error:
+            self._conexion.al_medir(pendiente['duracion'])
+
+    def _medir(self, funcion, *args):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args)
+        except Exception as e:
+            if self._pendiente is not None:
+                self._pendiente['duracion'] += time.perf_counter() - inicio
+            self._finalizar(error=type(e).__name__)
+            raise
+        finally:
+            if self._pendiente is not None:
+                self._pendiente['duracion'] += time.perf_counter() - inicio
+
+    def _nombre(self, nombre: Optional[str], sql) -> str:
+        # Por defecto: el método que la ejecuta más la huella de la sentencia, para que
+        # las distintas sentencias de un mismo método (o de EjecutorMigraciones.ejecutar)
+        # no compartan histograma
+        if nombre:
+            return nombre
+        metodo = sys._getframe(2).f_code.co_name
+        return f"{metodo}:{huella_sql(sql)}" if isinstance(sql, str) else metodo
+
+    def execute(self, sql, params=None, nombre: str = None):
+        self._iniciar(self._nombre(nombre, sql), sql, params)
+        if params is None:
+            self._medir(self._cursor.execute, sql)
+        else:
+            self._medir(self._cursor.execute, sql, params)
+        return self
+
+    def executemany(self, sql, seq_params, nombre: str = None):
+        seq_params = list(seq_params)
+        self._iniciar(self._nombre(nombre, sql), sql, seq_params[0] if seq_params else None)
+        self._medir(self._cursor.executemany, sql, seq_params)
+        self._finalizar()
+        return self
+
+    def fetchone(self):
+        fila = self._medir(self._cursor.fetchone)
+        if self._pendiente is not None:
+            if fila is None:
+                self._finalizar()
+            else:
+                self._pendiente['filas'] += 1
+        return fila
+
+    def fetchmany(self, size=None):
+        filas = self._medir(self._cursor.fetchmany, size) if size is not None \
+            else self._medir(self._cursor.fetchmany)
+        if self._pendiente is not None:
+            self._pendiente['filas'] += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._medir(self._cursor.fetchall)
+        if self._pendiente is not None:
+            self._pendiente['filas'] += len(filas)
+            self._finalizar()
+        return filas
+
+    def __iter__(self):
+        while True:
+            fila = self.fetchone()
+            if fila is None:
+                return
+            yield fila
+
+    def close(self):
+        self._finalizar()
+        self._cursor.close()
+
+
+class ConexionInstrumentada:
+    """Envuelve una conexión DB-API para que sus cursores queden instrumentados"""
+
+    def __init__(self, conexion, registro: RegistroConsultas, db_type: str, al_medir=None):
+        self._conexion = conexion
+        self.registro = registro
+        self._db_type = db_type
+        self._cursores = []
+        # al_medir(duracion_s) tras cada sentencia correcta (latencia de la réplica que la sirve)
+        self.al_medir = al_medir
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def __setattr__(self, nombre, valor):
+        # Atributos de la conexión real (p. ej. autocommit de psycopg2) se fijan en ella
+        if nombre in ('_conexion', 'registro', '_db_type', '_cursores', 'al_medir'):
+            object.__setattr__(self, nombre, valor)
+        else:
+            setattr(self._conexion, nombre, valor)
+
+    def cursor(self, *args, **kwargs):
+        cursor = CursorInstrumentado(self._conexion.cursor(*args, **kwargs), self)
+        self._cursores.append(cursor)
+        return cursor
+
+    def _finalizar_cursores(self):
+        for cursor in self._cursores:
+            cursor._finalizar()
+
+    def commit(self):
+        self._finalizar_cursores()
+        return self._conexion.commit()
+
+    def close(self):
+        self._finalizar_cursores()
+        self._cursores = []
+        return self._conexion.close()
+
+    def explicar(self, sql: str, params) -> Optional[str]:
+        """Plan de ejecución de una sentencia de lectura (solo SELECT/WITH)"""
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+
+        prefijo = 'EXPLAIN QUERY PLAN ' if self._db_type == 'sqlite' else 'EXPLAIN '
+        cursor = self._conexion.cursor()
+        try:
+            if params is None:
+                cursor.execute(prefijo + sql)
+            else:
+                cursor.execute(prefijo + sql, params)
+            return '\n'.join(' | '.join(str(c) for c in fila) for fila in cursor.fetchall())
+        finally:
+            cursor.close()
+
+
+# Registro compartido por todos los DatabaseManager del proceso. Arranca con los
+# valores por defecto: la configuración se aplica al crear el primer gestor
+registro_consultas = RegistroConsultas()
+_configurado = False
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registro_consultas._tras_fork)
+
+
+def configurar_desde_entorno():
+    """Aplica SLOW_QUERY_* de la configuración al registro global (una sola vez por proceso)"""
+    global _configurado
+    if _configurado:
+        return
+    _configurado = True
+
+    from config import DatabaseConfig
+
+    if DatabaseConfig.SLOW_QUERY_LOG_PATH and not logger_lentas.handlers:
+        manejador = logging.FileHandler(DatabaseConfig.SLOW_QUERY_LOG_PATH, encoding='utf-8')
+        manejador.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+        logger_lentas.addHandler(manejador)
+
+    registro_consultas.umbral_lento_ms = DatabaseConfig.SLOW_QUERY_MS
+    registro_consultas.capturar_explain = DatabaseConfig.SLOW_QUERY_EXPLAIN
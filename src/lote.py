@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Modo por lotes del Agente Entrevistador: miles de sets de preguntas sin interacción
+
+Para campañas de contratación: un archivo de trabajo lista perfiles de candidato
+(habilidades, nivel, preguntas por habilidad y cuántos sets de cada uno) y se generan
+todos en una pasada. El banco se lee una sola vez, un pool de (id, pregunta) por
+habilidad y nivel; los sets se muestrean en memoria en procesos paralelos y la salida
+se escribe bloque a bloque a medida que llegan, en el orden del trabajo.
+
+Cada set usa su propio random.Random(f"{semilla}:{perfil}:{set}"): con la misma
+semilla y el mismo banco la salida es idéntica sea cual sea el número de workers.
+
+Archivo de trabajo (JSON; los perfiles heredan nivel, cantidad y sets de la raíz):
+    {
+      "formato": "csv", "salida": "campana.csv", "semilla": 7, "cantidad": 2,
+      "perfiles": [
+        {"candidato": "Backend Sr", "habilidades": ["Python", "PostgreSQL", "Docker"],
+         "nivel": "avanzado", "cantidad": 3, "sets": 500},
+        {"candidato": "Generalista", "habilidades": "aleatorio:4", "sets": 200}
+      ]
+    }
+
+Uso:
+    python lote.py --trabajo campana.json
+    python lote.py --habilidades Python,Docker --nivel intermedio --sets 1000 --formato json
+    python agente.py --trabajo campana.json     # agente.py delega aquí si recibe argumentos
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from normalizacion import normalizar_texto
+
+FORMATOS = ('txt', 'json', 'csv')
+
+# Sets que genera cada tarea de un worker (y que se escriben de una vez)
+SETS_POR_BLOQUE = 250
+
+# Tareas en vuelo por worker: acota la memoria si la escritura va más lenta
+TAREAS_EN_VUELO_POR_WORKER = 2
+
+COLUMNAS_CSV = ['Candidato', 'Set', 'Nivel', 'Habilidad', 'Numero_Pregunta', 'Id', 'Pregunta']
+
+# Contexto de los procesos worker (pools y perfiles), fijado por _inicializar_worker
+_CONTEXTO = None
+
+
+def preguntas_genericas(habilidad: str) -> List[Tuple[Optional[int], str]]:
+    """Las mismas preguntas de respaldo que el modo interactivo, para habilidades sin banco"""
+    return [
+        (None, f"¿Cuál es tu experiencia trabajando con {habilidad}?"),
+        (None, f"Describe un proyecto donde hayas aplicado {habilidad} de manera efectiva")
+    ]
+
+
+def resolver_habilidades(especificacion, disponibles: List[str]) -> Tuple[List[str], int]:
+    """
+    Habilidades fijas de un perfil y cuántas elegir al azar en cada set.
+    Acepta una lista o un texto separado por comas, 'todas' y 'aleatorio:N'; los nombres
+    se resuelven como en el modo interactivo (exacto sin acentos, si no parcial).
+    """
+    if isinstance(especificacion, str):
+        especificacion = [parte.strip() for parte in especificacion.split(',') if parte.strip()]
+
+    habilidades, aleatorias = [], 0
+    for nombre in especificacion or []:
+        if nombre.lower() == 'todas':
+            habilidades.extend(disponibles)
+            continue
+        if nombre.lower().startswith('aleatorio:'):
+            aleatorias = int(nombre.split(':')[1])
+            continue
+
+        nombre_norm = normalizar_texto(nombre)
+        exactas = [h for h in disponibles if normalizar_texto(h) == nombre_norm]
+        coincidencias = exactas or [h for h in disponibles if nombre_norm in normalizar_texto(h)]
+        if coincidencias:
+            habilidades.extend(coincidencias)
+        else:
+            print(f"⚠️ No se encontró la habilidad: {nombre} (se usarán preguntas genéricas)")
+            habilidades.append(nombre)
+
+    # Sin duplicados, conservando el orden pedido
+    habilidades = list(dict.fromkeys(habilidades))
+    if not habilidades and not aleatorias:
+        raise ValueError(f"Perfil sin habilidades: {especificacion!r}")
+    return habilidades, aleatorias
+
+
+def cargar_trabajo(args) -> dict:
+    """Trabajo del archivo --trabajo o de los argumentos; los argumentos explícitos tienen prioridad"""
+    trabajo = {}
+    if args.trabajo:
+        with open(args.trabajo, 'r', encoding='utf-8') as f:
+            trabajo = json.load(f)
+    elif args.habilidades:
+        trabajo = {'perfiles': [{'candidato': args.candidato, 'habilidades': args.habilidades}]}
+    else:
+        raise ValueError("Indica --trabajo o --habilidades")
+
+    for clave in ('formato', 'salida', 'semilla', 'nivel', 'cantidad', 'sets'):
+        valor = getattr(args, clave)
+        if valor is not None:
+            trabajo[clave] = valor
+
+    trabajo.setdefault('formato', 'txt')
+    trabajo['formato'] = trabajo['formato'].lower()
+    if trabajo['formato'] not in FORMATOS:
+        raise ValueError(f"Formato '{trabajo['formato']}' no soportado. Use: {', '.join(FORMATOS)}")
+    trabajo.setdefault('semilla', random.randrange(2 ** 32))
+    trabajo.setdefault('salida', f"entrevistas_lote_{time.strftime('%Y%m%d_%H%M%S')}.{trabajo['formato']}")
+
+    if not trabajo.get('perfiles'):
+        raise ValueError("El trabajo no tiene perfiles")
+    return trabajo
+
+
+def preparar_perfiles(trabajo: dict, disponibles: List[str]) -> List[dict]:
+    """Perfiles completos: habilidades resueltas y valores heredados de la raíz del trabajo"""
+    perfiles = []
+    for i, perfil in enumerate(trabajo['perfiles'], 1):
+        habilidades, aleatorias = resolver_habilidades(perfil.get('habilidades'), disponibles)
+        perfiles.append({
+            'candidato': perfil.get('candidato') or f"perfil_{i}",
+            'habilidades': habilidades,
+            'aleatorias': aleatorias,
+            'nivel': perfil.get('nivel', trabajo.get('nivel')) or None,
+            'cantidad': int(perfil.get('cantidad', trabajo.get('cantidad', 2))),
+            'sets': int(perfil.get('sets', trabajo.get('sets', 1)))
+        })
+    return perfiles
+
+
+def cargar_pools(db, perfiles: List[dict], disponibles: List[str]) -> Dict[tuple, list]:
+    """Una lectura del banco por nivel pedido: {(habilidad, nivel): [(id, pregunta), ...]}"""
+    por_nivel = {}
+    for perfil in perfiles:
+        habilidades = por_nivel.setdefault(perfil['nivel'], set())
+        habilidades.update(perfil['habilidades'])
+        if perfil['aleatorias']:
+            habilidades.update(disponibles)
+
+    pools = {}
+    for nivel, habilidades in por_nivel.items():
+        for habilidad, pool in db.obtener_pool_preguntas(sorted(habilidades), nivel).items():
+            pools[(habilidad, nivel)] = pool
+    return pools
+
+
+def generar_set(perfil: dict, numero: int, pools: Dict[tuple, list],
+                disponibles: List[str], rng: random.Random) -> dict:
+    """Un set de entrevista: hasta `cantidad` preguntas distintas por habilidad"""
+    habilidades = list(perfil['habilidades'])
+    if perfil['aleatorias']:
+        restantes = [h for h in disponibles if h not in habilidades]
+        habilidades += rng.sample(restantes, min(perfil['aleatorias'], len(restantes)))
+
+    preguntas = {}
+    for habilidad in habilidades:
+        pool = pools.get((habilidad, perfil['nivel']))
+        preguntas[habilidad] = (rng.sample(pool, min(perfil['cantidad'], len(pool))) if pool
+                                else preguntas_genericas(habilidad))
+
+    return {
+        'candidato': perfil['candidato'],
+        'set': numero,
+        'nivel': perfil['nivel'] or 'todos',
+        'preguntas': preguntas
+    }
+
+
+def _formatear_txt(entrevista: dict) -> str:
+    lineas = [f"🎯 {entrevista['candidato']} · SET {entrevista['set']} · nivel {entrevista['nivel']}",
+              "=" * 65]
+    for habilidad, preguntas in entrevista['preguntas'].items():
+        lineas.append(f"\n🎯 {habilidad.upper()}:")
+        lineas.append("-" * (len(habilidad) + 5))
+        lineas.extend(f"  {i}. {pregunta}" for i, (_, pregunta) in enumerate(preguntas, 1))
+    return '\n'.join(lineas) + '\n\n'
+
+
+def _formatear_json(entrevista: dict) -> str:
+    datos = {
+        'candidato': entrevista['candidato'],
+        'set': entrevista['set'],
+        'nivel': entrevista['nivel'],
+        'preguntas_por_habilidad': {h: [pregunta for _, pregunta in preguntas]
+                                    for h, preguntas in entrevista['preguntas'].items()},
+        'ids_por_habilidad': {h: [pregunta_id for pregunta_id, _ in preguntas]
+                              for h, preguntas in entrevista['preguntas'].items()}
+    }
+    return json.dumps(datos, ensure_ascii=False)
+
+
+def _formatear_csv(entrevista: dict) -> str:
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator='\n')
+    for habilidad, preguntas in entrevista['preguntas'].items():
+        for i, (pregunta_id, pregunta) in enumerate(preguntas, 1):
+            escritor.writerow([entrevista['candidato'], entrevista['set'], entrevista['nivel'],
+                               habilidad, i, '' if pregunta_id is None else pregunta_id, pregunta])
+    return salida.getvalue()
+
+
+FORMATEADORES = {'txt': _formatear_txt, 'json': _formatear_json, 'csv': _formatear_csv}
+
+
+def _inicializar_worker(contexto: dict):
+    global _CONTEXTO
+    _CONTEXTO = contexto
+
+
+def _generar_bloque(tarea: Tuple[int, int, int]) -> Tuple[int, str]:
+    """Sets [desde, hasta) del perfil indicado, ya formateados para escribir de una vez"""
+    indice_perfil, desde, hasta = tarea
+    contexto = _CONTEXTO
+    perfil = contexto['perfiles'][indice_perfil]
+    formatear = FORMATEADORES[contexto['formato']]
+
+    partes = []
+    for numero in range(desde, hasta):
+        rng = random.Random(f"{contexto['semilla']}:{indice_perfil}:{numero}")
+        partes.append(formatear(generar_set(perfil, numero, contexto['pools'], contexto['disponibles'], rng)))
+
+    separador = ',\n' if contexto['formato'] == 'json' else ''
+    return hasta - desde, separador.join(partes)
+
+
+def _tareas(perfiles: List[dict]):
+    for indice, perfil in enumerate(perfiles):
+        for desde in range(1, perfil['sets'] + 1, SETS_POR_BLOQUE):
+            yield indice, desde, min(desde + SETS_POR_BLOQUE, perfil['sets'] + 1)
+
+
+def _bloques(contexto: dict, workers: int):
+    """Bloques generados en orden; en paralelo con una ventana acotada de tareas en vuelo"""
+    tareas = _tareas(contexto['perfiles'])
+    if workers <= 1:
+        _inicializar_worker(contexto)
+        yield from map(_generar_bloque, tareas)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker,
+                             initargs=(contexto,)) as ejecutor:
+        en_vuelo = deque()
+        for tarea in tareas:
+            en_vuelo.append(ejecutor.submit(_generar_bloque, tarea))
+            if len(en_vuelo) >= workers * TAREAS_EN_VUELO_POR_WORKER:
+                yield en_vuelo.popleft().result()
+        while en_vuelo:
+            yield en_vuelo.popleft().result()
+
+
+def escribir_lote(contexto: dict, salida, workers: int) -> int:
+    """Escribe todos los sets en `salida` (archivo abierto) a medida que se generan"""
+    formato = contexto['formato']
+    total_sets = sum(perfil['sets'] for perfil in contexto['perfiles'])
+
+    if formato == 'json':
+        metadata = {
+            'generado': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'semilla': contexto['semilla'],
+            'total_sets': total_sets,
+            'perfiles': [{clave: perfil[clave] for clave in ('candidato', 'nivel', 'cantidad', 'sets')}
+                         for perfil in contexto['perfiles']]
+        }
+        salida.write('{\n"metadata": ' + json.dumps(metadata, ensure_ascii=False) + ',\n"sets": [\n')
+    elif formato == 'csv':
+        csv.writer(salida, lineterminator='\n').writerow(COLUMNAS_CSV)
+    else:
+        salida.write("🎯 PREGUNTAS DE ENTREVISTA TÉCNICA (LOTE)\n")
+        salida.write("=" * 65 + "\n")
+        salida.write(f"Generado: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        salida.write(f"Perfiles: {len(contexto['perfiles'])} · Sets: {total_sets} · "
+                     f"Semilla: {contexto['semilla']}\n\n")
+
+    escritos, primero = 0, True
+    for cantidad, texto in _bloques(contexto, workers):
+        if formato == 'json' and not primero:
+            salida.write(',\n')
+        salida.write(texto)
+        primero = False
+        escritos += cantidad
+
+    if formato == 'json':
+        salida.write('\n]\n}\n')
+    elif formato == 'txt':
+        salida.write("--- Fin del documento ---\n")
+    return escritos
+
+
+def ejecutar_lote(trabajo: dict, db=None, workers: int = None) -> int:
+    """Genera el trabajo completo y retorna el número de sets escritos"""
+    if db is None:
+        from fragmentacion import crear_gestor_bd
+        db = crear_gestor_bd()
+
+    inicio = time.perf_counter()
+    disponibles = db.obtener_todas_habilidades()
+    perfiles = preparar_perfiles(trabajo, disponibles)
+    pools = cargar_pools(db, perfiles, disponibles)
+    preguntas_en_pool = sum(len(pool) for pool in pools.values())
+    print(f"📚 {preguntas_en_pool} preguntas en memoria para {len(pools)} habilidades/niveles "
+          f"({time.perf_counter() - inicio:.2f} s)")
+
+    contexto = {
+        'perfiles': perfiles,
+        'pools': pools,
+        'disponibles': disponibles,
+        'semilla': trabajo['semilla'],
+        'formato': trabajo['formato']
+    }
+    workers = workers or os.cpu_count() or 1
+
+    inicio = time.perf_counter()
+    with open(trabajo['salida'], 'w', encoding='utf-8', newline='') as f:
+        escritos = escribir_lote(contexto, f, workers)
+    duracion = time.perf_counter() - inicio
+
+    print(f"✅ {escritos} sets escritos en {trabajo['salida']} con {workers} workers "
+          f"({duracion:.1f} s, {escritos / max(duracion, 1e-9):.0f} sets/s)")
+    return escritos
+
+
+def construir_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Generación por lotes de sets de preguntas de entrevista')
+    parser.add_argument('--trabajo', help='Archivo JSON con los perfiles a generar')
+    parser.add_argument('--habilidades', help="Sin --trabajo: 'Python,Docker', 'todas' o 'aleatorio:N'")
+    parser.add_argument('--candidato', default='candidato', help='Nombre del perfil sin --trabajo')
+    parser.add_argument('--nivel', help='basico, intermedio o avanzado (por defecto todos)')
+    parser.add_argument('--cantidad', type=int, help='Preguntas por habilidad en cada set (2)')
+    parser.add_argument('--sets', type=int, help='Sets por perfil (1)')
+    parser.add_argument('--formato', choices=FORMATOS, help='txt (por defecto), json o csv')
+    parser.add_argument('--salida', help='Archivo de salida (por defecto entrevistas_lote_<fecha>.<formato>)')
+    parser.add_argument('--semilla', type=int, help='Semilla para reproducir un lote')
+    parser.add_argument('--workers', type=int, help='Procesos en paralelo (por defecto, uno por CPU)')
+    return parser
+
+
+def main(argv: List[str] = None):
+    parser = construir_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        trabajo = cargar_trabajo(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    try:
+        ejecutar_lote(trabajo, workers=args.workers)
+    except ValueError as e:
+        print(f"❌ Error en el trabajo: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Mide el arranque en frío de la CLI y de los workers WSGI
+Cada escenario corre en un intérprete nuevo varias veces; se informa la mediana y
+el p95 del tiempo total y el tiempo propio (por encima de un intérprete vacío).
+
+Uso:
+    python medir_arranque.py
+    python medir_arranque.py --repeticiones 20 --presupuesto-ms 100
+    python medir_arranque.py --detalle import_agente
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Lo que paga un worker que hereda las importaciones del maestro (gunicorn --preload):
+# solo la inicialización, medida dentro del proceso
+_INICIALIZACION_WORKER = (
+    "import time, app; inicio = time.perf_counter(); app.inicializar_sistema(); "
+    "print(f'{MARCA}{(time.perf_counter() - inicio) * 1000}')"
+)
+
+# Prefijo con el que un escenario informa su propio tiempo en lugar del tiempo de pared
+MARCA = 'TIEMPO_MS='
+
+# nombre -> código que ejecuta el intérprete nuevo
+ESCENARIOS = {
+    'interprete': 'pass',
+    'import_agente': 'import agente',
+    'import_app': 'import app',
+    'database_manager': 'from database_manager import DatabaseManager; DatabaseManager()',
+    'worker_wsgi': 'import wsgi',
+    'respawn_worker': _INICIALIZACION_WORKER.replace('{MARCA}', MARCA),
+}
+
+# Escenarios que cuentan para el presupuesto: importar Flask cuesta cientos de ms,
+# así que para los workers cuenta el respawn con las importaciones ya hechas
+CON_PRESUPUESTO = ('import_agente', 'database_manager', 'respawn_worker')
+
+# Escenarios que se miden dentro del proceso (no se les descuenta el intérprete)
+INTERNOS = ('respawn_worker',)
+
+
+def _percentil(ordenados, p: float) -> float:
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+def _entorno(ruta_db: str) -> dict:
+    entorno = dict(os.environ, SQLITE_PATH=ruta_db, PYTHONPATH=DIRECTORIO)
+    # Con bytecode en caché, como en producción (sin escribir dentro del repositorio)
+    entorno.pop('PYTHONDONTWRITEBYTECODE', None)
+    entorno.setdefault('PYTHONPYCACHEPREFIX', os.path.join(tempfile.gettempdir(), 'preguntas_pycache'))
+    return entorno
+
+
+def ejecutar(codigo: str, entorno: dict, cwd: str) -> float:
+    """Tiempo (ms) de un intérprete nuevo que ejecuta el código: el que informe o el de pared"""
+    inicio = time.perf_counter()
+    resultado = subprocess.run([sys.executable, '-c', codigo], env=entorno, cwd=cwd,
+                               capture_output=True, text=True)
+    duracion = (time.perf_counter() - inicio) * 1000
+    if resultado.returncode != 0:
+        raise RuntimeError(resultado.stderr.strip().splitlines()[-1] if resultado.stderr else 'error')
+
+    for linea in resultado.stdout.splitlines():
+        if linea.startswith(MARCA):
+            return float(linea[len(MARCA):])
+    return duracion
+
+
+def detalle_importaciones(codigo: str, entorno: dict, cwd: str, limite: int = 15):
+    """Módulos con mayor tiempo de importación acumulado (python -X importtime)"""
+    resultado = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], env=entorno, cwd=cwd,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    filas = []
+    for linea in resultado.stderr.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        propio, acumulado, modulo = linea[len('import time:'):].split('|')
+        filas.append((int(acumulado) / 1000, int(propio) / 1000, modulo.strip()))
+
+    print(f"\n🔍 Importaciones más costosas ({codigo})")
+    for acumulado, propio, modulo in sorted(filas, reverse=True)[:limite]:
+        print(f"   {acumulado:>8.1f} ms  (propio {propio:>6.1f} ms)  {modulo}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Arranque en frío de la CLI y los workers')
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--escenarios', default=','.join(ESCENARIOS),
+                        help='Escenarios separados por coma: ' + ', '.join(ESCENARIOS))
+    parser.add_argument('--presupuesto-ms', type=float,
+                        help='Falla (código 1) si el tiempo propio de la CLI o del respawn de un worker lo supera')
+    parser.add_argument('--detalle', choices=list(ESCENARIOS), help='Muestra el desglose de importaciones')
+    args = parser.parse_args()
+
+    # Copia de la base configurada: el primer arranque la inicializa y los demás
+    # deben medir el camino rápido, sin tocar la base de trabajo
+    temporal = tempfile.mkdtemp(prefix='arranque_')
+    ruta_db = os.path.join(temporal, 'preguntas.db')
+    original = os.path.join(DIRECTORIO, os.getenv('SQLITE_PATH', 'preguntas_entrevista.db'))
+    if os.path.exists(original):
+        shutil.copy(original, ruta_db)
+    entorno = _entorno(ruta_db)
+
+    try:
+        escenarios = [nombre.strip() for nombre in args.escenarios.split(',')]
+        if 'interprete' not in escenarios:
+            escenarios.insert(0, 'interprete')
+
+        medianas = {}
+        print(f"⏱️ Arranque en frío ({args.repeticiones} repeticiones, {sys.executable})")
+        for nombre in escenarios:
+            codigo = ESCENARIOS[nombre]
+            try:
+                ejecutar(codigo, entorno, temporal)  # calienta caché de bytecode e inicializa la BD
+                tiempos = sorted(ejecutar(codigo, entorno, temporal) for _ in range(args.repeticiones))
+            except RuntimeError as e:
+                print(f"   ❌ {nombre}: {e}")
+                continue
+
+            mediana = statistics.median(tiempos)
+            # Tiempo propio del escenario, sin el arranque del intérprete
+            medianas[nombre] = mediana if nombre in INTERNOS else mediana - medianas.get('interprete', 0)
+            print(f"   {nombre:<18} mediana {mediana:>7.1f} ms  p95 {_percentil(tiempos, 0.95):>7.1f} ms"
+                  f"  (propio {medianas[nombre]:.1f} ms)")
+
+        if args.detalle:
+            detalle_importaciones(ESCENARIOS[args.detalle], entorno, temporal)
+    finally:
+        shutil.rmtree(temporal, ignore_errors=True)
+
+    if args.presupuesto_ms is not None:
+        excedidos = [nombre for nombre in CON_PRESUPUESTO
+                     if medianas.get(nombre, 0) > args.presupuesto_ms]
+        if excedidos:
+            print(f"❌ Presupuesto de {args.presupuesto_ms:.0f} ms superado: {', '.join(excedidos)}")
+            sys.exit(1)
+        print(f"✅ Dentro del presupuesto de {args.presupuesto_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+"""
+Métricas de la aplicación en formato de texto de Prometheus
+Contadores, gauges e histogramas en memoria, seguros entre hilos y
+agregables entre procesos worker a través de un directorio compartido
+"""
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from instrumentacion import BUCKETS_MS, registro_consultas
+
+# Límites (s) de los histogramas de duración de peticiones y operaciones
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# Cada cuánto (s) un proceso vuelca sus métricas al directorio compartido
+INTERVALO_VOLCADO = 1.0
+
+# Descripción y tipo de cada métrica expuesta
+DESCRIPCIONES = {
+    'preguntas_http_peticiones_total': ('counter', 'Peticiones HTTP atendidas por ruta, método y estado'),
+    'preguntas_http_duracion_segundos': ('histogram', 'Duración de las peticiones HTTP por ruta'),
+    'preguntas_http_en_curso': ('gauge', 'Peticiones HTTP en curso'),
+    'preguntas_db_consulta_segundos': ('histogram', 'Duración de las consultas por método del DatabaseManager'),
+    'preguntas_db_consulta_filas_total': ('counter', 'Filas leídas o modificadas por consulta'),
+    'preguntas_db_consulta_errores_total': ('counter', 'Consultas que terminaron en error'),
+    'preguntas_db_conexion_segundos': ('histogram', 'Tiempo de apertura de conexiones a la base de datos'),
+    'preguntas_db_lecturas_total': ('counter', 'Conexiones de lectura por destino (réplica o primaria)'),
+    'preguntas_db_replica_fallos_total': ('counter', 'Conexiones fallidas a réplicas de lectura'),
+    'preguntas_db_replica_retrasada_total': ('counter', 'Lecturas desviadas a la primaria por retraso de la réplica'),
+    'preguntas_fragmentos_consultas_total': ('counter', 'Operaciones del banco fragmentado por modo (dirigida o difundida)'),
+    'preguntas_cache_consultas_total': ('counter', 'Consultas a los índices en memoria por resultado'),
+    'preguntas_cache_ratio_aciertos': ('gauge', 'Proporción de aciertos de cada caché (en memoria o en disco)'),
+    'preguntas_exportadas_total': ('counter', 'Preguntas exportadas por formato'),
+    'preguntas_exportacion_bytes_total': ('counter', 'Bytes generados por las exportaciones'),
+    'preguntas_exportacion_segundos': ('histogram', 'Duración de las exportaciones y backups'),
+    'preguntas_importadas_total': ('counter', 'Preguntas procesadas en importaciones por resultado'),
+    'preguntas_importacion_segundos': ('histogram', 'Duración de las importaciones'),
+    'preguntas_llm_total': ('counter', 'Preguntas generadas por el LLM para el banco por resultado'),
+    'preguntas_llm_reposicion_segundos': ('histogram', 'Duración de las rondas de reposición con el LLM'),
+    'preguntas_llm_primer_token_segundos': ('histogram', 'Tiempo hasta el primer token en la generación bajo demanda'),
+    'preguntas_sesiones_servidas_total': ('counter', 'Preguntas servidas en sesiones de entrevista (nuevas o repetidas)'),
+}
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+
+def _clave(etiquetas: dict) -> Etiquetas:
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _formatear_etiquetas(etiquetas: Etiquetas, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ''
+    valores = ','.join(
+        f'{k}="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in pares
+    )
+    return '{' + valores + '}'
+
+
+def _inicio_proceso(pid: int) -> Optional[str]:
+    """Instante de arranque del proceso según /proc (Linux); None si no se puede leer"""
+    try:
+        with open(f'/proc/{pid}/stat', encoding='utf-8') as f:
+            # El nombre va entre paréntesis y puede tener espacios: starttime es el campo 22
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _formatear_limite(limite: float) -> str:
+    return '+Inf' if limite == float('inf') else repr(float(limite))
+
+
+class RegistroMetricas:
+    """
+    Métricas del proceso actual. Cada operación toma un único lock durante
+    unas pocas sumas, así que es barata en el camino caliente de cada petición.
+    """
+
+    def __init__(self, directorio: str = None):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        self._contadores: Dict[str, Dict[Etiquetas, float]] = {}
+        self._gauges: Dict[str, Dict[Etiquetas, float]] = {}
+        # nombre -> etiquetas -> [conteos por bucket (no acumulados), suma, límites]
+        self._histogramas: Dict[str, Dict[Etiquetas, list]] = {}
+        self._ultimo_volcado = 0.0
+
+        # Identidad del proceso para el archivo de volcado: pid más su arranque (o un uuid),
+        # así un pid reutilizado no pisa el archivo de un worker que ya terminó
+        self._pid = None
+        self._inicio = None
+        self._token = None
+        # Archivos de procesos terminados cuyos contadores ya se sumaron a este registro
+        self._adoptados = set()
+
+    # ------------------------------------------------------------------ registro
+
+    def incrementar(self, nombre: str, valor: float = 1, **etiquetas):
+        clave = _clave(etiquetas)
+        with self._lock:
+            serie = self._contadores.setdefault(nombre, {})
+            serie[clave] = serie.get(clave, 0) + valor
+
+    def sumar_gauge(self, nombre: str, valor: float, **etiquetas):
+        clave = _clave(etiquetas)
+        with self._lock:
+            serie = self._gauges.setdefault(nombre, {})
+            serie[clave] = serie.get(clave, 0) + valor
+
+    def observar(self, nombre: str, valor: float, buckets=BUCKETS_SEGUNDOS, **etiquetas):
+        clave = _clave(etiquetas)
+        with self._lock:
+            serie = self._histogramas.setdefault(nombre, {})
+            datos = serie.get(clave)
+            if datos is None:
+                datos = serie[clave] = [[0] * len(buckets), 0.0, list(buckets)]
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    datos[0][i] += 1
+                    break
+            datos[1] += valor
+
+    # ------------------------------------------------------------------ snapshot
+
+    def snapshot(self) -> dict:
+        """Métricas propias más las de la instrumentación de consultas, en forma serializable"""
+        with self._lock:
+            contadores = {n: [[list(map(list, k)), v] for k, v in s.items()] for n, s in self._contadores.items()}
+            gauges = {n: [[list(map(list, k)), v] for k, v in s.items()] for n, s in self._gauges.items()}
+            histogramas = {n: [[list(map(list, k)), list(d[0]), d[1], d[2]] for k, d in s.items()]
+                           for n, s in self._histogramas.items()}
+
+        self._agregar_metricas_bd(contadores, histogramas)
+        self._identificar_proceso()
+        return {'pid': self._pid, 'inicio': self._inicio, 'adoptados': sorted(self._adoptados),
+                'contadores': contadores, 'gauges': gauges, 'histogramas': histogramas}
+
+    @staticmethod
+    def _agregar_metricas_bd(contadores: dict, histogramas: dict):
+        """Convierte el snapshot de instrumentacion (ms, buckets acumulados) a series en segundos"""
+        bd = registro_consultas.snapshot()
+        limites = [limite / 1000 for limite in BUCKETS_MS]
+
+        def desacumular(resumen):
+            acumulados = list(resumen['buckets'].values())
+            return [b - a for a, b in zip([0] + acumulados[:-1], acumulados)]
+
+        consultas = histogramas.setdefault('preguntas_db_consulta_segundos', [])
+        filas = contadores.setdefault('preguntas_db_consulta_filas_total', [])
+        errores = contadores.setdefault('preguntas_db_consulta_errores_total', [])
+        for nombre, resumen in bd['consultas'].items():
+            etiquetas = [['consulta', nombre]]
+            consultas.append([etiquetas, desacumular(resumen), resumen['suma_ms'] / 1000, limites])
+            filas.append([etiquetas, resumen['filas']])
+            errores.append([etiquetas, resumen['errores']])
+
+        conexion = bd['adquisicion_conexion']
+        histogramas['preguntas_db_conexion_segundos'] = [
+            [[], desacumular(conexion), conexion['suma_ms'] / 1000, limites]
+        ]
+
+    # ------------------------------------------------------------------ multiproceso
+
+    def _identificar_proceso(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            # Primera vez, o proceso hijo de un fork (_tras_fork ya vació lo heredado)
+            self._pid = pid
+            self._inicio = _inicio_proceso(pid)
+            self._token = self._inicio or uuid.uuid4().hex[:12]
+            self._adoptados = set()
+
+    def _ruta_proceso(self) -> str:
+        self._identificar_proceso()
+        return os.path.join(self.directorio, f"metricas_{self._pid}_{self._token}.json")
+
+    def volcar(self, forzar: bool = False):
+        """Escribe el snapshot del proceso en el directorio compartido (como mucho una vez por intervalo)"""
+        if not self.directorio:
+            return
+
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_volcado < INTERVALO_VOLCADO:
+            return
+        self._ultimo_volcado = ahora
+
+        # Los adoptados solo hace falta anunciarlos mientras su archivo siga existiendo
+        self._adoptados = {nombre for nombre in self._adoptados
+                           if os.path.exists(os.path.join(self.directorio, nombre))}
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            ruta = self._ruta_proceso()
+            temporal = f"{ruta}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudieron volcar las métricas: {e}")
+
+    @staticmethod
+    def _proceso_vivo(pid: int, inicio: str = None) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except OSError:
+            pass
+        # Mismo pid con otro arranque: el pid se reutilizó y aquel proceso ya terminó
+        return inicio is None or _inicio_proceso(pid) in (None, inicio)
+
+    def _adoptar(self, ruta: str, datos: dict) -> bool:
+        """
+        Suma a este registro los contadores e histogramas de un proceso terminado (sus
+        gauges se descartan) y borra su archivo. Un archivo de reserva creado con O_EXCL
+        garantiza que solo un proceso lo adopta; mientras el archivo exista, el volcado
+        propio lo anuncia en 'adoptados' para que nadie lo cuente dos veces.
+        """
+        reserva = f"{ruta}.adopcion"
+        try:
+            os.close(os.open(reserva, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except OSError:
+            return False
+
+        try:
+            with self._lock:
+                for nombre, series in datos['contadores'].items():
+                    serie = self._contadores.setdefault(nombre, {})
+                    for etiquetas, valor in series:
+                        clave = tuple(tuple(par) for par in etiquetas)
+                        serie[clave] = serie.get(clave, 0) + valor
+                for nombre, series in datos['histogramas'].items():
+                    serie = self._histogramas.setdefault(nombre, {})
+                    for etiquetas, conteos, suma, limites in series:
+                        clave = tuple(tuple(par) for par in etiquetas)
+                        actual = serie.get(clave)
+                        if actual is None:
+                            serie[clave] = [list(conteos), suma, list(limites)]
+                        else:
+                            actual[0] = [a + b for a, b in zip(actual[0], conteos)]
+                            actual[1] += suma
+                self._adoptados.add(os.path.basename(ruta))
+                self._adoptados.update(datos.get('adoptados', ()))
+
+            self.volcar(forzar=True)
+            os.remove(ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudieron adoptar las métricas de {ruta}: {e}")
+        finally:
+            try:
+                os.remove(reserva)
+            except OSError:
+                pass
+        return True
+
+    def _snapshots(self) -> list:
+        """
+        Snapshot propio (en vivo) más los de los demás procesos del directorio. Los
+        archivos de procesos terminados se pliegan en este registro al encontrarlos.
+        """
+        if not self.directorio:
+            return [self.snapshot()]
+
+        propio = self._ruta_proceso()
+        otros = []
+        for ruta in glob.glob(os.path.join(self.directorio, 'metricas_*.json')):
+            if ruta == propio:
+                continue
+            try:
+                with open(ruta, encoding='utf-8') as f:
+                    datos = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if (self._proceso_vivo(datos.get('pid', 0), datos.get('inicio'))
+                    or not self._adoptar(ruta, datos)):
+                otros.append((os.path.basename(ruta), datos))
+
+        snapshots = [self.snapshot()]
+        adoptados = set(snapshots[0]['adoptados'])
+        for _, datos in otros:
+            adoptados.update(datos.get('adoptados', ()))
+        for nombre, datos in otros:
+            if nombre in adoptados:
+                continue
+            # Terminado pero adoptado por otro proceso en este momento: sus gauges no cuentan
+            if not self._proceso_vivo(datos.get('pid', 0), datos.get('inicio')):
+                datos['gauges'] = {}
+            snapshots.append(datos)
+        return snapshots
+
+    # ------------------------------------------------------------------ exposición
+
+    def exportar_prometheus(self) -> str:
+        """Texto de exposición de Prometheus agregando todos los procesos"""
+        contadores, gauges, histogramas = {}, {}, {}
+
+        for datos in self._snapshots():
+            for destino, origen in ((contadores, datos['contadores']), (gauges, datos['gauges'])):
+                for nombre, series in origen.items():
+                    serie = destino.setdefault(nombre, {})
+                    for etiquetas, valor in series:
+                        clave = tuple(tuple(par) for par in etiquetas)
+                        serie[clave] = serie.get(clave, 0) + valor
+
+            for nombre, series in datos['histogramas'].items():
+                serie = histogramas.setdefault(nombre, {})
+                for etiquetas, conteos, suma, limites in series:
+                    clave = tuple(tuple(par) for par in etiquetas)
+                    actual = serie.get(clave)
+                    if actual is None:
+                        serie[clave] = [list(conteos), suma, limites]
+                    else:
+                        actual[0] = [a + b for a, b in zip(actual[0], conteos)]
+                        actual[1] += suma
+
+        gauges['preguntas_cache_ratio_aciertos'] = self._ratios_cache(
+            contadores.get('preguntas_cache_consultas_total', {}))
+
+        lineas = []
+        for nombre in sorted(set(contadores) | set(gauges) | set(histogramas)):
+            tipo, ayuda = DESCRIPCIONES.get(nombre, ('untyped', nombre))
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+            if nombre in histogramas:
+                for etiquetas, (conteos, suma, limites) in sorted(histogramas[nombre].items()):
+                    acumulado = 0
+                    for limite, conteo in zip(limites, conteos):
+                        acumulado += conteo
+                        le = (('le', _formatear_limite(limite)),)
+                        lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, le)} {acumulado}")
+                    lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {suma}")
+                    lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {acumulado}")
+            else:
+                series = contadores.get(nombre) or gauges.get(nombre, {})
+                for etiquetas, valor in sorted(series.items()):
+                    lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {valor}")
+
+        return '\n'.join(lineas) + '\n'
+
+    @staticmethod
+    def _ratios_cache(series: dict) -> dict:
+        """
+        Aciertos / total por caché a partir de preguntas_cache_consultas_total. Cargar el
+        índice desde disco ('disco') también es un acierto: no hubo que reconstruirlo.
+        """
+        totales, aciertos = {}, {}
+        for etiquetas, valor in series.items():
+            etiquetas = dict(etiquetas)
+            cache = etiquetas.get('cache', '')
+            totales[cache] = totales.get(cache, 0) + valor
+            if etiquetas.get('resultado') in ('acierto', 'disco'):
+                aciertos[cache] = aciertos.get(cache, 0) + valor
+        return {(('cache', cache),): round(aciertos.get(cache, 0) / total, 4)
+                for cache, total in totales.items() if total}
+
+    def reiniciar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._gauges.clear()
+            self._histogramas.clear()
+            self._adoptados.clear()
+
+    def _tras_fork(self):
+        """
+        En el hijo de un fork: lo heredado lo sigue contando (y volcando) el padre, así que
+        el hijo empieza de cero. El lock se recrea por si otro hilo lo tenía al hacer fork
+        """
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+
+# Registro compartido por la aplicación y el DatabaseManager. El directorio
+# compartido se lee de la configuración al crear el primer gestor
+metricas = RegistroMetricas()
+_configurado = False
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=metricas._tras_fork)
+
+
+def configurar_desde_entorno():
+    """Aplica METRICAS_DIR al registro global (una sola vez por proceso)"""
+    global _configurado
+    if _configurado:
+        return
+    _configurado = True
+
+    from config import DatabaseConfig
+
+    if metricas.directorio is None and DatabaseConfig.METRICAS_DIR:
+        metricas.directorio = DatabaseConfig.METRICAS_DIR
+        # Último volcado al terminar, para no perder lo acumulado desde el anterior
+        atexit.register(metricas.volcar, True)
@@ -0,0 +1,428 @@
+"""
+Migraciones versionadas del esquema de la base de preguntas
+Cada migración se aplica una sola vez y queda registrada en schema_version.
+Se ejecutan en línea, sin bloquear a los lectores: en PostgreSQL los índices se
+crean con CREATE INDEX CONCURRENTLY y el DDL espera el lock como mucho
+LOCK_TIMEOUT; en SQLite la base pasa a modo WAL y los rellenos y limpiezas se
+hacen por lotes, con un commit por lote.
+"""
+
+import time
+from typing import Callable, List, Optional, Tuple
+
+# Filas por lote en rellenos y limpiezas de SQLite
+TAMANO_LOTE_MIGRACION = 1000
+
+# Espera máxima por el lock de una tabla en PostgreSQL: mejor fallar y reintentar
+# al arrancar el siguiente proceso que encolar detrás a todas las lecturas
+LOCK_TIMEOUT = '5s'
+
+# Clave del advisory lock que serializa las migraciones entre procesos (PostgreSQL)
+CLAVE_LOCK_MIGRACIONES = 7301
+
+# (version, nombre, función); se registran con el decorador @migracion
+MIGRACIONES: List[Tuple[int, str, Callable]] = []
+
+
+def migracion(version: int, nombre: str):
+    """Registra una función f(ejecutor) como la migración `version`"""
+    def registrar(funcion):
+        MIGRACIONES.append((version, nombre, funcion))
+        MIGRACIONES.sort(key=lambda m: m[0])
+        return funcion
+    return registrar
+
+
+def ultima_version() -> int:
+    return MIGRACIONES[-1][0] if MIGRACIONES else 0
+
+
+class EjecutorMigraciones:
+    """Aplica las migraciones pendientes sobre una conexión y ofrece las operaciones en línea"""
+
+    def __init__(self, conexion, db_type: str, tamano_lote: int = TAMANO_LOTE_MIGRACION):
+        self.conexion = conexion
+        self.db_type = db_type
+        self.tamano_lote = tamano_lote
+        self.placeholder = '%s' if db_type == 'postgresql' else '?'
+
+    # ------------------------------------------------------------------ versión
+
+    def version_actual(self) -> int:
+        """Última versión aplicada (0 si la base no tiene schema_version)"""
+        cursor = self.conexion.cursor()
+        if self.db_type == 'postgresql':
+            cursor.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+        else:
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+        if not cursor.fetchone()[0]:
+            cursor.close()
+            return 0
+
+        cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+        version = cursor.fetchone()[0]
+        cursor.close()
+        return version
+
+    def pendientes(self) -> List[Tuple[int, str, Callable]]:
+        actual = self.version_actual()
+        return [m for m in MIGRACIONES if m[0] > actual]
+
+    def aplicar(self) -> List[int]:
+        """
+        Aplica en orden las migraciones pendientes y retorna sus versiones.
+        Cada paso es idempotente: si un proceso se interrumpe, el siguiente retoma
+        desde la última migración registrada.
+        """
+        es_postgresql = self.db_type == 'postgresql'
+        aplicadas = []
+
+        if es_postgresql:
+            # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+            self.conexion.commit()
+            self.conexion.autocommit = True
+            self.ejecutar(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+            self.ejecutar('SELECT pg_advisory_lock(%s)', (CLAVE_LOCK_MIGRACIONES,))
+
+        try:
+            self._crear_tabla_versiones()
+            for version, nombre, funcion in self.pendientes():
+                inicio = time.perf_counter()
+                print(f"🔧 Aplicando migración {version}: {nombre}")
+                funcion(self)
+                duracion_ms = (time.perf_counter() - inicio) * 1000
+                self.ejecutar(f'''
+                    INSERT INTO schema_version (version, nombre, duracion_ms)
+                    VALUES ({self.placeholder}, {self.placeholder}, {self.placeholder})
+                    ON CONFLICT (version) DO NOTHING
+                ''', (version, nombre, round(duracion_ms, 1)))
+                self.conexion.commit()
+                aplicadas.append(version)
+        finally:
+            if es_postgresql:
+                self.ejecutar('SELECT pg_advisory_unlock(%s)', (CLAVE_LOCK_MIGRACIONES,))
+                self.ejecutar('RESET lock_timeout')
+                self.conexion.autocommit = False
+
+        return aplicadas
+
+    def _crear_tabla_versiones(self):
+        self.ejecutar('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                nombre TEXT NOT NULL,
+                aplicada TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                duracion_ms REAL
+            )
+        ''')
+        self.conexion.commit()
+
+    # ------------------------------------------------------------------ operaciones
+
+    def ejecutar(self, sql: str, params=None):
+        cursor = self.conexion.cursor()
+        if params is None:
+            cursor.execute(sql)
+        else:
+            cursor.execute(sql, params)
+        cursor.close()
+
+    def existe_columna(self, tabla: str, columna: str) -> bool:
+        cursor = self.conexion.cursor()
+        if self.db_type == 'postgresql':
+            cursor.execute('''
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = %s AND column_name = %s
+            ''', (tabla, columna))
+            existe = cursor.fetchone() is not None
+        else:
+            cursor.execute(f'PRAGMA table_info({tabla})')
+            existe = any(fila[1] == columna for fila in cursor.fetchall())
+        cursor.close()
+        return existe
+
+    def agregar_columna(self, tabla: str, columna: str, definicion: str):
+        """
+        Agrega una columna si no existe. Sin DEFAULT volátil es solo un cambio de
+        catálogo en ambos motores (no reescribe la tabla); los valores de las filas
+        existentes se completan después con procesar_por_lotes.
+        """
+        if not self.existe_columna(tabla, columna):
+            self.ejecutar(f'ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}')
+            self.conexion.commit()
+
+    def crear_indice(self, nombre: str, tabla: str, columnas: str, unico: bool = False,
+                     metodo: str = None):
+        """Crea un índice sin bloquear la tabla (CONCURRENTLY en PostgreSQL)"""
+        unique = 'UNIQUE ' if unico else ''
+        usando = f' USING {metodo}' if metodo else ''
+
+        if self.db_type != 'postgresql':
+            self.ejecutar(f'CREATE {unique}INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})')
+            self.conexion.commit()
+            return
+
+        particiones = self._particiones(tabla)
+        if particiones is None:
+            self._descartar_indice_invalido(nombre)
+            self.ejecutar(f'CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {nombre} '
+                          f'ON {tabla}{usando} ({columnas})')
+            return
+
+        # Tabla particionada (fragmentacion.py): la tabla padre no admite CONCURRENTLY.
+        # Índice vacío ON ONLY en la padre, uno concurrente por partición y ATTACH de
+        # cada uno; el de la padre queda válido al adjuntar la última partición
+        self.ejecutar(f'CREATE {unique}INDEX IF NOT EXISTS {nombre} ON ONLY {tabla}{usando} ({columnas})')
+        for particion in particiones:
+            nombre_particion = f'{nombre}_{particion}'[:63]
+            self._descartar_indice_invalido(nombre_particion)
+            self.ejecutar(f'CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {nombre_particion} '
+                          f'ON {particion}{usando} ({columnas})')
+            self.ejecutar(f'ALTER INDEX {nombre} ATTACH PARTITION {nombre_particion}')
+
+    def _particiones(self, tabla: str) -> Optional[List[str]]:
+        """Particiones de una tabla de PostgreSQL; None si no está particionada"""
+        cursor = self.conexion.cursor()
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (tabla,))
+        fila = cursor.fetchone()
+        if fila is None or fila[0] != 'p':
+            cursor.close()
+            return None
+
+        cursor.execute('''
+            SELECT c.relname FROM pg_inherits h
+            JOIN pg_class c ON c.oid = h.inhrelid
+            WHERE h.inhparent = to_regclass(%s)
+            ORDER BY c.relname
+        ''', (tabla,))
+        particiones = [fila[0] for fila in cursor.fetchall()]
+        cursor.close()
+        return particiones
+
+    def _descartar_indice_invalido(self, nombre: str):
+        """Un CREATE INDEX CONCURRENTLY interrumpido deja el índice marcado como inválido"""
+        cursor = self.conexion.cursor()
+        cursor.execute('''
+            SELECT i.indisvalid FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s
+        ''', (nombre,))
+        fila = cursor.fetchone()
+        cursor.close()
+        if fila is not None and not fila[0]:
+            print(f"⚠️ Índice {nombre} inválido de un intento anterior, se reconstruye")
+            self.ejecutar(f'DROP INDEX CONCURRENTLY IF EXISTS {nombre}')
+
+    def eliminar_indice(self, nombre: str):
+        if self.db_type == 'postgresql':
+            # Los índices de tablas particionadas (relkind 'I') no admiten CONCURRENTLY
+            cursor = self.conexion.cursor()
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (nombre,))
+            fila = cursor.fetchone()
+            cursor.close()
+            concurrente = '' if fila and fila[0] == 'I' else 'CONCURRENTLY '
+            self.ejecutar(f'DROP INDEX {concurrente}IF EXISTS {nombre}')
+        else:
+            self.ejecutar(f'DROP INDEX IF EXISTS {nombre}')
+            self.conexion.commit()
+
+    def procesar_por_lotes(self, consulta: str, procesar: Callable, params: tuple = ()) -> int:
+        """
+        Ejecuta `consulta` (un SELECT de filas pendientes con LIMIT {lote}) y pasa
+        cada lote a procesar(cursor, filas), con un commit por lote, hasta que no
+        queden filas. `procesar` debe dejar de devolver en la consulta las filas que
+        ya trató. Retorna el total de filas procesadas.
+        """
+        total = 0
+        consulta = consulta.format(lote=self.tamano_lote)
+        while True:
+            cursor = self.conexion.cursor()
+            cursor.execute(consulta, params)
+            filas = cursor.fetchall()
+            if not filas:
+                cursor.close()
+                break
+            procesar(cursor, filas)
+            self.conexion.commit()
+            cursor.close()
+            total += len(filas)
+        return total
+
+
+# ---------------------------------------------------------------------- migraciones
+
+
+@migracion(1, 'esquema inicial: preguntas, firmas MinHash/LSH y metadatos')
+def _esquema_inicial(ejecutor: EjecutorMigraciones):
+    """Tablas de la primera versión (idempotente: las bases previas ya las tienen)"""
+    if ejecutor.db_type == 'postgresql':
+        ejecutor.ejecutar('''
+            CREATE TABLE IF NOT EXISTS preguntas (
+                id SERIAL PRIMARY KEY,
+                habilidad VARCHAR(100) NOT NULL,
+                pregunta TEXT NOT NULL,
+                tipo VARCHAR(50) DEFAULT 'general',
+                nivel VARCHAR(50) DEFAULT 'intermedio',
+                categoria VARCHAR(50) DEFAULT 'tecnica',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                habilidad_norm VARCHAR(100),
+                pregunta_norm TEXT,
+                CONSTRAINT unique_pregunta UNIQUE(habilidad, pregunta)
+            )
+        ''')
+        # Columnas normalizadas (sin acentos ni mayúsculas) para tablas creadas antes
+        ejecutor.agregar_columna('preguntas', 'habilidad_norm', 'VARCHAR(100)')
+        ejecutor.agregar_columna('preguntas', 'pregunta_norm', 'TEXT')
+
+        ejecutor.crear_indice('idx_habilidad', 'preguntas', 'habilidad')
+        ejecutor.crear_indice('idx_tipo_nivel', 'preguntas', 'tipo, nivel')
+        ejecutor.crear_indice('idx_nivel', 'preguntas', 'nivel')
+        ejecutor.crear_indice('idx_habilidad_norm', 'preguntas', 'habilidad_norm')
+        ejecutor.crear_indice('idx_pregunta_norm', 'preguntas', 'pregunta_norm text_pattern_ops')
+        # Índice de texto completo
+        ejecutor.crear_indice('idx_full_search', 'preguntas', "to_tsvector('spanish', pregunta)", metodo='gin')
+
+        # Índices de trigramas para búsqueda difusa y LIKE '%...%' (requiere pg_trgm)
+        try:
+            ejecutor.ejecutar('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            ejecutor.crear_indice('idx_pregunta_trgm', 'preguntas', 'pregunta_norm gin_trgm_ops', metodo='gin')
+            ejecutor.crear_indice('idx_habilidad_trgm', 'preguntas', 'habilidad_norm gin_trgm_ops', metodo='gin')
+        except Exception as e:
+            print(f"⚠️ pg_trgm no disponible, búsqueda difusa deshabilitada: {e}")
+
+        # Firmas MinHash y cubetas LSH para detectar preguntas casi duplicadas
+        ejecutor.ejecutar('''
+            CREATE TABLE IF NOT EXISTS preguntas_minhash (
+                pregunta_id INTEGER PRIMARY KEY REFERENCES preguntas(id) ON DELETE CASCADE,
+                firma BYTEA NOT NULL
+            )
+        ''')
+        ejecutor.ejecutar('''
+            CREATE TABLE IF NOT EXISTS preguntas_lsh (
+                banda SMALLINT NOT NULL,
+                cubeta BIGINT NOT NULL,
+                pregunta_id INTEGER NOT NULL REFERENCES preguntas(id) ON DELETE CASCADE
+            )
+        ''')
+
+        # Clave/valor para datos de control (hash de los datos iniciales, etc.)
+        ejecutor.ejecutar('''
+            CREATE TABLE IF NOT EXISTS metadatos (
+                clave VARCHAR(100) PRIMARY KEY,
+                valor TEXT,
+                actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+    else:
+        ejecutor.ejecutar('''
+            CREATE TABLE IF NOT EXISTS preguntas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                habilidad TEXT NOT NULL,
+                pregunta TEXT NOT NULL,
+                tipo TEXT DEFAULT 'general',
+                nivel TEXT DEFAULT 'intermedio',
+                categoria TEXT DEFAULT 'tecnica',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                habilidad_norm TEXT,
+                pregunta_norm TEXT
+            )
+        ''')
+        ejecutor.agregar_columna('preguntas', 'habilidad_norm', 'TEXT')
+        ejecutor.agregar_columna('preguntas', 'pregunta_norm', 'TEXT')
+
+        ejecutor.crear_indice('idx_habilidad', 'preguntas', 'habilidad')
+        ejecutor.crear_indice('idx_tipo_nivel', 'preguntas', 'tipo, nivel')
+        ejecutor.crear_indice('idx_habilidad_norm', 'preguntas', 'habilidad_norm')
+        ejecutor.crear_indice('idx_pregunta_norm', 'preguntas', 'pregunta_norm')
+
+        # SQLite no aplica las FK: las firmas se borran a mano junto con la pregunta
+        ejecutor.ejecutar('''
+            CREATE TABLE IF NOT EXISTS preguntas_minhash (
+                pregunta_id INTEGER PRIMARY KEY,
+                firma BLOB NOT NULL
+            )
+        ''')
+        ejecutor.ejecutar('''
+            CREATE TABLE IF NOT EXISTS preguntas_lsh (
+                banda INTEGER NOT NULL,
+                cubeta INTEGER NOT NULL,
+                pregunta_id INTEGER NOT NULL
+            )
+        ''')
+        ejecutor.ejecutar('''
+            CREATE TABLE IF NOT EXISTS metadatos (
+                clave TEXT PRIMARY KEY,
+                valor TEXT,
+                actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    ejecutor.crear_indice('idx_lsh_cubeta', 'preguntas_lsh', 'banda, cubeta')
+    ejecutor.crear_indice('idx_lsh_pregunta', 'preguntas_lsh', 'pregunta_id')
+    ejecutor.conexion.commit()
+
+
+@migracion(2, 'SQLite igual que PostgreSQL: WAL, idx_nivel y preguntas únicas por habilidad')
+def _reconciliar_sqlite(ejecutor: EjecutorMigraciones):
+    """En PostgreSQL no hay nada que hacer: ya tiene idx_nivel y unique_pregunta"""
+    if ejecutor.db_type == 'postgresql':
+        return
+
+    # WAL: los lectores no esperan a las escrituras (ni a la creación de índices)
+    ejecutor.ejecutar('PRAGMA journal_mode = WAL')
+    ejecutor.crear_indice('idx_nivel', 'preguntas', 'nivel')
+
+    # Antes del índice único hay que quitar los duplicados exactos (se conserva el más antiguo)
+    def eliminar(cursor, filas):
+        ids = [fila[0] for fila in filas]
+        marcadores = ', '.join(['?'] * len(ids))
+        for tabla, columna in (('preguntas_lsh', 'pregunta_id'), ('preguntas_minhash', 'pregunta_id'),
+                               ('preguntas', 'id')):
+            cursor.execute(f'DELETE FROM {tabla} WHERE {columna} IN ({marcadores})', ids)
+
+    eliminadas = ejecutor.procesar_por_lotes('''
+        SELECT p.id FROM preguntas p
+        WHERE EXISTS (
+            SELECT 1 FROM preguntas q
+            WHERE q.habilidad = p.habilidad AND q.pregunta = p.pregunta AND q.id < p.id
+        )
+        LIMIT {lote}
+    ''', eliminar)
+    if eliminadas:
+        print(f"🧹 {eliminadas} preguntas duplicadas eliminadas antes de crear unique_pregunta")
+
+    ejecutor.crear_indice('unique_pregunta', 'preguntas', 'habilidad, pregunta', unico=True)
+
+
+@migracion(3, 'índices compuestos para selección y estadísticas por habilidad')
+def _indices_por_habilidad(ejecutor: EjecutorMigraciones):
+    """
+    (habilidad_norm, nivel) sirve la selección de preguntas con y sin nivel;
+    (habilidad, nivel) y (habilidad, tipo) cubren los conteos por habilidad sin
+    leer la tabla. Los índices de una sola columna quedan como prefijos redundantes.
+    """
+    ejecutor.crear_indice('idx_habilidad_norm_nivel', 'preguntas', 'habilidad_norm, nivel')
+    ejecutor.crear_indice('idx_habilidad_nivel', 'preguntas', 'habilidad, nivel')
+    ejecutor.crear_indice('idx_habilidad_tipo', 'preguntas', 'habilidad, tipo')
+    ejecutor.eliminar_indice('idx_habilidad_norm')
+    ejecutor.eliminar_indice('idx_habilidad')
+
+
+@migracion(4, 'columna fuente: de dónde viene cada pregunta (banco estático o LLM)')
+def _fuente_preguntas(ejecutor: EjecutorMigraciones):
+    """
+    El DEFAULT constante no reescribe la tabla en ninguno de los dos motores: las filas
+    existentes leen 'banco' sin tocarlas. Las generadas por banco_llm llevan 'llm:<modelo>'.
+    """
+    tipo = 'VARCHAR(100)' if ejecutor.db_type == 'postgresql' else 'TEXT'
+    ejecutor.agregar_columna('preguntas', 'fuente', f"{tipo} DEFAULT 'banco'")
+
+
+@migracion(5, 'columna categoria en bases creadas antes de que existiera')
+def _categoria_preguntas(ejecutor: EjecutorMigraciones):
+    """
+    CREATE TABLE IF NOT EXISTS no toca las tablas ya creadas: preguntas_entrevista.db no
+    tiene categoria y todas las inserciones fallaban. Mismo DEFAULT que el esquema inicial.
+    """
+    tipo = 'VARCHAR(50)' if ejecutor.db_type == 'postgresql' else 'TEXT'
+    ejecutor.agregar_columna('preguntas', 'categoria', f"{tipo} DEFAULT 'tecnica'")
@@ -0,0 +1,26 @@
+"""
+Normalización de texto para búsquedas
+Pliega acentos y mayúsculas para que "metodos" encuentre "métodos"
+"""
+
+import re
+import unicodedata
+
+_ESPACIOS = re.compile(r'\s+')
+
+# Valores canónicos de las columnas nivel (de menor a mayor) y tipo del banco
+NIVELES = ('basico', 'intermedio', 'avanzado')
+TIPOS = ('general', 'practica', 'conceptual', 'experiencia')
+
+
+def normalizar_texto(texto: str) -> str:
+    """
+    Devuelve el texto sin acentos, en minúsculas (casefold) y con espacios colapsados.
+    Se usa tanto al guardar las columnas *_norm como al normalizar los términos de búsqueda.
+    """
+    if not texto:
+        return ''
+
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return _ESPACIOS.sub(' ', sin_acentos.casefold()).strip()
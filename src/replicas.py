@@ -0,0 +1,170 @@
+"""
+Selección de réplicas de lectura de PostgreSQL
+Reparte las lecturas entre réplicas sanas (round-robin o menor latencia de consulta),
+aparta temporalmente las que fallan o van demasiado retrasadas respecto de la primaria
+y manda las lecturas a la primaria durante una ventana tras cada escritura, para leer
+lo propio escrito.
+
+La ventana es por cliente dentro de una petición web: el servidor la lleva en una
+cookie (COOKIE_ESCRITURA, instante de fin) que marca cada petición con
+iniciar_peticion(), así vale en cualquier worker y no desvía a la primaria las lecturas
+de otros clientes. Fuera de una petición (CLI, scripts) la ventana es la del proceso.
+"""
+
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+# Peso de la última medición en la latencia suavizada (EWMA) de cada réplica
+ALFA_LATENCIA = 0.2
+
+# Fracción de lecturas que van a una réplica al azar para refrescar su latencia
+EXPLORACION = 0.05
+
+# Cada cuánto se vuelve a medir el retraso de replicación de una réplica (s)
+INTERVALO_RETRASO_S = 5.0
+
+# Retraso de la réplica: 0 si ya aplicó todo lo recibido (una primaria sin escrituras
+# no envía transacciones y el instante de la última aplicada no avanza)
+SQL_RETRASO_REPLICA = '''
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END
+'''
+
+# Cookie con el instante (epoch) hasta el que el cliente lee de la primaria
+COOKIE_ESCRITURA = 'leer_primaria_hasta'
+
+# Estado de la petición en curso: {'hasta': epoch, 'nueva': escribió en esta petición}
+_ventana_cliente: ContextVar[Optional[dict]] = ContextVar('ventana_cliente', default=None)
+
+
+def iniciar_peticion(cookie: Optional[str]):
+    """Usa la ventana de escritura del cliente (valor de COOKIE_ESCRITURA); devuelve el token para terminar"""
+    try:
+        hasta = float(cookie) if cookie else 0.0
+    except ValueError:
+        hasta = 0.0
+    return _ventana_cliente.set({'hasta': hasta, 'nueva': False})
+
+
+def ventana_escritura_peticion() -> Optional[float]:
+    """Fin de la ventana si el cliente escribió en esta petición (para renovar la cookie)"""
+    estado = _ventana_cliente.get()
+    return estado['hasta'] if estado is not None and estado['nueva'] else None
+
+
+def terminar_peticion(token):
+    _ventana_cliente.reset(token)
+
+
+class SelectorReplicas:
+    """Estado compartido entre hilos; cada operación toma el lock un instante"""
+
+    def __init__(self, replicas: List[dict], estrategia: str = 'latencia',
+                 ventana_escritura_s: float = 5.0, enfriamiento_s: float = 30.0,
+                 retraso_maximo_s: float = 10.0):
+        self.replicas = replicas
+        self.estrategia = estrategia
+        self.ventana_escritura_s = ventana_escritura_s
+        self.enfriamiento_s = enfriamiento_s
+        self.retraso_maximo_s = retraso_maximo_s
+        self._lock = threading.Lock()
+        self._siguiente = 0
+        self._latencias: List[Optional[float]] = [None] * len(replicas)
+        self._caida_hasta = [0.0] * len(replicas)
+        self._retrasos: List[Optional[float]] = [None] * len(replicas)
+        self._retraso_medido = [float('-inf')] * len(replicas)
+        self._ultima_escritura = float('-inf')
+
+    @staticmethod
+    def nombre(params: dict) -> str:
+        return f"{params['host']}:{params['port']}"
+
+    def registrar_escritura(self):
+        """Abre la ventana de lectura de las propias escrituras (del cliente o del proceso)"""
+        estado = _ventana_cliente.get()
+        if estado is not None:
+            estado['hasta'] = time.time() + self.ventana_escritura_s
+            estado['nueva'] = True
+            return
+        with self._lock:
+            self._ultima_escritura = time.monotonic()
+
+    def en_ventana_escritura(self) -> bool:
+        estado = _ventana_cliente.get()
+        if estado is not None:
+            return time.time() < estado['hasta']
+        return time.monotonic() - self._ultima_escritura < self.ventana_escritura_s
+
+    def elegir(self) -> Optional[int]:
+        """
+        Índice de la réplica para la próxima lectura, o None si debe ir a la primaria
+        (sin réplicas, dentro de la ventana de escritura o con todas caídas o retrasadas).
+        'latencia' usa dos opciones al azar y se queda con la más rápida: favorece a
+        las réplicas cercanas sin dejar de repartir la carga.
+        """
+        if not self.replicas or self.en_ventana_escritura():
+            return None
+
+        ahora = time.monotonic()
+        with self._lock:
+            disponibles = [i for i, hasta in enumerate(self._caida_hasta)
+                           if hasta <= ahora and not self._retrasada(i, ahora)]
+            if not disponibles:
+                return None
+
+            if self.estrategia == 'round_robin' or len(disponibles) == 1:
+                indice = disponibles[self._siguiente % len(disponibles)]
+                self._siguiente += 1
+                return indice
+
+            # Las réplicas aún sin medir se prueban primero
+            sin_medir = [i for i in disponibles if self._latencias[i] is None]
+            if sin_medir:
+                return sin_medir[0]
+            if random.random() < EXPLORACION:
+                return random.choice(disponibles)
+            a, b = random.sample(disponibles, 2)
+            return a if self._latencias[a] <= self._latencias[b] else b
+
+    def _retrasada(self, indice: int, ahora: float) -> bool:
+        """Retraso medido por encima del máximo; pasado INTERVALO_RETRASO_S vuelve a probarse"""
+        retraso = self._retrasos[indice]
+        return retraso is not None and retraso > self.retraso_maximo_s \
+            and ahora - self._retraso_medido[indice] < INTERVALO_RETRASO_S
+
+    def toca_medir_retraso(self, indice: int) -> bool:
+        return time.monotonic() - self._retraso_medido[indice] >= INTERVALO_RETRASO_S
+
+    def registrar_retraso(self, indice: int, retraso_s: float) -> bool:
+        """Guarda el retraso de replicación medido; False si supera el máximo"""
+        with self._lock:
+            self._retrasos[indice] = retraso_s
+            self._retraso_medido[indice] = time.monotonic()
+        return retraso_s <= self.retraso_maximo_s
+
+    def registrar_latencia(self, indice: int, duracion_s: float):
+        """Latencia de una consulta servida por la réplica (la mide el cursor instrumentado)"""
+        with self._lock:
+            anterior = self._latencias[indice]
+            self._latencias[indice] = duracion_s if anterior is None else \
+                ALFA_LATENCIA * duracion_s + (1 - ALFA_LATENCIA) * anterior
+
+    def marcar_caida(self, indice: int):
+        """Aparta la réplica durante enfriamiento_s y olvida su latencia"""
+        with self._lock:
+            self._caida_hasta[indice] = time.monotonic() + self.enfriamiento_s
+            self._latencias[indice] = None
+
+    def estado(self) -> List[dict]:
+        ahora = time.monotonic()
+        with self._lock:
+            return [{
+                'replica': self.nombre(params),
+                'disponible': self._caida_hasta[i] <= ahora,
+                'latencia_ms': round(self._latencias[i] * 1000, 3) if self._latencias[i] is not None else None,
+                'retraso_s': round(self._retrasos[i], 3) if self._retrasos[i] is not None else None
+            } for i, params in enumerate(self.replicas)]
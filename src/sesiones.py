@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Sesiones de entrevista: regenerar preguntas para un candidato sin repetir las ya servidas
+
+Cada sesión guarda el conjunto de ids de preguntas servidas como un bitmap (bit i = id i)
+comprimido con zlib: unos pocos cientos de bytes aunque los ids lleguen a cientos de
+miles, así que miles de sesiones caben en una tabla SQLite sin problema. Comprobar si
+una pregunta ya salió es O(1) sobre el bitmap descomprimido.
+
+El muestreo parte de los pools (id, pregunta) de obtener_pool_preguntas, cacheados en
+memoria y compartidos por todas las sesiones mientras no cambie la revisión del banco
+(obtener_revision, que sube con cada escritura de cualquier worker) y como mucho
+SESIONES_TTL_POOL_S segundos, por las cargas hechas por fuera. Elige al azar y
+descarta las vistas (muestreo por rechazo) y, solo si se rechazan demasiadas, filtra el
+pool completo. Agotado el pool de una habilidad, se completa con preguntas ya servidas
+y se indica en el resultado.
+
+El almacén es un archivo SQLite propio (WAL), independiente del banco: funciona igual
+con el banco fragmentado o con el catálogo de solo lectura. Cada hilo usa su propia
+conexión, así que las lecturas de sesiones distintas no se esperan entre sí; cada
+generación lee y reescribe el bitmap dentro de un BEGIN IMMEDIATE, así dos
+regeneraciones simultáneas de la misma sesión (o de otro worker) no se pisan.
+
+Configuración (DatabaseConfig, también desde .env): SESIONES_PATH, SESIONES_TTL_S
+(caducidad por inactividad), SESIONES_TTL_POOL_S.
+
+Uso:
+    python sesiones.py                       # últimas sesiones
+    python sesiones.py --sesion <id>         # detalle de una sesión
+    python sesiones.py --borrar <id>
+    python sesiones.py --purgar              # borra las sesiones caducadas
+"""
+
+import argparse
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import DatabaseConfig
+from metricas import metricas
+
+# Extracciones al azar por pregunta pedida antes de filtrar el pool entero
+INTENTOS_POR_PREGUNTA = 4
+
+
+class BitmapVistas:
+    """Conjunto de ids de preguntas como bitmap (bytearray); se guarda comprimido"""
+
+    __slots__ = ('_bits',)
+
+    def __init__(self, bits: bytes = b''):
+        self._bits = bytearray(bits)
+
+    def __contains__(self, pregunta_id: int) -> bool:
+        byte = pregunta_id >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (pregunta_id & 7)))
+
+    def agregar(self, pregunta_id: int):
+        byte = pregunta_id >> 3
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte + 1 - len(self._bits)))
+        self._bits[byte] |= 1 << (pregunta_id & 7)
+
+    def __len__(self) -> int:
+        return bin(int.from_bytes(self._bits, 'little')).count('1')
+
+    def comprimir(self) -> bytes:
+        return zlib.compress(bytes(self._bits))
+
+    @classmethod
+    def descomprimir(cls, datos: Optional[bytes]) -> 'BitmapVistas':
+        return cls(zlib.decompress(datos) if datos else b'')
+
+
+def muestrear_sin_repetir(pool: List[Tuple[int, str]], cantidad: int, vistas: BitmapVistas,
+                          aleatorio: random.Random) -> Tuple[List[Tuple[int, str]], int]:
+    """
+    Hasta `cantidad` preguntas del pool que no estén en `vistas`; si no alcanzan, se
+    completa con vistas. Devuelve (elegidas, cuántas de ellas son repetidas).
+    Las tuplas del pool pueden llevar más campos: solo se mira el primero (el id).
+    """
+    elegidas, probados = [], set()
+    intentos = INTENTOS_POR_PREGUNTA * cantidad
+    while len(elegidas) < cantidad and intentos > 0 and len(probados) < len(pool):
+        intentos -= 1
+        i = aleatorio.randrange(len(pool))
+        if i in probados:
+            continue
+        probados.add(i)
+        if pool[i][0] not in vistas:
+            elegidas.append(pool[i])
+
+    if len(elegidas) < cantidad:
+        # Muchas vistas: el rechazo ya no compensa, se filtra el pool una vez
+        libres = [p for i, p in enumerate(pool) if i not in probados and p[0] not in vistas]
+        elegidas.extend(aleatorio.sample(libres, min(cantidad - len(elegidas), len(libres))))
+
+    repetidas = 0
+    if len(elegidas) < cantidad:
+        ya_elegidas = {p[0] for p in elegidas}
+        resto = [p for p in pool if p[0] not in ya_elegidas]
+        extra = aleatorio.sample(resto, min(cantidad - len(elegidas), len(resto)))
+        elegidas.extend(extra)
+        repetidas = len(extra)
+    return elegidas, repetidas
+
+
+class GestorSesiones:
+    """Sesiones de entrevista en SQLite con el bitmap de preguntas servidas; segura entre hilos"""
+
+    def __init__(self, db=None, ruta: str = None, ttl_s: float = None, ttl_pool_s: float = None):
+        self.db = db
+        self.ruta = ruta or DatabaseConfig.SESIONES_PATH
+        self.ttl_s = ttl_s if ttl_s is not None else DatabaseConfig.SESIONES_TTL_S
+        self.ttl_pool_s = ttl_pool_s if ttl_pool_s is not None else DatabaseConfig.SESIONES_TTL_POOL_S
+        self._aleatorio = random.Random()
+
+        # {(habilidad, nivel): (instante, pool)}, compartido por todas las sesiones y
+        # válido para la revisión del banco en _revision_pools
+        self._pools = {}
+        self._revision_pools = None
+        self._bloqueo_pools = threading.Lock()
+
+        # Una conexión por hilo; el bloqueo solo serializa las escrituras de este proceso
+        # (entre procesos lo hace SQLite con BEGIN IMMEDIATE y el timeout de la conexión)
+        self._local = threading.local()
+        self._conexiones = []
+        self._bloqueo_conexiones = threading.Lock()
+        self._bloqueo_escritura = threading.Lock()
+
+        conexion = self._conexion()
+        conexion.execute('PRAGMA journal_mode=WAL')
+        conexion.execute('''
+            CREATE TABLE IF NOT EXISTS sesiones (
+                id TEXT PRIMARY KEY,
+                candidato TEXT,
+                creada REAL NOT NULL,
+                actualizada REAL NOT NULL,
+                generaciones INTEGER NOT NULL DEFAULT 0,
+                servidas INTEGER NOT NULL DEFAULT 0,
+                vistas BLOB NOT NULL
+            )
+        ''')
+        conexion.execute('CREATE INDEX IF NOT EXISTS idx_sesiones_actualizada ON sesiones (actualizada)')
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Conexión del hilo actual (se abre la primera vez); transacciones explícitas"""
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            # check_same_thread=False solo para que cerrar() pueda cerrarlas todas
+            conexion = sqlite3.connect(self.ruta, timeout=10, isolation_level=None,
+                                       check_same_thread=False)
+            self._local.conexion = conexion
+            with self._bloqueo_conexiones:
+                self._conexiones.append(conexion)
+        return conexion
+
+    def crear(self, candidato: str = None) -> str:
+        sesion_id = uuid.uuid4().hex
+        ahora = time.time()
+        with self._bloqueo_escritura:
+            self._conexion().execute('''
+                INSERT INTO sesiones (id, candidato, creada, actualizada, vistas)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (sesion_id, candidato, ahora, ahora, BitmapVistas().comprimir()))
+        return sesion_id
+
+    def _caducada(self, actualizada: float) -> bool:
+        return time.time() - actualizada > self.ttl_s
+
+    @staticmethod
+    def _a_dict(fila) -> dict:
+        sesion_id, candidato, creada, actualizada, generaciones, servidas, vistas = fila
+        return {
+            'id': sesion_id,
+            'candidato': candidato,
+            'creada': datetime.fromtimestamp(creada).isoformat(timespec='seconds'),
+            'actualizada': datetime.fromtimestamp(actualizada).isoformat(timespec='seconds'),
+            'generaciones': generaciones,
+            'servidas': servidas,
+            'bytes_bitmap': len(vistas)
+        }
+
+    def obtener(self, sesion_id: str) -> Optional[dict]:
+        """Datos de la sesión, o None si no existe o caducó"""
+        fila = self._conexion().execute('SELECT * FROM sesiones WHERE id = ?', (sesion_id,)).fetchone()
+        if fila is None or self._caducada(fila[3]):
+            return None
+        return self._a_dict(fila)
+
+    def listar(self, limite: int = 20) -> List[dict]:
+        filas = self._conexion().execute(
+            'SELECT * FROM sesiones ORDER BY actualizada DESC LIMIT ?', (limite,)).fetchall()
+        return [self._a_dict(fila) for fila in filas]
+
+    def eliminar(self, sesion_id: str) -> bool:
+        with self._bloqueo_escritura:
+            return self._conexion().execute('DELETE FROM sesiones WHERE id = ?', (sesion_id,)).rowcount > 0
+
+    def purgar_caducadas(self) -> int:
+        with self._bloqueo_escritura:
+            return self._conexion().execute('DELETE FROM sesiones WHERE actualizada < ?',
+                                            (time.time() - self.ttl_s,)).rowcount
+
+    def contar(self) -> int:
+        return self._conexion().execute('SELECT COUNT(*) FROM sesiones').fetchone()[0]
+
+    def _obtener_pools(self, habilidades: List[str], nivel: str = None) -> Dict[str, List[Tuple[int, str]]]:
+        """Pools de las habilidades pedidas; las que faltan o caducaron se leen en una sola consulta"""
+        ahora = time.monotonic()
+        revision = self.db.obtener_revision()
+        with self._bloqueo_pools:
+            if revision != self._revision_pools:
+                # Otro worker (o este) modificó el banco: todos los pools pueden estar viejos
+                self._pools.clear()
+                self._revision_pools = revision
+            vigentes = {}
+            for habilidad in habilidades:
+                entrada = self._pools.get((habilidad, nivel))
+                if entrada is not None and ahora - entrada[0] <= self.ttl_pool_s:
+                    vigentes[habilidad] = entrada[1]
+        faltantes = [habilidad for habilidad in habilidades if habilidad not in vigentes]
+
+        metricas.incrementar('preguntas_cache_consultas_total', len(vigentes),
+                             cache='pools_sesiones', resultado='acierto')
+        metricas.incrementar('preguntas_cache_consultas_total', len(faltantes),
+                             cache='pools_sesiones', resultado='fallo')
+        if faltantes:
+            leidos = self.db.obtener_pool_preguntas(faltantes, nivel)
+            with self._bloqueo_pools:
+                for habilidad in faltantes:
+                    pool = leidos.get(habilidad, [])
+                    self._pools[(habilidad, nivel)] = (ahora, pool)
+                    vigentes[habilidad] = pool
+        return vigentes
+
+    def generar(self, sesion_id: str, habilidades: List[str], cantidad: int = 2,
+                nivel: str = None) -> Optional[dict]:
+        """
+        Preguntas nuevas para la sesión, que quedan marcadas como servidas.
+        None si la sesión no existe o caducó; si no:
+        {'preguntas': {habilidad: [texto, ...]}, 'repetidas': n, 'agotadas': [habilidad, ...]}
+        (lista vacía para las habilidades sin preguntas en el banco)
+        """
+        # Los pools se leen fuera de la transacción: no se retiene el almacén mientras tanto
+        pools = self._obtener_pools(habilidades, nivel)
+
+        def elegir(vistas: BitmapVistas):
+            preguntas, servidas, repetidas, agotadas = {}, [], 0, []
+            for habilidad in habilidades:
+                pool = pools.get(habilidad) or []
+                if not pool:
+                    preguntas[habilidad] = []
+                    continue
+
+                elegidas, repetidas_habilidad = muestrear_sin_repetir(pool, cantidad, vistas, self._aleatorio)
+                if repetidas_habilidad:
+                    repetidas += repetidas_habilidad
+                    agotadas.append(habilidad)
+                servidas.extend(pregunta_id for pregunta_id, _ in elegidas)
+                preguntas[habilidad] = [texto for _, texto in elegidas]
+            return {'preguntas': preguntas, 'repetidas': repetidas, 'agotadas': agotadas}, servidas, repetidas
+
+        return self.servir(sesion_id, elegir)
+
+    def servir(self, sesion_id: str, elegir: Callable[[BitmapVistas], Tuple[Any, Iterable[int], int]]) -> Any:
+        """
+        Elige preguntas para la sesión dentro de su transacción: elegir(vistas) devuelve
+        (resultado, ids servidos, cuántos son repetidos); los ids quedan marcados como vistos.
+        Devuelve el resultado, o None si la sesión no existe o caducó.
+        """
+        conexion = self._conexion()
+        with self._bloqueo_escritura:
+            conexion.execute('BEGIN IMMEDIATE')
+            try:
+                fila = conexion.execute(
+                    'SELECT vistas, actualizada FROM sesiones WHERE id = ?', (sesion_id,)).fetchone()
+                if fila is None or self._caducada(fila[1]):
+                    conexion.execute('ROLLBACK')
+                    return None
+
+                vistas = BitmapVistas.descomprimir(fila[0])
+                resultado, servidas, repetidas = elegir(vistas)
+                nuevas = 0
+                for pregunta_id in servidas:
+                    if pregunta_id not in vistas:
+                        vistas.agregar(pregunta_id)
+                        nuevas += 1
+
+                conexion.execute('''
+                    UPDATE sesiones SET vistas = ?, actualizada = ?,
+                        generaciones = generaciones + 1, servidas = servidas + ?
+                    WHERE id = ?
+                ''', (vistas.comprimir(), time.time(), nuevas, sesion_id))
+                conexion.execute('COMMIT')
+            except Exception:
+                conexion.execute('ROLLBACK')
+                raise
+
+        metricas.incrementar('preguntas_sesiones_servidas_total', nuevas, resultado='nueva')
+        metricas.incrementar('preguntas_sesiones_servidas_total', repetidas, resultado='repetida')
+        return resultado
+
+    def cerrar(self):
+        with self._bloqueo_conexiones:
+            for conexion in self._conexiones:
+                conexion.close()
+            self._conexiones.clear()
+        self._local = threading.local()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Sesiones de entrevista (preguntas ya servidas por candidato)')
+    parser.add_argument('--ruta', help='Archivo del almacén (por defecto SESIONES_PATH)')
+    parser.add_argument('--sesion', help='Muestra el detalle de una sesión')
+    parser.add_argument('--borrar', metavar='SESION', help='Borra una sesión')
+    parser.add_argument('--purgar', action='store_true', help='Borra las sesiones caducadas')
+    parser.add_argument('--limite', type=int, default=20, help='Sesiones a listar')
+    args = parser.parse_args(argv)
+
+    gestor = GestorSesiones(ruta=args.ruta)
+    try:
+        if args.purgar:
+            print(f"🧹 {gestor.purgar_caducadas()} sesiones caducadas borradas")
+        if args.borrar:
+            print("🗑️ Sesión borrada" if gestor.eliminar(args.borrar) else f"⚠️ No existe la sesión {args.borrar}")
+            return 0
+        if args.sesion:
+            sesion = gestor.obtener(args.sesion)
+            if sesion is None:
+                print(f"⚠️ No existe (o caducó) la sesión {args.sesion}")
+                return 1
+            for clave, valor in sesion.items():
+                print(f"   {clave}: {valor}")
+            return 0
+
+        print(f"📋 {gestor.contar()} sesiones en {gestor.ruta}")
+        for sesion in gestor.listar(args.limite):
+            print(f"   {sesion['id']}  {sesion['candidato'] or '-':20}  {sesion['actualizada']}  "
+                  f"{sesion['generaciones']} generaciones, {sesion['servidas']} preguntas "
+                  f"({sesion['bytes_bitmap']} B)")
+        return 0
+    finally:
+        gestor.cerrar()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Índice TF-IDF para encontrar preguntas similares
+Bolsa de palabras con hashing sobre matrices dispersas (CSR/CSC) en NumPy,
+con caché en disco y actualización incremental en cada escritura
+"""
+
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_DISPONIBLE = True
+except ImportError:
+    NUMPY_DISPONIBLE = False
+
+# 2^18 columnas: colisiones de hashing despreciables para el vocabulario del banco
+DIMENSIONES = 1 << 18
+
+# Documentos nuevos que se acumulan antes de fusionarlos en la matriz principal
+MAX_PENDIENTES = 1000
+
+_PALABRA = re.compile(r'\w+')
+
+# Palabras vacías frecuentes en las preguntas; no aportan a la similitud
+PALABRAS_VACIAS = {
+    'que', 'cual', 'cuales', 'como', 'para', 'por', 'con', 'los', 'las', 'una', 'uno', 'del',
+    'entre', 'son', 'este', 'esta', 'sus', 'cuando', 'donde', 'mas', 'sin', 'sobre', 'hay',
+}
+
+
+def _raiz(palabra: str) -> str:
+    """Reducción mínima de plurales ("listas" -> "lista", "tuplas" -> "tupla")"""
+    return palabra[:-1] if len(palabra) > 4 and palabra.endswith('s') else palabra
+
+
+def vectorizar(texto_norm: str) -> Tuple[List[int], List[float]]:
+    """Columnas y pesos TF (1 + log tf) de un texto ya normalizado"""
+    conteos = Counter(
+        zlib.crc32(_raiz(palabra).encode('utf-8')) % DIMENSIONES
+        for palabra in _PALABRA.findall(texto_norm or '')
+        if len(palabra) >= 3 and palabra not in PALABRAS_VACIAS
+    )
+    columnas = sorted(conteos)
+    return columnas, [1.0 + math.log(conteos[c]) for c in columnas]
+
+
+class IndiceSimilitud:
+    """
+    Matriz documento x término con pesos TF en formato CSR, más su transpuesta CSC
+    para puntuar una consulta recorriendo solo las columnas de sus términos.
+    Las altas recientes se acumulan en una lista pendiente pequeña y las bajas
+    se marcan en una máscara, de modo que ninguna escritura reconstruye la matriz.
+    """
+
+    def __init__(self):
+        if not NUMPY_DISPONIBLE:
+            raise ImportError("numpy no instalado. Instala con: pip install numpy")
+
+        self._lock = threading.RLock()
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.datos = np.zeros(0, dtype=np.float32)
+        self.activos = np.zeros(0, dtype=bool)
+        self.df = np.zeros(DIMENSIONES, dtype=np.int32)
+        self.max_id = 0
+
+        self._pendientes = {}
+        self._posicion_por_id = {}
+        self._csc = None
+        self._normas = None
+        self.cambios_sin_guardar = 0
+
+    # ------------------------------------------------------------------ construcción
+
+    @classmethod
+    def construir(cls, filas: Iterable[Tuple[int, str]]) -> 'IndiceSimilitud':
+        """Construye el índice a partir de (id, texto_normalizado)"""
+        indice = cls()
+        ids, indptr, indices, datos = [], [0], [], []
+
+        for pregunta_id, texto_norm in filas:
+            columnas, pesos = vectorizar(texto_norm)
+            ids.append(pregunta_id)
+            indices.extend(columnas)
+            datos.extend(pesos)
+            indptr.append(len(indices))
+
+        indice._asignar(np.array(ids, dtype=np.int64), np.array(indptr, dtype=np.int64),
+                        np.array(indices, dtype=np.int32), np.array(datos, dtype=np.float32),
+                        np.ones(len(ids), dtype=bool))
+        indice.df = np.bincount(indice.indices, minlength=DIMENSIONES).astype(np.int32)
+        return indice
+
+    def _asignar(self, ids, indptr, indices, datos, activos):
+        self.ids, self.indptr, self.indices, self.datos, self.activos = ids, indptr, indices, datos, activos
+        self._posicion_por_id = {int(pregunta_id): pos for pos, pregunta_id in enumerate(ids)}
+        self.max_id = max(self.max_id, int(ids.max()) if len(ids) else 0)
+        self._csc = None
+        self._normas = None
+
+    # ------------------------------------------------------------------ persistencia
+
+    def guardar(self, ruta: str, firma: Tuple[int, int]):
+        """Escribe el índice (incluyendo pendientes) de forma atómica en un .npz"""
+        with self._lock:
+            self._fusionar_pendientes()
+            temporal = f"{ruta}.tmp.npz"
+            np.savez(temporal, ids=self.ids, indptr=self.indptr, indices=self.indices,
+                     datos=self.datos, activos=self.activos, df=self.df,
+                     firma=np.array(firma, dtype=np.int64))
+            os.replace(temporal, ruta)
+            self.cambios_sin_guardar = 0
+
+    @classmethod
+    def cargar(cls, ruta: str) -> Tuple[Optional['IndiceSimilitud'], Optional[Tuple[int, int]]]:
+        """Carga un índice guardado; retorna (índice, firma del banco) o (None, None)"""
+        if not os.path.exists(ruta):
+            return None, None
+
+        with np.load(ruta) as archivo:
+            indice = cls()
+            indice._asignar(archivo['ids'], archivo['indptr'], archivo['indices'],
+                            archivo['datos'], archivo['activos'])
+            indice.df = archivo['df']
+            firma = tuple(int(v) for v in archivo['firma'])
+        return indice, firma
+
+    # ------------------------------------------------------------------ escrituras
+
+    def agregar(self, pregunta_id: int, texto_norm: str):
+        """Alta o modificación incremental de una pregunta"""
+        with self._lock:
+            self.eliminar(pregunta_id)
+            columnas, pesos = vectorizar(texto_norm)
+            self._pendientes[pregunta_id] = (columnas, pesos)
+            self.df[columnas] += 1
+            self.max_id = max(self.max_id, pregunta_id)
+            self._normas = None
+            self.cambios_sin_guardar += 1
+
+            if len(self._pendientes) >= MAX_PENDIENTES:
+                self._fusionar_pendientes()
+
+    def eliminar(self, pregunta_id: int):
+        """Baja incremental: se enmascara la fila, sin reconstruir la matriz"""
+        with self._lock:
+            if pregunta_id in self._pendientes:
+                columnas, _ = self._pendientes.pop(pregunta_id)
+                self.df[columnas] -= 1
+            elif pregunta_id in self._posicion_por_id:
+                posicion = self._posicion_por_id.pop(pregunta_id)
+                if self.activos[posicion]:
+                    self.activos[posicion] = False
+                    self.df[self.indices[self.indptr[posicion]:self.indptr[posicion + 1]]] -= 1
+            else:
+                return
+            self._normas = None
+            self.cambios_sin_guardar += 1
+
+    def _fusionar_pendientes(self):
+        """Compacta la matriz: descarta filas borradas y añade las pendientes"""
+        if not self._pendientes and self.activos.all():
+            return
+
+        largos = np.diff(self.indptr)
+        seleccion = np.repeat(self.activos, largos)
+
+        ids = [self.ids[self.activos]]
+        indices = [self.indices[seleccion]]
+        datos = [self.datos[seleccion]]
+        nuevos_largos = [largos[self.activos]]
+
+        for pregunta_id, (columnas, pesos) in self._pendientes.items():
+            ids.append(np.array([pregunta_id], dtype=np.int64))
+            indices.append(np.array(columnas, dtype=np.int32))
+            datos.append(np.array(pesos, dtype=np.float32))
+            nuevos_largos.append(np.array([len(columnas)]))
+
+        largos_total = np.concatenate(nuevos_largos)
+        indptr = np.concatenate([[0], np.cumsum(largos_total)]).astype(np.int64)
+        self._pendientes = {}
+        self._asignar(np.concatenate(ids), indptr, np.concatenate(indices).astype(np.int32),
+                      np.concatenate(datos).astype(np.float32), np.ones(len(indptr) - 1, dtype=bool))
+
+    # ------------------------------------------------------------------ consultas
+
+    def _idf(self):
+        n_docs = int(self.activos.sum()) + len(self._pendientes)
+        return (np.log((1.0 + n_docs) / (1.0 + self.df)) + 1.0).astype(np.float32)
+
+    def _preparar(self, idf):
+        """CSC de la matriz principal y normas L2 de cada fila con el IDF vigente"""
+        filas = np.repeat(np.arange(len(self.ids), dtype=np.int64), np.diff(self.indptr))
+
+        if self._csc is None:
+            orden = np.argsort(self.indices, kind='stable')
+            indptr_csc = np.concatenate([[0], np.cumsum(np.bincount(self.indices, minlength=DIMENSIONES))])
+            self._csc = (indptr_csc, filas[orden], self.datos[orden])
+
+        if self._normas is None:
+            pesos = (self.datos * idf[self.indices]) ** 2
+            sumas = np.bincount(filas, weights=pesos, minlength=len(self.ids))
+            self._normas = np.sqrt(sumas).astype(np.float32)
+            self._normas[self._normas == 0] = 1.0
+
+    def similares_a_texto(self, texto_norm: str, k: int = 5,
+                          excluir_id: int = None) -> List[Tuple[int, float]]:
+        """Top-k [(pregunta_id, similitud coseno)] para un texto normalizado"""
+        columnas, pesos = vectorizar(texto_norm)
+        if not columnas:
+            return []
+
+        with self._lock:
+            idf = self._idf()
+            self._preparar(idf)
+
+            q = np.array(pesos, dtype=np.float32) * idf[columnas]
+            q /= np.linalg.norm(q) or 1.0
+
+            # Puntajes de la matriz principal: solo se recorren las columnas de la consulta
+            # (cada fila aparece a lo sumo una vez por columna, así que basta con +=)
+            indptr_csc, filas_csc, datos_csc = self._csc
+            puntajes = np.zeros(len(self.ids), dtype=np.float32)
+            for columna, peso in zip(columnas, q):
+                inicio, fin = indptr_csc[columna], indptr_csc[columna + 1]
+                puntajes[filas_csc[inicio:fin]] += datos_csc[inicio:fin] * (peso * idf[columna])
+            puntajes /= self._normas
+            puntajes[~self.activos] = 0.0
+
+            candidatos = []
+            if len(puntajes):
+                top = min(k + 1, len(puntajes))
+                mejores = np.argpartition(-puntajes, top - 1)[:top]
+                candidatos = [(int(self.ids[i]), float(puntajes[i])) for i in mejores if puntajes[i] > 0]
+
+            # Pendientes: pocos documentos, se puntúan uno a uno
+            consulta = dict(zip(columnas, q))
+            for pregunta_id, (cols, ws) in self._pendientes.items():
+                vector = np.array(ws, dtype=np.float32) * idf[cols]
+                norma = np.linalg.norm(vector) or 1.0
+                puntaje = sum(consulta.get(c, 0.0) * v for c, v in zip(cols, vector)) / norma
+                if puntaje > 0:
+                    candidatos.append((pregunta_id, float(puntaje)))
+
+        candidatos = [(pid, round(p, 4)) for pid, p in candidatos if pid != excluir_id]
+        candidatos.sort(key=lambda item: -item[1])
+        return candidatos[:k]
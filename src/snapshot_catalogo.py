@@ -0,0 +1,753 @@
+#!/usr/bin/env python3
+"""
+Snapshot inmutable del catálogo de preguntas para servir lecturas sin base de datos
+
+El banco cambia pocas veces al día y se lee miles de veces por minuto: construir_snapshot
+compila la tabla preguntas en un archivo binario que los workers abren con mmap. Todas
+las lecturas salen del page cache del sistema operativo, compartido entre procesos, y
+ninguna toca la base.
+
+Formato (enteros sin signo de 32 bits little-endian, secciones alineadas a 8 bytes):
+    cabecera           MAGIA, versión y posición/tamaño de cada sección
+    cadenas            tabla de cadenas deduplicadas: offsets (n+1) + bytes UTF-8
+    registros          CAMPOS enteros por pregunta (id e índices en la tabla de cadenas),
+                       ordenados por (habilidad_norm, habilidad, nivel, id)
+    grupos             (habilidad_norm, habilidad, nivel, inicio, fin) por cada rango
+                       contiguo de registros: selección y estadísticas sin recorrer filas
+    ids                ids ordenados y su posición en registros (búsqueda binaria)
+    preguntas_norm     pregunta_norm de cada registro, en su orden: las búsquedas de
+                       texto recorren estos bytes con mmap.find, sin decodificar
+    resumen            JSON con firma del origen, metadatos y conteos por tipo/categoría
+
+Uso:
+    python snapshot_catalogo.py --construir                 # desde la base configurada
+    python snapshot_catalogo.py --construir --si-cambio     # solo si la base cambió (cron)
+    python snapshot_catalogo.py --info
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from busqueda_difusa import UMBRAL_SIMILITUD_DEFECTO
+from config import DatabaseConfig
+from duplicados import NUMPY_DISPONIBLE, UMBRAL_DUPLICADO
+from instrumentacion import registro_consultas
+from metricas import metricas
+from normalizacion import normalizar_texto
+
+MAGIA = b'PRGCAT01'
+VERSION_FORMATO = 1
+
+# magia, versión, registros, cadenas, grupos, 2 reservados y (offset, tamaño) de cada sección
+CABECERA = struct.Struct('<8s6I14Q')
+SECCIONES = ('cadenas_offsets', 'cadenas_datos', 'registros', 'grupos', 'ids', 'preguntas_norm', 'resumen')
+
+# Campos de cada registro y de cada grupo
+CAMPOS = ('id', 'habilidad', 'pregunta', 'tipo', 'nivel', 'categoria', 'created_at')
+CAMPOS_GRUPO = 5
+
+# Segundos entre comprobaciones de si el archivo fue reemplazado por uno nuevo
+INTERVALO_RECARGA_S = 1.0
+
+
+def ruta_snapshot_defecto() -> str:
+    """SNAPSHOT_CATALOGO_PATH, o un archivo junto a la base configurada"""
+    if DatabaseConfig.SNAPSHOT_CATALOGO_PATH:
+        return DatabaseConfig.SNAPSHOT_CATALOGO_PATH
+    if DatabaseConfig.is_postgresql():
+        return f"catalogo_{DatabaseConfig.POSTGRES_CONFIG['database']}.snapshot"
+    return f"{DatabaseConfig.SQLITE_PATH}.snapshot"
+
+
+def _enteros(valores) -> bytes:
+    """array de uint32 en little-endian, como se guarda en el archivo"""
+    datos = array('I', valores)
+    if sys.byteorder == 'big':
+        datos.byteswap()
+    return datos.tobytes()
+
+
+def _vista_enteros(memoria: memoryview, inicio: int, tamano: int):
+    """Vista de uint32 sobre el mmap, sin copiar (copia solo en máquinas big-endian)"""
+    vista = memoria[inicio:inicio + tamano]
+    if sys.byteorder == 'little':
+        return vista.cast('I')
+    datos = array('I', vista.tobytes())
+    datos.byteswap()
+    return datos
+
+
+def _leer_filas(gestor) -> Iterator[tuple]:
+    """(id, habilidad, habilidad_norm, pregunta, pregunta_norm, tipo, nivel, categoria, created_at)"""
+    from fragmentacion import GestorFragmentado
+
+    if isinstance(gestor, GestorFragmentado):
+        for indice, fragmento in enumerate(gestor.fragmentos):
+            for fila in _leer_filas(fragmento):
+                yield (gestor.id_global(indice, fila[0]),) + fila[1:]
+        return
+
+    conn = gestor.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id, habilidad, habilidad_norm, pregunta, pregunta_norm,
+               tipo, nivel, categoria, created_at
+        FROM preguntas
+    ''')
+    for fila in cursor:
+        yield fila
+    conn.close()
+
+
+def _leer_metadatos(gestor) -> dict:
+    from fragmentacion import GestorFragmentado
+
+    if isinstance(gestor, GestorFragmentado):
+        gestor = gestor.fragmentos[0]
+    conn = gestor.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT clave, valor FROM metadatos')
+    metadatos = dict(cursor.fetchall())
+    conn.close()
+    return metadatos
+
+
+def firma_origen(gestor) -> List[int]:
+    """
+    (revisión, COUNT, MAX(id)) de la base: si no cambió, el snapshot sigue vigente. La
+    revisión (metadatos) sube con cada escritura del DatabaseManager, ediciones incluidas;
+    COUNT y MAX(id) cubren además las cargas hechas por fuera (psql, sqlite3).
+    """
+    from fragmentacion import GestorFragmentado
+
+    if isinstance(gestor, GestorFragmentado):
+        parciales = [firma_origen(fragmento) for fragmento in gestor.fragmentos]
+        # Revisión por fragmento: la suma podría repetirse con escrituras en fragmentos distintos
+        return [p[0] for p in parciales] + [sum(p[1] for p in parciales),
+                                            max(gestor.id_global(i, p[2]) for i, p in enumerate(parciales))]
+
+    conn = gestor.get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*), COALESCE(MAX(id), 0) FROM preguntas')
+    firma = [gestor.obtener_revision()] + [int(valor) for valor in cursor.fetchone()]
+    conn.close()
+    return firma
+
+
+def construir_snapshot(gestor, ruta: str = None) -> dict:
+    """
+    Compila el banco del gestor (DatabaseManager o GestorFragmentado) en `ruta`.
+    Se escribe a un temporal y se renombra: los workers ven el archivo viejo o el nuevo
+    completo, nunca uno a medias. Retorna el resumen guardado.
+    """
+    ruta = ruta or ruta_snapshot_defecto()
+    inicio = time.perf_counter()
+
+    def texto(valor) -> str:
+        return '' if valor is None else str(valor)
+
+    filas = sorted(
+        (tuple(texto(v) for v in fila[1:]) + (int(fila[0]),) for fila in _leer_filas(gestor)),
+        key=lambda f: (f[1], f[0], f[5], f[8])
+    )
+
+    cadenas, indices = [], {}
+
+    def cadena(valor: str) -> int:
+        indice = indices.get(valor)
+        if indice is None:
+            indice = indices[valor] = len(cadenas)
+            cadenas.append(valor)
+        return indice
+
+    registros, grupos, preguntas_norm = [], [], []
+    por_tipo, por_categoria = {}, {}
+    clave_grupo = None
+    for posicion, (habilidad, habilidad_norm, pregunta, pregunta_norm,
+                   tipo, nivel, categoria, creado, pregunta_id) in enumerate(filas):
+        registros.extend((pregunta_id, cadena(habilidad), cadena(pregunta), cadena(tipo),
+                          cadena(nivel), cadena(categoria), cadena(creado)))
+        preguntas_norm.append(pregunta_norm)
+
+        if (habilidad_norm, habilidad, nivel) != clave_grupo:
+            clave_grupo = (habilidad_norm, habilidad, nivel)
+            grupos.append([cadena(habilidad_norm), cadena(habilidad), cadena(nivel), posicion, posicion])
+        grupos[-1][4] = posicion + 1
+
+        conteos = por_tipo.setdefault(habilidad, {})
+        conteos[tipo] = conteos.get(tipo, 0) + 1
+        por_categoria[categoria] = por_categoria.get(categoria, 0) + 1
+
+    orden_ids = sorted(range(len(filas)), key=lambda posicion: filas[posicion][8])
+
+    datos_cadenas = bytearray()
+    offsets = [0]
+    for valor in cadenas:
+        datos_cadenas += valor.encode('utf-8')
+        offsets.append(len(datos_cadenas))
+
+    datos_norm = bytearray()
+    offsets_norm = [0]
+    for valor in preguntas_norm:
+        datos_norm += valor.encode('utf-8')
+        offsets_norm.append(len(datos_norm))
+
+    resumen = {
+        'firma': firma_origen(gestor),
+        'creado': datetime.now().isoformat(timespec='seconds'),
+        'origen': getattr(gestor, 'db_name', None) or DatabaseConfig.POSTGRES_CONFIG['database'],
+        'metadatos': _leer_metadatos(gestor),
+        'por_tipo': por_tipo,
+        'por_categoria': por_categoria,
+    }
+
+    secciones = [
+        _enteros(offsets),
+        bytes(datos_cadenas),
+        _enteros(registros),
+        _enteros(valor for grupo in grupos for valor in grupo),
+        _enteros([filas[p][8] for p in orden_ids]) + _enteros(orden_ids),
+        _enteros(offsets_norm) + bytes(datos_norm),
+        json.dumps(resumen, ensure_ascii=False).encode('utf-8'),
+    ]
+    if max(len(datos_cadenas), len(datos_norm)) >= 2 ** 32:
+        raise ValueError("El catálogo supera los 4 GB de texto que admite el formato")
+
+    posiciones, actual = [], CABECERA.size
+    for seccion in secciones:
+        actual += -actual % 8
+        posiciones.append((actual, len(seccion)))
+        actual += len(seccion)
+
+    cabecera = CABECERA.pack(MAGIA, VERSION_FORMATO, len(filas), len(cadenas), len(grupos), 0, 0,
+                             *[valor for posicion in posiciones for valor in posicion])
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(cabecera)
+        for (posicion, _), seccion in zip(posiciones, secciones):
+            f.write(b'\0' * (posicion - f.tell()))
+            f.write(seccion)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+    duracion = time.perf_counter() - inicio
+    print(f"✅ Snapshot {ruta}: {len(filas)} preguntas, {len(grupos)} grupos, "
+          f"{os.path.getsize(ruta) / 1024:.0f} KB en {duracion:.2f} s")
+    return resumen
+
+
+class SnapshotCatalogo:
+    """Lector de un snapshot: todas las estructuras son vistas sobre el mmap"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            estado = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identidad = (estado.st_ino, estado.st_mtime_ns)
+
+        campos = CABECERA.unpack_from(self._mmap, 0)
+        if campos[0] != MAGIA or campos[1] != VERSION_FORMATO:
+            raise ValueError(f"{ruta} no es un snapshot de catálogo compatible")
+        self.total, total_cadenas, total_grupos = campos[2:5]
+        posiciones = dict(zip(SECCIONES, zip(campos[7::2], campos[8::2])))
+
+        memoria = memoryview(self._mmap)
+        self._offsets = _vista_enteros(memoria, *posiciones['cadenas_offsets'])
+        inicio, tamano = posiciones['cadenas_datos']
+        self._cadenas = memoria[inicio:inicio + tamano]
+        self._registros = _vista_enteros(memoria, *posiciones['registros'])
+        grupos = _vista_enteros(memoria, *posiciones['grupos'])
+
+        inicio, tamano = posiciones['ids']
+        self._ids = _vista_enteros(memoria, inicio, 4 * self.total)
+        self._posiciones = _vista_enteros(memoria, inicio + 4 * self.total, 4 * self.total)
+
+        inicio, _ = posiciones['preguntas_norm']
+        self._offsets_norm = _vista_enteros(memoria, inicio, 4 * (self.total + 1))
+        self._inicio_norm = inicio + 4 * (self.total + 1)
+
+        inicio, tamano = posiciones['resumen']
+        self.resumen = json.loads(bytes(memoria[inicio:inicio + tamano]).decode('utf-8'))
+
+        # Índice de grupos en diccionarios: son pocos (habilidades x niveles)
+        self.grupos = {}
+        self.por_habilidad = {}
+        for i in range(total_grupos):
+            norm, habilidad, nivel, desde, hasta = grupos[i * CAMPOS_GRUPO:(i + 1) * CAMPOS_GRUPO]
+            rango = (self.cadena(habilidad), self.cadena(nivel), desde, hasta)
+            self.grupos.setdefault(self.cadena(norm), []).append(rango)
+            self.por_habilidad.setdefault(rango[0], []).append(rango)
+        self.habilidades = sorted(self.por_habilidad)
+
+    def cadena(self, indice: int) -> str:
+        return str(self._cadenas[self._offsets[indice]:self._offsets[indice + 1]], 'utf-8')
+
+    def campo(self, posicion: int, nombre: str) -> str:
+        return self.cadena(self._registros[posicion * len(CAMPOS) + CAMPOS.index(nombre)])
+
+    def registro(self, posicion: int) -> dict:
+        base = posicion * len(CAMPOS)
+        valores = self._registros[base:base + len(CAMPOS)]
+        fila = {nombre: self.cadena(valor) for nombre, valor in zip(CAMPOS[1:], valores[1:])}
+        fila['id'] = valores[0]
+        return fila
+
+    def pregunta_norm(self, posicion: int) -> str:
+        desde = self._inicio_norm + self._offsets_norm[posicion]
+        hasta = self._inicio_norm + self._offsets_norm[posicion + 1]
+        return str(self._mmap[desde:hasta], 'utf-8')
+
+    def posicion_de_id(self, pregunta_id: int) -> Optional[int]:
+        i = bisect.bisect_left(self._ids, pregunta_id)
+        if i < self.total and self._ids[i] == pregunta_id:
+            return self._posiciones[i]
+        return None
+
+    def posiciones_con_texto(self, termino_norm: str) -> Iterator[int]:
+        """Registros cuya pregunta_norm contiene el término (mmap.find sobre los bytes)"""
+        if not termino_norm:
+            yield from range(self.total)
+            return
+
+        buscado = termino_norm.encode('utf-8')
+        fin = self._inicio_norm + self._offsets_norm[self.total]
+        desde = self._inicio_norm
+        while True:
+            encontrado = self._mmap.find(buscado, desde, fin)
+            if encontrado < 0:
+                return
+            posicion = bisect.bisect_right(self._offsets_norm, encontrado - self._inicio_norm) - 1
+            # Una coincidencia que cruza el final de una pregunta no cuenta
+            if encontrado + len(buscado) - self._inicio_norm <= self._offsets_norm[posicion + 1]:
+                yield posicion
+                desde = self._inicio_norm + self._offsets_norm[posicion + 1]
+            else:
+                desde = encontrado + 1
+
+
+class GestorSoloLectura:
+    """
+    Interfaz de lectura de DatabaseManager servida desde un snapshot. Las escrituras se
+    rechazan: se hacen contra la base y se publica un snapshot nuevo, que cada worker
+    detecta (cambia el inodo del archivo) y abre sin reiniciarse.
+    """
+
+    def __init__(self, ruta: str = None):
+        self.db_type = 'snapshot'
+        self.db_name = ruta or ruta_snapshot_defecto()
+        self.selector_replicas = None
+        self._lock = threading.Lock()
+        self._snapshot = SnapshotCatalogo(self.db_name)
+        self._verificado = time.monotonic()
+        self._indice_trigramas = None
+        self._indice_similitud = None
+        print(f"🗄️ Catálogo de solo lectura: {self.db_name} ({self._snapshot.total} preguntas, "
+              f"creado {self._snapshot.resumen['creado']})")
+
+    def _catalogo(self) -> SnapshotCatalogo:
+        """Snapshot vigente; reabre el archivo si fue reemplazado (como mucho una vez por segundo)"""
+        metricas.incrementar('preguntas_db_lecturas_total', destino='snapshot')
+        ahora = time.monotonic()
+        if ahora - self._verificado < INTERVALO_RECARGA_S:
+            return self._snapshot
+
+        with self._lock:
+            if ahora - self._verificado >= INTERVALO_RECARGA_S:
+                self._verificado = ahora
+                try:
+                    estado = os.stat(self.db_name)
+                    if (estado.st_ino, estado.st_mtime_ns) != self._snapshot.identidad:
+                        # El mmap anterior se libera cuando terminan las lecturas que lo usan
+                        self._snapshot = SnapshotCatalogo(self.db_name)
+                        self._indice_trigramas = None
+                        self._indice_similitud = None
+                        print(f"🔄 Snapshot recargado: {self._snapshot.total} preguntas")
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ No se pudo recargar el snapshot, se sigue con el actual: {e}")
+        return self._snapshot
+
+    @staticmethod
+    def _rechazar(operacion: str):
+        print(f"❌ Catálogo en modo solo lectura: {operacion} debe hacerse en la base y "
+              f"publicarse con snapshot_catalogo.py --construir")
+
+    def _rangos(self, catalogo: SnapshotCatalogo, habilidad: str, nivel: str = None) -> list:
+        """Rangos de la habilidad: coincidencia exacta normalizada, si no parcial (como LIKE)"""
+        habilidad_norm = normalizar_texto(habilidad)
+        if habilidad_norm in catalogo.grupos:
+            rangos = catalogo.grupos[habilidad_norm]
+        else:
+            rangos = [rango for norm, grupos in catalogo.grupos.items() if habilidad_norm in norm
+                      for rango in grupos]
+        return [rango for rango in rangos if not nivel or rango[1] == nivel]
+
+    @staticmethod
+    def _muestra(rangos: list, cantidad: int) -> List[int]:
+        """Posiciones al azar (sin repetir) dentro de varios rangos"""
+        total = sum(hasta - desde for _, _, desde, hasta in rangos)
+        posiciones = []
+        for k in random.sample(range(total), min(cantidad, total)):
+            for _, _, desde, hasta in rangos:
+                if k < hasta - desde:
+                    posiciones.append(desde + k)
+                    break
+                k -= hasta - desde
+        return posiciones
+
+    # ------------------------------------------------------------------ escrituras
+
+    def agregar_pregunta(self, *args, **kwargs) -> bool:
+        self._rechazar('agregar preguntas')
+        return False
+
+    def agregar_preguntas_lote(self, preguntas) -> int:
+        self._rechazar('la carga masiva')
+        return 0
+
+    def guardar_metadato(self, clave: str, valor: str) -> bool:
+        self._rechazar('guardar metadatos')
+        return False
+
+    def actualizar_pregunta(self, *args, **kwargs) -> bool:
+        self._rechazar('actualizar preguntas')
+        return False
+
+    def eliminar_pregunta(self, pregunta_id: int) -> bool:
+        self._rechazar('eliminar preguntas')
+        return False
+
+    def limpiar_base_datos(self) -> bool:
+        self._rechazar('limpiar la base')
+        return False
+
+    # ------------------------------------------------------------------ lecturas
+
+    def obtener_metadato(self, clave: str) -> Optional[str]:
+        return self._catalogo().resumen['metadatos'].get(clave)
+
+    def obtener_revision(self) -> tuple:
+        # El catálogo solo cambia al publicarse otro snapshot: su identidad hace de revisión
+        return self._catalogo().identidad
+
+    def existe_habilidad(self, habilidad: str) -> bool:
+        return normalizar_texto(habilidad) in self._catalogo().grupos
+
+    def obtener_claves_preguntas(self, habilidades: List[str]) -> set:
+        catalogo = self._catalogo()
+        claves = set()
+        for habilidad_norm in {normalizar_texto(h) for h in habilidades}:
+            for _, _, desde, hasta in catalogo.grupos.get(habilidad_norm, []):
+                claves.update((habilidad_norm, catalogo.pregunta_norm(p)) for p in range(desde, hasta))
+        return claves
+
+    def obtener_preguntas_por_habilidad(self, habilidad: str,
+                                        cantidad: int = 2,
+                                        nivel: Optional[str] = None) -> List[str]:
+        catalogo = self._catalogo()
+        return [catalogo.campo(p, 'pregunta')
+                for p in self._muestra(self._rangos(catalogo, habilidad, nivel), cantidad)]
+
+    def obtener_todas_habilidades(self) -> List[str]:
+        return list(self._catalogo().habilidades)
+
+    def obtener_estadisticas_habilidad(self, habilidad: str) -> dict:
+        catalogo = self._catalogo()
+        niveles = {}
+        tipos = {}
+        # Por nombre normalizado, como DatabaseManager: suma las grafías de la misma habilidad
+        rangos = catalogo.grupos.get(normalizar_texto(habilidad), [])
+        for _, nivel, desde, hasta in rangos:
+            niveles[nivel] = niveles.get(nivel, 0) + hasta - desde
+        for nombre in {rango[0] for rango in rangos}:
+            for tipo, cantidad in catalogo.resumen['por_tipo'].get(nombre, {}).items():
+                tipos[tipo] = tipos.get(tipo, 0) + cantidad
+        return {
+            'habilidad': habilidad,
+            'total': sum(niveles.values()),
+            'por_nivel': niveles,
+            'por_tipo': tipos
+        }
+
+    def obtener_estadisticas_habilidades(self) -> dict:
+        return {h: self.obtener_estadisticas_habilidad(h) for h in self._catalogo().habilidades}
+
+    def obtener_habilidades_con_criterios(self, nivel: str = None, tipo: str = None,
+                                          categoria: str = None) -> List[str]:
+        """Por nivel basta con los grupos; tipo y categoría recorren los registros hasta el primero que cumple"""
+        catalogo = self._catalogo()
+        habilidades = []
+        for habilidad in catalogo.habilidades:
+            rangos = [r for r in catalogo.por_habilidad[habilidad] if not nivel or r[1] == nivel]
+            if not (tipo or categoria):
+                cumple = bool(rangos)
+            else:
+                cumple = any((not tipo or catalogo.campo(p, 'tipo') == tipo)
+                             and (not categoria or catalogo.campo(p, 'categoria') == categoria)
+                             for _, _, desde, hasta in rangos for p in range(desde, hasta))
+            if cumple:
+                habilidades.append(habilidad)
+        return habilidades
+
+    def contar_preguntas(self) -> int:
+        return self._catalogo().total
+
+    def contar_preguntas_por_habilidad(self, habilidad: str) -> int:
+        return sum(hasta - desde for _, _, desde, hasta in self._rangos(self._catalogo(), habilidad))
+
+    def buscar_preguntas(self, termino: str, limit: int = 10) -> List[Tuple]:
+        catalogo = self._catalogo()
+        termino_norm = normalizar_texto(termino)
+
+        posiciones = set(catalogo.posiciones_con_texto(termino_norm))
+        for norm, rangos in catalogo.grupos.items():
+            if termino_norm in norm:
+                for _, _, desde, hasta in rangos:
+                    posiciones.update(range(desde, hasta))
+
+        filas = [catalogo.registro(p) for p in posiciones]
+        filas.sort(key=lambda fila: (fila['habilidad'], fila['pregunta']))
+        return [(f['habilidad'], f['pregunta'], f['tipo'], f['nivel']) for f in filas[:limit]]
+
+    def _normalizados(self, catalogo: SnapshotCatalogo) -> Iterator[Tuple[int, str, str]]:
+        """(id, habilidad_norm, pregunta_norm) de todo el catálogo"""
+        for norm, rangos in catalogo.grupos.items():
+            for _, _, desde, hasta in rangos:
+                for posicion in range(desde, hasta):
+                    yield catalogo._registros[posicion * len(CAMPOS)], norm, catalogo.pregunta_norm(posicion)
+
+    def _filas_por_id(self, catalogo: SnapshotCatalogo, ids) -> dict:
+        filas = {}
+        for pregunta_id in ids:
+            posicion = catalogo.posicion_de_id(pregunta_id)
+            if posicion is not None:
+                filas[pregunta_id] = catalogo.registro(posicion)
+        return filas
+
+    def buscar_preguntas_difusa(self, termino: str, limit: int = 10,
+                                umbral: float = UMBRAL_SIMILITUD_DEFECTO) -> List[Tuple]:
+        """El índice de trigramas se arma en memoria del proceso, una vez por snapshot"""
+        from busqueda_difusa import IndiceTrigramas
+
+        catalogo = self._catalogo()
+        indice = self._indice_trigramas
+        if indice is None:
+            indice = IndiceTrigramas()
+            for pregunta_id, habilidad_norm, pregunta_norm in self._normalizados(catalogo):
+                indice.agregar(pregunta_id, habilidad_norm, pregunta_norm)
+            self._indice_trigramas = indice
+
+        coincidencias = indice.buscar(normalizar_texto(termino), umbral, limit)
+        filas = self._filas_por_id(catalogo, [pregunta_id for pregunta_id, _ in coincidencias])
+        return [(filas[i]['habilidad'], filas[i]['pregunta'], filas[i]['tipo'], filas[i]['nivel'], similitud)
+                for i, similitud in coincidencias if i in filas]
+
+    def obtener_preguntas_similares(self, pregunta_id: int = None, texto: str = None,
+                                    k: int = 5) -> List[dict]:
+        if not NUMPY_DISPONIBLE:
+            print("❌ numpy no instalado. Instala con: pip install numpy")
+            return []
+        from similitud import IndiceSimilitud
+
+        catalogo = self._catalogo()
+        if pregunta_id is not None:
+            posicion = catalogo.posicion_de_id(pregunta_id)
+            if posicion is None:
+                return []
+            texto_norm = f"{normalizar_texto(catalogo.campo(posicion, 'habilidad'))} {catalogo.pregunta_norm(posicion)}"
+        else:
+            texto_norm = normalizar_texto(texto or '')
+
+        if self._indice_similitud is None:
+            self._indice_similitud = IndiceSimilitud.construir(
+                (pid, f"{habilidad_norm} {pregunta_norm}")
+                for pid, habilidad_norm, pregunta_norm in self._normalizados(catalogo)
+            )
+
+        coincidencias = self._indice_similitud.similares_a_texto(texto_norm, k, excluir_id=pregunta_id)
+        filas = self._filas_por_id(catalogo, [pid for pid, _ in coincidencias])
+        return [{'id': pid, 'habilidad': filas[pid]['habilidad'], 'pregunta': filas[pid]['pregunta'],
+                 'tipo': filas[pid]['tipo'], 'nivel': filas[pid]['nivel'], 'similitud': puntaje}
+                for pid, puntaje in coincidencias if pid in filas]
+
+    def buscar_casi_duplicados(self, pregunta: str, habilidad: str = None,
+                               umbral: float = UMBRAL_DUPLICADO) -> List[dict]:
+        print("⚠️ La detección de duplicados usa las firmas MinHash de la base, no el snapshot")
+        return []
+
+    def reporte_duplicados(self, umbral: float = UMBRAL_DUPLICADO) -> List[dict]:
+        print("⚠️ La detección de duplicados usa las firmas MinHash de la base, no el snapshot")
+        return []
+
+    def obtener_pregunta_por_id(self, pregunta_id: int) -> dict:
+        catalogo = self._catalogo()
+        posicion = catalogo.posicion_de_id(pregunta_id)
+        return catalogo.registro(posicion) if posicion is not None else {}
+
+    def obtener_preguntas_por_criterios(self,
+                                        habilidades: List[str] = None,
+                                        nivel: str = None,
+                                        tipo: str = None,
+                                        cantidad_por_habilidad: int = 2) -> dict:
+        catalogo = self._catalogo()
+        resultado = {}
+        for habilidad in habilidades or catalogo.habilidades:
+            rangos = [r for r in catalogo.por_habilidad.get(habilidad, []) if not nivel or r[1] == nivel]
+            if tipo:
+                candidatas = [p for _, _, desde, hasta in rangos for p in range(desde, hasta)
+                              if catalogo.campo(p, 'tipo') == tipo]
+                elegidas = random.sample(candidatas, min(cantidad_por_habilidad, len(candidatas)))
+            else:
+                elegidas = self._muestra(rangos, cantidad_por_habilidad)
+            if elegidas:
+                resultado[habilidad] = [catalogo.campo(p, 'pregunta') for p in elegidas]
+        return resultado
+
+    def obtener_pool_preguntas(self, habilidades: List[str],
+                               nivel: str = None) -> Dict[str, List[Tuple[int, str]]]:
+        catalogo = self._catalogo()
+        pools = {}
+        for habilidad in habilidades:
+            pools[habilidad] = sorted((catalogo.registro(p)['id'], catalogo.campo(p, 'pregunta'))
+                                      for _, _, desde, hasta in self._rangos(catalogo, habilidad, nivel)
+                                      for p in range(desde, hasta))
+        return pools
+
+    def obtener_pool_estratos(self, habilidades: List[str]) -> Dict[str, Dict[Tuple[str, str], List[Tuple[int, str]]]]:
+        catalogo = self._catalogo()
+        estratos = {}
+        for habilidad in habilidades:
+            por_estrato = estratos.setdefault(habilidad, {})
+            for _, nivel, desde, hasta in self._rangos(catalogo, habilidad):
+                for p in range(desde, hasta):
+                    registro = catalogo.registro(p)
+                    por_estrato.setdefault((nivel, registro['tipo']), []).append((registro['id'], registro['pregunta']))
+            for pool in por_estrato.values():
+                pool.sort()
+        return estratos
+
+    def _descripcion(self, catalogo: SnapshotCatalogo) -> str:
+        return f"SNAPSHOT ({self.db_name}, creado {catalogo.resumen['creado']})"
+
+    def obtener_estadisticas_generales(self) -> dict:
+        catalogo = self._catalogo()
+        por_nivel, totales = {}, {}
+        for habilidad, rangos in catalogo.por_habilidad.items():
+            for _, nivel, desde, hasta in rangos:
+                por_nivel[nivel] = por_nivel.get(nivel, 0) + hasta - desde
+                totales[habilidad] = totales.get(habilidad, 0) + hasta - desde
+
+        por_tipo = {}
+        for conteos in catalogo.resumen['por_tipo'].values():
+            for tipo, cantidad in conteos.items():
+                por_tipo[tipo] = por_tipo.get(tipo, 0) + cantidad
+
+        return {
+            'total_preguntas': catalogo.total,
+            'por_nivel': por_nivel,
+            'por_tipo': por_tipo,
+            'por_categoria': dict(catalogo.resumen['por_categoria']),
+            'top_habilidades': sorted(totales.items(), key=lambda par: (-par[1], par[0]))[:5],
+            'archivo_bd': self._descripcion(catalogo)
+        }
+
+    def obtener_resumen_completo(self) -> dict:
+        catalogo = self._catalogo()
+        return {
+            'total_preguntas': catalogo.total,
+            'total_habilidades': len(catalogo.habilidades),
+            'habilidades': list(catalogo.habilidades),
+            'estadisticas': self.obtener_estadisticas_habilidades(),
+            'archivo_bd': self._descripcion(catalogo)
+        }
+
+    def exportar_bd_a_sql(self, archivo_salida: str = "backup_preguntas.sql") -> bool:
+        from generate_migration import escapar_sql
+
+        try:
+            catalogo = self._catalogo()
+            with open(archivo_salida, 'w', encoding='utf-8') as f:
+                f.write("-- Backup generado desde un snapshot del catálogo\n")
+                f.write(f"-- Snapshot: {self.db_name} (creado {catalogo.resumen['creado']})\n")
+                f.write(f"-- Total registros: {catalogo.total}\n\n")
+                for posicion in range(catalogo.total):
+                    fila = catalogo.registro(posicion)
+                    valores = ', '.join(escapar_sql(fila[campo]) for campo in CAMPOS[1:])
+                    f.write(f"INSERT INTO preguntas ({', '.join(CAMPOS[1:])}) VALUES ({valores});\n")
+
+            print(f"✅ Base de datos exportada a: {archivo_salida}")
+            return True
+
+        except Exception as e:
+            print(f"❌ Error exportando BD: {e}")
+            return False
+
+    # ------------------------------------------------------------------ mantenimiento
+
+    def test_connection(self) -> bool:
+        catalogo = self._catalogo()
+        print(f"✅ Snapshot disponible: {catalogo.total} preguntas (creado {catalogo.resumen['creado']})")
+        return True
+
+    def obtener_metricas_consultas(self) -> dict:
+        metricas_consultas = registro_consultas.snapshot()
+        metricas_consultas['lentas'] = registro_consultas.consultas_lentas()
+        return metricas_consultas
+
+    def estado_replicas(self) -> List[dict]:
+        return []
+
+    def cerrar_conexion(self):
+        pass
+
+
+def main():
+    from fragmentacion import crear_gestor_bd
+
+    parser = argparse.ArgumentParser(description='Snapshot del catálogo para servir lecturas con mmap')
+    parser.add_argument('--construir', action='store_true', help='Compila la base configurada en el snapshot')
+    parser.add_argument('--si-cambio', action='store_true',
+                        help='Con --construir: solo si la revisión, COUNT o MAX(id) de la base '
+                             'difieren del snapshot')
+    parser.add_argument('--salida', help='Archivo del snapshot (por defecto SNAPSHOT_CATALOGO_PATH)')
+    parser.add_argument('--info', action='store_true', help='Muestra el contenido del snapshot')
+    args = parser.parse_args()
+
+    ruta = args.salida or ruta_snapshot_defecto()
+
+    if args.construir:
+        gestor = crear_gestor_bd(solo_lectura=False)
+        if args.si_cambio and os.path.exists(ruta):
+            try:
+                vigente = SnapshotCatalogo(ruta).resumen['firma'] == firma_origen(gestor)
+            except ValueError:
+                vigente = False
+            if vigente:
+                print(f"✅ Snapshot {ruta} al día, no se reconstruye")
+                return
+        construir_snapshot(gestor, ruta)
+        gestor.cerrar_conexion()
+
+    if args.info or not args.construir:
+        catalogo = SnapshotCatalogo(ruta)
+        print(f"📦 {ruta}: {catalogo.total} preguntas, {len(catalogo.habilidades)} habilidades, "
+              f"{os.path.getsize(ruta) / 1024:.0f} KB")
+        print(f"   Creado {catalogo.resumen['creado']} desde {catalogo.resumen['origen']} "
+              f"(firma {catalogo.resumen['firma']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Punto de entrada WSGI para servir la aplicación con varios workers
+
+    gunicorn -w 4 -b 0.0.0.0:5000 wsgi:app
+
+Cada worker inicializa el sistema al importar este módulo e informa cuánto
+tardó su arranque en frío. Con --preload la importación ocurre una sola vez en
+el proceso maestro y los workers la heredan al hacer fork (las conexiones se
+abren por operación, así que no quedan compartidas entre procesos).
+"""
+
+import os
+import sys
+import time
+
+_inicio = time.perf_counter()
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, inicializar_sistema
+
+if inicializar_sistema():
+    print(f"✅ Worker {os.getpid()} listo en {(time.perf_counter() - _inicio) * 1000:.0f} ms")
+else:
+    print(f"❌ Worker {os.getpid()}: error inicializando sistema")
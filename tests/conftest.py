@@ -0,0 +1,51 @@
+"""
+Configuración común de las pruebas (pytest desde la raíz del repositorio)
+
+Los módulos viven en src/ y se importan planos, como al ejecutar los scripts. Cada
+prueba corre en su propio directorio temporal con bases SQLite nuevas y la
+configuración leída de nuevo (DatabaseConfig.recargar).
+"""
+
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, 'src'))
+
+from config import DatabaseConfig  # noqa: E402
+from normalizacion import NIVELES  # noqa: E402
+
+# Variables que cambiarían el gestor creado o dejarían archivos fuera del temporal
+VARIABLES_ENTORNO = ('DATABASE_TYPE', 'FRAGMENTOS_SQLITE', 'CATALOGO_SOLO_LECTURA', 'SNAPSHOT_CATALOGO_PATH',
+                     'METRICAS_DIR', 'SIMILITUD_CACHE_PATH', 'DATOS_INICIALES_PATH', 'POSTGRES_REPLICAS')
+
+
+@pytest.fixture(autouse=True)
+def entorno(monkeypatch, tmp_path):
+    for variable in VARIABLES_ENTORNO:
+        monkeypatch.delenv(variable, raising=False)
+    monkeypatch.setenv('DATABASE_TYPE', 'sqlite')
+    monkeypatch.setenv('SQLITE_PATH', str(tmp_path / 'banco.db'))
+    monkeypatch.setenv('SESIONES_PATH', str(tmp_path / 'sesiones.db'))
+    monkeypatch.chdir(tmp_path)
+    DatabaseConfig.recargar()
+    yield
+    DatabaseConfig.recargar()
+
+
+def filas_banco(habilidades=('Python', 'Docker'), tipos=('practica', 'conceptual'), por_estrato: int = 3):
+    """(habilidad, pregunta, tipo, nivel, categoria) con por_estrato preguntas por (nivel, tipo)"""
+    return [(habilidad, f"¿Pregunta {i} de {habilidad} para {nivel}, tipo {tipo}?", tipo, nivel, 'tecnica')
+            for habilidad in habilidades for nivel in NIVELES for tipo in tipos for i in range(por_estrato)]
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """DatabaseManager sobre un SQLite temporal con filas_banco()"""
+    from database_manager import DatabaseManager
+
+    db = DatabaseManager(str(tmp_path / 'banco.db'))
+    assert db.agregar_preguntas_lote(filas_banco()) == len(filas_banco())
+    return db
@@ -0,0 +1,68 @@
+"""Cuotas por nivel y mínimos por tipo del compositor de entrevistas"""
+
+from collections import Counter
+
+import pytest
+
+from compositor import CompositorEntrevistas, asignar_tipos, preparar_especificacion
+
+
+def test_cuotas_por_nivel_exactas_y_minimos_por_tipo(banco):
+    especificacion = {
+        'niveles': {'avanzado': 1, 'basico': 1, 'intermedio': 2},
+        'tipos_minimos': {'practica': 3},
+        'habilidades': ['Python', 'Docker']
+    }
+    resultado = CompositorEntrevistas(banco).componer(especificacion, semilla=7)
+
+    assert resultado['completa']
+    assert resultado['total_preguntas'] == 8
+    for habilidad, datos in resultado['habilidades'].items():
+        preguntas = datos['preguntas']
+        assert Counter(p['nivel'] for p in preguntas) == {'basico': 1, 'intermedio': 2, 'avanzado': 1}
+        assert sum(p['tipo'] == 'practica' for p in preguntas) >= 3
+        assert len({p['id'] for p in preguntas}) == len(preguntas)
+        assert all(habilidad in p['pregunta'] for p in preguntas)
+        # De básico a avanzado, sea cual sea el orden de la especificación
+        assert [p['nivel'] for p in preguntas] == ['basico', 'intermedio', 'intermedio', 'avanzado']
+
+
+def test_cuotas_propias_de_una_habilidad(banco):
+    especificacion = {'niveles': {'basico': 1},
+                      'habilidades': {'Python': {}, 'Docker': {'niveles': {'avanzado': 2}}}}
+    resultado = CompositorEntrevistas(banco).componer(especificacion, semilla=1)
+
+    assert [p['nivel'] for p in resultado['habilidades']['Python']['preguntas']] == ['basico']
+    assert [p['nivel'] for p in resultado['habilidades']['Docker']['preguntas']] == ['avanzado', 'avanzado']
+
+
+def test_lo_que_el_banco_no_cubre_se_informa(banco):
+    especificacion = {'niveles': {'avanzado': 10}, 'tipos_minimos': {'experiencia': 1}, 'habilidades': ['Python']}
+    resultado = CompositorEntrevistas(banco).componer(especificacion, semilla=3)
+
+    datos = resultado['habilidades']['Python']
+    assert not resultado['completa']
+    assert len(datos['preguntas']) == 6
+    assert datos['faltantes'] == {'niveles': {'avanzado': 4}, 'tipos': {'experiencia': 1}}
+
+
+def test_minimos_por_tipo_repartidos_entre_niveles():
+    disponibles = {('basico', 'practica'): 1, ('basico', 'conceptual'): 5, ('avanzado', 'practica'): 1}
+    asignacion, faltan = asignar_tipos({'basico': 1, 'avanzado': 1}, {'practica': 2}, disponibles)
+
+    assert faltan == {}
+    assert asignacion == {('basico', 'practica'): 1, ('avanzado', 'practica'): 1}
+
+    _, faltan = asignar_tipos({'basico': 1, 'avanzado': 1}, {'practica': 3}, disponibles)
+    assert faltan == {'practica': 1}
+
+
+@pytest.mark.parametrize('especificacion', [
+    {'niveles': {'basico': 1}},
+    {'niveles': {}, 'habilidades': ['Python']},
+    {'niveles': {'basico': -1}, 'habilidades': ['Python']},
+    {'niveles': {'basico': 1}, 'tipos_minimos': {'practica': 2}, 'habilidades': ['Python']},
+])
+def test_especificaciones_invalidas(especificacion):
+    with pytest.raises(ValueError):
+        preparar_especificacion(especificacion)
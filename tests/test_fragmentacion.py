@@ -0,0 +1,120 @@
+"""Banco SQLite fragmentado por habilidad: enrutamiento, ids globales y mapa compartido"""
+
+import shutil
+import sqlite3
+
+import pytest
+
+import fragmentacion
+from conftest import RAIZ, filas_banco
+from fragmentacion import GestorFragmentado, crear_gestor_bd, repartir_sqlite, ruta_fragmento
+from normalizacion import normalizar_texto
+
+FRAGMENTOS = 3
+
+
+@pytest.fixture
+def ruta_base(tmp_path):
+    return str(tmp_path / 'banco.db')
+
+
+@pytest.fixture
+def fragmentado(ruta_base):
+    return GestorFragmentado(ruta_base, FRAGMENTOS)
+
+
+def preguntas_en(ruta: str) -> set:
+    conn = sqlite3.connect(ruta)
+    habilidades = {fila[0] for fila in conn.execute('SELECT DISTINCT habilidad_norm FROM preguntas')}
+    conn.close()
+    return habilidades
+
+
+def test_habilidad_enrutada_por_nombre_normalizado(fragmentado, ruta_base):
+    habilidades = ('Python', 'Docker', 'Kubernetes', 'SQL', 'Go')
+    assert fragmentado.agregar_preguntas_lote(filas_banco(habilidades, por_estrato=1)) == 30
+
+    for habilidad in habilidades:
+        indice = fragmentado.indice_fragmento(habilidad)
+        assert fragmentado.indice_fragmento(f'  {habilidad.upper()} ') == indice
+        assert normalizar_texto(habilidad) in preguntas_en(ruta_fragmento(ruta_base, indice))
+        otros = [i for i in range(FRAGMENTOS) if i != indice]
+        assert all(normalizar_texto(habilidad) not in preguntas_en(ruta_fragmento(ruta_base, i)) for i in otros)
+
+    assert fragmentado.contar_preguntas() == 30
+    assert fragmentado.obtener_todas_habilidades() == sorted(habilidades)
+    assert fragmentado.obtener_estadisticas_habilidad('python')['total'] == 6
+
+
+def test_ids_globales(fragmentado):
+    fragmentado.agregar_preguntas_lote(filas_banco(('Python', 'Docker', 'SQL'), por_estrato=1))
+
+    for habilidad in ('Python', 'Docker', 'SQL'):
+        indice = fragmentado.indice_fragmento(habilidad)
+        for pregunta_id, texto in fragmentado.obtener_pool_preguntas([habilidad])[habilidad]:
+            assert pregunta_id % FRAGMENTOS == indice
+            assert fragmentado.obtener_pregunta_por_id(pregunta_id)['pregunta'] == texto
+
+    pregunta_id = fragmentado.obtener_pool_preguntas(['SQL'])['SQL'][0][0]
+    assert fragmentado.eliminar_pregunta(pregunta_id)
+    assert fragmentado.obtener_pregunta_por_id(pregunta_id) == {}
+    assert fragmentado.contar_preguntas_por_habilidad('SQL') == 5
+
+
+def test_asignar_habilidad_visible_para_otra_instancia(fragmentado, ruta_base):
+    otra = GestorFragmentado(ruta_base, FRAGMENTOS)
+    destino = (fragmentado.indice_fragmento('Rust') + 1) % FRAGMENTOS
+
+    assert fragmentado.asignar_habilidad('Rust', destino)
+    # Las escrituras releen el mapa siempre: la pregunta cae en el fragmento asignado
+    assert otra.agregar_pregunta('Rust', '¿Qué garantiza el borrow checker?')
+    assert 'rust' in preguntas_en(ruta_fragmento(ruta_base, destino))
+    assert fragmentado.contar_preguntas_por_habilidad('Rust') == 1
+
+
+def test_lecturas_releen_el_mapa_tras_el_intervalo(fragmentado, ruta_base, monkeypatch):
+    otra = GestorFragmentado(ruta_base, FRAGMENTOS)
+    destino = (otra.indice_fragmento('Rust') + 1) % FRAGMENTOS
+    assert fragmentado.asignar_habilidad('Rust', destino)
+
+    monkeypatch.setattr(fragmentacion, 'INTERVALO_MAPA_S', 0.0)
+    assert otra.indice_fragmento('Rust') == destino
+
+
+def test_asignar_habilidad_con_preguntas_rechazada(fragmentado):
+    fragmentado.agregar_pregunta('Python', '¿Qué es el GIL?')
+    actual = fragmentado.indice_fragmento('Python')
+
+    assert not fragmentado.asignar_habilidad('Python', (actual + 1) % FRAGMENTOS)
+    assert not fragmentado.asignar_habilidad('Rust', FRAGMENTOS)
+    assert fragmentado.indice_fragmento('Python', escritura=True) == actual
+
+
+def test_numero_de_fragmentos_distinto_rechazado(fragmentado, ruta_base):
+    with pytest.raises(Exception):
+        GestorFragmentado(ruta_base, FRAGMENTOS + 1)
+
+
+def test_repartir_banco_existente(ruta_base, tmp_path):
+    origen = str(tmp_path / 'preguntas_entrevista.db')
+    shutil.copyfile(f'{RAIZ}/preguntas_entrevista.db', origen)
+    conn = sqlite3.connect(origen)
+    total, habilidades = conn.execute('SELECT COUNT(*), COUNT(DISTINCT habilidad) FROM preguntas').fetchone()
+    conn.close()
+
+    destino = GestorFragmentado(ruta_base, FRAGMENTOS)
+    assert repartir_sqlite(origen, destino) == total
+    assert destino.contar_preguntas() == total
+    assert len(destino.obtener_todas_habilidades()) == habilidades
+
+
+def test_crear_gestor_bd_segun_configuracion(monkeypatch, ruta_base):
+    from config import DatabaseConfig
+    from database_manager import DatabaseManager
+
+    assert type(crear_gestor_bd(ruta_base)) is DatabaseManager
+
+    monkeypatch.setenv('FRAGMENTOS_SQLITE', str(FRAGMENTOS))
+    DatabaseConfig.recargar()
+    gestor = crear_gestor_bd(str(ruta_base).replace('banco', 'otro'))
+    assert isinstance(gestor, GestorFragmentado) and gestor.total_fragmentos == FRAGMENTOS
@@ -0,0 +1,103 @@
+"""Migraciones sobre bases existentes: las del repositorio y una heredada con duplicados"""
+
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from conftest import RAIZ
+from database_manager import FUENTE_BANCO, DatabaseManager
+from migraciones import EjecutorMigraciones, ultima_version
+from normalizacion import normalizar_texto
+
+BASES_EXISTENTES = ('preguntas_entrevista.db', os.path.join('src', 'test_preguntas.db'))
+
+
+def copiar_base(relativa: str, destino) -> str:
+    """Copia de trabajo: las bases versionadas no se tocan"""
+    ruta = str(destino / os.path.basename(relativa))
+    shutil.copyfile(os.path.join(RAIZ, relativa), ruta)
+    return ruta
+
+
+def leer_filas(ruta: str):
+    conn = sqlite3.connect(ruta)
+    filas = conn.execute('SELECT id, habilidad, pregunta, tipo, nivel FROM preguntas ORDER BY id').fetchall()
+    conn.close()
+    return filas
+
+
+def version_de(ruta: str) -> int:
+    conn = sqlite3.connect(ruta)
+    version = EjecutorMigraciones(conn, 'sqlite').version_actual()
+    conn.close()
+    return version
+
+
+@pytest.mark.parametrize('relativa', BASES_EXISTENTES)
+def test_base_existente_llega_a_la_ultima_version(relativa, tmp_path):
+    ruta = copiar_base(relativa, tmp_path)
+    antes = leer_filas(ruta)
+    assert version_de(ruta) == 0
+
+    db = DatabaseManager(ruta)
+
+    assert version_de(ruta) == ultima_version()
+    assert leer_filas(ruta) == antes
+    assert db.contar_preguntas() == len(antes)
+
+    conn = sqlite3.connect(ruta)
+    ejecutor = EjecutorMigraciones(conn, 'sqlite')
+    for columna in ('habilidad_norm', 'pregunta_norm', 'categoria', 'fuente'):
+        assert ejecutor.existe_columna('preguntas', columna)
+    for habilidad, habilidad_norm, pregunta, pregunta_norm, fuente in conn.execute(
+            'SELECT habilidad, habilidad_norm, pregunta, pregunta_norm, fuente FROM preguntas'):
+        assert habilidad_norm == normalizar_texto(habilidad)
+        assert pregunta_norm == normalizar_texto(pregunta)
+        assert fuente == FUENTE_BANCO
+    indices = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert {'unique_pregunta', 'idx_habilidad_norm_nivel', 'idx_habilidad_tipo'} <= indices
+    assert 'idx_habilidad' not in indices
+
+
+def test_reabrir_no_vuelve_a_migrar(tmp_path, capsys):
+    ruta = copiar_base(BASES_EXISTENTES[0], tmp_path)
+    DatabaseManager(ruta)
+    capsys.readouterr()
+
+    db = DatabaseManager(ruta)
+
+    assert 'Aplicando migración' not in capsys.readouterr().out
+    assert version_de(ruta) == ultima_version()
+    assert db.agregar_pregunta('Python', '¿Qué aporta la migración idempotente?')
+
+
+def test_base_heredada_con_duplicados(tmp_path):
+    ruta = str(tmp_path / 'heredada.db')
+    conn = sqlite3.connect(ruta)
+    conn.execute('''
+        CREATE TABLE preguntas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habilidad TEXT NOT NULL,
+            pregunta TEXT NOT NULL,
+            tipo TEXT DEFAULT 'conceptual',
+            nivel TEXT DEFAULT 'intermedio',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany('INSERT INTO preguntas (habilidad, pregunta) VALUES (?, ?)', [
+        ('Python', '¿Qué es un generador?'),
+        ('Python', '¿Qué es un generador?'),
+        ('Python', '¿Qué es un decorador?'),
+    ])
+    conn.commit()
+    conn.close()
+
+    db = DatabaseManager(ruta)
+
+    # Se conserva la fila más antigua de cada duplicado y el índice único queda creado
+    assert [fila[0] for fila in leer_filas(ruta)] == [1, 3]
+    db.agregar_pregunta('Python', '¿Qué es un generador?', verificar_duplicados=False)
+    assert db.contar_preguntas() == 2
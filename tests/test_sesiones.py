@@ -0,0 +1,81 @@
+"""Sesiones de entrevista: no repetir preguntas servidas"""
+
+import pytest
+
+from compositor import CompositorEntrevistas
+from database_manager import DatabaseManager
+from sesiones import BitmapVistas, GestorSesiones
+
+
+@pytest.fixture
+def sesiones(banco, tmp_path):
+    gestor = GestorSesiones(banco, ruta=str(tmp_path / 'sesiones.db'))
+    yield gestor
+    gestor.cerrar()
+
+
+def test_no_repite_hasta_agotar_el_pool(sesiones):
+    sesion_id = sesiones.crear('candidata')
+    servidas = []
+    # Python tiene 18 preguntas: 9 generaciones de 2 sin repetir
+    for _ in range(9):
+        resultado = sesiones.generar(sesion_id, ['Python'], cantidad=2)
+        assert resultado['repetidas'] == 0
+        servidas.extend(resultado['preguntas']['Python'])
+    assert len(set(servidas)) == 18
+
+    agotada = sesiones.generar(sesion_id, ['Python'], cantidad=2)
+    assert agotada['repetidas'] == 2
+    assert agotada['agotadas'] == ['Python']
+    assert sesiones.obtener(sesion_id)['servidas'] == 18
+
+
+def test_sesiones_independientes(sesiones):
+    primera, segunda = sesiones.crear(), sesiones.crear()
+    for _ in range(9):
+        sesiones.generar(primera, ['Docker'], cantidad=2)
+    assert sesiones.generar(segunda, ['Docker'], cantidad=2)['repetidas'] == 0
+
+
+def test_sesion_inexistente_o_eliminada(sesiones):
+    assert sesiones.generar('no-existe', ['Python']) is None
+    sesion_id = sesiones.crear()
+    assert sesiones.eliminar(sesion_id)
+    assert sesiones.obtener(sesion_id) is None
+
+
+def test_compositor_en_sesion_no_repite(banco, sesiones):
+    compositor = CompositorEntrevistas(banco)
+    especificacion = {'niveles': {'basico': 2, 'avanzado': 2}, 'habilidades': ['Python']}
+    sesion_id = sesiones.crear()
+
+    ids = []
+    for _ in range(3):
+        resultado = compositor.componer_en_sesion(sesiones, sesion_id, especificacion)
+        assert resultado['repetidas'] == 0
+        ids.extend(p['id'] for p in resultado['habilidades']['Python']['preguntas'])
+    assert len(set(ids)) == 12
+
+
+def test_escritura_de_otro_gestor_invalida_los_pools(banco, sesiones, tmp_path):
+    sesion_id = sesiones.crear()
+    sesiones.generar(sesion_id, ['Docker'], cantidad=1)
+
+    # Otro worker borra preguntas: la revisión del banco cambia y el pool cacheado se descarta
+    otro = DatabaseManager(str(tmp_path / 'banco.db'))
+    borradas = dict(otro.obtener_pool_preguntas(['Docker'])['Docker'][:10])
+    for pregunta_id in borradas:
+        assert otro.eliminar_pregunta(pregunta_id)
+
+    textos_borrados = set(borradas.values())
+    resultado = sesiones.generar(sesion_id, ['Docker'], cantidad=8)
+    assert not textos_borrados & set(resultado['preguntas']['Docker'])
+
+
+def test_bitmap_de_vistas_comprimido():
+    vistas = BitmapVistas()
+    for pregunta_id in (1, 8, 250_000):
+        vistas.agregar(pregunta_id)
+    copia = BitmapVistas.descomprimir(vistas.comprimir())
+    assert 8 in copia and 250_000 in copia and 2 not in copia
+    assert len(vistas.comprimir()) < 1000
@@ -0,0 +1,77 @@
+"""Snapshot del catálogo: lo que se lee del archivo coincide con la base"""
+
+import os
+
+import pytest
+
+import snapshot_catalogo
+from snapshot_catalogo import GestorSoloLectura, construir_snapshot, firma_origen
+
+
+@pytest.fixture
+def ruta_snapshot(banco, tmp_path):
+    ruta = str(tmp_path / 'catalogo.snapshot')
+    construir_snapshot(banco, ruta)
+    return ruta
+
+
+def test_ida_y_vuelta(banco, ruta_snapshot):
+    catalogo = GestorSoloLectura(ruta_snapshot)
+
+    assert catalogo.contar_preguntas() == banco.contar_preguntas()
+    assert catalogo.obtener_todas_habilidades() == banco.obtener_todas_habilidades()
+    for habilidad in banco.obtener_todas_habilidades():
+        assert catalogo.obtener_estadisticas_habilidad(habilidad) == banco.obtener_estadisticas_habilidad(habilidad)
+        assert sorted(catalogo.obtener_pool_preguntas([habilidad])[habilidad]) == \
+            sorted(banco.obtener_pool_preguntas([habilidad])[habilidad])
+
+    campos = ('id', 'habilidad', 'pregunta', 'tipo', 'nivel', 'categoria')
+    for pregunta_id, _ in banco.obtener_pool_preguntas(['Docker'])['Docker']:
+        original = banco.obtener_pregunta_por_id(pregunta_id)
+        leida = catalogo.obtener_pregunta_por_id(pregunta_id)
+        assert {c: leida[c] for c in campos} == {c: original[c] for c in campos}
+    assert catalogo.obtener_pregunta_por_id(10_000) == {}
+
+
+def test_busqueda_y_habilidad_normalizada(banco, ruta_snapshot):
+    catalogo = GestorSoloLectura(ruta_snapshot)
+
+    assert catalogo.existe_habilidad('  PYTHON ')
+    assert catalogo.obtener_estadisticas_habilidad('python')['total'] == 18
+    encontradas = set(catalogo.buscar_preguntas('TIPO PRÁCTICA', limit=100))
+    esperadas = set(banco.buscar_preguntas('tipo practica', limit=100))
+    assert encontradas == esperadas and len(encontradas) == 18
+
+
+def test_escrituras_rechazadas(ruta_snapshot):
+    catalogo = GestorSoloLectura(ruta_snapshot)
+    assert not catalogo.agregar_pregunta('Python', '¿Se puede escribir en el snapshot?')
+    assert not catalogo.eliminar_pregunta(1)
+
+
+def test_firma_cambia_con_cada_escritura(banco):
+    firma = firma_origen(banco)
+    pregunta_id, texto = banco.obtener_pool_preguntas(['Python'])['Python'][0]
+
+    # Editar no cambia ni el conteo ni el id máximo; la revisión sí
+    assert banco.actualizar_pregunta(pregunta_id, texto.replace('?', ' (editada)?'))
+    editada = firma_origen(banco)
+    assert editada != firma
+
+    assert banco.eliminar_pregunta(pregunta_id)
+    assert banco.agregar_pregunta('Python', '¿Pregunta reinsertada tras el borrado?', verificar_duplicados=False)
+    assert firma_origen(banco) != editada
+
+
+def test_recarga_al_publicar_un_snapshot_nuevo(banco, ruta_snapshot, monkeypatch):
+    monkeypatch.setattr(snapshot_catalogo, 'INTERVALO_RECARGA_S', 0.0)
+    catalogo = GestorSoloLectura(ruta_snapshot)
+    revision = catalogo.obtener_revision()
+
+    assert banco.agregar_pregunta('Go', '¿Cómo funcionan las goroutines en Go?')
+    construir_snapshot(banco, ruta_snapshot)
+    os.utime(ruta_snapshot)
+
+    assert catalogo.contar_preguntas() == banco.contar_preguntas()
+    assert catalogo.existe_habilidad('Go')
+    assert catalogo.obtener_revision() != revision